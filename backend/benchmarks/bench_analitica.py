@@ -0,0 +1,148 @@
+"""
+Benchmark de los informes de analítica: sobre los diccionarios vivos frente a
+la instantánea columnar mapeada en un proceso aparte.
+
+Para cada informe (asistencia, accesos, progresos) mide:
+
+  en vivo       el mismo cálculo en Python recorriendo GimnasioService dentro
+                del event loop: todo ese tiempo el loop no atiende peticiones
+  instantanea   latencia del informe calculado en el proceso de analítica
+                (primera vez y repetido desde la caché) y el máximo retraso
+                que sufre un latido de 1 ms del event loop mientras tanto
+
+y el coste de exportar la instantánea, que corre en un hilo de las tareas.
+
+Uso (desde la carpeta backend/):
+    python benchmarks/bench_analitica.py                   # 5000 socios
+    python benchmarks/bench_analitica.py --socios 20000 --progresos 50
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from src.Services.Gimnasio_service import GimnasioService  # noqa: E402
+from src.Services.Analitica_service import AnaliticaService  # noqa: E402
+from benchmarks.poblacion import crear_poblacion  # noqa: E402
+
+
+# =========== LOS MISMOS INFORMES SOBRE LOS DICCIONARIOS VIVOS ===========
+
+def asistencia_en_vivo(gym: GimnasioService) -> Dict[str, Any]:
+    clases = sorted(gym.clases.values(), key=lambda c: -len(c.socios_inscritos) / c.aforo)
+    con_reserva = {s for c in gym.clases.values() for s in c.socios_inscritos}
+    return {"reservas": sum(len(c.socios_inscritos) for c in clases),
+            "socios_sin_reservas": len(gym.socios) - len(con_reserva),
+            "por_clase": [(c.id, len(c.socios_inscritos) / c.aforo) for c in clases[:50]]}
+
+
+def accesos_en_vivo(gym: GimnasioService, dias: int = 30) -> Dict[str, Any]:
+    desde = date.today().toordinal() - dias + 1
+    recientes = [a for a in gym.accesos.values() if a.fecha.toordinal() >= desde]
+    return {"por_hora": Counter(a.hora.hour for a in recientes),
+            "por_dia_semana": Counter(a.fecha.weekday() for a in recientes),
+            "socios_activos": len({a.socio_id for a in recientes})}
+
+
+def progresos_en_vivo(gym: GimnasioService, cubetas: int = 20) -> Dict[str, Any]:
+    valores = sorted(p.peso for p in gym.progresos.values())
+    ancho = (valores[-1] - valores[0]) / cubetas or 1
+    return {"media": statistics.fmean(valores),
+            "percentiles": [valores[int(len(valores) * q)] for q in (0.1, 0.25, 0.5, 0.75, 0.9, 0.99)],
+            "histograma": Counter(min(int((v - valores[0]) / ancho), cubetas - 1) for v in valores)}
+
+
+# =========== MEDIDA ===========
+
+async def con_latido(corrutina: Awaitable) -> Tuple[float, float]:
+    """(segundos de la corrutina, máximo retraso de un latido de 1 ms del event loop mientras corre)."""
+    retraso_max = 0.0
+    terminado = False
+
+    async def latido():
+        nonlocal retraso_max
+        while not terminado:
+            antes = time.perf_counter()
+            await asyncio.sleep(0.001)
+            retraso_max = max(retraso_max, time.perf_counter() - antes - 0.001)
+
+    tarea = asyncio.create_task(latido())
+    await asyncio.sleep(0)
+    inicio = time.perf_counter()
+    await corrutina
+    duracion = time.perf_counter() - inicio
+    terminado = True
+    await tarea
+    return duracion, retraso_max
+
+
+async def en_loop(funcion: Callable[[], object]) -> None:
+    funcion()  # a propósito sin await intermedio: así bloquea el loop un cálculo sobre el servicio vivo
+
+
+async def main_async(args) -> None:
+    gym = GimnasioService()
+    pob = crear_poblacion(gym, socios=args.socios, clases=args.clases, series=0, rutinas=0,
+                          progresos_por_socio=args.progresos, accesos_por_socio=args.accesos)
+    rnd = random.Random(args.semilla)
+    for socio_id in pob.socios:
+        for clase_id in rnd.sample(pob.clases, 3):
+            try:
+                gym.reservar_clase(socio_id, clase_id)
+            except ValueError:
+                pass  # clase llena
+    print(f"{len(gym.socios):,} socios, {len(gym.progresos):,} progresos, {len(gym.accesos):,} accesos, "
+          f"{sum(len(c.socios_inscritos) for c in gym.clases.values()):,} reservas")
+
+    directorio = tempfile.mkdtemp(prefix="bench-analitica-")
+    gym.analitica = AnaliticaService(directorio)
+    try:
+        duracion, retraso = await con_latido(asyncio.to_thread(gym.exportar_analitica))
+        m = gym.analitica.manifiesto
+        print(f"  exportar     {duracion * 1000:9.1f} ms en un hilo  (latido max {retraso * 1000:6.1f} ms, "
+              f"{m['bytes'] / 1e6:.1f} MB)")
+        # El pool de procesos se arranca fuera de la medida (en producción vive todo el proceso)
+        await gym.analitica.informe("accesos", dias=1)
+
+        informes: List[Tuple[str, Callable[[], object], Dict[str, Any]]] = [
+            ("asistencia", lambda: asistencia_en_vivo(gym), {"limite": 50}),
+            ("accesos", lambda: accesos_en_vivo(gym), {"dias": 30}),
+            ("progresos", lambda: progresos_en_vivo(gym), {"campo": "peso", "cubetas": 20}),
+        ]
+        for nombre, en_vivo, parametros in informes:
+            vivo = [await con_latido(en_loop(en_vivo)) for _ in range(args.repeticiones)]
+            primera = await con_latido(gym.analitica.informe(nombre, **parametros))
+            cache = await con_latido(gym.analitica.informe(nombre, **parametros))
+            print(f"  {nombre:<11}  en vivo={statistics.median(d for d, _ in vivo) * 1000:8.1f} ms "
+                  f"(latido max {max(r for _, r in vivo) * 1000:7.1f} ms)   "
+                  f"instantanea={primera[0] * 1000:7.1f} ms (latido max {primera[1] * 1000:5.1f} ms)   "
+                  f"cache={cache[0] * 1000:6.3f} ms")
+    finally:
+        gym.analitica.cerrar()
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--socios", type=int, default=5000)
+    parser.add_argument("--clases", type=int, default=100)
+    parser.add_argument("--progresos", type=int, default=100, help="progresos por socio")
+    parser.add_argument("--accesos", type=int, default=30, help="accesos por socio")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--semilla", type=int, default=42)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+Benchmark de endpoints síncronos frente a asíncronos con alta concurrencia.
+
+Levanta con uvicorn (un solo worker) la misma mini-API sobre un GimnasioService
+real en dos versiones:
+
+  sync    endpoints `def`: Starlette los ejecuta en su threadpool (40 hilos)
+  async   endpoints `async def` sobre GimnasioServiceAsync (bcrypt en su pool de CPU)
+
+Las escrituras pasan por un almacenamiento con latencia simulada (--latencia-ms),
+como lo haría una base de datos remota: en sync la espera ocupa un hilo, en async
+es un `await`.
+
+  escrituras   ráfaga de POST /socios/{id}/accesos con --concurrencia conexiones
+  conexiones   --long-polls conexiones abiertas en GET /espera mientras se miden escrituras
+  login        logins (bcrypt) en paralelo mientras se miden escrituras
+
+Uso (desde la carpeta backend/):
+    python benchmarks/bench_async.py
+    python benchmarks/bench_async.py escrituras --concurrencia 2000 --latencia-ms 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from typing import Dict, List, Tuple
+from urllib.parse import urlencode
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from fastapi import FastAPI, HTTPException  # noqa: E402
+
+from src.Services.Gimnasio_service import GimnasioService  # noqa: E402
+from src.Services.Gimnasio_async_service import AlmacenamientoAsync, GimnasioServiceAsync  # noqa: E402
+from benchmarks.bench_carga import _puerto_libre, percentil  # noqa: E402
+from benchmarks.clientes import ClienteHTTP  # noqa: E402
+from benchmarks.poblacion import PASSWORD_BENCH, crear_poblacion  # noqa: E402
+
+MODOS = ("sync", "async")
+ESCENARIOS = ("escrituras", "conexiones", "login")
+H_FORM = {"Content-Type": "application/x-www-form-urlencoded"}
+
+
+class AlmacenamientoConLatencia(AlmacenamientoAsync):
+    """Almacenamiento remoto simulado: cada escritura tarda `latencia` segundos de I/O."""
+
+    def __init__(self, latencia: float) -> None:
+        self.latencia = latencia
+
+    async def anotar(self, operacion: str, datos: Dict) -> None:
+        await asyncio.sleep(self.latencia)
+
+
+def construir_app(modo: str, servicio: GimnasioService, latencia: float) -> FastAPI:
+    app = FastAPI()
+
+    if modo == "sync":
+        @app.post("/socios/{socio_id}/accesos")
+        def acceso(socio_id: str):
+            try:
+                acceso = servicio.registrar_acceso(socio_id)
+            except ValueError as e:
+                raise HTTPException(status_code=404, detail=str(e))
+            time.sleep(latencia)  # la escritura en el almacenamiento bloquea el hilo
+            return {"id": acceso.id}
+
+        @app.get("/espera")
+        def espera(segundos: float):
+            time.sleep(segundos)
+            return {"ok": True}
+
+        @app.post("/token")
+        def token(email: str, password: str):
+            if not servicio.autenticar_socio(email, password):
+                raise HTTPException(status_code=401)
+            return {"ok": True}
+    else:
+        servicio_async = GimnasioServiceAsync(servicio, AlmacenamientoConLatencia(latencia))
+
+        @app.post("/socios/{socio_id}/accesos")
+        async def acceso(socio_id: str):
+            try:
+                acceso = await servicio_async.registrar_acceso(socio_id)
+            except ValueError as e:
+                raise HTTPException(status_code=404, detail=str(e))
+            return {"id": acceso.id}
+
+        @app.get("/espera")
+        async def espera(segundos: float):
+            await asyncio.sleep(segundos)
+            return {"ok": True}
+
+        @app.post("/token")
+        async def token(email: str, password: str):
+            if not await servicio_async.autenticar_socio(email, password):
+                raise HTTPException(status_code=401)
+            return {"ok": True}
+
+    @app.get("/")
+    def raiz():
+        return {"modo": modo}
+
+    return app
+
+
+def _servir(app: FastAPI, puerto: int) -> None:
+    import uvicorn
+    uvicorn.run(app, host="127.0.0.1", port=puerto, log_level="warning", backlog=8192)
+
+
+def lanzar(app: FastAPI):
+    """
+    Arranca uvicorn en un proceso hijo (fork, hereda la población ya creada) y
+    espera a que responda. Devuelve (proceso, url).
+    """
+    import multiprocessing
+    import urllib.request
+    puerto = _puerto_libre()
+    proceso = multiprocessing.get_context("fork").Process(target=_servir, args=(app, puerto), daemon=True)
+    proceso.start()
+    url = f"http://127.0.0.1:{puerto}"
+    limite = time.monotonic() + 30
+    while time.monotonic() < limite:
+        try:
+            with urllib.request.urlopen(url + "/", timeout=1):
+                return proceso, url
+        except OSError:
+            time.sleep(0.05)
+    proceso.terminate()
+    raise RuntimeError("uvicorn no arrancó a tiempo")
+
+
+# =========== CARGA ===========
+
+def _resumir(latencias: List[float], duracion: float, errores: int) -> Dict[str, float]:
+    ordenadas = sorted(latencias)
+    return {
+        "peticiones": len(ordenadas),
+        "errores": errores,
+        "rps": len(ordenadas) / duracion if duracion > 0 else 0.0,
+        "p50_ms": percentil(ordenadas, 50) * 1000,
+        "p99_ms": percentil(ordenadas, 99) * 1000,
+        "max_ms": (ordenadas[-1] if ordenadas else 0.0) * 1000,
+    }
+
+
+async def rafaga(url: str, peticiones: List[Tuple[str, str]], concurrencia: int) -> Dict[str, float]:
+    """Lanza las peticiones (método, ruta) con `concurrencia` conexiones simultáneas."""
+    cliente = ClienteHTTP(url, conexiones=concurrencia)
+    pendientes = iter(peticiones)
+    latencias: List[float] = []
+    errores = 0
+
+    async def worker():
+        nonlocal errores
+        for metodo, ruta in pendientes:
+            inicio = time.perf_counter()
+            try:
+                estado, _ = await cliente.peticion(metodo, ruta, H_FORM if metodo == "POST" else None)
+            except (OSError, asyncio.IncompleteReadError):
+                estado = 0
+            latencias.append(time.perf_counter() - inicio)
+            if estado != 200:
+                errores += 1
+
+    inicio = time.perf_counter()
+    try:
+        await asyncio.gather(*(worker() for _ in range(concurrencia)))
+    finally:
+        await cliente.cerrar()
+    return _resumir(latencias, time.perf_counter() - inicio, errores)
+
+
+def _escrituras(socios: List[str], n: int, rnd: random.Random) -> List[Tuple[str, str]]:
+    return [("POST", f"/socios/{rnd.choice(socios)}/accesos") for _ in range(n)]
+
+
+async def escenario(nombre: str, url: str, socios: List[str], args) -> Dict[str, Dict[str, float]]:
+    rnd = random.Random(args.semilla)
+    if nombre == "escrituras":
+        return {"escrituras": await rafaga(url, _escrituras(socios, args.peticiones, rnd), args.concurrencia)}
+
+    # Tráfico de fondo (long polls o logins) y, a la vez, escrituras medidas con poca concurrencia
+    if nombre == "conexiones":
+        fondo = [("GET", f"/espera?segundos={args.espera}")] * args.long_polls
+        concurrencia_fondo = args.long_polls
+    else:
+        fondo = [("POST", "/token?" + urlencode({"email": f"socio{rnd.randrange(len(socios))}@bench.gym",
+                                                  "password": PASSWORD_BENCH}))
+                 for _ in range(args.logins)]
+        concurrencia_fondo = min(args.logins, 16)
+    tarea_fondo = asyncio.create_task(rafaga(url, fondo, concurrencia_fondo))
+    await asyncio.sleep(0.2)  # que el tráfico de fondo esté ya en curso
+    medidas = await rafaga(url, _escrituras(socios, args.peticiones // 5, rnd), 20)
+    return {nombre: await tarea_fondo, "escrituras durante " + nombre: medidas}
+
+
+def imprimir(modo: str, nombre: str, r: Dict[str, float]) -> None:
+    print(f"  {modo:<6} {nombre:<26} {r['peticiones']:>6} pet  {r['rps']:>8.1f} rps  "
+          f"p50={r['p50_ms']:8.1f} ms  p99={r['p99_ms']:8.1f} ms  max={r['max_ms']:8.1f} ms  errores={r['errores']}")
+
+
+async def main_async(args) -> None:
+    resultados: Dict[str, Dict] = {}
+    for modo in args.modos:
+        servicio = GimnasioService()
+        pob = crear_poblacion(servicio, socios=args.socios, entrenadores=1, clases=0, series=0, rutinas=0,
+                              progresos_por_socio=0, accesos_por_socio=0, semilla=args.semilla)
+        proceso, url = lanzar(construir_app(modo, servicio, args.latencia_ms / 1000))
+        try:
+            for nombre in args.escenarios or ESCENARIOS:
+                for etiqueta, r in (await escenario(nombre, url, pob.socios, args)).items():
+                    resultados.setdefault(modo, {})[etiqueta] = r
+                    imprimir(modo, etiqueta, r)
+        finally:
+            proceso.terminate()
+            proceso.join()
+    if args.json:
+        print(json.dumps(resultados, indent=2))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("escenarios", nargs="*", metavar="escenario",
+                        help=f"Escenarios a ejecutar: {', '.join(ESCENARIOS)} (por defecto, todos)")
+    parser.add_argument("--modos", nargs="+", choices=MODOS, default=list(MODOS))
+    parser.add_argument("--socios", type=int, default=1000)
+    parser.add_argument("--peticiones", type=int, default=5000, help="Escrituras por escenario")
+    parser.add_argument("--concurrencia", type=int, default=1000, help="Conexiones simultáneas en la ráfaga")
+    parser.add_argument("--latencia-ms", type=float, default=20, help="Latencia simulada del almacenamiento")
+    parser.add_argument("--long-polls", type=int, default=1000, help="Conexiones en espera (escenario conexiones)")
+    parser.add_argument("--espera", type=float, default=1.0, help="Segundos que dura cada long poll")
+    parser.add_argument("--logins", type=int, default=32, help="Logins del escenario login")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="Imprimir también los resultados en JSON")
+    args = parser.parse_args()
+    desconocidos = set(args.escenarios) - set(ESCENARIOS)
+    if desconocidos:
+        parser.error(f"escenarios desconocidos: {', '.join(sorted(desconocidos))}")
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
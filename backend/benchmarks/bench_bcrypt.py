@@ -0,0 +1,72 @@
+"""
+Benchmark del coste de bcrypt: cuánto tarda verificar una contraseña con
+cada coste en esta máquina y qué coste corresponde a un tiempo objetivo.
+
+  costes        verificación (ms) y logins por segundo y núcleo para cada
+                coste entre --desde y --hasta
+  objetivo      coste que elegiría BCRYPT_ROUNDS=auto para --objetivo-ms
+  rehash        login normal frente al primer login tras cambiar el coste
+                (verifica con el coste viejo y hashea con el nuevo; solo
+                ocurre una vez por socio)
+
+Uso (desde la carpeta backend/):
+    python benchmarks/bench_bcrypt.py                      # costes 8 a 14, objetivo 250 ms
+    python benchmarks/bench_bcrypt.py --objetivo-ms 100 --hasta 13
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from src.auth import calibrar_coste, tiempo_verificacion  # noqa: E402
+
+PASSWORD = "bench1234"
+
+
+def medir_login(contexto, hashed: str, repeticiones: int) -> float:
+    """Mediana en milisegundos de verify_and_update (lo que hace cada login)."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        contexto.verify_and_update(PASSWORD, hashed)
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--desde", type=int, default=8)
+    parser.add_argument("--hasta", type=int, default=14)
+    parser.add_argument("--objetivo-ms", type=float, default=250)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    from passlib.context import CryptContext
+
+    print(f"{os.cpu_count()} núcleos")
+    for rondas in range(args.desde, args.hasta + 1):
+        segundos = tiempo_verificacion(rondas, args.repeticiones)
+        print(f"  coste {rondas:>2}   verificar={segundos * 1000:8.1f} ms   logins={1 / segundos:8.1f}/s por núcleo")
+
+    inicio = time.perf_counter()
+    elegido = calibrar_coste(args.objetivo_ms)
+    print(f"  objetivo {args.objetivo_ms:.0f} ms -> coste {elegido} (calibrado en {time.perf_counter() - inicio:.2f} s)")
+
+    # Política vieja un punto por debajo de la elegida: el primer login rehashea, los siguientes no
+    viejo = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=elegido - 1)
+    nuevo = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=elegido,
+                         bcrypt__min_rounds=elegido, bcrypt__max_rounds=elegido)
+    hash_viejo = viejo.hash(PASSWORD)
+    hash_nuevo = nuevo.hash(PASSWORD)
+    assert nuevo.needs_update(hash_viejo) and not nuevo.needs_update(hash_nuevo)
+    print(f"  rehash     login normal={medir_login(nuevo, hash_nuevo, args.repeticiones):8.1f} ms   "
+          f"primer login tras subir de {elegido - 1} a {elegido}="
+          f"{medir_login(nuevo, hash_viejo, args.repeticiones):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,522 @@
+"""
+Benchmark de carga de la API del gimnasio.
+
+Monta una población sintética (socios, clases, rutinas, historial de progreso y
+accesos) y lanza mezclas realistas de tráfico contra la app de `src.main`:
+
+  login       tormenta de logins (bcrypt)            POST /token
+  refresco    renovación de sesiones (sin bcrypt)    POST /token/refresh
+  reservas    avalancha de reservas y cancelaciones  POST /reservas, DELETE /reservas/{id}
+  iot         ráfagas de sincronización IoT          POST /iot/sincronizar/{id}
+  catalogo    navegación del catálogo y del perfil   GET /clases, /rutinas, /progreso...
+  cobertura   una pasada por cada endpoint de la API
+
+Informa de throughput, latencias p50/p95/p99 y memoria (RSS máximo), y permite
+guardar una baseline y compararse con ella para detectar regresiones.
+
+Uso (desde la carpeta backend/):
+    python benchmarks/bench_carga.py --socios 2000 --concurrencia 50
+    python benchmarks/bench_carga.py --modo http            # uvicorn en localhost
+    python benchmarks/bench_carga.py --guardar-baseline benchmarks/baselines/local.json
+    python benchmarks/bench_carga.py --baseline benchmarks/baselines/local.json --tolerancia 0.25
+    PARTICIONES_SOCIOS=2 python benchmarks/bench_carga.py cobertura   # socios en particiones
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sys
+import time
+import urllib.request
+from dataclasses import dataclass
+from datetime import date
+from typing import Callable, Dict, Iterator, List, Tuple
+from urllib.parse import urlencode
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Los administradores se leen al importar src.auth
+os.environ.setdefault("ADMIN_EMAILS", "socio0@bench.gym")
+
+from src.main import app, gym_service, gym_async, control_carga, sesiones, _emitir_tokens  # noqa: E402
+from src.Services.Particiones_service import GimnasioParticionado  # noqa: E402
+from benchmarks.clientes import ClienteASGI, ClienteHTTP  # noqa: E402
+from benchmarks.poblacion import PASSWORD_BENCH, Poblacion, crear_poblacion  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class _Sincrono:
+    """Llamadas síncronas a la API asíncrona desde otro hilo, para montar la población con particiones."""
+
+    def __init__(self, asincrono, loop: asyncio.AbstractEventLoop) -> None:
+        self._asincrono = asincrono
+        self._loop = loop
+
+    def __getattr__(self, nombre: str) -> Callable:
+        metodo = getattr(self._asincrono, nombre)
+        return lambda *args, **kwargs: asyncio.run_coroutine_threadsafe(
+            metodo(*args, **kwargs), self._loop).result()
+
+
+@dataclass
+class Peticion:
+    ruta: str                 # plantilla, para agrupar las estadísticas
+    metodo: str
+    url: str
+    headers: Dict[str, str]
+    cuerpo: bytes = b""
+    esperados: Tuple[int, ...] = (200, 201)
+
+
+def _auth(pob: Poblacion, socio_id: str) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {pob.tokens[socio_id]}"}
+
+
+def _json(datos) -> Tuple[Dict[str, str], bytes]:
+    return {"Content-Type": "application/json"}, json.dumps(datos).encode()
+
+
+# =========== ESCENARIOS ===========
+
+def escenario_login(pob: Poblacion, rnd: random.Random, n: int) -> Iterator[Peticion]:
+    for _ in range(n):
+        email = rnd.choice(pob.emails)
+        cuerpo = urlencode({"username": email, "password": PASSWORD_BENCH}).encode()
+        yield Peticion("/token", "POST", "/token",
+                       {"Content-Type": "application/x-www-form-urlencoded"}, cuerpo)
+
+
+def _sesion_nueva(email: str) -> Dict[str, str]:
+    """Tokens de una sesión abierta directamente en el almacén (sin pasar por bcrypt)."""
+    return _emitir_tokens(email, *sesiones.abrir(email))
+
+
+def escenario_refresco(pob: Poblacion, rnd: random.Random, n: int) -> Iterator[Peticion]:
+    # Cada token de refresco vale una vez: una sesión por petición
+    for _ in range(n):
+        h, cuerpo = _json({"refresh_token": _sesion_nueva(rnd.choice(pob.emails))["refresh_token"]})
+        yield Peticion("/token/refresh", "POST", "/token/refresh", h, cuerpo)
+
+
+def escenario_reservas(pob: Poblacion, rnd: random.Random, n: int) -> Iterator[Peticion]:
+    # Pocas clases muy demandadas: muchas reservas acaban en "clase llena" (400).
+    # Incluye sesiones de series, que se materializan al recibir la primera reserva.
+    calientes = pob.clases[:5] + pob.sesiones[:5]
+    for _ in range(n):
+        socio_id = rnd.choice(pob.socios)
+        clase_id = rnd.choice(calientes)
+        if rnd.random() < 0.7:
+            h, cuerpo = _json({"clase_id": clase_id})
+            yield Peticion("/reservas", "POST", "/reservas", {**_auth(pob, socio_id), **h}, cuerpo,
+                           esperados=(201, 400))
+        else:
+            yield Peticion("/reservas/{clase_id}", "DELETE", f"/reservas/{clase_id}",
+                           _auth(pob, socio_id), esperados=(200, 404))
+
+
+def escenario_iot(pob: Poblacion, rnd: random.Random, n: int) -> Iterator[Peticion]:
+    for _ in range(n):
+        socio_id = rnd.choice(pob.socios)
+        yield Peticion("/iot/sincronizar/{dispositivo_id}", "POST",
+                       f"/iot/sincronizar/{pob.dispositivos[socio_id]}", _auth(pob, socio_id))
+
+
+def escenario_catalogo(pob: Poblacion, rnd: random.Random, n: int) -> Iterator[Peticion]:
+    mezcla: List[Tuple[float, str, bool]] = [
+        (0.30, "/clases", False),
+        (0.20, "/rutinas", False),
+        (0.05, "/buscar?q=ejercicio", False),
+        (0.10, "/entrenadores", False),
+        (0.10, "/rutinas/me", True),
+        (0.05, "/rutinas/recomendadas", True),
+        (0.10, "/socios/me", True),
+        (0.10, "/progreso", True),
+    ]
+    pesos = [m[0] for m in mezcla]
+    for _ in range(n):
+        _, ruta, autenticada = rnd.choices(mezcla, pesos)[0]
+        headers = _auth(pob, rnd.choice(pob.socios)) if autenticada else {}
+        yield Peticion(ruta.partition("?")[0], "GET", ruta, headers)
+
+
+def escenario_cobertura(pob: Poblacion, rnd: random.Random, n: int) -> Iterator[Peticion]:
+    """Recorre todos los endpoints; `n` es el número de pasadas."""
+    admin = pob.socios[0]
+    for i in range(n):
+        socio_id = rnd.choice(pob.socios[1:] or pob.socios)
+        auth = _auth(pob, socio_id)
+        clase_id = rnd.choice(pob.clases)
+        rutina_id = rnd.choice(pob.rutinas)
+        sufijo = f"{i}-{rnd.randrange(10**9)}"
+        for p in _peticiones_cobertura(pob, admin, socio_id, auth, clase_id, rutina_id, sufijo):
+            yield p
+
+
+def _peticiones_cobertura(pob, admin, socio_id, auth, clase_id, rutina_id, sufijo) -> List[Peticion]:
+    h_json = {"Content-Type": "application/json"}
+    admin_auth = _auth(pob, admin)
+    email = pob.emails[pob.socios.index(socio_id)]
+    ndjson = json.dumps({"nombre": f"Rutina import {sufijo}", "duracion": 30, "dificultad": "intermedio"}).encode()
+    return [
+        Peticion("/", "GET", "/", {}),
+        Peticion("/token", "POST", "/token", {"Content-Type": "application/x-www-form-urlencoded"},
+                 urlencode({"username": email, "password": PASSWORD_BENCH}).encode()),
+        Peticion("/token/refresh", "POST", "/token/refresh", h_json,
+                 json.dumps({"refresh_token": _sesion_nueva(email)["refresh_token"]}).encode()),
+        Peticion("/logout", "POST", "/logout", {"Authorization": f"Bearer {_sesion_nueva(email)['access_token']}"},
+                 esperados=(204,)),
+        Peticion("/socios", "POST", "/socios", h_json, json.dumps({
+            "nombre": "Nuevo", "email": f"nuevo{sufijo}@bench.gym", "fecha_nacimiento": "1990-01-01",
+            "nivel": "intermedio", "password": PASSWORD_BENCH}).encode()),
+        Peticion("/socios", "GET", "/socios", auth),
+        Peticion("/socios/me", "GET", "/socios/me", auth),
+        Peticion("/entrenadores", "POST", "/entrenadores", h_json, json.dumps({
+            "nombre": "Nuevo Entrenador", "email": f"entrenador{sufijo}@bench.gym", "especialidad": "Boxeo"}).encode(),
+            esperados=(201,)),
+        Peticion("/entrenadores", "GET", "/entrenadores", {}),
+        Peticion("/sedes", "POST", "/sedes", {**admin_auth, **h_json},
+                 json.dumps({"nombre": f"Sede {sufijo}", "direccion": "Calle Bench 1"}).encode(), esperados=(201,)),
+        Peticion("/sedes", "GET", "/sedes", {}),
+        Peticion("/sedes/{sede_id}/clases", "GET", "/sedes/principal/clases", {}),
+        Peticion("/sedes/{sede_id}/entrenadores", "GET", "/sedes/principal/entrenadores", {}),
+        Peticion("/sedes/{sede_id}/ocupacion", "GET", "/sedes/principal/ocupacion", {}),
+        Peticion("/sedes/{sede_id}/accesos", "GET", "/sedes/principal/accesos?limite=20", admin_auth),
+        Peticion("/sedes/{sede_id}/dispositivos", "GET", "/sedes/principal/dispositivos", admin_auth),
+        Peticion("/clases", "POST", "/clases", {**auth, **h_json}, json.dumps({
+            "nombre": f"Clase {sufijo}", "horario": "12:00", "aforo": 20, "entrenador_id": pob.entrenadores[0]}).encode(),
+            esperados=(200, 400)),  # 400: la franja ya está ocupada
+        Peticion("/entrenadores/{entrenador_id}/horario", "GET", f"/entrenadores/{pob.entrenadores[0]}/horario", {}),
+        Peticion("/entrenadores/{entrenador_id}/disponibilidad", "GET",
+                 f"/entrenadores/{pob.entrenadores[0]}/disponibilidad?horario=07:00&duracion=45&dia=lunes", {}),
+        Peticion("/salas/{sala}/horario", "GET", "/salas/Box/horario?dia=martes", {}),
+        Peticion("/clases", "GET", "/clases", {}),
+        Peticion("/series", "POST", "/series", {**auth, **h_json}, json.dumps({
+            "nombre": f"Serie {sufijo}", "horario": "06:45", "aforo": 15, "entrenador_id": pob.entrenadores[-1],
+            "fecha_inicio": date.today().isoformat(), "regla": "FREQ=WEEKLY;BYDAY=SU;COUNT=8"}).encode(),
+            esperados=(201, 400)),  # 400: la franja ya está ocupada
+        Peticion("/series", "GET", "/series", {}),
+        Peticion("/series/{serie_id}/ocurrencias", "GET", f"/series/{pob.series[0]}/ocurrencias", {}),
+        Peticion("/calendario", "GET", "/calendario?limite=100", {}),
+        Peticion("/reservas", "POST", "/reservas", {**auth, **h_json}, json.dumps({"clase_id": clase_id}).encode(),
+                 esperados=(201, 400)),
+        Peticion("/reservas/{clase_id}", "DELETE", f"/reservas/{clase_id}", auth, esperados=(200, 404)),
+        Peticion("/clases/{clase_id}/avisos", "POST", f"/clases/{clase_id}/avisos", {**admin_auth, **h_json},
+                 json.dumps({"mensaje": f"Cambio de sala {sufijo}"}).encode(), esperados=(202,)),
+        Peticion("/rutinas", "POST", "/rutinas", h_json, json.dumps({
+            "nombre": f"Rutina {sufijo}", "duracion": 40, "dificultad": "avanzado"}).encode()),
+        Peticion("/rutinas", "GET", "/rutinas", {}),
+        Peticion("/rutinas/me", "GET", "/rutinas/me", auth),
+        Peticion("/rutinas/recomendadas", "GET", "/rutinas/recomendadas?limite=10", auth),
+        Peticion("/rutinas/{rutina_id}/asignar", "POST", f"/rutinas/{rutina_id}/asignar", auth),
+        Peticion("/rutinas/{rutina_id}", "GET", f"/rutinas/{rutina_id}", {}),
+        Peticion("/rutinas/{rutina_id}/ejercicios", "POST", f"/rutinas/{rutina_id}/ejercicios", {**auth, **h_json},
+                 json.dumps({"nombre": f"Ejercicio {sufijo}", "repeticiones": 12, "series": 4}).encode(),
+                 esperados=(201,)),
+        Peticion("/rutinas/{rutina_id}/ejercicios/{posicion}", "DELETE", f"/rutinas/{rutina_id}/ejercicios/0", auth),
+        Peticion("/ejercicios", "POST", "/ejercicios", h_json, json.dumps({
+            "nombre": f"Ejercicio nuevo {sufijo}", "grupo_muscular": "core"}).encode(), esperados=(201,)),
+        Peticion("/ejercicios", "GET", "/ejercicios", {}),
+        Peticion("/buscar", "GET", "/buscar?q=rutin&tipo=rutina&pagina=2", {}),
+        Peticion("/iot/dispositivos", "POST", "/iot/dispositivos", {**auth, **h_json},
+                 json.dumps({"tipo": "sensor"}).encode(), esperados=(201, 400)),  # 400: límite por socio
+        Peticion("/iot/dispositivos", "GET", "/iot/dispositivos", auth),
+        Peticion("/iot/dispositivos/{dispositivo_id}", "GET", f"/iot/dispositivos/{pob.dispositivos[socio_id]}", auth),
+        Peticion("/iot/dispositivos/{dispositivo_id}", "DELETE", "/iot/dispositivos/desconocido", auth,
+                 esperados=(404,)),
+        Peticion("/iot/latido/{dispositivo_id}", "POST", f"/iot/latido/{pob.dispositivos[socio_id]}", auth),
+        Peticion("/iot/sincronizar/{dispositivo_id}", "POST", f"/iot/sincronizar/{pob.dispositivos[socio_id]}", auth),
+        Peticion("/iot/dispositivos/{dispositivo_id}/lecturas", "POST",
+                 f"/iot/dispositivos/{pob.dispositivos[socio_id]}/lecturas",
+                 {**auth, "Content-Type": "application/json"}, b"[]", esperados=(201,)),
+        Peticion("/accesos", "POST", "/accesos", {**auth, "Idempotency-Key": f"acceso-{sufijo}"}),
+        Peticion("/progreso", "GET", "/progreso", auth),
+        Peticion("/progreso", "GET", "/progreso?desde=2020-01-01", auth),
+        Peticion("/socios/me/estadisticas", "GET", "/socios/me/estadisticas", auth),
+        Peticion("/clasificacion", "GET", "/clasificacion?tipo=puntos&limite=10", auth),
+        Peticion("/clases/{clase_id}/clasificacion", "GET", f"/clases/{clase_id}/clasificacion", auth),
+        Peticion("/importar/{entidad}", "POST", "/importar/rutinas",
+                 {**admin_auth, "Content-Type": "application/x-ndjson"}, ndjson),
+        Peticion("/exportar/{entidad}", "GET", "/exportar/clases?formato=csv", admin_auth),
+        Peticion("/admin/perfil", "GET", "/admin/perfil?segundos=0.05", admin_auth),
+        Peticion("/admin/perfil/peticiones", "GET", "/admin/perfil/peticiones", admin_auth),
+        Peticion("/admin/perfil/peticiones/{perfil_id}", "GET", "/admin/perfil/peticiones/desconocido",
+                 admin_auth, esperados=(404,)),
+        Peticion("/admin/historial", "GET", "/admin/historial", admin_auth),
+        Peticion("/admin/historial/compactar", "POST", "/admin/historial/compactar", admin_auth),
+        Peticion("/admin/sesiones", "GET", "/admin/sesiones", admin_auth),
+        Peticion("/admin/notificaciones", "GET", "/admin/notificaciones", admin_auth),
+        Peticion("/admin/analitica/exportar", "POST", "/admin/analitica/exportar", admin_auth),
+        Peticion("/admin/analitica", "GET", "/admin/analitica", admin_auth),
+        Peticion("/informes/asistencia", "GET", "/informes/asistencia?limite=10", admin_auth),
+        Peticion("/informes/accesos", "GET", "/informes/accesos?dias=7", admin_auth),
+        Peticion("/informes/progresos", "GET", "/informes/progresos?campo=volumen", admin_auth),
+        Peticion("/informes/demanda", "GET", "/informes/demanda?agrupar=franja&orden=cancelacion", admin_auth),
+        Peticion("/informes/demanda", "GET", "/informes/demanda?agrupar=sede", admin_auth),
+        Peticion("/informes/demanda/eventos", "GET", f"/informes/demanda/eventos?clase_id={clase_id}", admin_auth),
+        Peticion("/metrics", "GET", "/metrics", {}),
+    ]
+
+
+ESCENARIOS: Dict[str, Callable[..., Iterator[Peticion]]] = {
+    "login": escenario_login,
+    "refresco": escenario_refresco,
+    "reservas": escenario_reservas,
+    "iot": escenario_iot,
+    "catalogo": escenario_catalogo,
+    "cobertura": escenario_cobertura,
+}
+
+# Peticiones por defecto de cada escenario (login es caro: bcrypt por petición)
+PETICIONES_POR_DEFECTO = {"login": 50, "refresco": 2000, "reservas": 5000, "iot": 3000, "catalogo": 5000}
+
+
+# =========== EJECUCIÓN Y ESTADÍSTICAS ===========
+
+def percentil(ordenados: List[float], p: float) -> float:
+    if not ordenados:
+        return 0.0
+    k = min(len(ordenados) - 1, max(0, round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[k]
+
+
+def _resumir(latencias: List[float], duracion: float, errores: int) -> Dict[str, float]:
+    ordenadas = sorted(latencias)
+    return {
+        "peticiones": len(ordenadas),
+        "errores": errores,
+        "rps": len(ordenadas) / duracion if duracion > 0 else 0.0,
+        "p50_ms": percentil(ordenadas, 50) * 1000,
+        "p95_ms": percentil(ordenadas, 95) * 1000,
+        "p99_ms": percentil(ordenadas, 99) * 1000,
+    }
+
+
+async def ejecutar(cliente, peticiones: Iterator[Peticion], concurrencia: int) -> Dict:
+    """Lanza las peticiones con `concurrencia` workers y devuelve las estadísticas."""
+    por_ruta: Dict[str, List[float]] = {}
+    errores_ruta: Dict[str, int] = {}
+    todas: List[float] = []
+    errores = 0
+    ejemplos_error: List[str] = []
+
+    async def worker():
+        nonlocal errores
+        for p in peticiones:  # iterador compartido entre workers
+            inicio = time.perf_counter()
+            estado, cuerpo = await cliente.peticion(p.metodo, p.url, p.headers, p.cuerpo)
+            lat = time.perf_counter() - inicio
+            todas.append(lat)
+            por_ruta.setdefault(f"{p.metodo} {p.ruta}", []).append(lat)
+            if estado not in p.esperados:
+                errores += 1
+                errores_ruta[f"{p.metodo} {p.ruta}"] = errores_ruta.get(f"{p.metodo} {p.ruta}", 0) + 1
+                if len(ejemplos_error) < 5:
+                    ejemplos_error.append(f"{p.metodo} {p.url} -> {estado} {cuerpo[:120]!r}")
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrencia)))
+    duracion = time.perf_counter() - inicio
+
+    resultado = _resumir(todas, duracion, errores)
+    resultado["rutas"] = {r: _resumir(l, duracion, errores_ruta.get(r, 0)) for r, l in sorted(por_ruta.items())}
+    resultado["ejemplos_error"] = ejemplos_error
+    return resultado
+
+
+def rss_mb(pid: int = 0) -> float:
+    """Memoria residente máxima del proceso (o del servidor `pid`), en MB."""
+    if pid:
+        try:
+            with open(f"/proc/{pid}/status", encoding="ascii") as f:
+                for linea in f:
+                    if linea.startswith("VmHWM:"):
+                        return int(linea.split()[1]) / 1024
+        except OSError:
+            pass
+        return 0.0
+    if resource is None:
+        return 0.0
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+def rutas_sin_cubrir() -> List[str]:
+    """Endpoints de la app que el escenario de cobertura no toca."""
+    pob = Poblacion(socios=["x"], emails=["x@x"], tokens={"x": ""}, dispositivos={"x": "d"},
+                    entrenadores=["e"], clases=["c"], series=["s"], rutinas=["r"])
+    cubiertas = {(p.metodo, p.ruta) for p in _peticiones_cobertura(pob, "x", "x", {}, "c", "r", "0")}
+    faltan = []
+    for ruta in app.routes:
+        for metodo in getattr(ruta, "methods", ()) or ():
+            if metodo in ("HEAD", "OPTIONS") or ruta.path.startswith(("/docs", "/redoc", "/openapi")):
+                continue
+            if (metodo, ruta.path) not in cubiertas:
+                faltan.append(f"{metodo} {ruta.path}")
+    return faltan
+
+
+# =========== MODO HTTP (uvicorn en localhost) ===========
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _servir(puerto: int) -> None:
+    import uvicorn
+    uvicorn.run(app, host="127.0.0.1", port=puerto, log_level="warning")
+
+
+def lanzar_uvicorn():
+    """
+    Arranca uvicorn en un proceso hijo (fork) que hereda la población ya creada,
+    y espera a que `/` responda. Devuelve (proceso, url).
+    """
+    import multiprocessing
+    puerto = _puerto_libre()
+    # No daemon: el servidor usa su propio pool de procesos para las importaciones
+    proceso = multiprocessing.get_context("fork").Process(target=_servir, args=(puerto,))
+    proceso.start()
+    url = f"http://127.0.0.1:{puerto}"
+    limite = time.monotonic() + 30
+    while time.monotonic() < limite:
+        try:
+            with urllib.request.urlopen(url + "/", timeout=1):
+                return proceso, url
+        except OSError:
+            time.sleep(0.05)
+    proceso.terminate()
+    raise RuntimeError("uvicorn no arrancó a tiempo")
+
+
+# =========== BASELINES ===========
+
+def comparar(resultados: Dict, baseline: Dict, tolerancia: float) -> List[str]:
+    """Devuelve las regresiones (p95 más lento o rps más bajo que la tolerancia)."""
+    regresiones = []
+    for nombre, actual in resultados.items():
+        base = baseline.get(nombre)
+        if not base:
+            continue
+        if base["p95_ms"] > 0 and actual["p95_ms"] > base["p95_ms"] * (1 + tolerancia):
+            regresiones.append(f"{nombre}: p95 {actual['p95_ms']:.2f} ms > baseline {base['p95_ms']:.2f} ms")
+        if base["rps"] > 0 and actual["rps"] < base["rps"] * (1 - tolerancia):
+            regresiones.append(f"{nombre}: {actual['rps']:.0f} rps < baseline {base['rps']:.0f} rps")
+    return regresiones
+
+
+def imprimir(nombre: str, r: Dict, detalle: bool) -> None:
+    print(f"{nombre:<10} {r['peticiones']:>7} pet  {r['rps']:>9.1f} rps  "
+          f"p50={r['p50_ms']:7.2f} ms  p95={r['p95_ms']:7.2f} ms  p99={r['p99_ms']:7.2f} ms  "
+          f"errores={r['errores']}  rss={r['rss_mb']:.0f} MB")
+    if detalle:
+        for ruta, rr in r["rutas"].items():
+            print(f"    {ruta:<45} {rr['peticiones']:>6}  p50={rr['p50_ms']:7.2f}  p95={rr['p95_ms']:7.2f}  "
+                  f"p99={rr['p99_ms']:7.2f}  errores={rr['errores']}")
+    for ejemplo in r["ejemplos_error"]:
+        print(f"    ! {ejemplo}")
+
+
+async def main_async(args) -> int:
+    # Los límites de carga se desactivan salvo que se quieran medir
+    control_carga.activo = args.con_limites
+    await app.router.startup()
+
+    inicio = time.perf_counter()
+    tamano = dict(socios=args.socios, clases=args.clases, rutinas=args.rutinas, progresos_por_socio=args.progresos,
+                  accesos_por_socio=args.accesos, semilla=args.semilla)
+    if isinstance(gym_async, GimnasioParticionado):
+        # Los socios viven en las particiones: se crean con la API asíncrona desde un hilo
+        pob = await asyncio.to_thread(crear_poblacion, _Sincrono(gym_async, asyncio.get_running_loop()), **tamano)
+    else:
+        pob = crear_poblacion(gym_service, **tamano)
+    print(f"Población: {args.socios} socios, {args.clases} clases, {args.rutinas} rutinas "
+          f"en {time.perf_counter() - inicio:.2f} s (rss={rss_mb():.0f} MB)")
+
+    proceso = None
+    if args.modo == "http":
+        proceso, url = lanzar_uvicorn()
+        cliente = ClienteHTTP(url, conexiones=args.concurrencia)
+        print(f"Modo http: uvicorn en {url}")
+    else:
+        cliente = ClienteASGI(app)
+
+    escenarios = args.escenarios or list(ESCENARIOS)
+    resultados = {}
+    try:
+        for nombre in escenarios:
+            rnd = random.Random(args.semilla)
+            if nombre == "cobertura":
+                n = args.pasadas
+            else:
+                n = args.peticiones or PETICIONES_POR_DEFECTO[nombre]
+            concurrencia = 1 if nombre == "cobertura" else args.concurrencia
+            r = await ejecutar(cliente, ESCENARIOS[nombre](pob, rnd, n), concurrencia)
+            r["rss_mb"] = rss_mb(proceso.pid if proceso is not None else 0)
+            resultados[nombre] = r
+            imprimir(nombre, r, args.detalle or nombre == "cobertura")
+    finally:
+        await cliente.cerrar()
+        if proceso is not None:
+            proceso.terminate()
+            proceso.join()
+        await app.router.shutdown()
+
+    faltan = rutas_sin_cubrir()
+    if faltan:
+        print("⚠️  Endpoints sin cubrir en el escenario de cobertura: " + ", ".join(faltan))
+
+    resumen = {n: {k: v for k, v in r.items() if k not in ("rutas", "ejemplos_error")} for n, r in resultados.items()}
+    if args.guardar_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.guardar_baseline)), exist_ok=True)
+        with open(args.guardar_baseline, "w", encoding="utf-8") as f:
+            json.dump(resumen, f, indent=2)
+        print(f"Baseline guardada en {args.guardar_baseline}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regresiones = comparar(resumen, json.load(f), args.tolerancia)
+        if regresiones:
+            print("❌ Regresiones respecto a la baseline:")
+            for r in regresiones:
+                print(f"    {r}")
+            return 1
+        print("✅ Sin regresiones respecto a la baseline")
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("escenarios", nargs="*", metavar="escenario",
+                        help=f"Escenarios a ejecutar: {', '.join(ESCENARIOS)} (por defecto, todos)")
+    parser.add_argument("--modo", choices=["inproc", "http"], default="inproc")
+    parser.add_argument("--socios", type=int, default=1000)
+    parser.add_argument("--clases", type=int, default=100)
+    parser.add_argument("--rutinas", type=int, default=200)
+    parser.add_argument("--progresos", type=int, default=20, help="Progresos por socio")
+    parser.add_argument("--accesos", type=int, default=10, help="Accesos por socio")
+    parser.add_argument("--peticiones", type=int, default=0, help="Peticiones por escenario (0 = por defecto)")
+    parser.add_argument("--pasadas", type=int, default=3, help="Pasadas del escenario de cobertura")
+    parser.add_argument("--concurrencia", type=int, default=32)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--con-limites", action="store_true", help="Mantener rate limiting y admisión")
+    parser.add_argument("--detalle", action="store_true", help="Estadísticas por ruta en todos los escenarios")
+    parser.add_argument("--guardar-baseline", metavar="FICHERO")
+    parser.add_argument("--baseline", metavar="FICHERO", help="Comparar con una baseline guardada")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="Margen antes de marcar regresión")
+    args = parser.parse_args()
+    desconocidos = set(args.escenarios) - set(ESCENARIOS)
+    if desconocidos:
+        parser.error(f"escenarios desconocidos: {', '.join(sorted(desconocidos))}")
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark del informe de demanda de clases: agregados incrementales frente a
+recalcular desde el registro de eventos.
+
+Simula --eventos reservas y cancelaciones sobre --clases clases y mide:
+
+  evento        coste de anotar una reserva/cancelación (cuatro grupos en O(1))
+  informe       GET /informes/demanda por clase, entrenador, franja y sede
+                (recorre los grupos) frente al mismo cálculo recorriendo
+                todos los eventos
+
+Uso (desde la carpeta backend/):
+    python benchmarks/bench_demanda.py                      # 1.000.000 de eventos, 2000 clases
+    python benchmarks/bench_demanda.py --eventos 200000 --clases 500
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from src.models.Clase import Clase, DIAS_SEMANA  # noqa: E402
+from src.models.Sede import SEDE_PRINCIPAL  # noqa: E402
+from src.Services.Demanda_service import AGRUPACIONES, DemandaService, franja  # noqa: E402
+
+
+def medir(funcion: Callable[[], object], repeticiones: int) -> List[float]:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+def informe_desde_eventos(demanda: DemandaService, clases: Dict[str, Clase], agrupacion: str) -> List[Dict]:
+    """Lo que costaría sin agregados: reagrupar todo el registro de eventos en cada consulta."""
+    clave = {"clase": lambda c: c.id, "entrenador": lambda c: c.entrenador_id, "franja": franja,
+             "sede": lambda c: c.sede_id or SEDE_PRINCIPAL}[agrupacion]
+    reservas, cancelaciones, inscritos = defaultdict(int), defaultdict(int), defaultdict(int)
+    for evento in demanda.eventos:
+        grupo = clave(clases[evento.clase_id])
+        if evento.tipo == "reserva":
+            reservas[grupo] += 1
+            inscritos[grupo] += 1
+        else:
+            cancelaciones[grupo] += 1
+            inscritos[grupo] -= 1
+    plazas = defaultdict(int)
+    for clase in clases.values():
+        plazas[clave(clase)] += clase.aforo
+    filas = [{"id": g, "ocupacion": inscritos[g] / plazas[g], "tasa_cancelacion": cancelaciones[g] / reservas[g]}
+             for g in reservas]
+    return sorted(filas, key=lambda f: f["ocupacion"], reverse=True)[:50]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--eventos", type=int, default=1_000_000)
+    parser.add_argument("--clases", type=int, default=2000)
+    parser.add_argument("--entrenadores", type=int, default=50)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.semilla)
+    clases = {}
+    for i in range(args.clases):
+        clase = Clase(f"Clase {i}", f"{rnd.randint(6, 22):02d}:{rnd.choice(['00', '30'])}", rnd.randint(10, 40),
+                      f"entrenador-{rnd.randrange(args.entrenadores)}", 60, rnd.choice(DIAS_SEMANA))
+        clases[clase.id] = clase
+    demanda = DemandaService(max_eventos=args.eventos)
+    for clase in clases.values():
+        demanda.alta(clase)
+
+    # Socios que entran y salen de las clases: ~80 % reservas, el resto cancela una reserva vigente
+    ids = list(clases)
+    inscritos: Dict[str, List[str]] = {clase_id: [] for clase_id in ids}
+    inicio = time.perf_counter()
+    for n in range(args.eventos):
+        clase = clases[rnd.choice(ids)]
+        lista = inscritos[clase.id]
+        if lista and (len(lista) >= clase.aforo or rnd.random() < 0.2):
+            demanda.cancelacion(clase, lista.pop(rnd.randrange(len(lista))))
+        else:
+            socio_id = f"socio-{n}"
+            lista.append(socio_id)
+            demanda.reserva(clase, socio_id)
+    por_evento = (time.perf_counter() - inicio) / args.eventos
+    print(f"{args.eventos:,} eventos sobre {args.clases:,} clases y {args.entrenadores} entrenadores")
+    print(f"  evento       {por_evento * 1e6:8.2f} us por reserva/cancelación (incluye la simulación)")
+
+    for agrupacion in AGRUPACIONES:
+        grupos = len(demanda.informe(agrupacion, limite=len(clases)))
+        incremental = medir(lambda: demanda.informe(agrupacion), args.repeticiones)
+        completo = medir(lambda: informe_desde_eventos(demanda, clases, agrupacion), max(1, args.repeticiones // 2))
+        print(f"  informe {agrupacion:<10} ({grupos:>5} grupos)  agregados={statistics.median(incremental) * 1000:8.3f} ms"
+              f"   desde eventos={statistics.median(completo) * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
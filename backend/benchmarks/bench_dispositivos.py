@@ -0,0 +1,99 @@
+"""
+Benchmark del registro de dispositivos IoT: latidos y detección de desconexiones.
+
+Registra N dispositivos, simula --segundos de tráfico en el que cada uno da
+latido con un periodo aleatorio y una fracción deja de conectar, y mide:
+
+  latido      coste de un latido (incluye la deduplicación por secuencia)
+  barrido     coste de cada barrido periódico con la rueda de temporizadores
+  escaneo     lo que costaría el mismo barrido recorriendo todos los dispositivos
+
+El tiempo es simulado (se pasa `ahora` a latido/barrer), así que se recorren
+minutos de tráfico en segundos.
+
+Uso (desde la carpeta backend/):
+    python benchmarks/bench_dispositivos.py                       # 50.000 dispositivos
+    python benchmarks/bench_dispositivos.py --dispositivos 200000 --caidos 0.05
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from src.models.DispositivoIoT import DispositivoIoT  # noqa: E402
+from src.Services.Dispositivos_service import DispositivosService  # noqa: E402
+
+TIPOS = ("pulsera", "bascula", "sensor")
+
+
+def escaneo(registro: DispositivosService, ultimo: Dict[str, float], ahora: float) -> List[DispositivoIoT]:
+    """Barrido ingenuo: mira el último latido de cada dispositivo registrado."""
+    return [d for d in registro.dispositivos.values() if d.conectado and ultimo[d.id] + registro.timeout <= ahora]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--dispositivos", type=int, default=50_000)
+    parser.add_argument("--segundos", type=int, default=1800, help="Tráfico simulado")
+    parser.add_argument("--periodo", type=float, default=60, help="Periodo medio de latido por dispositivo (s)")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--resolucion", type=float, default=5)
+    parser.add_argument("--caidos", type=float, default=0.02, help="Fracción que deja de conectar a mitad")
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+    rnd = random.Random(args.semilla)
+
+    registro = DispositivosService(timeout=args.timeout, resolucion=args.resolucion,
+                                   max_por_socio=args.dispositivos)
+    registro.anadir(DispositivoIoT(rnd.choice(TIPOS), f"socio{i % 1000}") for i in range(args.dispositivos))
+    ids = list(registro.dispositivos)
+    caidos = set(rnd.sample(ids, int(len(ids) * args.caidos)))
+    # Cada dispositivo da latido con su propio periodo y desfase: (próximo latido, periodo, secuencia)
+    proximos = {i: [rnd.uniform(0, args.periodo), rnd.uniform(0.5, 1.5) * args.periodo, 0] for i in ids}
+    ultimo: Dict[str, float] = {}
+
+    t0 = time.monotonic()
+    latidos: List[float] = []
+    barridos: List[float] = []
+    escaneos: List[float] = []
+    desconectados = 0
+    ahora = 0.0
+    while ahora < args.segundos:
+        ahora += args.resolucion
+        inicio = time.perf_counter()
+        n = 0
+        for i, estado in proximos.items():
+            while estado[0] <= ahora:
+                if not (i in caidos and estado[0] > args.segundos / 2):
+                    estado[2] += 1
+                    registro.latido(i, estado[2], ahora=t0 + estado[0])
+                    ultimo[i] = t0 + estado[0]
+                    n += 1
+                estado[0] += estado[1]
+        if n:
+            latidos.append((time.perf_counter() - inicio) / n)
+
+        inicio = time.perf_counter()
+        escaneo(registro, ultimo, t0 + ahora)
+        escaneos.append(time.perf_counter() - inicio)
+        inicio = time.perf_counter()
+        desconectados += len(registro.barrer(t0 + ahora))
+        barridos.append(time.perf_counter() - inicio)
+
+    print(f"{args.dispositivos:,} dispositivos, {args.segundos} s simulados, "
+          f"{len(caidos):,} dejan de conectar a mitad")
+    print(f"  latido    mediana={statistics.median(latidos) * 1e6:8.2f} µs")
+    for nombre, tiempos in (("barrido", barridos), ("escaneo", escaneos)):
+        print(f"  {nombre:<9} mediana={statistics.median(tiempos) * 1000:8.3f} ms  "
+              f"max={max(tiempos) * 1000:8.3f} ms  total={sum(tiempos) * 1000:9.1f} ms  ({len(tiempos)} barridos)")
+    print(f"  desconectados detectados: {desconectados:,}")
+
+
+if __name__ == "__main__":
+    main()
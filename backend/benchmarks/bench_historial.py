@@ -0,0 +1,118 @@
+"""
+Benchmark de la retención del historial de progresos y accesos.
+
+Genera --anios de historial para --socios socios, mide la memoria que ocupa
+todo en crudo, compacta (resúmenes diarios + archivo comprimido en disco) y
+compara:
+
+  compactar   duración total y la parte que ocupa el event loop
+  memoria     bytes vivos en Python (tracemalloc) antes y después de compactar
+  archivo     tamaño en disco de los meses archivados
+  consulta    listar_progresos_socio completo y de un trimestre antiguo,
+              todo en crudo frente a niveles caliente + templado + frío
+
+Uso (desde la carpeta backend/):
+    python benchmarks/bench_historial.py                    # 1000 socios, 3 años
+    python benchmarks/bench_historial.py --socios 200 --anios 10
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from typing import Callable, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from src.models.Socio import Socio  # noqa: E402
+from src.Services.Gimnasio_service import GimnasioService  # noqa: E402
+from src.Services.Historial_service import HistorialService  # noqa: E402
+
+
+def medir(funcion: Callable[[], object], repeticiones: int) -> List[float]:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--socios", type=int, default=1000)
+    parser.add_argument("--anios", type=int, default=3)
+    parser.add_argument("--sesiones-semana", type=float, default=3)
+    parser.add_argument("--consultas", type=int, default=200)
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+    rnd = random.Random(args.semilla)
+    hoy = date.today()
+    dias = 365 * args.anios
+
+    directorio = tempfile.mkdtemp(prefix="bench_historial_")
+    tracemalloc.start()
+    gym = GimnasioService()
+    gym.historial = HistorialService(directorio)
+    socios = [Socio(f"Socio {i}", f"socio{i}@bench.gym", "1990-01-01", "principiante", "")
+              for i in range(args.socios)]
+    gym.registrar_socios_en_bloque(socios)
+    por_socio = int(dias / 7 * args.sesiones_semana)
+    base = tracemalloc.get_traced_memory()[0]
+    for socio in socios:
+        gym.registrar_progresos_en_bloque(socio.id, [
+            (round(rnd.uniform(5, 120), 1), rnd.randint(1, 15), rnd.randint(60, 3600),
+             datetime.combine(hoy - timedelta(days=rnd.randrange(dias)), datetime.min.time())
+             + timedelta(minutes=rnd.randrange(6 * 60, 22 * 60)))
+            for _ in range(por_socio)])
+        for _ in range(por_socio // 2):
+            gym.registrar_acceso(socio.id).fecha = hoy - timedelta(days=rnd.randrange(dias))
+    crudo = tracemalloc.get_traced_memory()[0] - base
+    print(f"{args.socios:,} socios, {args.anios} años: {len(gym.progresos):,} progresos y "
+          f"{len(gym.accesos):,} accesos")
+
+    muestra = [rnd.choice(socios).id for _ in range(args.consultas)]
+    inicio_trimestre = hoy - timedelta(days=365 * (args.anios - 1))  # ya en el archivo tras compactar
+    trimestre = (inicio_trimestre, inicio_trimestre + timedelta(days=90))
+    consultas = {
+        "completa": lambda: [gym.listar_progresos_socio(s) for s in muestra],
+        "trimestre": lambda: [gym.listar_progresos_socio(s, *trimestre) for s in muestra],
+    }
+    antes = {nombre: medir(f, 3) for nombre, f in consultas.items()}
+
+    # Los pasos de compactar_historial: elegir y borrar corren en el event loop, resumir y archivar en un hilo
+    inicio = time.perf_counter()
+    progresos, accesos, limite = gym._crudos_viejos(hoy)
+    en_loop = time.perf_counter() - inicio
+    gym._resumir_crudos(progresos, accesos, limite)
+    antes_de_borrar = time.perf_counter()
+    gym._borrar_crudos(progresos, accesos, True)
+    en_loop += time.perf_counter() - antes_de_borrar
+    resultado = gym._archivar_historial(progresos, accesos, hoy)
+    duracion = time.perf_counter() - inicio
+    compactado = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    despues = {nombre: medir(f, 3) for nombre, f in consultas.items()}
+
+    estado = gym.historial.estado()
+    print(f"  compactar   {duracion * 1000:9.1f} ms  ({resultado['progresos']:,} progresos, "
+          f"{resultado['accesos']:,} accesos, {resultado['dias_archivados']} días al archivo)")
+    print(f"              {en_loop * 1000:9.1f} ms en el event loop (elegir y borrar), el resto en un hilo")
+    print(f"  memoria     crudo={crudo / 2**20:8.1f} MB  compactado={compactado / 2**20:8.1f} MB  "
+          f"({estado['resumenes_en_memoria']:,} resúmenes en memoria)")
+    print(f"  archivo     {estado['bytes_archivo'] / 2**20:8.2f} MB en {len(estado['meses_archivados'])} meses")
+    for nombre in consultas:
+        por_consulta = [t / len(muestra) for t in (antes[nombre] + despues[nombre])]
+        print(f"  consulta {nombre:<10} crudo={statistics.median(por_consulta[:3]) * 1000:7.3f} ms  "
+              f"por niveles={statistics.median(por_consulta[3:]) * 1000:7.3f} ms")
+    shutil.rmtree(directorio, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark de ingesta IoT: lecturas en JSON frente al protocolo binario.
+
+Genera N lecturas simuladas de un tipo de dispositivo y compara los dos formatos:
+
+  tamano         bytes del lote
+  decodificar    cuerpo -> lecturas de progreso (peso, repeticiones, tiempo, fecha)
+  ingesta        POST /iot/dispositivos/{id}/lecturas completo, en proceso
+                 (decodificación + validación + inserción en el historial)
+
+Uso (desde la carpeta backend/):
+    python benchmarks/bench_iot.py                      # 100.000 lecturas de pulsera
+    python benchmarks/bench_iot.py --lecturas 20000 --tipo sensor --repeticiones 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from src import protocolo_iot  # noqa: E402
+from src.main import app, gym_service, control_carga, _lecturas_json  # noqa: E402
+from src.models.DispositivoIoT import DispositivoIoT  # noqa: E402
+from benchmarks.clientes import ClienteASGI  # noqa: E402
+from benchmarks.poblacion import crear_poblacion  # noqa: E402
+
+TIPOS = ("pulsera", "bascula", "sensor")
+
+
+def generar_lecturas(tipo: str, n: int, semilla: int) -> List[Dict]:
+    random.seed(semilla)
+    dispositivo = DispositivoIoT(tipo, "bench")
+    return [dict(dispositivo.recopilar_datos()) for _ in range(n)]
+
+
+def medir(funcion: Callable[[], object], repeticiones: int) -> List[float]:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+def imprimir(nombre: str, formato: str, tiempos: List[float], n: int) -> None:
+    mediana = statistics.median(tiempos)
+    print(f"  {nombre:<12} {formato:<8} mediana={mediana * 1000:9.1f} ms  mejor={min(tiempos) * 1000:9.1f} ms  "
+          f"{n / mediana:>12,.0f} lecturas/s")
+
+
+async def main_async(args) -> None:
+    control_carga.activo = False
+    await app.router.startup()
+    pob = crear_poblacion(gym_service, socios=1, entrenadores=1, clases=0, series=0, rutinas=0,
+                          progresos_por_socio=0, accesos_por_socio=0)
+    socio_id = pob.socios[0]
+    socio = gym_service.socios[socio_id]
+    dispositivo = gym_service.registrar_dispositivo(args.tipo, socio_id)
+    auth = {"Authorization": f"Bearer {pob.tokens[socio_id]}"}
+
+    lecturas = generar_lecturas(args.tipo, args.lecturas, args.semilla)
+    cuerpos = {
+        "json": json.dumps(lecturas).encode(),
+        "binario": protocolo_iot.codificar(args.tipo, lecturas),
+    }
+    n = args.lecturas
+    print(f"{n:,} lecturas de {args.tipo}")
+    for formato, cuerpo in cuerpos.items():
+        print(f"  {'tamano':<12} {formato:<8} {len(cuerpo):>12,} bytes  ({len(cuerpo) / n:.1f} bytes/lectura)")
+
+    decodificadores = {
+        "json": lambda: _lecturas_json(cuerpos["json"]),
+        "binario": lambda: list(protocolo_iot.progresos(cuerpos["binario"])[1]),
+    }
+    for formato, decodificar in decodificadores.items():
+        imprimir("decodificar", formato, medir(decodificar, args.repeticiones), n)
+
+    cliente = ClienteASGI(app)
+    url = f"/iot/dispositivos/{dispositivo.id}/lecturas"
+    tipos_contenido = {"json": "application/json", "binario": "application/octet-stream"}
+    try:
+        for formato, cuerpo in cuerpos.items():
+            tiempos = []
+            for _ in range(args.repeticiones):
+                inicio = time.perf_counter()
+                estado, respuesta = await cliente.peticion(
+                    "POST", url, {**auth, "Content-Type": tipos_contenido[formato]}, cuerpo)
+                tiempos.append(time.perf_counter() - inicio)
+                if estado != 201:
+                    raise RuntimeError(f"{formato}: {estado} {respuesta[:200]!r}")
+                # Los agregados se calculan en segundo plano: se esperan fuera de la medida
+                # y se vacía el historial para que cada pasada parta del mismo estado
+                await gym_service.tareas.esperar_vacia()
+                for progreso_id in socio.progresos:
+                    gym_service.progresos.pop(progreso_id, None)
+                socio.progresos.clear()
+            imprimir("ingesta", formato, tiempos, n)
+    finally:
+        await cliente.cerrar()
+        await app.router.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lecturas", type=int, default=100_000)
+    parser.add_argument("--tipo", choices=TIPOS, default="pulsera")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--semilla", type=int, default=42)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
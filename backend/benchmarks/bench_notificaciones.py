@@ -0,0 +1,133 @@
+"""
+Benchmark de las notificaciones: publicar en la petición y repartir por
+lotes en segundo plano, frente a notificar a todos dentro de la petición.
+
+Con --socios socios reservados en una clase mide:
+
+  publicar      lo que paga la petición: dejar el aviso en la cola frente a
+                generar y entregar ya todas sus notificaciones
+  reparto       notificaciones por segundo según el tamaño de lote, a un
+                fichero NDJSON y a un sumidero que solo cuenta
+  memoria       pico de memoria del reparto por lotes frente a construir
+                todas las notificaciones del aviso de una vez
+  recordatorios programar y sacar --clases recordatorios del heap
+
+Uso (desde la carpeta backend/):
+    python benchmarks/bench_notificaciones.py                    # 5000 socios, 20 avisos
+    python benchmarks/bench_notificaciones.py --socios 20000 --lotes 1 100 1000
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from src.models.Clase import Clase, DIAS_SEMANA  # noqa: E402
+from src.Services.Notificaciones_service import (  # noqa: E402
+    NotificacionesService, Notificacion, Sumidero, SumideroFichero)
+
+
+class SumideroContador(Sumidero):
+    """Sin E/S: mide solo el coste del reparto."""
+
+    nombre = "contador"
+
+    def __init__(self) -> None:
+        self.recibidas = 0
+
+    def enviar(self, lote: List[Notificacion]) -> None:
+        self.recibidas += len(lote)
+
+
+def medir(funcion: Callable[[], object], repeticiones: int) -> float:
+    """Mediana en milisegundos."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos) * 1000
+
+
+def servicio(socios: int, sumidero: Sumidero, lote: int) -> NotificacionesService:
+    notificaciones = NotificacionesService([sumidero], lote=lote)
+    for i in range(socios):
+        notificaciones.suscribir("clase", f"socio-{i}")
+    return notificaciones
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--socios", type=int, default=5000)
+    parser.add_argument("--avisos", type=int, default=20)
+    parser.add_argument("--lotes", type=int, nargs="+", default=[1, 50, 500])
+    parser.add_argument("--clases", type=int, default=100_000)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp(prefix="bench-notificaciones-")
+    try:
+        print(f"{args.socios:,} socios con reserva en la clase, {args.avisos} avisos")
+        notificaciones = servicio(args.socios, SumideroContador(), 500)
+        en_cola = medir(lambda: notificaciones.publicar("clase", "cambio", "Cambio de sala"), args.repeticiones)
+        notificaciones.repartir()
+        en_linea = medir(lambda: (notificaciones.publicar("clase", "cambio", "Cambio de sala"),
+                                  notificaciones.repartir()), args.repeticiones)
+        print(f"  publicar     en cola={en_cola * 1000:8.2f} us   "
+              f"repartiendo en la petición={en_linea:8.2f} ms")
+
+        for lote in args.lotes:
+            contador = SumideroContador()
+            memoria = servicio(args.socios, contador, lote)
+            for _ in range(args.avisos):
+                memoria.publicar("clase", "cambio", "Cambio de sala")
+            inicio = time.perf_counter()
+            memoria.repartir()
+            sin_io = contador.recibidas / (time.perf_counter() - inicio)
+
+            fichero = SumideroFichero(os.path.join(directorio, f"lote-{lote}.ndjson"))
+            disco = servicio(args.socios, fichero, lote)
+            for _ in range(args.avisos):
+                disco.publicar("clase", "cambio", "Cambio de sala")
+            inicio = time.perf_counter()
+            enviadas = disco.repartir()["notificaciones"]
+            a_fichero = enviadas / (time.perf_counter() - inicio)
+            fichero.cerrar()
+            print(f"  reparto      lote={lote:>5}   contador={sin_io:12,.0f}/s   fichero={a_fichero:10,.0f}/s")
+
+        for lote, etiqueta in ((500, "por lotes de 500"), (args.socios, "todo de una vez")):
+            picos = servicio(args.socios, SumideroContador(), lote)
+            picos.publicar("clase", "cambio", "Cambio de sala")
+            tracemalloc.start()
+            picos.repartir()
+            pico = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"  memoria      {etiqueta:<17} pico={pico / 1024:8.0f} KB")
+
+        recordatorios = NotificacionesService([SumideroContador()])
+        clases = [Clase(f"Clase {i}", f"{6 + i % 16:02d}:{(i * 7) % 60:02d}", 20, "e", 60, DIAS_SEMANA[i % 7])
+                  for i in range(args.clases)]
+        inicio = time.perf_counter()
+        for clase in clases:
+            recordatorios.programar_recordatorio(clase)
+        programar = (time.perf_counter() - inicio) / args.clases * 1e6
+        limite = (datetime.now() + timedelta(days=1)).timestamp()
+        inicio = time.perf_counter()
+        vencidos = recordatorios._recordatorios_vencidos(limite)
+        sacar = (time.perf_counter() - inicio) / max(len(vencidos), 1) * 1e6
+        print(f"  recordatorios {args.clases:,} clases: programar={programar:6.2f} us   "
+              f"sacar vencido={sacar:6.2f} us   ({len(vencidos):,} vencen en 24 h)")
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
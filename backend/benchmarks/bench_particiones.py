@@ -0,0 +1,165 @@
+"""
+Benchmark del particionado de socios: N particiones en procesos frente al
+servicio único en el proceso de la API.
+
+Para 1, 2, 4... particiones (--particiones) mide, con --socios socios:
+
+  login         --logins logins concurrentes (bcrypt en la partición del socio)
+  progresos     --progresos altas de progreso concurrentes + sus estadísticas
+  reservas      reservas concurrentes de todos los socios en --clases clases
+                (el aforo vive en el coordinador; se comprueba que no se pasa)
+
+y cuántas claves cambian de partición al añadir una: anillo consistente
+frente a hash módulo N.
+
+El paralelismo depende de los núcleos: con un solo núcleo las particiones
+en procesos solo añaden el coste de la IPC.
+
+Uso (desde la carpeta backend/):
+    python benchmarks/bench_particiones.py                        # 2000 socios, 1/2/4 particiones
+    python benchmarks/bench_particiones.py --particiones 1 2 4 8 --logins 400
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from typing import Awaitable, Callable, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+# El historial de cada partición va a un directorio temporal (antes de importar los servicios)
+DIRECTORIO_HISTORIAL = os.environ.setdefault("HISTORIAL_DIR", tempfile.mkdtemp(prefix="bench-particiones-"))
+
+from src.auth import hash_password  # noqa: E402
+from src.models.Socio import Socio  # noqa: E402
+from src.Services.Gimnasio_service import GimnasioService  # noqa: E402
+from src.Services.Particiones_service import AnilloConsistente, GimnasioParticionado, _hash64  # noqa: E402
+from benchmarks.poblacion import PASSWORD_BENCH  # noqa: E402
+
+
+def crear_socios(n: int, password_hash: str) -> List[Socio]:
+    socios = []
+    for i in range(n):
+        socio = Socio(f"Socio {i}", f"socio{i}@bench.gym", "1990-01-01", "intermedio")
+        socio.password_hash = password_hash
+        socios.append(socio)
+    return socios
+
+
+def crear_clases(gym: GimnasioService, n: int, aforo: int) -> List[str]:
+    """Todas a la misma hora: un entrenador por clase para que la agenda no las rechace."""
+    clases = []
+    for i in range(n):
+        entrenador = gym.registrar_entrenador(f"Entrenador {i}", f"entrenador{i}@bench.gym", "Fuerza")
+        clases.append(gym.crear_clase(f"Clase {i}", "18:00", aforo, entrenador.id).id)
+    return clases
+
+
+async def por_segundo(n: int, corrutinas: Callable[[], List[Awaitable]]) -> float:
+    inicio = time.perf_counter()
+    await asyncio.gather(*corrutinas())
+    return n / (time.perf_counter() - inicio)
+
+
+async def medir_base(args, socios: List[Socio]) -> None:
+    """El servicio único: todo se hace en el proceso de la API, una operación tras otra."""
+    gym = GimnasioService()
+    gym.registrar_socios_en_bloque(socios)
+    clases = crear_clases(gym, args.clases, args.aforo)
+
+    async def en_loop(funcion, *a):
+        try:
+            return funcion(*a)
+        except ValueError:
+            return False  # clase completa
+
+    logins = await por_segundo(args.logins, lambda: [
+        en_loop(gym.autenticar_socio, socios[i % len(socios)].email, PASSWORD_BENCH) for i in range(args.logins)])
+    progresos = await por_segundo(args.progresos, lambda: [
+        en_loop(lambda s: (gym.registrar_progreso(s, 80.0, 10, 60), gym.estadisticas_socio(s)),
+                socios[i % len(socios)].id) for i in range(args.progresos)])
+    rnd = random.Random(args.semilla)
+    reservas = await por_segundo(len(socios), lambda: [
+        en_loop(gym.reservar_clase, socio.id, rnd.choice(clases)) for socio in socios])
+    print(f"  servicio unico      login={logins:8.1f}/s   progresos={progresos:9.1f}/s   reservas={reservas:9.1f}/s")
+
+
+async def medir_particionado(args, particiones: int, socios: List[Socio]) -> None:
+    gym = GimnasioParticionado(particiones, en_procesos=True)
+    try:
+        await gym.registrar_socios_en_bloque(socios)
+        reparto = await gym.socios_por_particion()
+        clases = crear_clases(gym.catalogo, args.clases, args.aforo)
+        await gym.autenticar_socio(socios[0].email, PASSWORD_BENCH)  # procesos ya arrancados fuera de la medida
+
+        logins = await por_segundo(args.logins, lambda: [
+            gym.autenticar_socio(socios[i % len(socios)].email, PASSWORD_BENCH) for i in range(args.logins)])
+
+        async def progreso(socio_id: str):
+            await gym.registrar_progreso(socio_id, 80.0, 10, 60)
+            return await gym.estadisticas_socio(socio_id)
+
+        progresos = await por_segundo(args.progresos, lambda: [
+            progreso(socios[i % len(socios)].id) for i in range(args.progresos)])
+
+        async def reserva(socio_id: str, clase_id: str):
+            try:
+                return await gym.reservar_clase(socio_id, clase_id)
+            except ValueError:
+                return False  # clase completa
+
+        rnd = random.Random(args.semilla)
+        reservas = await por_segundo(len(socios), lambda: [
+            reserva(socio.id, rnd.choice(clases)) for socio in socios])
+        excedidas = sum(len(c.socios_inscritos) > c.aforo for c in gym.catalogo.clases.values())
+        print(f"  {particiones:>2} particiones      login={logins:8.1f}/s   progresos={progresos:9.1f}/s   "
+              f"reservas={reservas:9.1f}/s   socios por particion={reparto}   aforo excedido={excedidas}")
+    finally:
+        await gym.cerrar()
+
+
+def claves_movidas(particiones: List[int], claves: int) -> None:
+    ids = [f"socio-{i}" for i in range(claves)]
+    print(f"Claves que cambian de partición al añadir una ({claves:,} claves):")
+    for n in particiones:
+        antes, despues = AnilloConsistente(n), AnilloConsistente(n + 1)
+        anillo = sum(antes.particion(k) != despues.particion(k) for k in ids) / claves
+        modulo = sum(_hash64(k) % n != _hash64(k) % (n + 1) for k in ids) / claves
+        print(f"  {n:>2} -> {n + 1:<2}  anillo={anillo:6.1%}  (ideal {1 / (n + 1):6.1%})   modulo={modulo:6.1%}")
+
+
+async def main_async(args) -> None:
+    print(f"{os.cpu_count()} núcleos; {args.socios:,} socios, {args.logins} logins, {args.progresos} progresos, "
+          f"{args.clases} clases de aforo {args.aforo}")
+    socios = crear_socios(args.socios, hash_password(PASSWORD_BENCH))
+    await medir_base(args, socios)
+    for particiones in args.particiones:
+        await medir_particionado(args, particiones, crear_socios(args.socios, socios[0].password_hash))
+    claves_movidas(args.particiones, args.claves)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--particiones", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--socios", type=int, default=2000)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--progresos", type=int, default=5000)
+    parser.add_argument("--clases", type=int, default=50)
+    parser.add_argument("--aforo", type=int, default=20)
+    parser.add_argument("--claves", type=int, default=100_000)
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(main_async(args))
+    finally:
+        if os.path.basename(DIRECTORIO_HISTORIAL).startswith("bench-particiones-"):
+            shutil.rmtree(DIRECTORIO_HISTORIAL, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark de las consultas por sede: índices y caché por sede frente a
+filtrar el catálogo completo.
+
+Reparte --clases clases entre --sedes sedes y mide, para una sede tranquila
+mientras otra (la "ocupada") recibe reservas sin parar:
+
+  catalogo      GET /sedes/{id}/clases: filtrando todas las clases del
+                gimnasio, recorriendo solo el índice de la sede (caché fría)
+                y desde la caché de la sede
+  ocupacion     plazas e inscritos de la sede: sumando sobre todas las clases
+                frente a los contadores de la sede
+  acierto       fracción de consultas servidas desde la caché en cada sede
+                cuando se intercalan con las reservas de la sede ocupada
+
+Uso (desde la carpeta backend/):
+    python benchmarks/bench_sedes.py                         # 20 sedes, 20.000 clases
+    python benchmarks/bench_sedes.py --sedes 50 --clases 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Callable, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from src.models.Clase import DIAS_SEMANA  # noqa: E402
+from src.models.Socio import Socio  # noqa: E402
+from src.Services.Gimnasio_service import GimnasioService  # noqa: E402
+
+FRANJAS_POR_ENTRENADOR = len(DIAS_SEMANA) * 16  # una clase por hora, de 6:00 a 22:00
+
+
+def medir(funcion: Callable[[], object], repeticiones: int) -> float:
+    """Mediana en milisegundos."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos) * 1000
+
+
+def poblar(gym: GimnasioService, sedes: int, clases: int, socios: int, semilla: int) -> List[str]:
+    rnd = random.Random(semilla)
+    ids_sedes = [gym.crear_sede(f"Sede {s}").id for s in range(sedes)]
+    por_sede = clases // sedes
+    for s, sede_id in enumerate(ids_sedes):
+        for j in range(por_sede):
+            if j % FRANJAS_POR_ENTRENADOR == 0:
+                entrenador = gym.registrar_entrenador(f"Entrenador {s}-{j}", f"entrenador{s}-{j}@bench.gym",
+                                                      "Fuerza", sede_id)
+            franja = j % FRANJAS_POR_ENTRENADOR
+            gym.crear_clase(f"Clase {s}-{j}", f"{6 + franja % 16:02d}:00", rnd.randint(10, 40), entrenador.id,
+                            60, DIAS_SEMANA[franja // 16])
+    nuevos = []
+    for i in range(socios):
+        socio = Socio(f"Socio {i}", f"socio{i}@bench.gym", "1990-01-01")
+        socio.password_hash = "-"  # no inician sesión
+        nuevos.append(socio)
+    gym.registrar_socios_en_bloque(nuevos)
+    return ids_sedes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sedes", type=int, default=20)
+    parser.add_argument("--clases", type=int, default=20_000)
+    parser.add_argument("--socios", type=int, default=5000)
+    parser.add_argument("--consultas", type=int, default=2000, help="consultas intercaladas con reservas")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+
+    gym = GimnasioService()
+    inicio = time.perf_counter()
+    ids_sedes = poblar(gym, args.sedes, args.clases, args.socios, args.semilla)
+    print(f"{len(gym.clases):,} clases en {args.sedes} sedes (+ la principal), {len(gym.socios):,} socios "
+          f"({time.perf_counter() - inicio:.1f} s)")
+    ocupada, tranquila = ids_sedes[0], ids_sedes[1]
+    fila = gym._fila_catalogo
+
+    def filtrando():
+        return [fila(c) for c in gym.clases.values() if c.sede_id == tranquila]
+
+    def indice_frio():
+        gym.sedes.indice(tranquila).catalogo = None
+        return gym.catalogo_sede(tranquila)
+
+    assert sorted(f["id"] for f in filtrando()) == sorted(f["id"] for f in gym.catalogo_sede(tranquila))
+    print(f"  catalogo    filtrando todo={medir(filtrando, args.repeticiones):8.3f} ms   "
+          f"indice de la sede={medir(indice_frio, args.repeticiones):7.3f} ms   "
+          f"cache={medir(lambda: gym.catalogo_sede(tranquila), args.repeticiones) * 1000:7.2f} us")
+
+    def ocupacion_filtrando():
+        clases = [c for c in gym.clases.values() if c.sede_id == tranquila]
+        return sum(c.aforo for c in clases), sum(len(c.socios_inscritos) for c in clases)
+
+    print(f"  ocupacion   filtrando todo={medir(ocupacion_filtrando, args.repeticiones):8.3f} ms   "
+          f"contadores={medir(lambda: gym.ocupacion_sede(tranquila), args.repeticiones) * 1000:7.2f} us")
+
+    # La sede ocupada recibe una reserva entre cada par de consultas
+    rnd = random.Random(args.semilla)
+    clases_ocupada = list(gym.sedes.indice(ocupada).clases)
+    socios = list(gym.socios)
+    aciertos = {}
+    for sede_id in (tranquila, ocupada):
+        indice = gym.sedes.indice(sede_id)
+        indice.catalogo = None
+        fallos, tiempos = 0, []
+        for _ in range(args.consultas):
+            try:
+                gym.reservar_clase(rnd.choice(socios), rnd.choice(clases_ocupada))
+            except ValueError:
+                pass  # clase completa
+            version = indice.version
+            guardado = indice.catalogo
+            inicio = time.perf_counter()
+            gym.catalogo_sede(sede_id)
+            tiempos.append(time.perf_counter() - inicio)
+            fallos += guardado is None or guardado[0] != version
+        aciertos[sede_id] = (1 - fallos / args.consultas, statistics.median(tiempos) * 1000)
+    print(f"  con reservas en la sede ocupada ({args.consultas} consultas):")
+    for nombre, sede_id in (("tranquila", tranquila), ("ocupada", ocupada)):
+        tasa, mediana = aciertos[sede_id]
+        print(f"    sede {nombre:<9}  acierto de caché={tasa:6.1%}   catálogo={mediana:7.3f} ms (mediana)")
+
+
+if __name__ == "__main__":
+    main()
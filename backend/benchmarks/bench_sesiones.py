@@ -0,0 +1,116 @@
+"""
+Benchmark del almacén de sesiones y de la lista de revocación.
+
+Con --sesiones sesiones abiertas y 0, --revocados/10 y --revocados tokens
+revocados, mide:
+
+  revocado      comprobar el jti y el sid de un token (lo que añade cada
+                petición autenticada), frente a decodificar el JWT
+  rotar         canjear un token de refresco (sin firmar tokens)
+  emitir        firmar el par de tokens de acceso y refresco
+  memoria       bytes por sesión abierta y por clave revocada (tracemalloc)
+
+El login con bcrypt y /token/refresh de punta a punta se comparan con
+bench_carga.py (escenarios login y refresco).
+
+Uso (desde la carpeta backend/):
+    python benchmarks/bench_sesiones.py
+    python benchmarks/bench_sesiones.py --sesiones 200000 --revocados 100000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import timedelta
+from typing import Callable
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from src.auth import create_access_token, create_refresh_token, decode_token  # noqa: E402
+from src.sesiones import AlmacenSesiones  # noqa: E402
+
+
+def medir(funcion: Callable[[], object], repeticiones: int) -> float:
+    """Mediana en microsegundos (lotes de 100 llamadas)."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        for _ in range(100):
+            funcion()
+        tiempos.append((time.perf_counter() - inicio) / 100)
+    return statistics.median(tiempos) * 1e6
+
+
+def bytes_por(crear: Callable[[], object], n: int) -> float:
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    objeto = crear()
+    despues = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objeto
+    return (despues - antes) / n
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sesiones", type=int, default=100_000)
+    parser.add_argument("--revocados", type=int, default=50_000)
+    parser.add_argument("--repeticiones", type=int, default=50)
+    args = parser.parse_args()
+
+    almacen = AlmacenSesiones(max_sesiones=args.sesiones)
+    ids = [almacen.abrir(f"socio{i}@bench.gym") for i in range(args.sesiones)]
+    token = create_access_token({"sub": "socio0@bench.gym", "sid": ids[0][0]})
+    payload = decode_token(token)
+    claves = (payload["jti"], payload["sid"])
+    print(f"{len(almacen):,} sesiones abiertas")
+
+    print(f"  decodificar JWT     {medir(lambda: decode_token(token), args.repeticiones):8.2f} us")
+    revocadas = 0
+    for objetivo in (0, args.revocados // 10, args.revocados):
+        while revocadas < objetivo:
+            almacen.revocar(uuid.uuid4().hex)
+            revocadas += 1
+        print(f"  revocado            {medir(lambda: almacen.revocado(claves), args.repeticiones):8.2f} us   "
+              f"({revocadas:,} claves revocadas)")
+
+    pendientes = iter(ids)
+
+    def rotar():
+        sesion_id, refresco = next(pendientes)
+        return almacen.rotar(sesion_id, refresco)
+
+    lotes = min(args.repeticiones, args.sesiones // 100)
+    print(f"  rotar               {medir(rotar, lotes):8.2f} us")
+    sesion_id = ids[-1][0]
+
+    def emitir():
+        return (create_access_token({"sub": "socio0@bench.gym", "sid": sesion_id}),
+                create_refresh_token("socio0@bench.gym", sesion_id, uuid.uuid4().hex, timedelta(days=7)))
+
+    print(f"  emitir              {medir(emitir, args.repeticiones):8.2f} us   (acceso + refresco)")
+
+    n = 20_000
+
+    def sesiones():
+        a = AlmacenSesiones(max_sesiones=n)
+        for i in range(n):
+            a.abrir(f"socio{i}@bench.gym")
+        return a
+
+    def revocaciones():
+        a = AlmacenSesiones()
+        for _ in range(n):
+            a.revocar(uuid.uuid4().hex)
+        return a
+
+    print(f"  memoria             {bytes_por(sesiones, n):6.0f} B por sesión   "
+          f"{bytes_por(revocaciones, n):6.0f} B por clave revocada")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark de arranque en frío del backend.
+
+Mide dos cosas, cada una en un proceso Python nuevo para que no haya cachés:
+  1. Tiempo de importación de `src.main` (módulos + construcción de la app).
+  2. Tiempo hasta la primera respuesta sana de `GET /` levantando uvicorn.
+
+Uso (desde la carpeta backend/):
+    python benchmarks/bench_startup.py --runs 5
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); import src.main; "
+    "print(time.perf_counter() - t)"
+)
+
+
+def medir_importacion() -> float:
+    """Devuelve los segundos que tarda `import src.main` en un proceso limpio."""
+    salida = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    return float(salida.stdout.strip().splitlines()[-1])
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def medir_primera_respuesta(timeout: float = 30.0) -> float:
+    """Lanza uvicorn y devuelve los segundos hasta el primer 200 en `/`."""
+    puerto = _puerto_libre()
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--host", "127.0.0.1",
+         "--port", str(puerto), "--log-level", "warning"],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        url = f"http://127.0.0.1:{puerto}/"
+        while time.perf_counter() - inicio < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as r:
+                    if r.status == 200:
+                        return time.perf_counter() - inicio
+            except OSError:
+                time.sleep(0.005)
+        raise RuntimeError("El backend no respondió a tiempo")
+    finally:
+        proceso.terminate()
+        proceso.wait()
+
+
+def _resumen(nombre: str, muestras: list) -> None:
+    print(f"{nombre:<28} mediana={statistics.median(muestras) * 1000:8.1f} ms  "
+          f"min={min(muestras) * 1000:8.1f} ms  max={max(muestras) * 1000:8.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5, help="Repeticiones por medida")
+    args = parser.parse_args()
+
+    importaciones = [medir_importacion() for _ in range(args.runs)]
+    respuestas = [medir_primera_respuesta() for _ in range(args.runs)]
+
+    print(f"Arranque en frío ({args.runs} ejecuciones)")
+    _resumen("import src.main", importaciones)
+    _resumen("primer GET / sano", respuestas)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Clientes mínimos para lanzar peticiones contra la API sin dependencias externas.
+
+- ClienteASGI: llama a la app directamente (en proceso, sin red).
+- ClienteHTTP: habla HTTP/1.1 con un uvicorn real (p. ej. en localhost).
+"""
+import asyncio
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+class ClienteASGI:
+    """Ejecuta peticiones sobre la app ASGI en el mismo event loop."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def peticion(self, metodo: str, ruta: str, headers: Optional[Dict[str, str]] = None,
+                       cuerpo: bytes = b"") -> Tuple[int, bytes]:
+        path, _, query = ruta.partition("?")
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": metodo,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": [(k.lower().encode("latin-1"), v.encode("latin-1"))
+                        for k, v in (headers or {}).items()]
+                       + [(b"content-length", str(len(cuerpo)).encode())],
+            "client": ("127.0.0.1", 50000),
+            "server": ("bench", 80),
+        }
+        terminado = asyncio.Event()
+        pendiente = [cuerpo]
+        estado = [0]
+        partes = []
+
+        async def receive():
+            if pendiente:
+                return {"type": "http.request", "body": pendiente.pop(), "more_body": False}
+            await terminado.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(mensaje):
+            if mensaje["type"] == "http.response.start":
+                estado[0] = mensaje["status"]
+            elif mensaje["type"] == "http.response.body":
+                partes.append(mensaje.get("body", b""))
+                if not mensaje.get("more_body", False):
+                    terminado.set()
+
+        await self.app(scope, receive, send)
+        terminado.set()
+        return estado[0], b"".join(partes)
+
+    async def cerrar(self) -> None:
+        pass
+
+
+class ClienteHTTP:
+    """
+    Cliente HTTP/1.1 con keep-alive sobre asyncio streams, con un pequeño
+    pool de conexiones. Suficiente para los cuerpos JSON de la API.
+    """
+
+    def __init__(self, url_base: str, conexiones: int = 64):
+        partes = urlsplit(url_base)
+        self.host = partes.hostname or "127.0.0.1"
+        self.puerto = partes.port or 80
+        self._libres: asyncio.Queue = asyncio.Queue()
+        self._semaforo = asyncio.Semaphore(conexiones)
+
+    async def _conexion(self):
+        try:
+            return self._libres.get_nowait()
+        except asyncio.QueueEmpty:
+            return await asyncio.open_connection(self.host, self.puerto)
+
+    async def peticion(self, metodo: str, ruta: str, headers: Optional[Dict[str, str]] = None,
+                       cuerpo: bytes = b"") -> Tuple[int, bytes]:
+        async with self._semaforo:
+            reader, writer = await self._conexion()
+            cabeceras = {"Host": f"{self.host}:{self.puerto}", "Content-Length": str(len(cuerpo))}
+            cabeceras.update(headers or {})
+            texto = f"{metodo} {ruta} HTTP/1.1\r\n" + "".join(f"{k}: {v}\r\n" for k, v in cabeceras.items()) + "\r\n"
+            writer.write(texto.encode("latin-1") + cuerpo)
+            await writer.drain()
+
+            linea_estado = await reader.readline()
+            if not linea_estado:
+                # El servidor cerró la conexión sin responder
+                writer.close()
+                return 0, b""
+            estado = int(linea_estado.split()[1])
+            longitud, chunked, cerrar = 0, False, False
+            while True:
+                linea = (await reader.readline()).decode("latin-1").strip()
+                if not linea:
+                    break
+                nombre, _, valor = linea.partition(":")
+                nombre, valor = nombre.lower(), valor.strip()
+                if nombre == "content-length":
+                    longitud = int(valor)
+                elif nombre == "transfer-encoding" and valor.lower() == "chunked":
+                    chunked = True
+                elif nombre == "connection" and valor.lower() == "close":
+                    cerrar = True
+
+            if chunked:
+                trozos = []
+                while True:
+                    tam = int((await reader.readline()).strip(), 16)
+                    trozos.append(await reader.readexactly(tam + 2))
+                    if tam == 0:
+                        break
+                datos = b"".join(t[:-2] for t in trozos)
+            else:
+                datos = await reader.readexactly(longitud)
+
+            if cerrar:
+                writer.close()
+            else:
+                self._libres.put_nowait((reader, writer))
+            return estado, datos
+
+    async def cerrar(self) -> None:
+        while not self._libres.empty():
+            _, writer = self._libres.get_nowait()
+            writer.close()
@@ -0,0 +1,105 @@
+"""
+Generación de poblaciones sintéticas para los benchmarks.
+
+Los objetos se insertan directamente en el GimnasioService (sin pasar por la API)
+y todos los socios comparten un único hash bcrypt precalculado: así montar una
+población de miles de socios tarda milisegundos en vez de minutos.
+"""
+import random
+from datetime import date, timedelta
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from src.auth import create_access_token, hash_password
+from src.models.Clase import DIAS_SEMANA
+from src.models.Socio import Socio
+
+PASSWORD_BENCH = "bench1234"
+NIVELES = ["principiante", "intermedio", "avanzado"]
+TIPOS_DISPOSITIVO = ["pulsera", "bascula", "sensor"]
+
+
+@dataclass
+class Poblacion:
+    """IDs y credenciales de la población creada, para construir las peticiones."""
+    socios: List[str] = field(default_factory=list)
+    emails: List[str] = field(default_factory=list)
+    tokens: Dict[str, str] = field(default_factory=dict)        # socio_id -> JWT
+    dispositivos: Dict[str, str] = field(default_factory=dict)  # socio_id -> dispositivo_id
+    entrenadores: List[str] = field(default_factory=list)
+    clases: List[str] = field(default_factory=list)
+    series: List[str] = field(default_factory=list)
+    sesiones: List[str] = field(default_factory=list)          # IDs de ocurrencia reservables
+    rutinas: List[str] = field(default_factory=list)
+    admin_email: str = ""
+
+
+def crear_poblacion(gym_service, socios: int = 1000, entrenadores: int = 20, clases: int = 100,
+                    series: int = 20, rutinas: int = 200, progresos_por_socio: int = 20, accesos_por_socio: int = 10,
+                    semilla: int = 42) -> Poblacion:
+    """Crea una población reproducible (misma `semilla`, mismos datos)."""
+    rnd = random.Random(semilla)
+    pob = Poblacion()
+    hash_comun = hash_password(PASSWORD_BENCH)
+
+    for i in range(entrenadores):
+        e = gym_service.registrar_entrenador(f"Entrenador {i}", f"entrenador{i}@bench.gym", rnd.choice(["Yoga", "CrossFit", "Pilates", "Spinning"]))
+        pob.entrenadores.append(e.id)
+
+    for i in range(clases):
+        # La agenda rechaza solapes: se prueban franjas hasta dar con una libre
+        for _ in range(100):
+            horario = f"{rnd.randint(6, 22):02d}:{rnd.choice(['00', '30'])}"
+            try:
+                c = gym_service.crear_clase(f"Clase {i}", horario, rnd.randint(10, 40), rnd.choice(pob.entrenadores),
+                                            rnd.choice([45, 60]), rnd.choice(DIAS_SEMANA))
+                break
+            except ValueError:
+                continue
+        else:
+            raise RuntimeError("No hay franjas libres para tantas clases; aumente el número de entrenadores")
+        pob.clases.append(c.id)
+
+    for i in range(series):
+        for _ in range(100):
+            try:
+                sr = gym_service.crear_serie(f"Serie {i}", f"{rnd.randint(6, 22):02d}:15", rnd.randint(10, 30),
+                                             rnd.choice(pob.entrenadores), date.today(), "semanal", 1,
+                                             rnd.sample(DIAS_SEMANA, 2), duracion=45)
+                break
+            except ValueError:
+                continue
+        else:
+            raise RuntimeError("No hay franjas libres para tantas series; aumente el número de entrenadores")
+        pob.series.append(sr.id)
+        pob.sesiones.extend(sr.id_ocurrencia(f) for f in sr.fechas(date.today(), date.today() + timedelta(days=13)))
+
+    for i in range(rutinas):
+        r = gym_service.crear_rutina(f"Rutina {i}", rnd.choice([20, 30, 45, 60, 90]), rnd.choice(NIVELES))
+        for j in range(rnd.randint(3, 8)):
+            gym_service.anadir_ejercicio_rutina(r.id, f"Ejercicio {rnd.randint(0, 150)}", rnd.randint(5, 15), rnd.randint(2, 5))
+        pob.rutinas.append(r.id)
+
+    nuevos = []
+    for i in range(socios):
+        email = f"socio{i}@bench.gym"
+        s = Socio(f"Socio {i}", email, f"{rnd.randint(1960, 2005)}-0{rnd.randint(1, 9)}-1{rnd.randint(0, 9)}", rnd.choice(NIVELES))
+        s.password_hash = hash_comun
+        nuevos.append(s)
+        pob.socios.append(s.id)
+        pob.emails.append(email)
+        pob.tokens[s.id] = create_access_token({"sub": email})
+    gym_service.registrar_socios_en_bloque(nuevos)
+    pob.admin_email = pob.emails[0] if pob.emails else ""
+
+    for socio_id in pob.socios:
+        for rutina_id in rnd.sample(pob.rutinas, min(3, len(pob.rutinas))):
+            gym_service.asignar_rutina(socio_id, rutina_id)
+        for _ in range(progresos_por_socio):
+            gym_service.registrar_progreso(socio_id, round(rnd.uniform(0, 120), 1), rnd.randint(0, 20), rnd.randint(0, 3600))
+        for _ in range(accesos_por_socio):
+            gym_service.registrar_acceso(socio_id)
+        d = gym_service.registrar_dispositivo(rnd.choice(TIPOS_DISPOSITIVO), socio_id)
+        pob.dispositivos[socio_id] = d.id
+
+    return pob
@@ -0,0 +1,134 @@
+import threading
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from src.models.Clase import Clase, MINUTOS_DIA, DIAS_SEMANA
+from src.models.SerieClase import SerieClase
+from src.models.Sede import SEDE_PRINCIPAL
+
+# Lo que ocupa la agenda: una clase semanal/diaria o el patrón de una serie
+Reservable = Union[Clase, SerieClase]
+
+
+class IndiceIntervalos:
+    """
+    Conjunto de intervalos [inicio, fin) que no se solapan, ordenado por inicio.
+
+    Como nunca hay solapes, los fines quedan también ordenados y basta mirar
+    el vecino anterior y el siguiente para saber si un intervalo nuevo choca:
+    detección de conflictos en O(log n) con `bisect`, sin recorrer la agenda.
+    """
+
+    __slots__ = ("_inicios", "_fines", "_clases")
+
+    def __init__(self) -> None:
+        self._inicios: List[int] = []
+        self._fines: List[int] = []
+        self._clases: List[str] = []
+
+    def conflicto(self, inicio: int, fin: int) -> Optional[str]:
+        """ID de la clase que se solapa con [inicio, fin), o None."""
+        i = bisect_right(self._inicios, inicio)
+        if i > 0 and self._fines[i - 1] > inicio:
+            return self._clases[i - 1]
+        if i < len(self._inicios) and self._inicios[i] < fin:
+            return self._clases[i]
+        return None
+
+    def anadir(self, inicio: int, fin: int, clase_id: str) -> None:
+        i = bisect_right(self._inicios, inicio)
+        self._inicios.insert(i, inicio)
+        self._fines.insert(i, fin)
+        self._clases.insert(i, clase_id)
+
+    def quitar(self, inicio: int, clase_id: str) -> None:
+        i = bisect_left(self._inicios, inicio)
+        while i < len(self._inicios) and self._inicios[i] == inicio:
+            if self._clases[i] == clase_id:
+                del self._inicios[i], self._fines[i], self._clases[i]
+                return
+            i += 1
+
+    def en_rango(self, desde: int, hasta: int) -> Iterator[Tuple[int, int, str]]:
+        """Intervalos que empiezan en [desde, hasta), en orden."""
+        i = bisect_left(self._inicios, desde)
+        fin = bisect_left(self._inicios, hasta)
+        for j in range(i, fin):
+            yield self._inicios[j], self._fines[j], self._clases[j]
+
+    def __len__(self) -> int:
+        return len(self._inicios)
+
+
+def formatear_minuto(minuto_semana: int) -> Tuple[str, str]:
+    """Minuto de la semana -> (día, "HH:MM")."""
+    dia, minuto = divmod(minuto_semana, MINUTOS_DIA)
+    return DIAS_SEMANA[dia % len(DIAS_SEMANA)], f"{minuto // 60:02d}:{minuto % 60:02d}"
+
+
+class AgendaService:
+    """
+    Agenda semanal de entrenadores y salas.
+
+    Mantiene un IndiceIntervalos por entrenador y otro por sala (de cada
+    sede: dos sedes pueden tener una "Sala 1" cada una); al crear una
+    clase (o una serie) se comprueban sus franjas contra ambos antes de
+    reservarlas. Las series ocupan su patrón semanal completo, aunque tengan
+    fecha de fin o se repitan cada varias semanas (criterio conservador).
+    """
+
+    def __init__(self) -> None:
+        self._por_entrenador: Dict[str, IndiceIntervalos] = {}
+        self._por_sala: Dict[Tuple[str, str], IndiceIntervalos] = {}  # (sede_id, sala)
+        self._lock = threading.Lock()
+
+    def _indices(self, clase: Reservable) -> List[Tuple[str, IndiceIntervalos]]:
+        indices = [("entrenador", self._por_entrenador.setdefault(clase.entrenador_id, IndiceIntervalos()))]
+        if clase.sala:
+            clave = (clase.sede_id or SEDE_PRINCIPAL, clase.sala)
+            indices.append(("sala", self._por_sala.setdefault(clave, IndiceIntervalos())))
+        return indices
+
+    def _conflicto(self, clase: Reservable) -> Optional[str]:
+        for recurso, indice in self._indices(clase):
+            for inicio, fin in clase.franjas():
+                otra = indice.conflicto(inicio, fin)
+                if otra is not None:
+                    dia, hora = formatear_minuto(inicio)
+                    quien = "el entrenador" if recurso == "entrenador" else f"la sala {clase.sala}"
+                    return f"Error: {quien} ya tiene una clase ({otra}) que se solapa con la franja del {dia} a las {hora}."
+        return None
+
+    def comprobar(self, clase: Reservable) -> Optional[str]:
+        """Motivo del conflicto si la clase (creada o no) no cabe en la agenda, o None."""
+        with self._lock:
+            return self._conflicto(clase)
+
+    def reservar(self, clase: Reservable) -> None:
+        """Ocupa las franjas de la clase; lanza ValueError si chocan con otra."""
+        with self._lock:
+            motivo = self._conflicto(clase)
+            if motivo:
+                raise ValueError(motivo)
+            for _, indice in self._indices(clase):
+                for inicio, fin in clase.franjas():
+                    indice.anadir(inicio, fin, clase.id)
+
+    def liberar(self, clase: Reservable) -> None:
+        with self._lock:
+            for _, indice in self._indices(clase):
+                for inicio, _fin in clase.franjas():
+                    indice.quitar(inicio, clase.id)
+
+    def horario(self, entrenador_id: Optional[str] = None, sala: Optional[str] = None,
+                dia: Optional[str] = None, sede_id: str = SEDE_PRINCIPAL) -> List[Tuple[int, int, str]]:
+        """Franjas (inicio, fin, clase_id) del entrenador o de la sala de la sede, opcionalmente de un solo día."""
+        indice = self._por_entrenador.get(entrenador_id) if entrenador_id else self._por_sala.get((sede_id, sala))
+        if indice is None:
+            return []
+        desde, hasta = 0, len(DIAS_SEMANA) * MINUTOS_DIA
+        if dia:
+            desde = DIAS_SEMANA.index(dia) * MINUTOS_DIA
+            hasta = desde + MINUTOS_DIA
+        with self._lock:
+            return list(indice.en_rango(desde, hasta))
@@ -0,0 +1,364 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.metrics import registro
+from src.models.Acceso import Acceso
+from src.models.Clase import Clase
+from src.models.Progreso import Progreso
+from src.Services.Historial_service import COLUMNAS as COLUMNAS_DIARIAS, Tabla
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configuración
+ANALITICA_DIR = os.getenv("ANALITICA_DIR", os.path.join(BACKEND_DIR, "analitica"))
+ANALITICA_INTERVALO = float(os.getenv("ANALITICA_INTERVALO", 300))   # segundos entre instantáneas
+ANALITICA_WORKERS = int(os.getenv("ANALITICA_WORKERS", 1))           # procesos que calculan los informes
+ANALITICA_CONSERVAR = 2      # instantáneas en disco (la actual y la anterior, que aún puede estar en uso)
+MANIFIESTO = "manifiesto.json"
+PUNTERO = "ACTUAL"
+
+exportaciones = registro.counter(
+    "gym_analitica_exportaciones_total", "Instantáneas de analítica escritas en disco")
+bytes_instantanea = registro.gauge(
+    "gym_analitica_bytes_instantanea", "Tamaño en disco de la instantánea de analítica actual")
+informes_calculados = registro.counter(
+    "gym_analitica_informes_total", "Informes servidos por tipo y origen (cache, calculado)", ("informe", "origen"))
+
+
+# =========== EXPORTACIÓN (proceso de la API) ===========
+
+def _columnas_progresos(progresos: List[Progreso], indice: Dict[str, int]) -> Dict[str, np.ndarray]:
+    return {
+        "socio": np.array([indice.get(p.socio_id, -1) for p in progresos], "<i4"),
+        "dia": np.array([p.fecha.toordinal() for p in progresos], "<i4"),
+        "peso": np.array([p.peso for p in progresos], "<f4"),
+        "repeticiones": np.array([p.repeticiones for p in progresos], "<i4"),
+        "tiempo": np.array([p.tiempo for p in progresos], "<i4"),
+    }
+
+
+def _columnas_accesos(accesos: List[Acceso], indice: Dict[str, int]) -> Dict[str, np.ndarray]:
+    return {
+        "socio": np.array([indice.get(a.socio_id, -1) for a in accesos], "<i4"),
+        "dia": np.array([a.fecha.toordinal() for a in accesos], "<i4"),
+        "minuto": np.array([a.hora.hour * 60 + a.hora.minute for a in accesos], "<i2"),
+    }
+
+
+def _columnas_diarios(diarios: Tabla, indice: Dict[str, int]) -> Dict[str, np.ndarray]:
+    """Resúmenes (socio, día) del historial compactado, con el socio como índice igual que el resto."""
+    ids, posicion = np.unique(diarios["socio"], return_inverse=True)
+    socios = np.array([indice.get(s.decode(), -1) for s in ids.tolist()], "<i4")
+    columnas = {"socio": socios[posicion] if len(ids) else np.empty(0, "<i4")}
+    columnas.update({col: np.asarray(diarios[col], dtype) for col, dtype in COLUMNAS_DIARIAS})
+    return columnas
+
+
+def _columnas_clases(clases: List[Clase], indice: Dict[str, int]) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+    inscritos = [list(c.socios_inscritos) for c in clases]
+    columnas_clases = {
+        "id": np.array([c.id.encode() for c in clases], "S"),
+        "nombre": np.array([c.nombre for c in clases], "U"),
+        "aforo": np.array([c.aforo for c in clases], "<i4"),
+        "inscritos": np.array([len(i) for i in inscritos], "<i4"),
+    }
+    reservas = {
+        "clase": np.repeat(np.arange(len(clases), dtype="<i4"), columnas_clases["inscritos"]),
+        "socio": np.array([indice.get(s, -1) for i in inscritos for s in i], "<i4"),
+    }
+    return columnas_clases, reservas
+
+
+def exportar_instantanea(directorio: str, socios: List[str], progresos: List[Progreso], accesos: List[Acceso],
+                         clases: List[Clase], diarios: Optional[Tabla] = None) -> Dict[str, Any]:
+    """
+    Escribe una instantánea columnar: un .npy por columna (`<tabla>.<columna>.npy`)
+    y un manifiesto. Se escribe en un directorio temporal, se renombra y al
+    final se cambia el puntero ACTUAL, así que un lector nunca ve una a medias.
+    Los socios se guardan como índice en `socios.id.npy`. `diarios` son los
+    resúmenes del historial ya compactado (los días que ya no están en
+    `progresos` ni en `accesos`).
+    """
+    indice = {socio_id: i for i, socio_id in enumerate(socios)}
+    clases_cols, reservas = _columnas_clases(clases, indice)
+    tablas = {
+        "socios": {"id": np.array([s.encode() for s in socios], "S")},
+        "progresos": _columnas_progresos(progresos, indice),
+        "accesos": _columnas_accesos(accesos, indice),
+        "clases": clases_cols,
+        "reservas": reservas,
+    }
+    if diarios is not None:
+        tablas["diarios"] = _columnas_diarios(diarios, indice)
+    version = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    os.makedirs(directorio, exist_ok=True)
+    temporal = os.path.join(directorio, f".instantanea-{version}")
+    os.makedirs(temporal)
+    for tabla, columnas in tablas.items():
+        for columna, valores in columnas.items():
+            np.save(os.path.join(temporal, f"{tabla}.{columna}.npy"), valores)
+    manifiesto = {
+        "version": version,
+        "creada": datetime.now().isoformat(timespec="seconds"),
+        "filas": {tabla: len(next(iter(columnas.values()))) for tabla, columnas in tablas.items()},
+        "bytes": sum(os.path.getsize(os.path.join(temporal, f)) for f in os.listdir(temporal)),
+    }
+    with open(os.path.join(temporal, MANIFIESTO), "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f)
+    os.rename(temporal, os.path.join(directorio, f"instantanea-{version}"))
+    puntero = os.path.join(directorio, PUNTERO)
+    with open(puntero + ".tmp", "w", encoding="utf-8") as f:
+        f.write(f"instantanea-{version}")
+    os.replace(puntero + ".tmp", puntero)
+    return manifiesto
+
+
+# =========== LECTURA E INFORMES (procesos de analítica) ===========
+
+class Instantanea:
+    """
+    Instantánea abierta en solo lectura. Cada columna se mapea con
+    np.load(mmap_mode="r"): nada se copia ni se deserializa, y varios
+    procesos que abren la misma instantánea comparten las páginas del
+    page cache.
+    """
+
+    def __init__(self, ruta: str) -> None:
+        self.ruta = ruta
+        with open(os.path.join(ruta, MANIFIESTO), encoding="utf-8") as f:
+            self.manifiesto = json.load(f)
+        self._columnas: Dict[str, np.ndarray] = {}
+
+    def tiene(self, tabla: str) -> bool:
+        return tabla in self.manifiesto["filas"]
+
+    def __getitem__(self, nombre: str) -> np.ndarray:
+        """`instantanea["progresos.peso"]` -> array mapeado."""
+        columna = self._columnas.get(nombre)
+        if columna is None:
+            columna = self._columnas[nombre] = np.load(os.path.join(self.ruta, f"{nombre}.npy"), mmap_mode="r")
+        return columna
+
+
+def informe_asistencia(inst: Instantanea, limite: int = 50) -> Dict[str, Any]:
+    """Ocupación de cada clase (reservas / aforo), de más a menos llena."""
+    aforo, inscritos = inst["clases.aforo"], inst["clases.inscritos"]
+    ocupacion = inscritos / np.maximum(aforo, 1)
+    orden = np.argsort(-ocupacion, kind="stable")[:limite]
+    reservas_por_socio = np.bincount(inst["reservas.socio"][inst["reservas.socio"] >= 0],
+                                     minlength=len(inst["socios.id"]))
+    return {
+        "clases": len(aforo),
+        "reservas": int(inscritos.sum()),
+        "ocupacion_media": round(float(ocupacion.mean()), 4) if len(aforo) else 0.0,
+        "clases_completas": int((inscritos >= aforo).sum()),
+        "socios_sin_reservas": int((reservas_por_socio == 0).sum()),
+        "por_clase": [
+            {"clase_id": inst["clases.id"][i].decode(), "nombre": str(inst["clases.nombre"][i]),
+             "aforo": int(aforo[i]), "inscritos": int(inscritos[i]), "ocupacion": round(float(ocupacion[i]), 4)}
+            for i in orden.tolist()
+        ],
+    }
+
+
+def _diarios(inst: Instantanea, mascara: Callable[[Instantanea], np.ndarray], *columnas: str) -> List[np.ndarray]:
+    """Columnas de los resúmenes diarios que cumplen `mascara` (vacías si la instantánea es de antes de tenerlos)."""
+    if not inst.tiene("diarios"):
+        return [np.empty(0, "<i4") for _ in columnas]
+    filas = mascara(inst)
+    return [np.asarray(inst[f"diarios.{col}"])[filas] for col in columnas]
+
+
+def informe_accesos(inst: Instantanea, dias: int = 30) -> Dict[str, Any]:
+    """
+    Accesos de los últimos `dias` días por hora del día y día de la semana.
+    Los días ya compactados cuentan en el total, los socios activos y el día
+    de la semana; los resúmenes no guardan la hora, así que `por_hora` solo
+    cubre los accesos en crudo (`accesos_sin_hora` dice cuántos faltan).
+    """
+    desde = date.today().toordinal() - dias + 1
+    dia, minuto, socio = inst["accesos.dia"], inst["accesos.minuto"], inst["accesos.socio"]
+    recientes = dia >= desde
+    dia, minuto, socio = dia[recientes], minuto[recientes], socio[recientes]
+    d_dia, d_socio, d_accesos = _diarios(
+        inst, lambda i: (i["diarios.dia"] >= desde) & (i["diarios.accesos"] > 0), "dia", "socio", "accesos")
+    socios = np.concatenate([socio, d_socio])
+    sin_hora = int(d_accesos.sum())
+    return {
+        "dias": dias,
+        "accesos": int(len(dia)) + sin_hora,
+        "accesos_sin_hora": sin_hora,
+        "socios_activos": int(len(np.unique(socios[socios >= 0]))),
+        "por_hora": np.bincount(minuto // 60, minlength=24).tolist(),
+        # date.fromordinal(1) es lunes: el ordinal - 1 módulo 7 es el día de la semana (0 = lunes)
+        "por_dia_semana": (np.bincount((dia - 1) % 7, minlength=7)
+                           + np.bincount((d_dia - 1) % 7, weights=d_accesos, minlength=7).astype(np.int64)).tolist(),
+    }
+
+
+CAMPOS_PROGRESO = ("peso", "repeticiones", "tiempo", "volumen")
+
+
+def _valores_diarios(inst: Instantanea, campo: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Valores por sesión de los días compactados y su socio. El resumen solo
+    guarda totales del día: cada sesión cuenta con la media del día (el
+    peso, con el máximo), lo que es exacto en los días de una sola sesión.
+    """
+    sesiones, socio, peso_max, repeticiones, tiempo, volumen = _diarios(
+        inst, lambda i: i["diarios.sesiones"] > 0,
+        "sesiones", "socio", "peso_max", "repeticiones", "tiempo", "volumen")
+    if campo == "peso":
+        por_sesion = peso_max.astype(np.float64)
+    else:
+        total = {"repeticiones": repeticiones, "tiempo": tiempo, "volumen": volumen}[campo]
+        por_sesion = total / np.maximum(sesiones, 1)
+    return np.repeat(por_sesion, sesiones), np.repeat(socio, sesiones)
+
+
+def informe_progresos(inst: Instantanea, campo: str = "peso", cubetas: int = 20) -> Dict[str, Any]:
+    """Distribución de un campo de los progresos (en crudo y compactados): percentiles e histograma."""
+    if campo == "volumen":
+        valores = inst["progresos.peso"] * inst["progresos.repeticiones"]
+    else:
+        valores = np.asarray(inst[f"progresos.{campo}"])
+    resumidos, socios_resumidos = _valores_diarios(inst, campo)
+    valores = np.concatenate([valores, resumidos])
+    socios = np.concatenate([inst["progresos.socio"], socios_resumidos])
+    sesiones = np.bincount(socios[socios >= 0], minlength=len(inst["socios.id"]))
+    if not len(valores):
+        return {"campo": campo, "registros": 0, "registros_resumidos": 0, "media": None, "percentiles": {},
+                "histograma": [], "sesiones_por_socio": {}}
+    conteos, bordes = np.histogram(valores, bins=cubetas)
+    percentiles = np.percentile(valores, (10, 25, 50, 75, 90, 99))
+    return {
+        "campo": campo,
+        "registros": int(len(valores)),
+        "registros_resumidos": int(len(resumidos)),
+        "media": round(float(valores.mean()), 3),
+        "percentiles": {f"p{p}": round(float(v), 3) for p, v in zip((10, 25, 50, 75, 90, 99), percentiles)},
+        "histograma": [{"desde": round(float(a), 3), "hasta": round(float(b), 3), "registros": int(n)}
+                       for a, b, n in zip(bordes[:-1], bordes[1:], conteos)],
+        "sesiones_por_socio": {"media": round(float(sesiones.mean()), 3) if len(sesiones) else 0.0,
+                               "max": int(sesiones.max()) if len(sesiones) else 0,
+                               "sin_sesiones": int((sesiones == 0).sum())},
+    }
+
+
+INFORMES: Dict[str, Callable[..., Dict[str, Any]]] = {
+    "asistencia": informe_asistencia,
+    "accesos": informe_accesos,
+    "progresos": informe_progresos,
+}
+
+# Instantáneas ya abiertas en este proceso de analítica (ruta -> Instantanea)
+_abiertas: Dict[str, Instantanea] = {}
+
+
+def _calcular_informe(ruta: str, nombre: str, parametros: Dict[str, Any]) -> Dict[str, Any]:
+    """Se ejecuta en un proceso del pool: abre (una vez) la instantánea y calcula el informe."""
+    inst = _abiertas.get(ruta)
+    if inst is None:
+        _abiertas.clear()  # la anterior ya no se va a pedir
+        inst = _abiertas[ruta] = Instantanea(ruta)
+    return INFORMES[nombre](inst, **parametros)
+
+
+# =========== SERVICIO ===========
+
+class AnaliticaService:
+    """
+    Analítica sobre una instantánea en disco en vez de sobre los diccionarios
+    vivos de GimnasioService.
+
+    La exportación periódica vuelca progresos, accesos, reservas y los
+    resúmenes diarios del historial compactado a columnas .npy. Los informes
+    se calculan en procesos aparte que mapean esas columnas (sin locks ni
+    pickle del servicio), y el resultado se guarda por versión de
+    instantánea: hasta la siguiente exportación, repetir un informe no
+    cuesta nada.
+    """
+
+    def __init__(self, directorio: str = ANALITICA_DIR, workers: int = ANALITICA_WORKERS) -> None:
+        self.directorio = directorio
+        self.workers = max(1, workers)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._cache: Dict[Tuple[str, str, Tuple], Dict[str, Any]] = {}
+        self.manifiesto: Optional[Dict[str, Any]] = self._leer_actual()
+
+    def _leer_actual(self) -> Optional[Dict[str, Any]]:
+        """Manifiesto de la instantánea a la que apunta ACTUAL (de una ejecución anterior), si la hay."""
+        try:
+            with open(os.path.join(self.directorio, PUNTERO), encoding="utf-8") as f:
+                ruta = os.path.join(self.directorio, f.read().strip())
+            with open(os.path.join(ruta, MANIFIESTO), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _ruta(self, version: str) -> str:
+        return os.path.join(self.directorio, f"instantanea-{version}")
+
+    def exportar(self, socios: Iterable[str], progresos: Iterable[Progreso], accesos: Iterable[Acceso],
+                 clases: Iterable[Clase], diarios: Optional[Tabla] = None) -> Dict[str, Any]:
+        """Escribe una instantánea nueva, la hace actual y borra las antiguas."""
+        inicio = time.perf_counter()
+        with self._lock:
+            manifiesto = exportar_instantanea(self.directorio, list(socios), list(progresos), list(accesos),
+                                              list(clases), diarios)
+            self.manifiesto = manifiesto
+            self._cache.clear()
+            antiguas = sorted(d for d in os.listdir(self.directorio) if d.startswith("instantanea-"))
+            for nombre in antiguas[:-ANALITICA_CONSERVAR]:
+                # Un proceso que aún la tenga mapeada sigue leyendo: en POSIX el fichero vive hasta que la suelte
+                shutil.rmtree(os.path.join(self.directorio, nombre), ignore_errors=True)
+        manifiesto["segundos"] = round(time.perf_counter() - inicio, 3)
+        exportaciones.inc()
+        bytes_instantanea.set(manifiesto["bytes"])
+        return manifiesto
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Los procesos de analítica se crean con el primer informe, no al arrancar."""
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    # "spawn": un fork de este proceso con hilos heredaría sus locks tal cual
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def cerrar(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def informe(self, nombre: str, **parametros: Any) -> Dict[str, Any]:
+        """Calcula (o devuelve de la caché) un informe sobre la instantánea actual."""
+        if nombre not in INFORMES:
+            raise ValueError(f"Error: informe desconocido. Opciones: {', '.join(INFORMES)}")
+        manifiesto = self.manifiesto
+        if manifiesto is None:
+            raise ValueError("Error: todavía no hay ninguna instantánea de analítica.")
+        clave = (manifiesto["version"], nombre, tuple(sorted(parametros.items())))
+        resultado = self._cache.get(clave)
+        if resultado is not None:
+            informes_calculados.inc(nombre, "cache")
+            return resultado
+        datos = await asyncio.get_running_loop().run_in_executor(
+            self._get_pool(), _calcular_informe, self._ruta(manifiesto["version"]), nombre, parametros)
+        resultado = {"instantanea": manifiesto["version"], "creada": manifiesto["creada"], **datos}
+        if self.manifiesto is manifiesto:
+            self._cache[clave] = resultado
+        informes_calculados.inc(nombre, "calculado")
+        return resultado
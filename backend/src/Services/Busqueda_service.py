@@ -0,0 +1,250 @@
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from src.models.Clase import Clase
+from src.models.Ejercicio import Ejercicio
+from src.models.Entrenador import Entrenador
+from src.models.Rutina import Rutina
+from src.models.SerieClase import SerieClase
+
+TIPOS = ("clase", "serie", "rutina", "entrenador", "ejercicio")
+
+# Peso de cada campo en la puntuación
+PESO_NOMBRE = 2.0
+PESO_ESPECIALIDAD = 1.0
+PESO_EJERCICIOS = 0.5
+PESO_GRUPO_MUSCULAR = 1.0
+# Peso relativo de una coincidencia por prefijo / aproximada frente a una exacta
+PESO_PREFIJO = 0.8
+PESO_FUZZY = 0.6
+MAX_EXPANSIONES_PREFIJO = 50
+MAX_CANDIDATOS_FUZZY = 10
+SIMILITUD_MINIMA = 0.4          # Jaccard de trigramas
+LONGITUD_MINIMA_FUZZY = 3
+
+_SEPARADOR = re.compile(r"[^0-9a-z]+")
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas y sin tildes: "Fuerza Básica" -> "fuerza basica"."""
+    descompuesto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def tokenizar(texto: str) -> List[str]:
+    return [t for t in _SEPARADOR.split(normalizar(texto)) if t]
+
+
+def trigramas(termino: str) -> Set[str]:
+    relleno = f"  {termino} "
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+class _Documento:
+    __slots__ = ("tipo", "id", "nombre", "terminos")
+
+    def __init__(self, tipo: str, doc_id: str, nombre: str, terminos: Dict[str, float]):
+        self.tipo = tipo
+        self.id = doc_id
+        self.nombre = nombre
+        self.terminos = terminos   # término -> peso en el documento
+
+
+class BusquedaService:
+    """
+    Índice invertido en memoria sobre clases, series, rutinas, entrenadores y ejercicios.
+
+    - Normaliza tildes y mayúsculas (los datos están en español).
+    - El último término de la consulta se expande por prefijo (typeahead)
+      usando el vocabulario ordenado y `bisect`.
+    - Los términos sin coincidencia exacta se buscan por similitud de
+      trigramas (tolera erratas: "pilates" ~ "pilattes").
+    - Se actualiza de forma incremental al crear o modificar documentos.
+    """
+
+    def __init__(self) -> None:
+        self._docs: Dict[int, _Documento] = {}
+        self._clave_a_doc: Dict[Tuple[str, str], int] = {}
+        self._siguiente = 0
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._vocabulario: List[str] = []                     # ordenado, para prefijos
+        self._trigramas: Dict[str, Set[str]] = defaultdict(set)  # trigrama -> términos
+        self._lock = threading.RLock()
+
+    # =========== INDEXACIÓN ===========
+
+    def indexar_clase(self, clase: Clase) -> None:
+        self._indexar("clase", clase.id, clase.nombre, [(clase.nombre, PESO_NOMBRE)])
+
+    def indexar_serie(self, serie: SerieClase) -> None:
+        self._indexar("serie", serie.id, serie.nombre, [(serie.nombre, PESO_NOMBRE)])
+
+    def indexar_rutina(self, rutina: Rutina) -> None:
+        campos = [(rutina.nombre, PESO_NOMBRE)]
+        campos.extend((e.ejercicio.nombre, PESO_EJERCICIOS) for e in rutina.ejercicios)
+        self._indexar("rutina", rutina.id, rutina.nombre, campos)
+
+    def indexar_entrenador(self, entrenador: Entrenador) -> None:
+        self._indexar("entrenador", entrenador.id, entrenador.nombre,
+                      [(entrenador.nombre, PESO_NOMBRE), (entrenador.especialidad, PESO_ESPECIALIDAD)])
+
+    def indexar_ejercicio(self, ejercicio: Ejercicio) -> None:
+        self._indexar("ejercicio", ejercicio.id, ejercicio.nombre,
+                      [(ejercicio.nombre, PESO_NOMBRE), (ejercicio.grupo_muscular, PESO_GRUPO_MUSCULAR)])
+
+    def _indexar(self, tipo: str, doc_id: str, nombre: str, campos: Iterable[Tuple[str, float]]) -> None:
+        terminos: Dict[str, float] = {}
+        for texto, peso in campos:
+            for termino in tokenizar(texto):
+                terminos[termino] = terminos.get(termino, 0.0) + peso
+
+        with self._lock:
+            interno = self._clave_a_doc.get((tipo, doc_id))
+            if interno is not None:
+                self._quitar_postings(interno)
+            else:
+                interno = self._siguiente
+                self._siguiente += 1
+                self._clave_a_doc[(tipo, doc_id)] = interno
+            self._docs[interno] = _Documento(tipo, doc_id, nombre, terminos)
+            for termino, peso in terminos.items():
+                postings = self._postings.get(termino)
+                if postings is None:
+                    postings = self._postings[termino] = {}
+                    self._vocabulario.insert(bisect_left(self._vocabulario, termino), termino)
+                    for tri in trigramas(termino):
+                        self._trigramas[tri].add(termino)
+                postings[interno] = peso
+
+    def eliminar(self, tipo: str, doc_id: str) -> None:
+        with self._lock:
+            interno = self._clave_a_doc.pop((tipo, doc_id), None)
+            if interno is not None:
+                self._quitar_postings(interno)
+                del self._docs[interno]
+
+    def _quitar_postings(self, interno: int) -> None:
+        for termino in self._docs[interno].terminos:
+            postings = self._postings.get(termino)
+            if postings is None:
+                continue
+            postings.pop(interno, None)
+            if not postings:
+                del self._postings[termino]
+                del self._vocabulario[bisect_left(self._vocabulario, termino)]
+                for tri in trigramas(termino):
+                    self._trigramas[tri].discard(termino)
+
+    # =========== CONSULTA ===========
+
+    def _por_prefijo(self, prefijo: str) -> List[str]:
+        i = bisect_left(self._vocabulario, prefijo)
+        encontrados = []
+        while i < len(self._vocabulario) and self._vocabulario[i].startswith(prefijo):
+            encontrados.append(self._vocabulario[i])
+            i += 1
+        if len(encontrados) > MAX_EXPANSIONES_PREFIJO:
+            # Se prefieren los términos más frecuentes
+            encontrados = heapq.nlargest(MAX_EXPANSIONES_PREFIJO, encontrados, key=lambda t: len(self._postings[t]))
+        return encontrados
+
+    def _aproximados(self, termino: str) -> List[Tuple[str, float]]:
+        tris = trigramas(termino)
+        compartidos: Dict[str, int] = defaultdict(int)
+        for tri in tris:
+            for candidato in self._trigramas.get(tri, ()):
+                compartidos[candidato] += 1
+        similares = []
+        for candidato, comunes in compartidos.items():
+            similitud = comunes / (len(tris) + len(candidato) + 1 - comunes)
+            if similitud >= SIMILITUD_MINIMA:
+                similares.append((candidato, similitud))
+        return heapq.nlargest(MAX_CANDIDATOS_FUZZY, similares, key=lambda x: x[1])
+
+    def _expandir(self, termino: str, es_ultimo: bool) -> Dict[str, float]:
+        """Términos del vocabulario que cuentan para `termino`, con su peso."""
+        expansion: Dict[str, float] = {}
+        if termino in self._postings:
+            expansion[termino] = 1.0
+        if es_ultimo:
+            for t in self._por_prefijo(termino):
+                expansion.setdefault(t, PESO_PREFIJO)
+        if not expansion and len(termino) >= LONGITUD_MINIMA_FUZZY:
+            for t, similitud in self._aproximados(termino):
+                expansion[t] = PESO_FUZZY * similitud
+        return expansion
+
+    def buscar(self, consulta: str, tipo: Optional[str] = None, pagina: int = 1,
+               tamano: int = 20) -> Tuple[int, List[Tuple[str, str, str, float]]]:
+        """
+        Busca y ordena por relevancia (tf ponderado por campo x idf).
+
+        Returns:
+            (total de resultados, [(tipo, id, nombre, puntuación)] de la página pedida)
+        """
+        terminos = tokenizar(consulta)
+        if not terminos:
+            return 0, []
+        with self._lock:
+            n_docs = len(self._docs) or 1
+            expansiones = [self._expandir(t, i == len(terminos) - 1) for i, t in enumerate(terminos)]
+
+            if len(expansiones) == 1 and len(expansiones[0]) == 1 and tipo is None:
+                # Caso más común (una palabra, sin filtro): el orden es el de los pesos del posting
+                termino = next(iter(expansiones[0]))
+                postings = self._postings[termino]
+                factor = expansiones[0][termino] * math.log(1 + n_docs / len(postings))
+                total = len(postings)
+                inicio = (max(pagina, 1) - 1) * tamano
+                mejores = [(d, p * factor) for d, p in
+                           heapq.nlargest(inicio + tamano, postings.items(), key=itemgetter(1))[inicio:]]
+                return total, self._resultados(mejores)
+
+            puntuaciones: Dict[int, float] = {}
+            for expansion in expansiones:
+                if len(expansion) == 1:
+                    (t, peso_expansion), = expansion.items()
+                    postings = self._postings[t]
+                    factor = peso_expansion * math.log(1 + n_docs / len(postings))
+                    actual = puntuaciones.get
+                    for interno, peso_campo in postings.items():
+                        puntuaciones[interno] = actual(interno, 0.0) + peso_campo * factor
+                    continue
+                # Varias expansiones (prefijo / erratas): cada término de la consulta
+                # suma, como mucho, su mejor coincidencia por documento
+                mejor: Dict[int, float] = {}
+                for t, peso_expansion in expansion.items():
+                    postings = self._postings[t]
+                    factor = peso_expansion * math.log(1 + n_docs / len(postings))
+                    for interno, peso_campo in postings.items():
+                        valor = peso_campo * factor
+                        if valor > mejor.get(interno, 0.0):
+                            mejor[interno] = valor
+                for interno, valor in mejor.items():
+                    puntuaciones[interno] = puntuaciones.get(interno, 0.0) + valor
+
+            if tipo is not None:
+                docs = self._docs
+                puntuaciones = {d: p for d, p in puntuaciones.items() if docs[d].tipo == tipo}
+
+            total = len(puntuaciones)
+            inicio = (max(pagina, 1) - 1) * tamano
+            mejores = heapq.nlargest(inicio + tamano, puntuaciones.items(), key=itemgetter(1))[inicio:]
+            return total, self._resultados(mejores)
+
+    def _resultados(self, mejores: List[Tuple[int, float]]) -> List[Tuple[str, str, str, float]]:
+        resultados = []
+        for interno, puntuacion in mejores:
+            doc = self._docs[interno]
+            resultados.append((doc.tipo, doc.id, doc.nombre, puntuacion))
+        return resultados
+
+    def __len__(self) -> int:
+        return len(self._docs)
@@ -0,0 +1,370 @@
+import asyncio
+import csv
+import inspect
+import io
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from pydantic import ValidationError
+
+from src.Services.Gimnasio_service import GimnasioService
+from src.models.Socio import Socio
+from src.models.Entrenador import Entrenador
+from src.models.Clase import Clase
+from src.models.Rutina import Rutina
+from src.schemas.schemas import (
+    SocioCreate, SocioResponse,
+    EntrenadorCreate, EntrenadorResponse,
+    ClaseCreate, ClaseResponse,
+    RutinaCreate, RutinaResponse,
+)
+
+# Configuración
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", os.cpu_count() or 1))
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", 500))
+EXPORT_CHUNK_SIZE = 500      # Registros por trozo enviado al cliente
+MAX_ERRORES_INFORME = 100    # Errores detallados que se devuelven como máximo
+CSV_FILAS_POR_PASO = 500     # Filas CSV que se parsean en el hilo por cada ida y vuelta desde el loop
+
+FORMATOS = ("csv", "ndjson")
+
+
+# =========== CONSTRUCCIÓN (se ejecuta en los procesos del pool) ===========
+
+def _construir_socio(d: SocioCreate) -> Socio:
+    # El hash bcrypt se calcula aquí, en el proceso hijo
+    return Socio(d.nombre, d.email, d.fecha_nacimiento, d.nivel, d.password)
+
+def _construir_entrenador(d: EntrenadorCreate) -> Entrenador:
+    return Entrenador(d.nombre, d.email, d.especialidad, d.sede_id)
+
+def _construir_clase(d: ClaseCreate) -> Clase:
+    return Clase(d.nombre, d.horario, d.aforo, d.entrenador_id, d.duracion, d.dia, d.sala, d.sede_id)
+
+def _construir_rutina(d: RutinaCreate) -> Rutina:
+    return Rutina(d.nombre, d.duracion, d.dificultad)
+
+
+# entidad -> (schema de entrada, constructor del modelo)
+_CONSTRUCTORES: Dict[str, Tuple[type, Callable[[Any], Any]]] = {
+    "socios": (SocioCreate, _construir_socio),
+    "entrenadores": (EntrenadorCreate, _construir_entrenador),
+    "clases": (ClaseCreate, _construir_clase),
+    "rutinas": (RutinaCreate, _construir_rutina),
+}
+
+ENTIDADES = tuple(_CONSTRUCTORES)
+
+
+def _mensaje_validacion(e: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+    )
+
+
+def _preparar_registros(entidad: str, registros: List[Dict[str, Any]]) -> List[Tuple[bool, Any]]:
+    """
+    Valida y construye un trozo de registros. Pensada para correr en un proceso hijo.
+
+    Returns:
+        Una tupla por registro: (True, objeto) si es válido o (False, motivo)
+    """
+    schema, construir = _CONSTRUCTORES[entidad]
+    resultado = []
+    for registro in registros:
+        try:
+            resultado.append((True, construir(schema.model_validate(registro))))
+        except ValidationError as e:
+            resultado.append((False, _mensaje_validacion(e)))
+        except ValueError as e:
+            resultado.append((False, str(e)))
+    return resultado
+
+
+# =========== LECTURA EN STREAMING ===========
+
+async def _lineas(stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Parte el cuerpo de la petición en líneas sin cargarlo entero en memoria."""
+    resto = b""
+    async for trozo in stream:
+        resto += trozo
+        *lineas, resto = resto.split(b"\n")
+        for linea in lineas:
+            yield linea.decode("utf-8").rstrip("\r")
+    if resto:
+        yield resto.decode("utf-8").rstrip("\r")
+
+
+def _lineas_csv(siguiente_trozo: Callable[[], bytes]) -> Iterator[str]:
+    """
+    Líneas del cuerpo con su salto de línea: csv.reader lo necesita para
+    conservarlo dentro de un campo entre comillas. `siguiente_trozo`
+    devuelve b"" al acabar el cuerpo.
+    """
+    resto = b""
+    while True:
+        trozo = siguiente_trozo()
+        if not trozo:
+            break
+        resto += trozo
+        inicio = 0
+        while (fin := resto.find(b"\n", inicio)) != -1:
+            yield resto[inicio:fin + 1].decode("utf-8")
+            inicio = fin + 1
+        resto = resto[inicio:]
+    if resto:
+        yield resto.decode("utf-8")
+
+
+async def _filas_csv(stream: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Filas CSV del cuerpo: (número de la línea donde empieza, valores), o un
+    str con el motivo si el CSV está roto (y ahí se deja de leer).
+
+    csv.reader consume él mismo las líneas, así que los campos entre
+    comillas pueden tener saltos de línea y una comilla suelta en un campo
+    sin comillas (O"Brien) es un carácter más. El lector corre en un hilo
+    de CSV_FILAS_POR_PASO en CSV_FILAS_POR_PASO filas y pide cada trozo del
+    cuerpo al event loop, que mientras tanto queda libre.
+    """
+    loop = asyncio.get_running_loop()
+    trozos = stream.__aiter__()
+
+    async def siguiente() -> bytes:
+        try:
+            return await trozos.__anext__()
+        except StopAsyncIteration:
+            return b""
+
+    lector = csv.reader(_lineas_csv(lambda: asyncio.run_coroutine_threadsafe(siguiente(), loop).result()))
+
+    def leer_paso() -> List[Tuple[int, Any]]:
+        filas: List[Tuple[int, Any]] = []
+        while len(filas) < CSV_FILAS_POR_PASO:
+            inicio = lector.line_num + 1
+            try:
+                valores = next(lector, None)
+            except csv.Error as e:
+                filas.append((inicio, f"CSV inválido: {e}"))
+                break
+            if valores is None:
+                break
+            filas.append((inicio, valores))
+        return filas
+
+    while True:
+        filas = await asyncio.to_thread(leer_paso)
+        for fila in filas:
+            yield fila
+        if len(filas) < CSV_FILAS_POR_PASO or isinstance(filas[-1][1], str):
+            return
+
+
+async def _registros(stream: AsyncIterator[bytes], formato: str) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Devuelve (número de línea, registro) por cada línea no vacía del cuerpo
+    (en CSV, por cada fila; su número es el de la línea donde empieza).
+    Si la línea no se puede parsear, el registro es un str con el motivo.
+    """
+    if formato == "ndjson":
+        numero = 0
+        async for linea in _lineas(stream):
+            numero += 1
+            if not linea.strip():
+                continue
+            try:
+                registro = json.loads(linea)
+            except json.JSONDecodeError as e:
+                yield numero, f"JSON inválido: {e.msg}"
+                continue
+            if not isinstance(registro, dict):
+                yield numero, "JSON inválido: se esperaba un objeto"
+                continue
+            yield numero, registro
+        return
+
+    cabecera: Optional[List[str]] = None
+    async for numero, valores in _filas_csv(stream):
+        if isinstance(valores, str):
+            yield numero, valores
+            continue
+        if not any(v.strip() for v in valores):
+            continue
+        if cabecera is None:
+            cabecera = [v.strip() for v in valores]
+            continue
+        if len(valores) != len(cabecera):
+            yield numero, f"CSV inválido: se esperaban {len(cabecera)} columnas"
+            continue
+        # Las columnas vacías se omiten para que apliquen los valores por defecto
+        yield numero, {k: v for k, v in zip(cabecera, valores) if v != ""}
+
+
+class CargaMasivaService:
+    """Importación y exportación masiva (CSV / NDJSON) sobre el GimnasioService."""
+
+    def __init__(self, gym_service: GimnasioService, workers: int = IMPORT_WORKERS,
+                 tamano_lote: int = IMPORT_BATCH_SIZE, socios: Optional[Any] = None) -> None:
+        self.gym_service = gym_service
+        # Con los socios particionados (GimnasioParticionado) sus altas y su exportación van a las particiones
+        self.socios = socios
+        self.workers = max(1, workers)
+        self.tamano_lote = max(1, tamano_lote)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+        # entidad -> (colección del servicio, o None si está en particiones; inserción en bloque; serializador)
+        self._entidades: Dict[str, Tuple[Optional[Dict[str, Any]], Callable, Callable[[Any], Dict[str, Any]]]] = {
+            "socios": (gym_service.socios if socios is None else None,
+                       (socios or gym_service).registrar_socios_en_bloque,
+                       lambda s: SocioResponse.model_validate(s).model_dump(mode="json")),
+            "entrenadores": (gym_service.entrenadores, gym_service.registrar_entrenadores_en_bloque,
+                             lambda e: EntrenadorResponse.model_validate(e).model_dump(mode="json")),
+            "clases": (gym_service.clases, gym_service.crear_clases_en_bloque,
+                       lambda c: ClaseResponse(**gym_service._fila_catalogo(c)).model_dump(mode="json")),
+            "rutinas": (gym_service.rutinas, gym_service.crear_rutinas_en_bloque,
+                        lambda r: RutinaResponse.model_validate(r).model_dump(mode="json")),
+        }
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """El pool de procesos se crea en la primera importación, no al arrancar."""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    # spawn: hacer fork de este proceso (con hilos de tareas, bcrypt y perfilado que
+                    # pueden tener un lock cogido) puede dejar al hijo bloqueado para siempre
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def cerrar(self) -> None:
+        """Libera los procesos del pool (llamar al apagar la aplicación)."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    # =========== IMPORTACIÓN ===========
+
+    async def importar(self, entidad: str, formato: str, stream: AsyncIterator[bytes]) -> Dict[str, Any]:
+        """
+        Importa registros leídos en streaming del cuerpo de la petición.
+
+        Los registros se agrupan en lotes; cada lote se valida y construye en
+        paralelo en el pool de procesos (ahí se paga el bcrypt de los socios)
+        y después se inserta de una vez en el servicio.
+
+        Returns:
+            Resumen con importados, rechazados y el detalle de los primeros errores
+        """
+        if entidad not in self._entidades:
+            raise ValueError(f"Entidad inválida. Debe ser: {', '.join(ENTIDADES)}")
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato inválido. Debe ser: {', '.join(FORMATOS)}")
+
+        resumen: Dict[str, Any] = {"entidad": entidad, "importados": 0, "rechazados": 0, "errores": []}
+        lote: List[Tuple[int, Dict[str, Any]]] = []
+        async for numero, registro in _registros(stream, formato):
+            if isinstance(registro, str):
+                self._anotar_error(resumen, numero, registro)
+                continue
+            lote.append((numero, registro))
+            if len(lote) >= self.tamano_lote:
+                await self._procesar_lote(entidad, lote, resumen)
+                lote = []
+        if lote:
+            await self._procesar_lote(entidad, lote, resumen)
+        return resumen
+
+    async def _procesar_lote(self, entidad: str, lote: List[Tuple[int, Dict[str, Any]]],
+                             resumen: Dict[str, Any]) -> None:
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        registros = [r for _, r in lote]
+
+        # Un trozo por worker para repartir el trabajo de validación y hashing
+        tam = -(-len(registros) // self.workers)
+        trozos = [registros[i:i + tam] for i in range(0, len(registros), tam)]
+        resultados = await asyncio.gather(*(
+            loop.run_in_executor(pool, _preparar_registros, entidad, trozo) for trozo in trozos
+        ))
+
+        validos, lineas_validas = [], []
+        for (numero, _), (ok, valor) in zip(lote, (r for trozo in resultados for r in trozo)):
+            if ok:
+                validos.append(valor)
+                lineas_validas.append(numero)
+            else:
+                self._anotar_error(resumen, numero, valor)
+
+        _, insertar_en_bloque, _ = self._entidades[entidad]
+        rechazados = insertar_en_bloque(validos)
+        if inspect.isawaitable(rechazados):
+            rechazados = await rechazados
+        for posicion, motivo in rechazados:
+            self._anotar_error(resumen, lineas_validas[posicion], motivo)
+        resumen["importados"] += len(validos) - len(rechazados)
+
+    @staticmethod
+    def _anotar_error(resumen: Dict[str, Any], linea: int, motivo: str) -> None:
+        resumen["rechazados"] += 1
+        if len(resumen["errores"]) < MAX_ERRORES_INFORME:
+            resumen["errores"].append({"linea": linea, "error": motivo})
+
+    # =========== EXPORTACIÓN ===========
+
+    def exportar(self, entidad: str, formato: str) -> Union[Iterator[str], AsyncIterator[str]]:
+        """
+        Generador que serializa la colección registro a registro.
+
+        Solo se copia la lista de IDs (no los registros) para poder recorrerla
+        aunque se inserten datos mientras tanto; la salida se agrupa en trozos.
+        Los socios particionados salen de un generador asíncrono que los pide
+        antes a las particiones.
+        """
+        if entidad not in self._entidades:
+            raise ValueError(f"Entidad inválida. Debe ser: {', '.join(ENTIDADES)}")
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato inválido. Debe ser: {', '.join(FORMATOS)}")
+        coleccion, _, serializar = self._entidades[entidad]
+        if coleccion is None:
+            return self._generar_particionado(serializar, formato)
+        return self._generar(coleccion, serializar, formato)
+
+    async def _generar_particionado(self, serializar: Callable[[Any], Dict[str, Any]],
+                                    formato: str) -> AsyncIterator[str]:
+        socios = await self.socios.listar_socios()
+        for trozo in self._generar({s.id: s for s in socios}, serializar, formato):
+            yield trozo
+
+    @staticmethod
+    def _generar(coleccion: Dict[str, Any], serializar: Callable[[Any], Dict[str, Any]],
+                 formato: str) -> Iterator[str]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        cabecera_escrita = False
+        pendientes = 0
+        for clave in tuple(coleccion):
+            obj = coleccion.get(clave)
+            if obj is None:
+                continue
+            datos = serializar(obj)
+            if formato == "ndjson":
+                buffer.write(json.dumps(datos, ensure_ascii=False))
+                buffer.write("\n")
+            else:
+                if not cabecera_escrita:
+                    writer.writerow(datos.keys())
+                    cabecera_escrita = True
+                writer.writerow(datos.values())
+            pendientes += 1
+            if pendientes >= EXPORT_CHUNK_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+                pendientes = 0
+        if buffer.tell():
+            yield buffer.getvalue()
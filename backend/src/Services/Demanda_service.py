@@ -0,0 +1,204 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from src.metrics import registro
+from src.models.Clase import Clase
+from src.models.SerieClase import SEPARADOR_OCURRENCIA
+from src.models.Sede import SEDE_PRINCIPAL
+
+# Configuración
+DEMANDA_MAX_EVENTOS = int(os.getenv("DEMANDA_MAX_EVENTOS", 100_000))  # eventos recientes que se conservan
+
+AGRUPACIONES = ("clase", "entrenador", "franja", "sede")
+ORDENES = ("ocupacion", "cancelacion", "tiempo_hasta_lleno", "reservas")
+
+eventos_reserva = registro.counter(
+    "gym_reservas_eventos_total", "Reservas y cancelaciones de clases (reserva, cancelacion)", ("tipo",))
+
+
+class EventoReserva(NamedTuple):
+    instante: float  # time.time()
+    tipo: str        # "reserva" o "cancelacion"
+    clase_id: str
+    socio_id: str
+
+
+class _Agregado:
+    """Contadores de un grupo (una clase, un entrenador, una franja o una sede); se actualizan con cada evento."""
+
+    __slots__ = ("etiqueta", "sesiones", "plazas", "inscritos", "reservas", "cancelaciones",
+                 "llenas", "llenadas", "segundos_hasta_lleno")
+
+    def __init__(self, etiqueta: str) -> None:
+        self.etiqueta = etiqueta
+        self.sesiones = 0               # clases u ocurrencias del grupo
+        self.plazas = 0                 # suma de sus aforos
+        self.inscritos = 0              # reservas vigentes
+        self.reservas = 0
+        self.cancelaciones = 0
+        self.llenas = 0                 # sesiones completas ahora mismo
+        self.llenadas = 0               # sesiones que se han llenado alguna vez
+        self.segundos_hasta_lleno = 0.0  # suma, desde la apertura hasta la primera vez completa
+
+    def resumen(self) -> Dict[str, object]:
+        return {
+            "etiqueta": self.etiqueta,
+            "sesiones": self.sesiones,
+            "plazas": self.plazas,
+            "inscritos": self.inscritos,
+            "ocupacion": round(self.inscritos / self.plazas, 4) if self.plazas else 0.0,
+            "reservas": self.reservas,
+            "cancelaciones": self.cancelaciones,
+            "tasa_cancelacion": round(self.cancelaciones / self.reservas, 4) if self.reservas else 0.0,
+            "completas": self.llenas,
+            "llenadas": self.llenadas,
+            "segundos_hasta_lleno": round(self.segundos_hasta_lleno / self.llenadas, 1) if self.llenadas else None,
+        }
+
+
+class _EstadoSesion:
+    __slots__ = ("abierta", "aforo", "inscritos", "completa", "llenada", "grupos")
+
+    def __init__(self, abierta: float, aforo: int, grupos: Tuple[_Agregado, ...]) -> None:
+        self.abierta = abierta
+        self.aforo = aforo
+        self.inscritos = 0
+        self.completa = False
+        self.llenada = False  # se ha completado alguna vez (su tiempo hasta lleno ya contó)
+        self.grupos = grupos
+
+
+def franja(clase: Clase) -> str:
+    """ "lunes 18:00"; las clases sin día fijo van a "diaria 18:00"."""
+    return f"{clase.dia or 'diaria'} {clase.horario}"
+
+
+class DemandaService:
+    """
+    Demanda de las clases: registro de reservas y cancelaciones con su
+    instante, y agregados por clase, por entrenador, por franja y por sede
+    (ocupación, tasa de cancelación, tiempo hasta completarse).
+
+    Cada evento actualiza en O(1) los cuatro grupos de su sesión, de modo que
+    el informe recorre grupos y no eventos. Los eventos se conservan solo
+    los DEMANDA_MAX_EVENTOS más recientes, para consulta.
+
+    Una sesión es una clase semanal o una ocurrencia de una serie; las
+    ocurrencias cuentan en el grupo de su serie. Una sesión abre al darse de
+    alta (las ocurrencias, cuando se creó su serie): de ahí se mide el
+    tiempo hasta completarse.
+    """
+
+    def __init__(self, max_eventos: int = DEMANDA_MAX_EVENTOS) -> None:
+        self.eventos: Deque[EventoReserva] = deque(maxlen=max_eventos)
+        self._grupos: Dict[str, Dict[str, _Agregado]] = {agrupacion: {} for agrupacion in AGRUPACIONES}
+        self._sesiones: Dict[str, _EstadoSesion] = {}
+        self._aperturas: Dict[str, float] = {}  # serie_id -> instante en que abrió
+        self._lock = threading.Lock()
+
+    def _grupo(self, agrupacion: str, clave: str, etiqueta: str) -> _Agregado:
+        grupos = self._grupos[agrupacion]
+        agregado = grupos.get(clave)
+        if agregado is None:
+            agregado = grupos[clave] = _Agregado(etiqueta)
+        return agregado
+
+    def _sesion(self, clase: Clase, instante: float) -> _EstadoSesion:
+        """Estado de la sesión; la da de alta (y suma sus plazas a sus grupos) la primera vez."""
+        estado = self._sesiones.get(clase.id)
+        if estado is None:
+            serie_id = getattr(clase, "serie_id", None)
+            grupos = (self._grupo("clase", serie_id or clase.id, clase.nombre),
+                      self._grupo("entrenador", clase.entrenador_id, clase.entrenador_id),
+                      self._grupo("franja", franja(clase), franja(clase)),
+                      self._grupo("sede", clase.sede_id or SEDE_PRINCIPAL, clase.sede_id or SEDE_PRINCIPAL))
+            abierta = self._aperturas.get(serie_id, instante) if serie_id else instante
+            estado = self._sesiones[clase.id] = _EstadoSesion(abierta, clase.aforo, grupos)
+            for agregado in grupos:
+                agregado.sesiones += 1
+                agregado.plazas += clase.aforo
+        return estado
+
+    # =========== ALTAS ===========
+
+    def alta(self, clase: Clase, instante: Optional[float] = None) -> None:
+        """Abre una clase a reservas: cuenta en los informes aunque no tenga ninguna."""
+        with self._lock:
+            self._sesion(clase, time.time() if instante is None else instante)
+
+    def alta_serie(self, serie_id: str, instante: Optional[float] = None) -> None:
+        """Las ocurrencias de la serie abren cuando se crea la serie (se materializan al reservar)."""
+        with self._lock:
+            self._aperturas[serie_id] = time.time() if instante is None else instante
+
+    # =========== EVENTOS ===========
+
+    def reserva(self, clase: Clase, socio_id: str, instante: Optional[float] = None) -> None:
+        instante = time.time() if instante is None else instante
+        with self._lock:
+            estado = self._sesion(clase, instante)
+            estado.inscritos += 1
+            se_completa = estado.inscritos >= estado.aforo and not estado.completa
+            primera_vez = se_completa and not estado.llenada
+            for agregado in estado.grupos:
+                agregado.reservas += 1
+                agregado.inscritos += 1
+                if se_completa:
+                    agregado.llenas += 1
+                if primera_vez:
+                    agregado.llenadas += 1
+                    agregado.segundos_hasta_lleno += instante - estado.abierta
+            if se_completa:
+                estado.completa = estado.llenada = True
+            self.eventos.append(EventoReserva(instante, "reserva", clase.id, socio_id))
+        eventos_reserva.inc("reserva")
+
+    def cancelacion(self, clase: Clase, socio_id: str, instante: Optional[float] = None) -> None:
+        instante = time.time() if instante is None else instante
+        with self._lock:
+            estado = self._sesion(clase, instante)
+            estado.inscritos -= 1
+            libera = estado.completa and estado.inscritos < estado.aforo
+            for agregado in estado.grupos:
+                agregado.cancelaciones += 1
+                agregado.inscritos -= 1
+                if libera:
+                    agregado.llenas -= 1
+            if libera:
+                estado.completa = False
+            self.eventos.append(EventoReserva(instante, "cancelacion", clase.id, socio_id))
+        eventos_reserva.inc("cancelacion")
+
+    # =========== CONSULTAS ===========
+
+    def informe(self, agrupacion: str = "clase", orden: str = "ocupacion",
+                limite: int = 50) -> List[Dict[str, object]]:
+        """Resumen de cada grupo, ordenado de mayor a menor según `orden`. O(grupos)."""
+        if agrupacion not in AGRUPACIONES:
+            raise ValueError(f"Error: agrupación inválida. Opciones: {', '.join(AGRUPACIONES)}")
+        if orden not in ORDENES:
+            raise ValueError(f"Error: orden inválido. Opciones: {', '.join(ORDENES)}")
+        with self._lock:
+            filas = [{"id": clave, **agregado.resumen()} for clave, agregado in self._grupos[agrupacion].items()]
+        campo = {"ocupacion": "ocupacion", "cancelacion": "tasa_cancelacion",
+                 "tiempo_hasta_lleno": "segundos_hasta_lleno", "reservas": "reservas"}[orden]
+        if orden == "tiempo_hasta_lleno":
+            # Las que se llenan antes primero; las que nunca se han llenado, al final
+            filas.sort(key=lambda f: (f[campo] is None, f[campo] or 0.0))
+        else:
+            filas.sort(key=lambda f: f[campo], reverse=True)
+        return filas[:limite]
+
+    def ultimos_eventos(self, limite: int = 100, clase_id: Optional[str] = None) -> List[EventoReserva]:
+        """Eventos más recientes primero, opcionalmente de una sola clase (o de las ocurrencias de una serie)."""
+        resultado = []
+        with self._lock:
+            for evento in reversed(self.eventos):
+                if clase_id is None or evento.clase_id == clase_id or evento.clase_id.startswith(clase_id + SEPARADOR_OCURRENCIA):
+                    resultado.append(evento)
+                    if len(resultado) >= limite:
+                        break
+        return resultado
@@ -0,0 +1,230 @@
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+from src.metrics import registro
+from src.models.DispositivoIoT import DispositivoIoT
+from src.models.Sede import SEDE_PRINCIPAL
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+DISPOSITIVOS_TIMEOUT = float(os.getenv("DISPOSITIVOS_TIMEOUT", 300))         # segundos sin latido -> desconectado
+DISPOSITIVOS_RESOLUCION = float(os.getenv("DISPOSITIVOS_RESOLUCION", 5))     # cubeta de la rueda y periodo del barrido
+DISPOSITIVOS_MAX_POR_SOCIO = int(os.getenv("DISPOSITIVOS_MAX_POR_SOCIO", 10))
+
+dispositivos_conectados = registro.gauge(
+    "gym_dispositivos_conectados", "Dispositivos IoT con latido reciente")
+latidos = registro.counter(
+    "gym_dispositivos_latidos_total", "Latidos de dispositivos IoT por resultado (nuevo, reenvio)", ("resultado",))
+desconexiones = registro.counter(
+    "gym_dispositivos_desconexiones_total", "Dispositivos IoT marcados como desconectados por falta de latido")
+
+
+class RuedaTemporizadores:
+    """
+    Rueda de temporizadores con cubetas de `resolucion` segundos. Programar y
+    cancelar son O(1), y cada barrido solo visita las cubetas ya vencidas,
+    nunca el conjunto completo de claves. Un vencimiento se redondea a la
+    cubeta siguiente, así que salta como mucho `resolucion` segundos tarde.
+    """
+
+    def __init__(self, resolucion: float) -> None:
+        self.resolucion = resolucion
+        self._cubetas: Dict[int, Set[str]] = {}
+        self._cubeta_de: Dict[str, int] = {}
+        self._cursor: Optional[int] = None  # primera cubeta aún sin barrer
+
+    def __len__(self) -> int:
+        return len(self._cubeta_de)
+
+    def __contains__(self, clave: str) -> bool:
+        return clave in self._cubeta_de
+
+    def programar(self, clave: str, vence: float) -> None:
+        """(Re)programa `clave` para que venza en el instante `vence` (segundos monotónicos)."""
+        cubeta = math.ceil(vence / self.resolucion)
+        if self._cursor is not None and cubeta < self._cursor:
+            cubeta = self._cursor  # detrás del cursor no la volvería a ver ningún barrido
+        anterior = self._cubeta_de.get(clave)
+        if anterior == cubeta:
+            return
+        if anterior is not None:
+            self._sacar(clave, anterior)
+        self._cubetas.setdefault(cubeta, set()).add(clave)
+        self._cubeta_de[clave] = cubeta
+
+    def cancelar(self, clave: str) -> None:
+        cubeta = self._cubeta_de.pop(clave, None)
+        if cubeta is not None:
+            self._sacar(clave, cubeta)
+
+    def _sacar(self, clave: str, cubeta: int) -> None:
+        claves = self._cubetas[cubeta]
+        claves.discard(clave)
+        if not claves:
+            del self._cubetas[cubeta]
+
+    def vencidos(self, ahora: float) -> List[str]:
+        """Saca de la rueda y devuelve las claves de todas las cubetas vencidas en `ahora`."""
+        hasta = math.floor(ahora / self.resolucion)
+        if self._cursor is None or hasta - self._cursor > len(self._cubetas):
+            # Primer barrido o un salto largo: más barato mirar las cubetas ocupadas que recorrer el hueco
+            cubetas: Iterable[int] = sorted(c for c in self._cubetas if c <= hasta)
+        else:
+            cubetas = range(self._cursor, hasta + 1)
+        self._cursor = max(hasta + 1, self._cursor or 0)
+        vencidas: List[str] = []
+        for cubeta in cubetas:
+            claves = self._cubetas.pop(cubeta, None)
+            if claves:
+                for clave in claves:
+                    del self._cubeta_de[clave]
+                vencidas.extend(claves)
+        return vencidas
+
+
+class DispositivosService:
+    """
+    Registro de dispositivos IoT: a qué socio pertenece cada uno, su último
+    latido y secuencia aceptada, y qué dispositivos han dejado de conectar.
+
+    Un latido solo actualiza el dispositivo. Su vencimiento en la rueda se
+    reprograma de forma perezosa cuando salta, de modo que cada dispositivo
+    activo entra en la rueda como mucho una vez por `timeout` y el barrido
+    periódico cuesta lo que vence, no lo que hay registrado.
+    """
+
+    def __init__(self, timeout: float = DISPOSITIVOS_TIMEOUT, resolucion: float = DISPOSITIVOS_RESOLUCION,
+                 max_por_socio: int = DISPOSITIVOS_MAX_POR_SOCIO) -> None:
+        self.timeout = timeout
+        self.resolucion = resolucion
+        self.max_por_socio = max_por_socio
+        self.dispositivos: Dict[str, DispositivoIoT] = {}
+        self._por_socio: Dict[str, Set[str]] = {}
+        self._ultimo_latido: Dict[str, float] = {}  # dispositivo_id -> time.monotonic()
+        self._rueda = RuedaTemporizadores(resolucion)
+        self._lock = threading.Lock()
+        self._barrido: Optional[asyncio.Task] = None
+
+    # =========== REGISTRO Y PROPIEDAD ===========
+
+    def anadir(self, dispositivos: Iterable[DispositivoIoT]) -> None:
+        with self._lock:
+            for dispositivo in dispositivos:
+                self.dispositivos[dispositivo.id] = dispositivo
+                self._por_socio.setdefault(dispositivo.socio_id, set()).add(dispositivo.id)
+
+    def registrar(self, tipo: str, socio_id: str, sede_id: str = SEDE_PRINCIPAL) -> DispositivoIoT:
+        dispositivo = DispositivoIoT(tipo, socio_id, sede_id)
+        with self._lock:
+            if len(self._por_socio.get(socio_id, ())) >= self.max_por_socio:
+                raise ValueError(f"Error: un socio puede tener como máximo {self.max_por_socio} dispositivos.")
+            self.dispositivos[dispositivo.id] = dispositivo
+            self._por_socio.setdefault(socio_id, set()).add(dispositivo.id)
+        return dispositivo
+
+    def obtener(self, dispositivo_id: str, socio_id: Optional[str] = None) -> DispositivoIoT:
+        """
+        Devuelve el dispositivo; con `socio_id`, solo si es suyo. Un
+        dispositivo ajeno se trata igual que uno inexistente, para no revelar
+        qué IDs existen.
+        """
+        dispositivo = self.dispositivos.get(dispositivo_id)
+        if dispositivo is None or (socio_id is not None and dispositivo.socio_id != socio_id):
+            raise ValueError("Error: dispositivo no encontrado.")
+        return dispositivo
+
+    def de_socio(self, socio_id: str) -> List[DispositivoIoT]:
+        return [self.dispositivos[i] for i in self._por_socio.get(socio_id, ())]
+
+    def eliminar(self, dispositivo_id: str, socio_id: str) -> None:
+        dispositivo = self.obtener(dispositivo_id, socio_id)
+        with self._lock:
+            del self.dispositivos[dispositivo_id]
+            self._por_socio[socio_id].discard(dispositivo_id)
+            self._ultimo_latido.pop(dispositivo_id, None)
+            self._rueda.cancelar(dispositivo_id)
+            if dispositivo.conectado:
+                dispositivo.conectado = False
+                dispositivos_conectados.dec()
+
+    # =========== LATIDOS ===========
+
+    def es_reenvio(self, dispositivo: DispositivoIoT, secuencia: Optional[int]) -> bool:
+        """True si `secuencia` ya se aceptó antes: el dispositivo reenvía algo que no supo que llegó."""
+        return secuencia is not None and secuencia <= dispositivo.ultima_secuencia
+
+    def latido(self, dispositivo_id: str, secuencia: Optional[int] = None,
+               ahora: Optional[float] = None) -> bool:
+        """
+        Marca el dispositivo como vivo y, si trae `secuencia` nueva, la acepta.
+        Devuelve False si la secuencia era un reenvío.
+        """
+        ahora = time.monotonic() if ahora is None else ahora
+        with self._lock:
+            dispositivo = self.dispositivos.get(dispositivo_id)
+            if dispositivo is None:
+                raise ValueError("Error: dispositivo no encontrado.")
+            dispositivo.ultima_conexion = datetime.now()
+            self._ultimo_latido[dispositivo_id] = ahora
+            if not dispositivo.conectado:
+                dispositivo.conectado = True
+                dispositivos_conectados.inc()
+            if dispositivo_id not in self._rueda:
+                self._rueda.programar(dispositivo_id, ahora + self.timeout)
+            nuevo = not self.es_reenvio(dispositivo, secuencia)
+            if nuevo and secuencia is not None:
+                dispositivo.ultima_secuencia = secuencia
+        latidos.inc("nuevo" if nuevo else "reenvio")
+        return nuevo
+
+    def barrer(self, ahora: Optional[float] = None) -> List[DispositivoIoT]:
+        """Marca como desconectados los dispositivos sin latido en `timeout` segundos y los devuelve."""
+        ahora = time.monotonic() if ahora is None else ahora
+        caidos: List[DispositivoIoT] = []
+        with self._lock:
+            for dispositivo_id in self._rueda.vencidos(ahora):
+                dispositivo = self.dispositivos.get(dispositivo_id)
+                if dispositivo is None:
+                    continue
+                vence = self._ultimo_latido[dispositivo_id] + self.timeout
+                if vence > ahora:
+                    self._rueda.programar(dispositivo_id, vence)  # dio latido después: sigue vivo
+                else:
+                    dispositivo.conectado = False
+                    caidos.append(dispositivo)
+        if caidos:
+            dispositivos_conectados.dec(cantidad=len(caidos))
+            desconexiones.inc(cantidad=len(caidos))
+        return caidos
+
+    # =========== BARRIDO PERIÓDICO ===========
+
+    async def iniciar(self) -> None:
+        """Lanza el barrido cada `resolucion` segundos en el event loop actual (startup de la app)."""
+        loop = asyncio.get_running_loop()
+        if self._barrido is not None and self._barrido.get_loop() is loop:
+            return
+        # Un proceso hijo (fork) hereda una tarea del loop del padre: se lanza una nueva
+        self._barrido = loop.create_task(self._barrer_periodicamente())
+
+    async def detener(self) -> None:
+        if self._barrido is None:
+            return
+        self._barrido.cancel()
+        await asyncio.gather(self._barrido, return_exceptions=True)
+        self._barrido = None
+
+    async def _barrer_periodicamente(self) -> None:
+        while True:
+            await asyncio.sleep(self.resolucion)
+            try:
+                self.barrer()
+            except Exception:
+                logger.exception("Error en el barrido de dispositivos IoT")
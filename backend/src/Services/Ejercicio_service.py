@@ -0,0 +1,54 @@
+from typing import Dict, List, Optional
+
+from src.models.Ejercicio import Ejercicio
+from src.Services.Busqueda_service import normalizar
+
+
+def _clave(nombre: str) -> str:
+    """Clave de internado: "  Press  Banca" y "press banca" son el mismo ejercicio."""
+    return " ".join(normalizar(nombre).split())
+
+
+class EjercicioService:
+    """
+    Catálogo de ejercicios con definiciones internadas.
+
+    Cada ejercicio existe una sola vez en memoria: las rutinas guardan una
+    referencia a la misma instancia inmutable en lugar de su propio dict con
+    el nombre, de modo que miles de rutinas que repiten ejercicios no
+    multiplican su coste.
+    """
+
+    def __init__(self) -> None:
+        self.ejercicios: Dict[str, Ejercicio] = {}
+        self._por_nombre: Dict[str, Ejercicio] = {}
+
+    def registrar(self, nombre: str, grupo_muscular: str = "general") -> Ejercicio:
+        if _clave(nombre) in self._por_nombre:
+            raise ValueError(f"Error: el ejercicio {nombre} ya existe.")
+        return self.obtener_o_crear(nombre, grupo_muscular)
+
+    def obtener_o_crear(self, nombre: str, grupo_muscular: str = "general") -> Ejercicio:
+        """Devuelve la definición internada de `nombre`, creándola si no existe."""
+        clave = _clave(nombre)
+        ejercicio = self._por_nombre.get(clave)
+        if ejercicio is not None:
+            return ejercicio
+        nuevo = Ejercicio(nombre.strip(), grupo_muscular.strip())
+        # setdefault es atómico: dos peticiones concurrentes acaban con la misma instancia
+        ejercicio = self._por_nombre.setdefault(clave, nuevo)
+        if ejercicio is nuevo:
+            self.ejercicios[nuevo.id] = nuevo
+        return ejercicio
+
+    def buscar_por_id(self, ejercicio_id: str) -> Optional[Ejercicio]:
+        return self.ejercicios.get(ejercicio_id)
+
+    def buscar_por_nombre(self, nombre: str) -> Optional[Ejercicio]:
+        return self._por_nombre.get(_clave(nombre))
+
+    def listar(self) -> List[Ejercicio]:
+        return list(self.ejercicios.values())
+
+    def __len__(self) -> int:
+        return len(self.ejercicios)
@@ -0,0 +1,346 @@
+import math
+import random
+import threading
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Reglas de puntuación
+PUNTOS_SESION = 10              # por cada progreso registrado
+PUNTOS_POR_100KG = 1            # por cada 100 kg de volumen (peso x repeticiones)
+PUNTOS_POR_MINUTO = 1           # por minuto de ejercicio
+PUNTOS_ACCESO = 5               # primer acceso del día
+BONUS_RACHA = 2                 # extra por cada día consecutivo de racha...
+MAX_BONUS_RACHA = 10            # ...hasta este número de días
+SEMANAS_VOLUMEN = 2             # clasificaciones semanales que se conservan (actual y anterior)
+
+_NIVELES = 32
+
+
+class _Nodo:
+    __slots__ = ("clave", "siguientes", "anchos")
+
+    def __init__(self, clave, niveles: int):
+        self.clave = clave
+        self.siguientes: List["_Nodo"] = [None] * niveles
+        self.anchos: List[int] = [1] * niveles
+
+
+class Clasificacion:
+    """
+    Ranking ordenado de socios (mayor valor primero) sobre una skip list
+    indexable: cada enlace guarda cuántas posiciones salta, de modo que
+    actualizar, la posición de un socio y el acceso al puesto k son O(log n).
+
+    Los empates se ordenan por socio_id para que el orden sea estable.
+    """
+
+    def __init__(self, semilla: Optional[int] = None) -> None:
+        self._fin = _Nodo((math.inf, ""), 0)
+        self._cabeza = _Nodo(None, _NIVELES)
+        self._cabeza.siguientes = [self._fin] * _NIVELES
+        self._valores: Dict[str, float] = {}
+        self._rnd = random.Random(semilla)
+
+    @staticmethod
+    def _clave(socio_id: str, valor: float) -> Tuple[float, str]:
+        return (-valor, socio_id)
+
+    def _camino(self, clave) -> Tuple[List[_Nodo], List[int]]:
+        """Último nodo con clave < `clave` en cada nivel, y posiciones avanzadas en cada uno."""
+        camino: List[_Nodo] = [None] * _NIVELES
+        pasos = [0] * _NIVELES
+        nodo = self._cabeza
+        for nivel in reversed(range(_NIVELES)):
+            while nodo.siguientes[nivel].clave < clave:
+                pasos[nivel] += nodo.anchos[nivel]
+                nodo = nodo.siguientes[nivel]
+            camino[nivel] = nodo
+        return camino, pasos
+
+    def _insertar(self, clave) -> None:
+        camino, pasos = self._camino(clave)
+        niveles = 1
+        while niveles < _NIVELES and self._rnd.random() < 0.5:
+            niveles += 1
+        nuevo = _Nodo(clave, niveles)
+        avance = 0
+        for nivel in range(niveles):
+            previo = camino[nivel]
+            nuevo.siguientes[nivel] = previo.siguientes[nivel]
+            previo.siguientes[nivel] = nuevo
+            nuevo.anchos[nivel] = previo.anchos[nivel] - avance
+            previo.anchos[nivel] = avance + 1
+            avance += pasos[nivel]
+        for nivel in range(niveles, _NIVELES):
+            camino[nivel].anchos[nivel] += 1
+
+    def _borrar(self, clave) -> None:
+        camino, _ = self._camino(clave)
+        objetivo = camino[0].siguientes[0]
+        if objetivo.clave != clave:
+            return
+        for nivel in range(len(objetivo.siguientes)):
+            previo = camino[nivel]
+            previo.anchos[nivel] += objetivo.anchos[nivel] - 1
+            previo.siguientes[nivel] = objetivo.siguientes[nivel]
+        for nivel in range(len(objetivo.siguientes), _NIVELES):
+            camino[nivel].anchos[nivel] -= 1
+
+    def actualizar(self, socio_id: str, valor: float) -> None:
+        anterior = self._valores.get(socio_id)
+        if anterior == valor:
+            return
+        if anterior is not None:
+            self._borrar(self._clave(socio_id, anterior))
+        self._valores[socio_id] = valor
+        self._insertar(self._clave(socio_id, valor))
+
+    def quitar(self, socio_id: str) -> None:
+        anterior = self._valores.pop(socio_id, None)
+        if anterior is not None:
+            self._borrar(self._clave(socio_id, anterior))
+
+    def posicion(self, socio_id: str) -> Optional[int]:
+        """Puesto (desde 1) del socio, o None si no está en la clasificación."""
+        valor = self._valores.get(socio_id)
+        if valor is None:
+            return None
+        clave = self._clave(socio_id, valor)
+        nodo, posicion = self._cabeza, 0
+        for nivel in reversed(range(_NIVELES)):
+            while nodo.siguientes[nivel].clave <= clave:
+                posicion += nodo.anchos[nivel]
+                nodo = nodo.siguientes[nivel]
+        return posicion
+
+    def top(self, n: int, desde: int = 0) -> List[Tuple[int, str, float]]:
+        """Puestos desde+1 .. desde+n como (puesto, socio_id, valor)."""
+        if desde >= len(self._valores) or n <= 0:
+            return []
+        # Salto en O(log n) hasta el puesto `desde + 1`...
+        nodo, restantes = self._cabeza, desde + 1
+        for nivel in reversed(range(_NIVELES)):
+            while nodo.anchos[nivel] <= restantes:
+                restantes -= nodo.anchos[nivel]
+                nodo = nodo.siguientes[nivel]
+        # ...y recorrido secuencial de los n siguientes
+        resultado = []
+        puesto = desde + 1
+        while nodo is not self._fin and len(resultado) < n:
+            menos_valor, socio_id = nodo.clave
+            resultado.append((puesto, socio_id, -menos_valor))
+            nodo = nodo.siguientes[0]
+            puesto += 1
+        return resultado
+
+    def por_delante(self, socio_id: str, valor: float) -> int:
+        """Socios que quedarían por delante de `socio_id` con `valor`, esté o no en la clasificación."""
+        clave = self._clave(socio_id, valor)
+        nodo, delante = self._cabeza, 0
+        for nivel in reversed(range(_NIVELES)):
+            while nodo.siguientes[nivel].clave < clave:
+                delante += nodo.anchos[nivel]
+                nodo = nodo.siguientes[nivel]
+        return delante
+
+    def valor(self, socio_id: str) -> Optional[float]:
+        return self._valores.get(socio_id)
+
+    def __len__(self) -> int:
+        return len(self._valores)
+
+
+class _EstadoSocio:
+    __slots__ = ("puntos", "sesiones", "accesos", "ultimo_acceso", "racha", "mejor_racha",
+                 "semana", "volumen_semana")
+
+    def __init__(self) -> None:
+        self.puntos = 0.0
+        self.sesiones = 0
+        self.accesos = 0
+        self.ultimo_acceso: Optional[date] = None
+        self.racha = 0
+        self.mejor_racha = 0
+        self.semana: Optional[str] = None
+        self.volumen_semana = 0.0
+
+
+def _semana(fecha: date) -> str:
+    anio, semana, _ = fecha.isocalendar()
+    return f"{anio}-W{semana:02d}"
+
+
+class EstadisticasService:
+    """
+    Gamificación: puntos, volumen semanal y rachas de asistencia por socio,
+    y clasificaciones (general, semanal de volumen y por clase).
+
+    Todo se actualiza de forma incremental en cada progreso, acceso o
+    reserva; las consultas nunca recalculan desde el historial.
+    """
+
+    def __init__(self) -> None:
+        self._estado: Dict[str, _EstadoSocio] = {}
+        self.general = Clasificacion()
+        self._volumen: Dict[str, Clasificacion] = {}          # semana ISO -> clasificación
+        self._por_clase: Dict[str, Clasificacion] = {}
+        self._clases_de: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def _estado_de(self, socio_id: str) -> _EstadoSocio:
+        estado = self._estado.get(socio_id)
+        if estado is None:
+            estado = self._estado[socio_id] = _EstadoSocio()
+        return estado
+
+    def _sumar_puntos(self, socio_id: str, estado: _EstadoSocio, puntos: float) -> None:
+        estado.puntos += puntos
+        self.general.actualizar(socio_id, estado.puntos)
+        for clase_id in self._clases_de.get(socio_id, ()):
+            self._por_clase[clase_id].actualizar(socio_id, estado.puntos)
+
+    # =========== EVENTOS ===========
+
+    def registrar_progreso(self, socio_id: str, peso: float, repeticiones: int, tiempo: int,
+                           fecha: date) -> None:
+        volumen = peso * repeticiones
+        puntos = PUNTOS_SESION + PUNTOS_POR_100KG * volumen / 100 + PUNTOS_POR_MINUTO * (tiempo // 60)
+        semana = _semana(fecha)
+        with self._lock:
+            estado = self._estado_de(socio_id)
+            estado.sesiones += 1
+            if estado.semana != semana:
+                estado.semana, estado.volumen_semana = semana, 0.0
+            estado.volumen_semana += volumen
+            self._clasificacion_volumen(semana).actualizar(socio_id, estado.volumen_semana)
+            self._sumar_puntos(socio_id, estado, puntos)
+
+    def registrar_progresos(self, socio_id: str, progresos: Iterable[Tuple[float, int, int, date]]) -> None:
+        """
+        Igual que registrar_progreso para un lote (peso, repeticiones, tiempo, fecha):
+        cada clasificación se toca una vez por lote y semana, no una vez por lectura.
+        """
+        puntos, sesiones = 0.0, 0
+        volumen_por_semana: Dict[str, float] = {}
+        for peso, repeticiones, tiempo, fecha in progresos:
+            volumen = peso * repeticiones
+            puntos += PUNTOS_SESION + PUNTOS_POR_100KG * volumen / 100 + PUNTOS_POR_MINUTO * (tiempo // 60)
+            sesiones += 1
+            semana = _semana(fecha)
+            volumen_por_semana[semana] = volumen_por_semana.get(semana, 0.0) + volumen
+        if not sesiones:
+            return
+        with self._lock:
+            estado = self._estado_de(socio_id)
+            estado.sesiones += sesiones
+            for semana in sorted(volumen_por_semana):
+                clasificacion = self._clasificacion_volumen(semana)
+                total = (clasificacion.valor(socio_id) or 0.0) + volumen_por_semana[semana]
+                clasificacion.actualizar(socio_id, total)
+                if estado.semana is None or semana >= estado.semana:
+                    estado.semana, estado.volumen_semana = semana, total
+            self._sumar_puntos(socio_id, estado, puntos)
+
+    def registrar_acceso(self, socio_id: str, fecha: date) -> None:
+        with self._lock:
+            estado = self._estado_de(socio_id)
+            estado.accesos += 1
+            if estado.ultimo_acceso == fecha:
+                return  # Solo puntúa el primer acceso del día
+            if estado.ultimo_acceso == fecha - timedelta(days=1):
+                estado.racha += 1
+            else:
+                estado.racha = 1
+            estado.ultimo_acceso = fecha
+            estado.mejor_racha = max(estado.mejor_racha, estado.racha)
+            bonus = BONUS_RACHA * min(estado.racha - 1, MAX_BONUS_RACHA)
+            self._sumar_puntos(socio_id, estado, PUNTOS_ACCESO + bonus)
+
+    def inscribir(self, socio_id: str, clase_id: str) -> None:
+        with self._lock:
+            self._clases_de.setdefault(socio_id, set()).add(clase_id)
+            clasificacion = self._por_clase.setdefault(clase_id, Clasificacion())
+            clasificacion.actualizar(socio_id, self._estado_de(socio_id).puntos)
+
+    def dar_de_baja(self, socio_id: str, clase_id: str) -> None:
+        with self._lock:
+            self._clases_de.get(socio_id, set()).discard(clase_id)
+            clasificacion = self._por_clase.get(clase_id)
+            if clasificacion is not None:
+                clasificacion.quitar(socio_id)
+                if not len(clasificacion):
+                    del self._por_clase[clase_id]
+
+    def _clasificacion_volumen(self, semana: str) -> Clasificacion:
+        clasificacion = self._volumen.get(semana)
+        if clasificacion is None:
+            clasificacion = self._volumen[semana] = Clasificacion()
+            # Solo se conservan las últimas semanas
+            for antigua in sorted(self._volumen)[:-SEMANAS_VOLUMEN]:
+                del self._volumen[antigua]
+        return clasificacion
+
+    # =========== CONSULTAS ===========
+
+    def resumen(self, socio_id: str, hoy: date) -> Dict[str, object]:
+        with self._lock:
+            estado = self._estado.get(socio_id) or _EstadoSocio()
+            semana = _semana(hoy)
+            volumen = self._volumen.get(semana)
+            # La racha se rompe si el último acceso fue antes de ayer
+            racha = estado.racha if estado.ultimo_acceso and estado.ultimo_acceso >= hoy - timedelta(days=1) else 0
+            return {
+                "puntos": round(estado.puntos, 1),
+                "posicion": self.general.posicion(socio_id),
+                "total_socios": len(self.general),
+                "sesiones": estado.sesiones,
+                "accesos": estado.accesos,
+                "volumen_semanal": round(estado.volumen_semana if estado.semana == semana else 0.0, 1),
+                "posicion_volumen_semanal": volumen.posicion(socio_id) if volumen is not None else None,
+                "racha_actual": racha,
+                "mejor_racha": estado.mejor_racha,
+            }
+
+    def clasificacion(self, tipo: str = "puntos", limite: int = 10, desde: int = 0,
+                      clase_id: Optional[str] = None, hoy: Optional[date] = None) -> Tuple[int, List[Tuple[int, str, float]]]:
+        """
+        Puestos de una clasificación: "puntos" (general o de una clase) o
+        "volumen_semanal" (semana en curso). Devuelve (total, [(puesto, socio_id, valor)]).
+        """
+        with self._lock:
+            clasificacion = self._clasificacion_de(tipo, clase_id, hoy)
+            if clasificacion is None:
+                return 0, []
+            return len(clasificacion), clasificacion.top(limite, desde)
+
+    def _clasificacion_de(self, tipo: str, clase_id: Optional[str], hoy: Optional[date]) -> Optional[Clasificacion]:
+        if tipo == "volumen_semanal":
+            return self._volumen.get(_semana(hoy or date.today()))
+        if clase_id is not None:
+            return self._por_clase.get(clase_id)
+        return self.general
+
+    def valor(self, socio_id: str, tipo: str = "puntos", clase_id: Optional[str] = None,
+              hoy: Optional[date] = None) -> Optional[float]:
+        """Valor del socio en una clasificación (None si no figura en ella)."""
+        with self._lock:
+            clasificacion = self._clasificacion_de(tipo, clase_id, hoy)
+            return clasificacion.valor(socio_id) if clasificacion is not None else None
+
+    def por_delante(self, socio_id: str, valor: float, tipo: str = "puntos", clase_id: Optional[str] = None,
+                    hoy: Optional[date] = None) -> Tuple[int, int]:
+        """
+        (socios por delante de `socio_id` con `valor`, total clasificados). El
+        socio no tiene por qué estar aquí: sumando lo de cada partición de
+        socios sale su puesto global.
+        """
+        with self._lock:
+            clasificacion = self._clasificacion_de(tipo, clase_id, hoy)
+            if clasificacion is None:
+                return 0, 0
+            return clasificacion.por_delante(socio_id, valor), len(clasificacion)
+
+    def posicion_en_clase(self, socio_id: str, clase_id: str) -> Optional[int]:
+        with self._lock:
+            clasificacion = self._por_clase.get(clase_id)
+            return clasificacion.posicion(socio_id) if clasificacion is not None else None
@@ -0,0 +1,295 @@
+import asyncio
+import base64
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.auth import hash_password
+from src.models.Socio import Socio
+from src.Services.Gimnasio_service import GimnasioService
+from src.metrics import temporizar
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ALMACENAMIENTO = os.getenv("ALMACENAMIENTO", "memoria")  # memoria o fichero
+ALMACENAMIENTO_FICHERO = os.getenv(
+    "ALMACENAMIENTO_FICHERO", os.path.join(BACKEND_DIR, "diario", "operaciones.ndjson"))
+ALMACENAMIENTO_FSYNC = os.getenv("ALMACENAMIENTO_FSYNC", "1") == "1"  # fsync por cada grupo de escrituras
+
+# Hilos para el trabajo de CPU que sale del event loop (bcrypt libera el GIL).
+# Con más hilos que núcleos solo se reparte la misma CPU entre más logins a la vez.
+HILOS_CPU = int(os.getenv("HILOS_CPU", str(max(2, os.cpu_count() or 1))))
+
+# Operaciones que modifican el estado: además de ejecutarse se anotan en el almacenamiento
+OPERACIONES_ESCRITURA = frozenset({
+    "crear_sede", "registrar_entrenador", "crear_clase", "crear_serie", "reservar_clase", "cancelar_reserva_clase",
+    "registrar_ejercicio", "crear_rutina", "anadir_ejercicio_rutina", "quitar_ejercicio_rutina",
+    "asignar_rutina", "registrar_progreso", "registrar_progresos_en_bloque", "registrar_dispositivo",
+    "eliminar_dispositivo", "registrar_lecturas_dispositivo", "registrar_acceso", "compactar_historial",
+})
+
+# Operaciones que recorren colecciones enteras o hacen cálculo (ranking, similitud,
+# índices de búsqueda): se ejecutan en un hilo para no parar el event loop. Los
+# servicios que tocan protegen su estado con locks; las demás son búsquedas en
+# diccionarios de microsegundos y van directas en el loop.
+OPERACIONES_PESADAS = frozenset({
+    "listar_socios", "listar_entrenadores", "listar_clases", "listar_series", "listar_ejercicios",
+    "listar_rutinas", "calendario", "recomendar_rutinas", "buscar", "clasificacion", "informe_demanda",
+    "listar_progresos_socio", "exportar_analitica",
+})
+
+
+# =========== ALMACENAMIENTO ===========
+
+class AlmacenamientoAsync(ABC):
+    """
+    Puerto de persistencia asíncrono. GimnasioServiceAsync le anota cada
+    operación de escritura ya validada y aplicada en memoria; un adaptador
+    con base de datos o cola remota hace aquí su I/O con `await`, sin ocupar
+    ningún hilo mientras espera.
+    """
+
+    @abstractmethod
+    async def anotar(self, operacion: str, datos: Dict[str, Any]) -> None:
+        """Persiste una operación de escritura (nombre del método y sus argumentos)."""
+
+    async def cerrar(self) -> None:
+        pass
+
+
+class AlmacenamientoMemoria(AlmacenamientoAsync):
+    """El estado vive en los diccionarios de GimnasioService: no hay nada más que escribir."""
+
+    async def anotar(self, operacion: str, datos: Dict[str, Any]) -> None:
+        return None
+
+
+def _a_json(valor: Any) -> Any:
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, (bytes, bytearray, memoryview)):
+        return base64.b64encode(bytes(valor)).decode("ascii")
+    if isinstance(valor, (set, frozenset)):
+        return sorted(valor)
+    if hasattr(valor, "tolist"):  # escalares y arrays de numpy
+        return valor.tolist()
+    if hasattr(valor, "__dict__"):
+        return vars(valor)
+    raise TypeError(f"No se puede anotar un {type(valor).__name__}")
+
+
+class AlmacenamientoFichero(AlmacenamientoAsync):
+    """
+    Diario de operaciones en un fichero NDJSON (una operación por línea).
+
+    `anotar` deja la operación en una cola y espera, sin ocupar el loop, a
+    que un único hilo escritor la tenga en disco. El escritor vacía la cola
+    entera en cada vuelta con un solo write (y un fsync): las operaciones
+    que llegan mientras se escribe el grupo anterior comparten el siguiente,
+    así que con carga hay muchas menos escrituras que peticiones. La
+    serialización también se hace en ese hilo.
+    """
+
+    def __init__(self, ruta: str = ALMACENAMIENTO_FICHERO, fsync: bool = ALMACENAMIENTO_FSYNC) -> None:
+        self.ruta = ruta
+        self.fsync = fsync
+        self._pendientes: List[Tuple[str, Dict[str, Any], asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._cond = threading.Condition()
+        self._cerrado = False
+        self._hilo: Optional[threading.Thread] = None
+
+    def _arrancar(self) -> None:
+        # El fichero y el hilo se crean con la primera escritura
+        if self._hilo is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.ruta)), exist_ok=True)
+            self._hilo = threading.Thread(target=self._escribir, name="gym-diario", daemon=True)
+            self._hilo.start()
+
+    async def anotar(self, operacion: str, datos: Dict[str, Any]) -> None:
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+        with self._cond:
+            if self._cerrado:
+                raise RuntimeError("Error: el almacenamiento está cerrado.")
+            self._arrancar()
+            self._pendientes.append((operacion, datos, loop, futuro))
+            self._cond.notify()
+        await futuro
+
+    def _escribir(self) -> None:
+        with open(self.ruta, "a", encoding="utf-8") as fichero:
+            while True:
+                with self._cond:
+                    while not self._pendientes and not self._cerrado:
+                        self._cond.wait()
+                    grupo, self._pendientes = self._pendientes, []
+                    if not grupo and self._cerrado:
+                        return
+                lineas, error = [], None
+                try:
+                    for operacion, datos, _, _ in grupo:
+                        lineas.append(json.dumps({"operacion": operacion, "instante": time.time(), "datos": datos},
+                                                 default=_a_json, ensure_ascii=False) + "\n")
+                    fichero.write("".join(lineas))
+                    fichero.flush()
+                    if self.fsync:
+                        os.fsync(fichero.fileno())
+                except Exception as e:
+                    error = e
+                for _, _, loop, futuro in grupo:
+                    loop.call_soon_threadsafe(_resolver, futuro, error)
+
+    async def cerrar(self) -> None:
+        with self._cond:
+            self._cerrado = True
+            self._cond.notify()
+        if self._hilo is not None:
+            await asyncio.to_thread(self._hilo.join)
+
+
+def _resolver(futuro: asyncio.Future, error: Optional[BaseException]) -> None:
+    if futuro.done():  # la petición que esperaba se canceló
+        return
+    if error is None:
+        futuro.set_result(None)
+    else:
+        futuro.set_exception(error)
+
+
+def crear_almacenamiento(nombre: str = ALMACENAMIENTO) -> AlmacenamientoAsync:
+    if nombre == "memoria":
+        return AlmacenamientoMemoria()
+    if nombre == "fichero":
+        return AlmacenamientoFichero()
+    raise ValueError(f"Error: ALMACENAMIENTO inválido: {nombre} (memoria o fichero)")
+
+
+# =========== SERVICIO ASÍNCRONO ===========
+
+def version_asincrona(servicio_cls):
+    """
+    Decorador de clase: añade una versión `async` de cada método público de
+    `servicio_cls` que la clase no defina ya. Casi todas son operaciones en
+    memoria de microsegundos y se ejecutan directamente en el event loop
+    (saltar a un hilo costaría más que la operación); las de
+    OPERACIONES_PESADAS van a un hilo con asyncio.to_thread, y las de
+    OPERACIONES_ESCRITURA se anotan después en el almacenamiento.
+    """
+    def decorar(cls):
+        for nombre, metodo in list(vars(servicio_cls).items()):
+            if (nombre.startswith("_") or not callable(metodo) or nombre in vars(cls)
+                    or inspect.isgeneratorfunction(inspect.unwrap(metodo))):
+                continue
+            setattr(cls, nombre, _asincrono(nombre, metodo, nombre in OPERACIONES_ESCRITURA,
+                                            nombre in OPERACIONES_PESADAS))
+        return cls
+    return decorar
+
+
+def _asincrono(nombre: str, metodo: Callable, escritura: bool, pesada: bool) -> Callable:
+    firma = inspect.signature(inspect.unwrap(metodo))
+
+    @functools.wraps(metodo)
+    async def envoltorio(self, *args, **kwargs):
+        if pesada:
+            resultado = await asyncio.to_thread(metodo, self.servicio, *args, **kwargs)
+        else:
+            resultado = metodo(self.servicio, *args, **kwargs)
+        if escritura:
+            argumentos = firma.bind(self.servicio, *args, **kwargs).arguments
+            argumentos.pop("self", None)
+            await self.almacenamiento.anotar(nombre, argumentos)
+        return resultado
+    return envoltorio
+
+
+@version_asincrona(GimnasioService)
+class GimnasioServiceAsync:
+    """
+    API asíncrona del gimnasio para los endpoints `async def`.
+
+    Envuelve un GimnasioService: la lógica y el estado son los mismos, pero
+    todo se espera con `await`. Lo que es CPU puro (bcrypt) va a un pool de
+    hilos propio y acotado, y la escritura en el almacenamiento es I/O
+    asíncrona, de modo que el event loop nunca se bloquea y un solo worker
+    puede mantener miles de conexiones abiertas (websockets, long polling).
+    """
+
+    def __init__(self, servicio: GimnasioService, almacenamiento: Optional[AlmacenamientoAsync] = None,
+                 hilos_cpu: int = HILOS_CPU) -> None:
+        self.servicio = servicio
+        self.almacenamiento = almacenamiento or crear_almacenamiento()
+        self.hilos_cpu = hilos_cpu
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        # Se crea en el primer login/registro; el arranque no paga los hilos
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.hilos_cpu, thread_name_prefix="gym-cpu")
+        return self._pool
+
+    async def en_hilo_cpu(self, funcion: Callable, *args) -> Any:
+        """Ejecuta `funcion` en el pool de CPU y espera su resultado sin bloquear el loop."""
+        return await asyncio.get_running_loop().run_in_executor(self._get_pool(), funcion, *args)
+
+    async def cerrar(self) -> None:
+        await self.almacenamiento.cerrar()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    # =========== SOCIOS Y AUTENTICACIÓN (bcrypt fuera del loop) ===========
+
+    async def registrar_socio(self, nombre: str, email: str, fecha_nacimiento: str, nivel: str,
+                              password: str) -> Socio:
+        # Las validaciones son las del servicio síncrono; al pool solo va el hash
+        socio = self.servicio._nuevo_socio(nombre, email, fecha_nacimiento, nivel)
+        if password:
+            socio.password_hash = await self.en_hilo_cpu(self._hashear, password)
+        # Mientras se hasheaba otro registro pudo quedarse el email: se vuelve a comprobar al insertar
+        self.servicio._insertar_socio(socio)
+        await self.almacenamiento.anotar("registrar_socio", {
+            "id": socio.id, "nombre": nombre, "email": email, "fecha_nacimiento": socio.fecha_nacimiento,
+            "nivel": socio.nivel, "password_hash": socio.password_hash,
+        })
+        return socio
+
+    @staticmethod
+    def _hashear(password: str) -> str:
+        with temporizar("bcrypt_hash"):
+            return hash_password(password)
+
+    async def autenticar_socio(self, email: str, password_plana: str) -> Optional[Socio]:
+        if email not in self.servicio.email_socio_index:
+            return None  # Sin hash que comprobar: no hace falta salir del loop
+        socio = self.servicio.socios.get(self.servicio.email_socio_index[email])
+        hash_anterior = socio.password_hash if socio else None
+        autenticado = await self.en_hilo_cpu(self.servicio.autenticar_socio, email, password_plana)
+        if autenticado is not None and autenticado.password_hash != hash_anterior:
+            # Rehasheada con el coste actual al entrar: se anota para no repetirlo tras reconstruir
+            await self.almacenamiento.anotar("actualizar_password_hash", {
+                "id": autenticado.id, "password_hash": autenticado.password_hash})
+        return autenticado
+
+    # =========== HISTORIAL (resumen fuera del loop) ===========
+
+    async def compactar_historial(self, hoy: Optional[date] = None) -> Dict[str, int]:
+        hoy = hoy or date.today()
+        servicio = self.servicio
+        # Elegir y borrar los registros toca los diccionarios vivos: en el loop. Resumir y archivar, en un hilo.
+        # Se borran solo cuando su resumen ya está hecho
+        progresos, accesos, limite = servicio._crudos_viejos(hoy)
+        resumidos = False
+        try:
+            await self.en_hilo_cpu(servicio._resumir_crudos, progresos, accesos, limite)
+            resumidos = True
+        finally:
+            servicio._borrar_crudos(progresos, accesos, resumidos)
+        return await self.en_hilo_cpu(servicio._archivar_historial, progresos, accesos, hoy)
@@ -1,12 +1,36 @@
-from typing import List, Dict, Optional, Any
+import heapq
+import logging
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Iterable, Optional, Any, Tuple, Union
 from src.models.Socio import Socio
 from src.models.Entrenador import Entrenador
 from src.models.Clase import Clase
+from src.models.SerieClase import SerieClase, separar_id_ocurrencia
 from src.models.Rutina import Rutina
+from src.models.Ejercicio import Ejercicio
 from src.models.Progreso import Progreso
 from src.models.DispositivoIoT import DispositivoIoT
 from src.models.Acceso import Acceso
-
+from src.models.Sede import Sede, SEDE_PRINCIPAL
+from src.Services.Recomendacion_service import RecomendacionService
+from src.Services.Busqueda_service import BusquedaService
+from src.Services.Ejercicio_service import EjercicioService
+from src.Services.Agenda_service import AgendaService, formatear_minuto
+from src.Services.Estadisticas_service import EstadisticasService
+from src.Services.Tareas_service import ColaTareas, PRIORIDAD_ALTA, PRIORIDAD_BAJA
+from src.Services.Dispositivos_service import DispositivosService
+from src.Services.Historial_service import HistorialService, ProgresoDiario, Tabla, HISTORIAL_INTERVALO
+from src.Services.Analitica_service import AnaliticaService, ANALITICA_INTERVALO
+from src.Services.Demanda_service import DemandaService, EventoReserva
+from src.Services.Sedes_service import SedesService
+from src.Services.Notificaciones_service import NotificacionesService, NOTIFICACIONES_INTERVALO
+from src.metrics import medir_servicio, temporizar
+from src.auth import hash_password
+
+logger = logging.getLogger(__name__)
+
+
+@medir_servicio
 class GimnasioService:
     """Servicio que gestiona todas las operaciones del gimnasio."""
 
@@ -14,35 +38,223 @@ class GimnasioService:
         self.socios: Dict[str, Socio] = {}
         self.entrenadores: Dict[str, Entrenador] = {}
         self.clases: Dict[str, Clase] = {}
+        self.series: Dict[str, SerieClase] = {}
         self.rutinas: Dict[str, Rutina] = {}
         self.progresos: Dict[str, Progreso] = {}
-        self.dispositivos: Dict[str, DispositivoIoT] = {}
+        # Dispositivos IoT por socio, latidos y desconexiones (el diccionario es el del registro)
+        self.registro_iot = DispositivosService()
+        self.dispositivos: Dict[str, DispositivoIoT] = self.registro_iot.dispositivos
         self.accesos: Dict[str, Acceso] = {}
 
         # Índices para búsqueda rápida
         self.email_socio_index: Dict[str, str] = {}
         self.email_entrenador_index: Dict[str, str] = {}
+        # Sedes, con las clases, entrenadores, dispositivos y accesos de cada una y su catálogo en caché
+        self.sedes = SedesService()
+
+        # Índice de recomendación de rutinas (se actualiza de forma incremental)
+        self.recomendador = RecomendacionService()
+        # Índice de texto completo sobre clases, rutinas, entrenadores y ejercicios
+        self.buscador = BusquedaService()
+        # Catálogo de ejercicios (definiciones compartidas entre rutinas)
+        self.catalogo_ejercicios = EjercicioService()
+        # Agenda semanal por entrenador y por sala (detección de solapes)
+        self.agenda = AgendaService()
+        # Puntos, rachas y clasificaciones (se actualizan en cada evento)
+        self.estadisticas = EstadisticasService()
+        # Reservas y cancelaciones con su instante; ocupación y cancelaciones por clase, entrenador y franja
+        self.demanda = DemandaService()
+        # Trabajo secundario (agregados, índices) que no tiene que esperar la petición
+        self.tareas = ColaTareas()
+        # Retención: progresos y accesos antiguos -> resúmenes diarios -> archivo comprimido
+        self.historial = HistorialService()
+        self._compactando: Optional[Tuple[List[Progreso], List[Acceso]]] = None
+        self.tareas.cada("historial.compactar", HISTORIAL_INTERVALO, self._programar_compactacion)
+        # Instantánea columnar en disco para los informes (se calculan en otros procesos)
+        self.analitica = AnaliticaService()
+        self.tareas.cada("analitica.exportar", ANALITICA_INTERVALO, self.exportar_analitica, en_hilo=True)
+        # Avisos y recordatorios a los socios con reserva (por tema = clase), repartidos por lotes
+        self.notificaciones = NotificacionesService()
+        self.tareas.cada("notificaciones.repartir", NOTIFICACIONES_INTERVALO, self.notificaciones.repartir,
+                         en_hilo=True)
+
+    # =========== CARGA DE DATOS SEMILLA ===========
+
+    def cargar_semilla(self, datos: Dict[str, Any]) -> None:
+        """
+        Carga en bloque sedes, entrenadores, clases, ejercicios, rutinas y dispositivos desde un fixture.
+
+        Todos los objetos se construyen (y validan) antes de tocar el estado del
+        servicio, y después se insertan de una sola vez en los diccionarios.
+
+        Args:
+            datos: Diccionario con las listas "sedes", "entrenadores", "clases",
+                "ejercicios", "rutinas" y "dispositivos". Las clases referencian al
+                entrenador por email (y van a su sede) y las rutinas a sus
+                ejercicios por nombre; entrenadores y dispositivos sin "sede_id"
+                van a la sede principal.
+        """
+        sedes = [Sede(s["nombre"], s.get("direccion"), s.get("id")) for s in datos.get("sedes", [])]
+        ids_sedes = {s.id for s in sedes} | {s.id for s in self.sedes.listar()}
+        entrenadores = [
+            Entrenador(e["nombre"], e["email"], e["especialidad"], e.get("sede_id", SEDE_PRINCIPAL))
+            for e in datos.get("entrenadores", [])
+        ]
+        dispositivos = []
+        for d in datos.get("dispositivos", []):
+            dispositivo = DispositivoIoT(d["tipo"], d["socio_id"], d.get("sede_id", SEDE_PRINCIPAL))
+            if "id" in d:
+                dispositivo.id = d["id"]  # IDs fijos para demos
+            dispositivos.append(dispositivo)
+        if any(o.sede_id not in ids_sedes for o in entrenadores + dispositivos):
+            raise ValueError("Error: sede no encontrada.")
+        email_index = dict(self.email_entrenador_index)
+        for entrenador in entrenadores:
+            if entrenador.email in email_index:
+                raise ValueError(f"Error: el email {entrenador.email} ya está registrado.")
+            email_index[entrenador.email] = entrenador.id
+
+        por_email = {e.email: e for e in self.entrenadores.values()}
+        por_email.update((e.email, e) for e in entrenadores)
+        clases = []
+        for c in datos.get("clases", []):
+            entrenador = por_email.get(c["entrenador_email"])
+            if entrenador is None:
+                raise ValueError("Error: entrenador no encontrado.")
+            clases.append(Clase(c["nombre"], c["horario"], c["aforo"], entrenador.id,
+                                c.get("duracion", 60), c.get("dia"), c.get("sala"), entrenador.sede_id))
+
+        for e in datos.get("ejercicios", []):
+            self.catalogo_ejercicios.obtener_o_crear(e["nombre"], e.get("grupo_muscular", "general"))
+
+        rutinas = []
+        for r in datos.get("rutinas", []):
+            rutina = Rutina(r["nombre"], r["duracion"], r["dificultad"])
+            for e in r.get("ejercicios", []):
+                ejercicio = self.catalogo_ejercicios.obtener_o_crear(e["nombre"])
+                rutina.anadir_ejercicio(ejercicio, e.get("repeticiones", 10), e.get("series", 3))
+            rutinas.append(rutina)
+
+        # Las franjas se reservan antes de insertar nada; si alguna choca (o una sede está repetida) se deshace todo
+        reservadas = []
+        try:
+            for clase in clases:
+                self.agenda.reservar(clase)
+                reservadas.append(clase)
+            for sede in sedes:
+                self.sedes.anadir(sede)
+        except ValueError:
+            for clase in reservadas:
+                self.agenda.liberar(clase)
+            raise
+
+        self.entrenadores.update((e.id, e) for e in entrenadores)
+        self.email_entrenador_index = email_index
+        for entrenador in entrenadores:
+            self.sedes.alta_entrenador(entrenador)
+        self.clases.update((c.id, c) for c in clases)
+        for clase in clases:
+            self.entrenadores[clase.entrenador_id].crear_clase(clase.id)
+            self.demanda.alta(clase)
+            self.sedes.alta_clase(clase)
+        self.rutinas.update((r.id, r) for r in rutinas)
+        for rutina in rutinas:
+            self.recomendador.actualizar_rutina(rutina)
+            self.buscador.indexar_rutina(rutina)
+        for entrenador in entrenadores:
+            self.buscador.indexar_entrenador(entrenador)
+        for clase in clases:
+            self.buscador.indexar_clase(clase)
+        for ejercicio in self.catalogo_ejercicios.listar():
+            self.buscador.indexar_ejercicio(ejercicio)
+        self.registro_iot.anadir(dispositivos)
+        for dispositivo in dispositivos:
+            self.sedes.alta_dispositivo(dispositivo)
+
+    # =========== SEDES ===========
+
+    def crear_sede(self, nombre: str, direccion: Optional[str] = None) -> Sede:
+        return self.sedes.anadir(Sede(nombre, direccion))
+
+    def listar_sedes(self) -> List[Sede]:
+        return self.sedes.listar()
+
+    def obtener_sede(self, sede_id: str) -> Sede:
+        return self.sedes.obtener(sede_id)
+
+    def catalogo_sede(self, sede_id: str) -> List[Dict[str, Any]]:
+        """Clases de la sede con sus plazas libres; en caché hasta que cambia algo de esa sede."""
+        return self.sedes.catalogo(sede_id, self._fila_catalogo)
+
+    @staticmethod
+    def _fila_catalogo(clase: Clase) -> Dict[str, Any]:
+        return {"id": clase.id, "nombre": clase.nombre, "horario": clase.horario, "aforo": clase.aforo,
+                "plazas_disponibles": clase.plazas_disponibles(), "entrenador_id": clase.entrenador_id,
+                "duracion": clase.duracion, "dia": clase.dia, "sala": clase.sala, "sede_id": clase.sede_id}
+
+    def ocupacion_sede(self, sede_id: str) -> Dict[str, Any]:
+        return self.sedes.ocupacion(sede_id)
+
+    def accesos_sede(self, sede_id: str, limite: int = 100) -> List[Acceso]:
+        return self.sedes.ultimos_accesos(sede_id, limite)
+
+    def dispositivos_sede(self, sede_id: str) -> List[DispositivoIoT]:
+        return list(self.sedes.indice(sede_id).dispositivos.values())
+
+    def _sede_de_clase(self, entrenador: Entrenador, sede_id: Optional[str]) -> str:
+        """Sede de una clase o serie nueva: la de su entrenador, que es quien la imparte."""
+        if sede_id is not None and sede_id != entrenador.sede_id:
+            self.sedes.obtener(sede_id)
+            raise ValueError("Error: el entrenador no pertenece a esa sede.")
+        return entrenador.sede_id
 
     # =========== GESTIÓN DE SOCIOS Y AUTENTICACIÓN ===========
 
     def registrar_socio(self, nombre: str, email: str, fecha_nacimiento: str, nivel: str, password: str) -> Socio:
+        socio = self._nuevo_socio(nombre, email, fecha_nacimiento, nivel)
+        if password:
+            socio.password_hash = hash_password(password)
+        return self._insertar_socio(socio)
+
+    def _nuevo_socio(self, nombre: str, email: str, fecha_nacimiento: str, nivel: str) -> Socio:
+        """Valida los datos de un registro y construye el socio, aún sin contraseña ni insertar."""
         if email in self.email_socio_index:
             raise ValueError(f"Error: el email {email} ya está registrado.")
+        return Socio(nombre, email, fecha_nacimiento, nivel)
 
-        socio = Socio(nombre, email, fecha_nacimiento, nivel, password)
+    def _insertar_socio(self, socio: Socio) -> Socio:
+        if socio.email in self.email_socio_index:
+            raise ValueError(f"Error: el email {socio.email} ya está registrado.")
         self.socios[socio.id] = socio
-        self.email_socio_index[email] = socio.id
+        self.email_socio_index[socio.email] = socio.id
         return socio
 
+    def registrar_socios_en_bloque(self, socios: List[Socio]) -> List[Tuple[int, str]]:
+        """
+        Inserta de una vez socios ya construidos (y con la contraseña hasheada).
+
+        Returns:
+            Lista de (posición, motivo) de los socios rechazados
+        """
+        errores = []
+        for i, socio in enumerate(socios):
+            try:
+                self._insertar_socio(socio)
+            except ValueError as e:
+                errores.append((i, str(e)))
+        return errores
+
     def autenticar_socio(self, email: str, password_plana: str) -> Optional[Socio]:
         socio_id = self.email_socio_index.get(email)
         if not socio_id:
             return None
         
         socio = self.socios.get(socio_id)
-        if socio and socio.verificar_contrasena(password_plana):
-            return socio
-        return None
+        if not socio:
+            return None
+        with temporizar("bcrypt_verify"):
+            valida = socio.verificar_contrasena(password_plana)
+        return socio if valida else None
 
     def listar_socios(self) -> List[Socio]:
         return list(self.socios.values())
@@ -50,81 +262,422 @@ class GimnasioService:
     def buscar_socio_por_id(self, socio_id: str) -> Optional[Socio]:
         return self.socios.get(socio_id)
 
+    def buscar_socio_por_email(self, email: str) -> Optional[Socio]:
+        socio_id = self.email_socio_index.get(email)
+        return self.socios.get(socio_id) if socio_id else None
+
     # =========== GESTIÓN DE ENTRENADORES ===========
 
-    def registrar_entrenador(self, nombre: str, email: str, especialidad: str) -> Entrenador:
+    def registrar_entrenador(self, nombre: str, email: str, especialidad: str,
+                             sede_id: str = SEDE_PRINCIPAL) -> Entrenador:
         if email in self.email_entrenador_index:
             raise ValueError(f"Error: el email {email} ya está registrado.")
+        self.sedes.obtener(sede_id)
 
-        entrenador = Entrenador(nombre, email, especialidad)
+        entrenador = Entrenador(nombre, email, especialidad, sede_id)
         self.entrenadores[entrenador.id] = entrenador
         self.email_entrenador_index[email] = entrenador.id
+        self.sedes.alta_entrenador(entrenador)
+        self.buscador.indexar_entrenador(entrenador)
         return entrenador
 
-    def listar_entrenadores(self) -> List[Entrenador]:
+    def registrar_entrenadores_en_bloque(self, entrenadores: List[Entrenador]) -> List[Tuple[int, str]]:
+        """Inserta de una vez entrenadores ya construidos. Devuelve los rechazados."""
+        errores = []
+        insertados = []
+        for i, entrenador in enumerate(entrenadores):
+            if entrenador.email in self.email_entrenador_index:
+                errores.append((i, f"Error: el email {entrenador.email} ya está registrado."))
+                continue
+            if not self.sedes.existe(entrenador.sede_id):
+                errores.append((i, "Error: sede no encontrada."))
+                continue
+            self.entrenadores[entrenador.id] = entrenador
+            self.email_entrenador_index[entrenador.email] = entrenador.id
+            self.sedes.alta_entrenador(entrenador)
+            insertados.append(entrenador)
+        # El índice de búsqueda del lote se rellena en segundo plano
+        self.tareas.encolar("indexar.entrenadores", self._indexar_lote, self.buscador.indexar_entrenador,
+                            insertados, prioridad=PRIORIDAD_BAJA)
+        return errores
+
+    def listar_entrenadores(self, sede_id: Optional[str] = None) -> List[Entrenador]:
+        if sede_id is not None:
+            return list(self.sedes.indice(sede_id).entrenadores.values())
         return list(self.entrenadores.values())
 
     # =========== GESTIÓN DE CLASES ===========
 
-    def crear_clase(self, nombre: str, horario: str, aforo: int, entrenador_id: str) -> Clase:
+    def crear_clase(self, nombre: str, horario: str, aforo: int, entrenador_id: str,
+                    duracion: int = 60, dia: Optional[str] = None, sala: Optional[str] = None,
+                    sede_id: Optional[str] = None) -> Clase:
         # 1. Validación de existencia del Entrenador (Mínima validación requerida)
         if entrenador_id not in self.entrenadores:
             # Esta línea se mantiene para la seguridad básica
             raise ValueError("Error: entrenador no encontrado.")
+        sede_id = self._sede_de_clase(self.entrenadores[entrenador_id], sede_id)
 
         # 2. Creación del objeto
-        clase = Clase(nombre, horario, aforo, entrenador_id)
+        clase = Clase(nombre, horario, aforo, entrenador_id, duracion, dia, sala, sede_id)
+
+        # 3. Reserva de la franja en la agenda del entrenador y de la sala (falla si se solapa)
+        self.agenda.reservar(clase)
         
-        # 3. PERSISTENCIA: Esta línea DEBE ser la única y la última antes del return.
+        # 4. PERSISTENCIA
         self.clases[clase.id] = clase
-        
-        # Eliminamos cualquier otra referencia o llamada de función aquí.
-        
+        self.entrenadores[entrenador_id].crear_clase(clase.id)
+        self.buscador.indexar_clase(clase)
+        self.demanda.alta(clase)
+        self.sedes.alta_clase(clase)
         return clase
 
-    def listar_clases(self) -> List[Clase]:
+    def crear_clases_en_bloque(self, clases: List[Clase]) -> List[Tuple[int, str]]:
+        """Inserta de una vez clases ya construidas. Devuelve las rechazadas."""
+        errores = []
+        insertadas = []
+        for i, clase in enumerate(clases):
+            if clase.entrenador_id not in self.entrenadores:
+                errores.append((i, "Error: entrenador no encontrado."))
+                continue
+            try:
+                clase.sede_id = self._sede_de_clase(self.entrenadores[clase.entrenador_id], clase.sede_id)
+                self.agenda.reservar(clase)
+            except ValueError as e:
+                errores.append((i, str(e)))
+                continue
+            self.clases[clase.id] = clase
+            self.entrenadores[clase.entrenador_id].crear_clase(clase.id)
+            self.demanda.alta(clase)
+            self.sedes.alta_clase(clase)
+            insertadas.append(clase)
+        self.tareas.encolar("indexar.clases", self._indexar_lote, self.buscador.indexar_clase,
+                            insertadas, prioridad=PRIORIDAD_BAJA)
+        return errores
+
+    def listar_clases(self, sede_id: Optional[str] = None) -> List[Clase]:
+        if sede_id is not None:
+            return list(self.sedes.indice(sede_id).clases.values())
         return list(self.clases.values())
 
+    # =========== AGENDA DE ENTRENADORES Y SALAS ===========
+
+    def horario_entrenador(self, entrenador_id: str, dia: Optional[str] = None) -> List[Tuple[Clase, str, str, str]]:
+        """
+        Clases del entrenador en orden semanal.
+
+        Returns:
+            Lista de (clase, día, hora de inicio, hora de fin)
+        """
+        if entrenador_id not in self.entrenadores:
+            raise ValueError("Error: entrenador no encontrado.")
+        return self._franjas_a_horario(self.agenda.horario(entrenador_id=entrenador_id, dia=dia))
+
+    def horario_sala(self, sala: str, dia: Optional[str] = None,
+                     sede_id: str = SEDE_PRINCIPAL) -> List[Tuple[Clase, str, str, str]]:
+        self.sedes.obtener(sede_id)
+        return self._franjas_a_horario(self.agenda.horario(sala=sala, dia=dia, sede_id=sede_id))
+
+    def _franjas_a_horario(self, franjas: List[Tuple[int, int, str]]) -> List[Tuple[Clase, str, str, str]]:
+        horario = []
+        for inicio, fin, clase_id in franjas:
+            clase = self.clases.get(clase_id) or self.series.get(clase_id)
+            if clase:
+                dia, hora_inicio = formatear_minuto(inicio)
+                horario.append((clase, dia, hora_inicio, formatear_minuto(fin)[1]))
+        return horario
+
+    def comprobar_disponibilidad(self, entrenador_id: str, horario: str, duracion: int = 60,
+                                 dia: Optional[str] = None, sala: Optional[str] = None) -> Optional[str]:
+        """Motivo por el que no se podría crear esa clase, o None si el hueco está libre."""
+        if entrenador_id not in self.entrenadores:
+            raise ValueError("Error: entrenador no encontrado.")
+        return self.agenda.comprobar(Clase("consulta", horario, 1, entrenador_id, duracion, dia, sala,
+                                           self.entrenadores[entrenador_id].sede_id))
+
     # --- AQUÍ ESTABAN LOS MÉTODOS QUE FALTABAN ---
 
     def reservar_clase(self, socio_id: str, clase_id: str) -> bool:
-        """Reserva una clase para un socio."""
+        """Reserva una clase (o una sesión de una serie, "<serie_id>@AAAA-MM-DD") para un socio."""
         socio = self.socios.get(socio_id)
-        clase = self.clases.get(clase_id)
-
-        if not socio or not clase:
+        if not socio:
             return False
-
         # Intentar inscribir en la clase (controla aforo)
-        if clase.inscribir_socio(socio_id):
-            socio.reservar_clase(clase_id)
-            return True
-        return False
+        clase = self._ocupar_plaza(socio_id, clase_id)
+        if clase is None:
+            return False
+        self._anotar_reserva(socio, clase.id)
+        self._reserva_hecha(clase, socio_id)
+        return True
 
     def cancelar_reserva_clase(self, socio_id: str, clase_id: str) -> bool:
         """Cancela una reserva."""
         socio = self.socios.get(socio_id)
-        clase = self.clases.get(clase_id)
-
-        if not socio or not clase:
+        if not socio:
+            return False
+        clase = self._liberar_plaza(socio_id, clase_id)
+        if clase is None:
             return False
+        self._anotar_cancelacion(socio, clase.id)
+        self._cancelacion_hecha(clase, socio_id)
+        return True
 
-        if clase.cancelar_reserva(socio_id):
-            socio.cancelar_reserva(clase_id)
-            return True
-        return False
+    # Una reserva tiene un lado de catálogo (la plaza y los agregados de la clase) y uno
+    # del socio; con los socios particionados cada lado vive en un sitio (ver Particiones_service)
+
+    def _ocupar_plaza(self, socio_id: str, clase_id: str) -> Optional[Clase]:
+        """Ocupa una plaza en la clase o en la sesión de una serie; None si está llena o no existe."""
+        clase = self.clases.get(clase_id)
+        if clase is not None:
+            return clase if clase.inscribir_socio(socio_id) else None
+        partes = separar_id_ocurrencia(clase_id)
+        serie = self.series.get(partes[0]) if partes else None
+        if serie is None:
+            return None
+        fecha = partes[1]
+        if fecha < date.today():
+            raise ValueError("Error: la sesión ya se ha celebrado.")
+        # Serializa las reservas de sesiones (se crean y descartan al vuelo) dentro de la sede de la serie
+        with self.sedes.indice(serie.sede_id).lock_ocurrencias:
+            ocurrencia = serie.ocurrencia(fecha, materializar=True)
+            if ocurrencia is None:
+                raise ValueError("Error: la serie no tiene sesión ese día.")
+            try:
+                inscrito = ocurrencia.inscribir_socio(socio_id)
+            finally:
+                serie.descartar_si_vacia(fecha)
+        return ocurrencia if inscrito else None
+
+    def _liberar_plaza(self, socio_id: str, clase_id: str) -> Optional[Clase]:
+        """Libera la plaza del socio; None si no tenía reserva."""
+        clase = self.clases.get(clase_id)
+        if clase is not None:
+            return clase if clase.cancelar_reserva(socio_id) else None
+        partes = separar_id_ocurrencia(clase_id)
+        serie = self.series.get(partes[0]) if partes else None
+        if serie is None:
+            return None
+        with self.sedes.indice(serie.sede_id).lock_ocurrencias:
+            ocurrencia = serie.ocurrencia(partes[1])
+            if ocurrencia is None or not ocurrencia.cancelar_reserva(socio_id):
+                return None
+            serie.descartar_si_vacia(partes[1])
+        return ocurrencia
+
+    def _anotar_reserva(self, socio: Socio, clase_id: str) -> None:
+        socio.reservar_clase(clase_id)
+        self.estadisticas.inscribir(socio.id, clase_id)
+
+    def _anotar_cancelacion(self, socio: Socio, clase_id: str) -> None:
+        socio.cancelar_reserva(clase_id)
+        self.estadisticas.dar_de_baja(socio.id, clase_id)
+
+    def _reserva_hecha(self, clase: Clase, socio_id: str) -> None:
+        self.demanda.reserva(clase, socio_id)
+        self.sedes.reserva(clase)
+        self.notificaciones.reserva(clase, socio_id)
+
+    def _cancelacion_hecha(self, clase: Clase, socio_id: str) -> None:
+        self.demanda.cancelacion(clase, socio_id)
+        self.sedes.cancelacion(clase)
+        self.notificaciones.cancelacion(clase, socio_id)
+
+    # =========== SERIES DE CLASES RECURRENTES ===========
+
+    def crear_serie(self, nombre: str, horario: str, aforo: int, entrenador_id: str, fecha_inicio: date,
+                    frecuencia: str = "semanal", intervalo: int = 1, dias: Optional[List[str]] = None,
+                    fecha_fin: Optional[date] = None, repeticiones: Optional[int] = None,
+                    duracion: int = 60, sala: Optional[str] = None,
+                    sede_id: Optional[str] = None) -> SerieClase:
+        if entrenador_id not in self.entrenadores:
+            raise ValueError("Error: entrenador no encontrado.")
+        sede_id = self._sede_de_clase(self.entrenadores[entrenador_id], sede_id)
+        serie = SerieClase(nombre, horario, aforo, entrenador_id, fecha_inicio, frecuencia, intervalo,
+                           dias, fecha_fin, repeticiones, duracion, sala, sede_id)
+        # La serie ocupa su patrón semanal en la agenda del entrenador y de la sala
+        self.agenda.reservar(serie)
+        self.series[serie.id] = serie
+        self.entrenadores[entrenador_id].crear_clase(serie.id)
+        self.demanda.alta_serie(serie.id)
+        self.sedes.alta_serie(serie)
+        self.buscador.indexar_serie(serie)
+        return serie
+
+    def listar_series(self, sede_id: Optional[str] = None) -> List[SerieClase]:
+        if sede_id is not None:
+            return list(self.sedes.indice(sede_id).series.values())
+        return list(self.series.values())
+
+    def ocurrencias_serie(self, serie_id: str, desde: date, hasta: date) -> List[Tuple[SerieClase, date]]:
+        serie = self.series.get(serie_id)
+        if not serie:
+            raise ValueError("Error: serie no encontrada.")
+        return [(serie, fecha) for fecha in serie.fechas(desde, hasta)]
+
+    def calendario(self, desde: date, hasta: date, limite: int = 500) -> List[Tuple[SerieClase, date]]:
+        """
+        Sesiones de todas las series en [desde, hasta], en orden cronológico.
+        Cada serie genera sus fechas de forma perezosa y se mezclan con un heap,
+        así que solo se calculan las `limite` primeras.
+        """
+        generadores = [
+            ((fecha, serie.minuto_inicio(), serie.id, serie) for fecha in serie.fechas(desde, hasta))
+            for serie in list(self.series.values())
+        ]
+        sesiones = []
+        for fecha, _, _, serie in heapq.merge(*generadores):
+            if len(sesiones) >= limite:
+                break
+            sesiones.append((serie, fecha))
+        return sesiones
+
+    # =========== NOTIFICACIONES ===========
+
+    def avisar_clase(self, clase_id: str, mensaje: str) -> int:
+        """
+        Publica un aviso (cambio de sala, de hora, cancelación...) para los
+        socios con reserva en la clase o en la sesión de una serie. Se reparte
+        en segundo plano; devuelve a cuántos socios se enviará.
+        """
+        if not mensaje.strip():
+            raise ValueError("Error: el mensaje no puede estar vacío.")
+        if clase_id not in self.clases:
+            partes = separar_id_ocurrencia(clase_id)
+            serie = self.series.get(partes[0]) if partes else None
+            if serie is None or not serie.es_ocurrencia(partes[1]):
+                raise ValueError("Error: clase no encontrada.")
+        return self.notificaciones.publicar(clase_id, "cambio", mensaje.strip())
+
+    # =========== DEMANDA DE CLASES ===========
+
+    def informe_demanda(self, agrupacion: str = "clase", orden: str = "ocupacion",
+                        limite: int = 50) -> List[Dict[str, Any]]:
+        """Ocupación, cancelaciones y tiempo hasta completarse por clase, entrenador, franja o sede."""
+        filas = self.demanda.informe(agrupacion, orden, limite)
+        nombres = {"entrenador": self.entrenadores, "sede": {s.id: s for s in self.sedes.listar()}}.get(agrupacion)
+        if nombres is not None:
+            for fila in filas:
+                elemento = nombres.get(fila["id"])
+                if elemento:
+                    fila["etiqueta"] = elemento.nombre
+        return filas
+
+    def eventos_demanda(self, limite: int = 100, clase_id: Optional[str] = None) -> List[EventoReserva]:
+        return self.demanda.ultimos_eventos(limite, clase_id)
+
+    # =========== CATÁLOGO DE EJERCICIOS ===========
+
+    def registrar_ejercicio(self, nombre: str, grupo_muscular: str = "general") -> Ejercicio:
+        ejercicio = self.catalogo_ejercicios.registrar(nombre, grupo_muscular)
+        self.buscador.indexar_ejercicio(ejercicio)
+        return ejercicio
+
+    def _ejercicio_por_nombre(self, nombre: str) -> Ejercicio:
+        ejercicio = self.catalogo_ejercicios.buscar_por_nombre(nombre)
+        if ejercicio is None:
+            ejercicio = self.catalogo_ejercicios.obtener_o_crear(nombre)
+            self.buscador.indexar_ejercicio(ejercicio)
+        return ejercicio
+
+    def listar_ejercicios(self) -> List[Ejercicio]:
+        return self.catalogo_ejercicios.listar()
 
     # =========== GESTIÓN DE RUTINAS ===========
     
     def crear_rutina(self, nombre: str, duracion: int, dificultad: str) -> Rutina:
         rutina = Rutina(nombre, duracion, dificultad)
         self.rutinas[rutina.id] = rutina
+        self.recomendador.actualizar_rutina(rutina)
+        self.buscador.indexar_rutina(rutina)
         return rutina
 
+    def crear_rutinas_en_bloque(self, rutinas: List[Rutina]) -> List[Tuple[int, str]]:
+        """
+        Inserta de una vez rutinas ya construidas. Devuelve las rechazadas:
+        las de un ID ya existente y las que repiten el nombre y la dificultad
+        de otra (importar dos veces el mismo fichero no duplica rutinas).
+        """
+        errores = []
+        insertadas = []
+        existentes = {(r.nombre.strip().lower(), r.dificultad) for r in list(self.rutinas.values())}
+        for i, rutina in enumerate(rutinas):
+            clave = (rutina.nombre.strip().lower(), rutina.dificultad)
+            if rutina.id in self.rutinas:
+                errores.append((i, f"Error: la rutina {rutina.id} ya existe."))
+                continue
+            if clave in existentes:
+                errores.append((i, f"Error: ya existe una rutina {rutina.nombre.strip()} ({rutina.dificultad})."))
+                continue
+            existentes.add(clave)
+            self.rutinas[rutina.id] = rutina
+            insertadas.append(rutina)
+        self.tareas.encolar("indexar.rutinas", self._indexar_lote, self._indexar_rutina,
+                            insertadas, prioridad=PRIORIDAD_BAJA)
+        return errores
+
+    def _indexar_rutina(self, rutina: Rutina) -> None:
+        self.recomendador.actualizar_rutina(rutina)
+        self.buscador.indexar_rutina(rutina)
+
+    @staticmethod
+    def _indexar_lote(indexar, elementos: List[Any]) -> None:
+        for elemento in elementos:
+            indexar(elemento)
+
     def listar_rutinas(self) -> List[Rutina]:
         """Retorna todas las rutinas."""
         return list(self.rutinas.values())
 
+    def buscar_rutina_por_id(self, rutina_id: str) -> Optional[Rutina]:
+        return self.rutinas.get(rutina_id)
+
+    def anadir_ejercicio_rutina(self, rutina_id: str, nombre_ejercicio: Optional[str] = None,
+                                repeticiones: int = 10, series: int = 3,
+                                ejercicio_id: Optional[str] = None) -> Rutina:
+        """
+        Añade un ejercicio a la rutina, por ID del catálogo o por nombre
+        (si el nombre no está en el catálogo, se da de alta).
+        """
+        rutina = self.rutinas.get(rutina_id)
+        if not rutina:
+            raise ValueError("Rutina no encontrada")
+        if ejercicio_id is not None:
+            ejercicio = self.catalogo_ejercicios.buscar_por_id(ejercicio_id)
+            if ejercicio is None:
+                raise ValueError("Error: ejercicio no encontrado.")
+        elif nombre_ejercicio:
+            ejercicio = self._ejercicio_por_nombre(nombre_ejercicio)
+        else:
+            raise ValueError("Error: indique el ejercicio (ID o nombre).")
+        rutina.anadir_ejercicio(ejercicio, repeticiones, series)
+        self.recomendador.actualizar_rutina(rutina)
+        self.buscador.indexar_rutina(rutina)
+        return rutina
+
+    def quitar_ejercicio_rutina(self, rutina_id: str, posicion: int) -> Rutina:
+        rutina = self.rutinas.get(rutina_id)
+        if not rutina:
+            raise ValueError("Rutina no encontrada")
+        rutina.quitar_ejercicio(posicion)
+        self.recomendador.actualizar_rutina(rutina)
+        self.buscador.indexar_rutina(rutina)
+        return rutina
+
+    def recomendar_rutinas(self, socio_id: str, limite: int = 5) -> List[Tuple[Rutina, float]]:
+        """
+        Sugiere rutinas según el nivel del socio, las rutinas que ya tiene
+        y la tendencia de su progreso. Devuelve (rutina, puntuación).
+        """
+        socio = self.socios.get(socio_id)
+        if not socio:
+            raise ValueError("Socio no encontrado")
+        sugeridas = self.recomendador.recomendar(socio_id, socio.nivel, socio.rutinas, limite)
+        return [(self.rutinas[r], p) for r, p in sugeridas if r in self.rutinas]
+
+    def buscar(self, consulta: str, tipo: Optional[str] = None, pagina: int = 1,
+               tamano: int = 20) -> Tuple[int, List[Tuple[str, str, str, float]]]:
+        """Búsqueda de texto (tolerante a tildes, prefijos y erratas) en el catálogo."""
+        return self.buscador.buscar(consulta, tipo, pagina, tamano)
+
     def asignar_rutina(self, socio_id: str, rutina_id: str) -> bool:
         socio = self.socios.get(socio_id)
         rutina = self.rutinas.get(rutina_id)
@@ -141,40 +694,277 @@ class GimnasioService:
         progreso = Progreso(socio_id, peso, repeticiones, tiempo)
         self.progresos[progreso.id] = progreso
         self.socios[socio_id].registrar_progreso(progreso.id)
+        # Perfil de recomendación y puntos se actualizan en segundo plano (acumulan: sin reintentos)
+        self.tareas.encolar("recomendador.progreso", self.recomendador.registrar_progreso,
+                            socio_id, peso, tiempo, reintentos=0)
+        self.tareas.encolar("estadisticas.progreso", self.estadisticas.registrar_progreso,
+                            socio_id, peso, repeticiones, tiempo, progreso.fecha.date(), reintentos=0)
         return progreso
     
-    def listar_progresos_socio(self, socio_id: str) -> List[Progreso]:
-        """Retorna el historial de progresos de un socio."""
+    def registrar_progresos_en_bloque(self, socio_id: str,
+                                      lecturas: Iterable[Tuple[float, int, int, datetime]]) -> int:
+        """
+        Inserta de una vez un lote de lecturas (peso, repeticiones, tiempo, fecha),
+        p. ej. las de un dispositivo IoT. Si alguna no es válida no se inserta ninguna.
+
+        Returns:
+            Número de progresos registrados
+        """
+        socio = self.socios.get(socio_id)
+        if not socio:
+            raise ValueError("Socio no encontrado")
+        nuevos = [Progreso(socio_id, peso, reps, tiempo, fecha) for peso, reps, tiempo, fecha in lecturas]
+        self.progresos.update((p.id, p) for p in nuevos)
+        socio.progresos.extend(p.id for p in nuevos)
+        self.tareas.encolar("progreso.lote", self._agregar_progresos, socio_id, nuevos, reintentos=0)
+        return len(nuevos)
+
+    def _agregar_progresos(self, socio_id: str, progresos: List[Progreso]) -> None:
+        for p in progresos:
+            self.recomendador.registrar_progreso(socio_id, p.peso, p.tiempo)
+        self.estadisticas.registrar_progresos(
+            socio_id, ((p.peso, p.repeticiones, p.tiempo, p.fecha.date()) for p in progresos))
+
+    def listar_progresos_socio(self, socio_id: str, desde: Optional[date] = None,
+                               hasta: Optional[date] = None) -> List[Union[ProgresoDiario, Progreso]]:
+        """
+        Retorna el historial de progresos de un socio: primero los días ya
+        compactados (un ProgresoDiario por día) y después los registros
+        recientes, opcionalmente entre `desde` y `hasta`.
+        """
         socio = self.socios.get(socio_id)
         if not socio:
             return []
 
-        # Busca los objetos Progreso reales usando los IDs guardados en el socio
-        historial = []
-        for prog_id in socio.progresos:
-            if prog_id in self.progresos:
-                historial.append(self.progresos[prog_id])
+        # Primero los registros recientes y después los resúmenes con su corte: un registro
+        # que se compacte entre medias sale en el resumen y el corte lo quita de aquí
+        crudos = [p for p in map(self.progresos.get, list(socio.progresos)) if p is not None]
+        historial: List[Union[ProgresoDiario, Progreso]]
+        historial, corte = self.historial.progresos_diarios(socio_id, desde, hasta)
+        for progreso in crudos:
+            dia = progreso.fecha.date()
+            if dia.toordinal() < corte:
+                continue  # ya está en un resumen, pendiente de borrarse
+            if (desde is None or dia >= desde) and (hasta is None or dia <= hasta):
+                historial.append(progreso)
         
         return historial
 
-    def registrar_dispositivo(self, tipo: str, socio_id: str) -> DispositivoIoT:
+    def compactar_historial(self, hoy: Optional[date] = None) -> Dict[str, int]:
+        """
+        Aplica la retención: los progresos y accesos de hace más de
+        `historial.dias_crudos` días pasan a resúmenes diarios, y los
+        resúmenes de hace más de `historial.dias_agregados` días, al archivo.
+        Los registros se borran solo cuando su resumen ya está guardado: si
+        algo falla a medias no se pierde nada. Desde el event loop se hace
+        por pasos (ver _programar_compactacion).
+        """
+        hoy = hoy or date.today()
+        progresos, accesos, limite = self._crudos_viejos(hoy)
+        resumidos = False
+        try:
+            self._resumir_crudos(progresos, accesos, limite)
+            resumidos = True
+        finally:
+            self._borrar_crudos(progresos, accesos, resumidos)
+        return self._archivar_historial(progresos, accesos, hoy)
+
+    def _programar_compactacion(self) -> None:
+        """
+        Tarea periódica (en el loop): elige los registros viejos y deja el
+        resumen y el archivo, que son lo caro, a un hilo. Borrarlos de las
+        colecciones vivas vuelve al loop cuando el resumen ya está hecho.
+        """
+        hoy = date.today()
+        try:
+            progresos, accesos, limite = self._crudos_viejos(hoy)
+        except ValueError:
+            return  # sigue en curso la anterior (o una pedida por un administrador)
+        self.tareas.encolar("historial.resumir", self._compactar_en_hilo, progresos, accesos, limite, hoy,
+                            reintentos=0, en_hilo=True)
+
+    def _compactar_en_hilo(self, progresos: List[Progreso], accesos: List[Acceso], limite: date,
+                           hoy: date) -> Dict[str, int]:
+        resumidos = False
+        try:
+            self._resumir_crudos(progresos, accesos, limite)
+            resumidos = True
+        finally:
+            # Con el resumen hecho se borran; si falló, solo se libera la compactación
+            self.tareas.encolar("historial.borrar", self._borrar_crudos, progresos, accesos, resumidos,
+                                prioridad=PRIORIDAD_ALTA)
+        return self._archivar_historial(progresos, accesos, hoy)
+
+    def _crudos_viejos(self, hoy: date) -> Tuple[List[Progreso], List[Acceso], date]:
+        """
+        Progresos y accesos anteriores a la retención, sin sacarlos aún de
+        las colecciones. Debe correr en el loop (o sin él). Solo puede haber
+        una compactación a la vez: si no, dos resumirían los mismos registros.
+        """
+        if self._compactando is not None:
+            raise ValueError("Error: ya hay una compactación del historial en curso.")
+        limite = hoy - timedelta(days=self.historial.dias_crudos)
+        progresos = [p for p in self.progresos.values() if p.fecha.date() < limite]
+        accesos = [a for a in self.accesos.values() if a.fecha < limite]
+        self._compactando = (progresos, accesos)
+        return progresos, accesos, limite
+
+    def _resumir_crudos(self, progresos: List[Progreso], accesos: List[Acceso], limite: date) -> None:
+        """
+        Pasa los registros a resúmenes diarios y adelanta el corte a `limite`
+        en el mismo paso: desde ese momento las consultas ignoran los
+        registros anteriores que sigan en memoria. Puede ir en un hilo.
+        """
+        self.historial.compactar(progresos, accesos, limite)
+        if progresos or accesos:
+            logger.info("Historial compactado: %d progresos y %d accesos a resúmenes diarios.",
+                        len(progresos), len(accesos))
+
+    def _borrar_crudos(self, progresos: List[Progreso], accesos: List[Acceso], resumidos: bool) -> None:
+        """
+        Da por terminada la compactación en curso y, si el resumen se hizo,
+        saca sus registros de las colecciones. Debe correr en el loop (o sin
+        él): borra en los diccionarios que leen los endpoints. Si el resumen
+        falló, los registros se quedan para la siguiente.
+        """
+        if self._compactando is None or self._compactando[0] is not progresos:
+            return
+        self._compactando = None
+        if not resumidos:
+            return
+        for p in progresos:
+            self.progresos.pop(p.id, None)
+        for a in accesos:
+            self.accesos.pop(a.id, None)
+        for socio_id in {p.socio_id for p in progresos}:
+            socio = self.socios.get(socio_id)
+            if socio:
+                socio.progresos = [i for i in socio.progresos if i in self.progresos]
+
+    def _archivar_historial(self, progresos: List[Progreso], accesos: List[Acceso],
+                            hoy: date) -> Dict[str, int]:
+        """Archiva los meses viejos del nivel templado. Puede ir en un hilo."""
+        dias = self.historial.archivar(hoy)
+        if dias:
+            logger.info("Historial: %d días al archivo.", dias)
+        return {"progresos": len(progresos), "accesos": len(accesos), "dias_archivados": dias}
+
+    def estado_historial(self) -> Dict[str, object]:
+        return self.historial.estado()
+
+    def exportar_analitica(self) -> Dict[str, Any]:
+        """
+        Vuelca progresos, accesos, reservas y los resúmenes diarios del
+        historial ya compactado a una instantánea para los informes. Puede
+        correr en un hilo: solo copia las colecciones (cada list() es atómico
+        con el GIL) y construye las columnas sobre la copia.
+        """
+        socios, progresos, accesos, resumenes = self._datos_analitica()
+        return self.analitica.exportar(socios, progresos, accesos, list(self.clases.values()), resumenes)
+
+    def _datos_analitica(self) -> Tuple[List[str], List[Progreso], List[Acceso], Tabla]:
+        """IDs de socio, registros en crudo y resúmenes del historial para la instantánea."""
+        progresos, accesos = list(self.progresos.values()), list(self.accesos.values())
+        # Después de copiar los registros: los que ya estén en un resumen se quitan con su corte
+        resumenes, corte = self.historial.resumenes()
+        return (list(self.socios), [p for p in progresos if p.fecha.toordinal() >= corte],
+                [a for a in accesos if a.fecha.toordinal() >= corte], resumenes)
+
+    # =========== DISPOSITIVOS IOT ===========
+
+    def registrar_dispositivo(self, tipo: str, socio_id: str, sede_id: str = SEDE_PRINCIPAL) -> DispositivoIoT:
         if socio_id not in self.socios:
             raise ValueError("Socio no encontrado")
-        dispositivo = DispositivoIoT(tipo, socio_id)
-        self.dispositivos[dispositivo.id] = dispositivo
+        return self._alta_dispositivo(tipo, socio_id, sede_id)
+
+    def _alta_dispositivo(self, tipo: str, socio_id: str, sede_id: str) -> DispositivoIoT:
+        """Alta en el registro y en la sede; quien llama ya ha comprobado que el socio existe."""
+        self.sedes.obtener(sede_id)
+        dispositivo = self.registro_iot.registrar(tipo, socio_id, sede_id)
+        self.sedes.alta_dispositivo(dispositivo)
         return dispositivo
 
-    def sincronizar_dispositivo(self, dispositivo_id: str) -> Optional[Dict]:
+    def listar_dispositivos_socio(self, socio_id: str) -> List[DispositivoIoT]:
+        return self.registro_iot.de_socio(socio_id)
+
+    def obtener_dispositivo(self, dispositivo_id: str, socio_id: Optional[str] = None) -> DispositivoIoT:
+        """Dispositivo por ID; con `socio_id`, solo si pertenece a ese socio."""
+        return self.registro_iot.obtener(dispositivo_id, socio_id)
+
+    def eliminar_dispositivo(self, dispositivo_id: str, socio_id: str) -> None:
+        dispositivo = self.registro_iot.obtener(dispositivo_id, socio_id)
+        self.registro_iot.eliminar(dispositivo_id, socio_id)
+        self.sedes.baja_dispositivo(dispositivo)
+
+    def latido_dispositivo(self, dispositivo_id: str, socio_id: str) -> DispositivoIoT:
+        dispositivo = self.registro_iot.obtener(dispositivo_id, socio_id)
+        self.registro_iot.latido(dispositivo_id)
+        return dispositivo
+
+    def sincronizar_dispositivo(self, dispositivo_id: str, socio_id: Optional[str] = None) -> Optional[Dict]:
         dispositivo = self.dispositivos.get(dispositivo_id)
-        if dispositivo:
+        if dispositivo and (socio_id is None or dispositivo.socio_id == socio_id):
             dispositivo.sincronizar()
+            self.registro_iot.latido(dispositivo_id)
             return dispositivo.datos
         return None
 
-    def registrar_acceso(self, socio_id: str) -> Acceso:
+    def registrar_lecturas_dispositivo(self, dispositivo_id: str, socio_id: str,
+                                       lecturas: Iterable[Tuple[float, int, int, datetime]],
+                                       secuencia: Optional[int] = None) -> Optional[int]:
+        """
+        Lote de lecturas de un dispositivo del socio. Con `secuencia`, un lote
+        ya aceptado (el dispositivo reintenta sin saber que llegó) no se vuelve
+        a insertar y se devuelve None. La secuencia solo se da por aceptada si
+        el lote se inserta: un lote inválido se puede reenviar con la misma.
+
+        Returns:
+            Número de progresos registrados, o None si el lote era un reenvío
+        """
+        dispositivo = self.registro_iot.obtener(dispositivo_id, socio_id)
+        if self.registro_iot.es_reenvio(dispositivo, secuencia):
+            self.registro_iot.latido(dispositivo_id, secuencia)
+            return None
+        registrados = self.registrar_progresos_en_bloque(socio_id, lecturas)
+        self.registro_iot.latido(dispositivo_id, secuencia)
+        return registrados
+
+    def registrar_acceso(self, socio_id: str, sede_id: str = SEDE_PRINCIPAL) -> Acceso:
+        if socio_id not in self.socios:
+            raise ValueError("Socio no encontrado")
+        self.sedes.obtener(sede_id)
+        acceso = self._anotar_acceso(socio_id, sede_id)
+        self.sedes.acceso(acceso)
+        return acceso
+
+    def _anotar_acceso(self, socio_id: str, sede_id: str) -> Acceso:
+        """Lado del socio de un acceso (el registro y sus puntos); la sede la valida quien llama."""
         socio = self.socios.get(socio_id)
         if not socio:
             raise ValueError("Socio no encontrado")
-        acceso = Acceso(socio_id, socio.nombre)
+        acceso = Acceso(socio_id, socio.nombre, sede_id)
         self.accesos[acceso.id] = acceso
-        return acceso
\ No newline at end of file
+        self.tareas.encolar("estadisticas.acceso", self.estadisticas.registrar_acceso,
+                            socio_id, acceso.fecha, reintentos=0)
+        return acceso
+
+    # =========== ESTADÍSTICAS Y CLASIFICACIONES ===========
+
+    def estadisticas_socio(self, socio_id: str) -> Dict[str, object]:
+        if socio_id not in self.socios:
+            raise ValueError("Socio no encontrado")
+        return self.estadisticas.resumen(socio_id, date.today())
+
+    def clasificacion(self, tipo: str = "puntos", limite: int = 10, desde: int = 0,
+                      clase_id: Optional[str] = None) -> Tuple[int, List[Tuple[int, Socio, float]]]:
+        """
+        Clasificación general, semanal de volumen o de los inscritos en una clase.
+
+        Returns:
+            (total de socios clasificados, [(puesto, socio, valor)])
+        """
+        total, puestos = self.estadisticas.clasificacion(tipo, limite, desde, clase_id, date.today())
+        return total, [(p, self.socios[s], v) for p, s, v in puestos if s in self.socios]
+
+    def posicion_en_clase(self, socio_id: str, clase_id: str) -> Optional[int]:
+        return self.estadisticas.posicion_en_clase(socio_id, clase_id)
\ No newline at end of file
@@ -0,0 +1,433 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.metrics import registro
+from src.models.Acceso import Acceso
+from src.models.Progreso import Progreso
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configuración
+HISTORIAL_DIR = os.getenv("HISTORIAL_DIR", os.path.join(BACKEND_DIR, "historial"))
+HISTORIAL_DIAS_CRUDOS = int(os.getenv("HISTORIAL_DIAS_CRUDOS", 30))         # registros individuales en memoria
+HISTORIAL_DIAS_AGREGADOS = int(os.getenv("HISTORIAL_DIAS_AGREGADOS", 365))  # resúmenes diarios en memoria
+HISTORIAL_INTERVALO = float(os.getenv("HISTORIAL_INTERVALO", 3600))        # segundos entre compactaciones
+HISTORIAL_CACHE_GRUPOS = int(os.getenv("HISTORIAL_CACHE_GRUPOS", 256))     # grupos del archivo descomprimidos
+FILAS_POR_GRUPO = 1024
+NIVEL_COMPRESION = 6
+
+# Columnas de un resumen diario (socio, día) en memoria y en disco. El día va como ordinal (date.toordinal)
+COLUMNAS: Tuple[Tuple[str, str], ...] = (
+    ("dia", "<i4"), ("sesiones", "<i4"), ("peso_max", "<f4"), ("repeticiones", "<i4"),
+    ("tiempo", "<i8"), ("volumen", "<f8"), ("accesos", "<i4"),
+)
+_SUMADAS = ("sesiones", "repeticiones", "tiempo", "volumen", "accesos")
+
+historial_registros = registro.gauge(
+    "gym_historial_dias_en_memoria", "Resúmenes diarios (socio, día) en el nivel templado")
+historial_bytes = registro.gauge(
+    "gym_historial_bytes_archivo", "Tamaño en disco del archivo de historial")
+historial_compactados = registro.counter(
+    "gym_historial_compactados_total", "Registros que pasan al siguiente nivel del historial", ("tipo",))
+
+# Una tabla es un diccionario columna -> array, con la columna "socio" (bytes) además de COLUMNAS
+Tabla = Dict[str, np.ndarray]
+
+
+class ProgresoDiario:
+    """Progresos de un socio en un día ya compactados; mismos campos que Progreso para las consultas."""
+
+    __slots__ = ("id", "socio_id", "fecha", "peso", "repeticiones", "tiempo", "sesiones", "volumen")
+    agregado = True
+
+    def __init__(self, socio_id: str, dia: int, sesiones: int, peso_max: float, repeticiones: int,
+                 tiempo: int, volumen: float) -> None:
+        self.fecha = datetime.fromordinal(dia)
+        self.id = f"{socio_id}:{self.fecha:%Y-%m-%d}"
+        self.socio_id = socio_id
+        self.peso = round(float(peso_max), 1)
+        self.repeticiones = int(repeticiones)
+        self.tiempo = int(tiempo)
+        self.sesiones = int(sesiones)
+        self.volumen = float(volumen)
+
+
+def _tabla_vacia() -> Tabla:
+    tabla = {col: np.empty(0, dtype) for col, dtype in COLUMNAS}
+    tabla["socio"] = np.empty(0, "S1")
+    return tabla
+
+
+def _concatenar(tablas: List[Tabla]) -> Tabla:
+    return {col: np.concatenate([t[col] for t in tablas]) for col in tablas[0]}
+
+
+def unir_tablas(tablas: List[Tabla]) -> Tabla:
+    """Una sola tabla con las filas de todas (p. ej. los resúmenes de varias particiones de socios)."""
+    return _concatenar(tablas) if tablas else _tabla_vacia()
+
+
+def _mes(dia: int) -> str:
+    return date.fromordinal(dia).strftime("%Y-%m")
+
+
+def _filtrar(tabla: Tabla, mascara: np.ndarray) -> Tabla:
+    return {col: valores[mascara] for col, valores in tabla.items()}
+
+
+def _filas_socio(tabla: Tabla, clave: bytes) -> Tabla:
+    """Filas del socio en una tabla ordenada por (socio, día), sin la columna socio."""
+    socios = tabla["socio"]
+    desde, hasta = np.searchsorted(socios, clave, "left"), np.searchsorted(socios, clave, "right")
+    return {col: valores[desde:hasta] for col, valores in tabla.items() if col != "socio"}
+
+
+def _combinar(tabla: Tabla) -> Tabla:
+    """Ordena por (socio, día) y funde las filas repetidas: suma los contadores, máximo del peso."""
+    orden = np.lexsort((tabla["dia"], tabla["socio"]))
+    tabla = {col: valores[orden] for col, valores in tabla.items()}
+    n = len(tabla["dia"])
+    if n < 2:
+        return tabla
+    nueva = np.ones(n, bool)
+    nueva[1:] = (tabla["socio"][1:] != tabla["socio"][:-1]) | (tabla["dia"][1:] != tabla["dia"][:-1])
+    if nueva.all():
+        return tabla
+    inicios = np.flatnonzero(nueva)
+    combinada = {"socio": tabla["socio"][inicios], "dia": tabla["dia"][inicios],
+                 "peso_max": np.maximum.reduceat(tabla["peso_max"], inicios)}
+    for col in _SUMADAS:
+        combinada[col] = np.add.reduceat(tabla[col], inicios)
+    return combinada
+
+
+# =========== NIVEL FRÍO: ARCHIVO EN DISCO ===========
+
+_MAGIA = b"GYMH"
+_VERSION = 1
+_PREAMBULO = struct.Struct("<4sBI")  # magia, versión, longitud de la cabecera JSON
+
+
+class ArchivoHistorial:
+    """
+    Resúmenes diarios antiguos en disco: un fichero por mes, columnar y comprimido.
+
+      preámbulo | cabecera JSON | IDs de socio ordenados (ancho fijo) | inicio de cada socio (int64) | bloques zlib
+
+    Las filas van ordenadas por (socio, día) y partidas en grupos de
+    FILAS_POR_GRUPO, con cada columna de cada grupo comprimida por separado.
+    Los IDs y los inicios no se comprimen: se leen con mmap sin cargar el
+    fichero, de modo que consultar un socio es una búsqueda binaria en el
+    mapa y descomprimir solo el grupo (o los dos) donde están sus filas.
+    """
+
+    def __init__(self, directorio: str, cache_grupos: int = HISTORIAL_CACHE_GRUPOS) -> None:
+        self.directorio = directorio
+        self.cache_grupos = cache_grupos
+        self._cabeceras: Dict[str, dict] = {}
+        self._grupos: "OrderedDict[Tuple[str, int], Tabla]" = OrderedDict()
+        self._mapas: Dict[str, mmap.mmap] = {}
+        self._lock = threading.Lock()
+        self._meses: List[str] = sorted(
+            f[len("historial-"):-len(".gymh")] for f in (os.listdir(directorio) if os.path.isdir(directorio) else ())
+            if f.startswith("historial-") and f.endswith(".gymh"))
+
+    def _ruta(self, mes: str) -> str:
+        return os.path.join(self.directorio, f"historial-{mes}.gymh")
+
+    def meses(self) -> List[str]:
+        return list(self._meses)
+
+    def bytes_en_disco(self) -> int:
+        return sum(os.path.getsize(self._ruta(mes)) for mes in self._meses)
+
+    # --- escritura ---
+
+    def anadir(self, mes: str, tabla: Tabla) -> None:
+        """Funde `tabla` con lo que ya hubiera archivado de `mes` y reescribe el fichero."""
+        with self._lock:
+            if mes in self._cabeceras or mes in self._meses:
+                tabla = _concatenar([self._leer_mes(mes), tabla])
+            self._olvidar(mes)
+            self._escribir(mes, _combinar(tabla))
+            if mes not in self._meses:
+                self._meses = sorted(self._meses + [mes])
+
+    def _olvidar(self, mes: str) -> None:
+        """Descarta el mapa, la cabecera y los grupos en caché de un mes que se va a reescribir."""
+        mapa = self._mapas.pop(mes, None)
+        if mapa is not None:
+            mapa.close()
+        self._cabeceras.pop(mes, None)
+        for clave in [c for c in self._grupos if c[0] == mes]:
+            del self._grupos[clave]
+
+    def cerrar(self) -> None:
+        with self._lock:
+            for mes in list(self._mapas):
+                self._olvidar(mes)
+
+    def _escribir(self, mes: str, tabla: Tabla) -> None:
+        n = len(tabla["dia"])
+        socios, inicio = np.unique(tabla["socio"], return_index=True)
+        inicio = np.append(inicio, n).astype("<i8")
+        bloques, cuerpo = [], bytearray()
+        for desde in range(0, n, FILAS_POR_GRUPO):
+            bloque = {}
+            for col, dtype in COLUMNAS:
+                datos = zlib.compress(tabla[col][desde:desde + FILAS_POR_GRUPO].astype(dtype).tobytes(), NIVEL_COMPRESION)
+                bloque[col] = (len(cuerpo), len(datos))
+                cuerpo += datos
+            bloques.append(bloque)
+        cabecera = json.dumps({"filas": n, "socios": len(socios), "ancho_id": socios.dtype.itemsize,
+                               "grupo": FILAS_POR_GRUPO, "bloques": bloques}).encode()
+        os.makedirs(self.directorio, exist_ok=True)
+        temporal = self._ruta(mes) + ".tmp"
+        with open(temporal, "wb") as f:
+            f.write(_PREAMBULO.pack(_MAGIA, _VERSION, len(cabecera)))
+            f.write(cabecera)
+            f.write(socios.tobytes())
+            f.write(inicio.tobytes())
+            f.write(cuerpo)
+        os.replace(temporal, self._ruta(mes))  # quien lea a la vez ve el fichero anterior o el nuevo, entero
+
+    # --- lectura ---
+
+    def _mapa(self, mes: str) -> mmap.mmap:
+        """Mapa del fichero del mes; se abre una vez y se reutiliza hasta que el mes se reescribe."""
+        mapa = self._mapas.get(mes)
+        if mapa is None:
+            with open(self._ruta(mes), "rb") as f:
+                mapa = self._mapas[mes] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return mapa
+
+    def _cabecera(self, mes: str, mapa) -> dict:
+        cabecera = self._cabeceras.get(mes)
+        if cabecera is None:
+            magia, version, longitud = _PREAMBULO.unpack_from(mapa)
+            if magia != _MAGIA or version != _VERSION:
+                raise ValueError(f"Error: fichero de historial inválido: {self._ruta(mes)}")
+            cabecera = json.loads(mapa[_PREAMBULO.size:_PREAMBULO.size + longitud])
+            cabecera["off_socios"] = _PREAMBULO.size + longitud
+            cabecera["off_inicio"] = cabecera["off_socios"] + cabecera["socios"] * cabecera["ancho_id"]
+            cabecera["off_datos"] = cabecera["off_inicio"] + (cabecera["socios"] + 1) * 8
+            self._cabeceras[mes] = cabecera
+        return cabecera
+
+    @staticmethod
+    def _localizar(mapa, cabecera: dict, clave: bytes) -> Optional[Tuple[int, int]]:
+        """Filas [desde, hasta) del socio, buscando directamente sobre el mapa (sin copiar los IDs)."""
+        if len(clave) > cabecera["ancho_id"]:
+            return None
+        socios = np.frombuffer(mapa, f"S{cabecera['ancho_id']}", cabecera["socios"], cabecera["off_socios"])
+        i = int(np.searchsorted(socios, clave))
+        if i == len(socios) or socios[i] != clave:
+            return None
+        desde, hasta = np.frombuffer(mapa, "<i8", 2, cabecera["off_inicio"] + 8 * i)
+        return int(desde), int(hasta)
+
+    @staticmethod
+    def _descomprimir(mapa, cabecera: dict, g: int) -> Tabla:
+        base = cabecera["off_datos"]
+        grupo = {}
+        for col, dtype in COLUMNAS:
+            offset, longitud = cabecera["bloques"][g][col]
+            grupo[col] = np.frombuffer(zlib.decompress(mapa[base + offset:base + offset + longitud]), dtype)
+        return grupo
+
+    def _grupo(self, mes: str, g: int, mapa, cabecera: dict) -> Tabla:
+        clave = (mes, g)
+        grupo = self._grupos.get(clave)
+        if grupo is not None:
+            self._grupos.move_to_end(clave)
+            return grupo
+        grupo = self._grupos[clave] = self._descomprimir(mapa, cabecera, g)
+        if len(self._grupos) > self.cache_grupos:
+            self._grupos.popitem(last=False)
+        return grupo
+
+    def consultar(self, socio_id: str, meses: Iterable[str]) -> List[Tabla]:
+        """Filas archivadas del socio en esos meses (tablas sin la columna socio)."""
+        clave = socio_id.encode()
+        resultado = []
+        with self._lock:
+            for mes in meses:
+                mapa = self._mapa(mes)
+                cabecera = self._cabecera(mes, mapa)
+                filas = self._localizar(mapa, cabecera, clave)
+                if filas is None:
+                    continue
+                desde, hasta = filas
+                tamano = cabecera["grupo"]
+                for g in range(desde // tamano, (hasta - 1) // tamano + 1):
+                    grupo = self._grupo(mes, g, mapa, cabecera)
+                    a, b = max(desde - g * tamano, 0), min(hasta - g * tamano, tamano)
+                    resultado.append({col: valores[a:b] for col, valores in grupo.items()})
+        return resultado
+
+    def leer_mes(self, mes: str) -> Tabla:
+        """Mes archivado completo, con la columna socio (para exportarlo a la analítica)."""
+        with self._lock:
+            return self._leer_mes(mes)
+
+    def _leer_mes(self, mes: str) -> Tabla:
+        """Mes completo, descomprimido (para fundirlo con filas nuevas)."""
+        mapa = self._mapa(mes)
+        cabecera = self._cabecera(mes, mapa)
+        socios = np.frombuffer(mapa, f"S{cabecera['ancho_id']}", cabecera["socios"], cabecera["off_socios"]).copy()
+        inicio = np.frombuffer(mapa, "<i8", cabecera["socios"] + 1, cabecera["off_inicio"]).copy()
+        # Sin pasar por la caché de grupos: un mes entero la vaciaría para las consultas
+        grupos = [self._descomprimir(mapa, cabecera, g) for g in range(len(cabecera["bloques"]))]
+        tabla = _concatenar(grupos) if grupos else _tabla_vacia()
+        tabla["socio"] = np.repeat(socios, np.diff(inicio))
+        return tabla
+
+
+# =========== HISTORIAL POR NIVELES ===========
+
+class HistorialService:
+    """
+    Retención del historial de progresos y accesos en tres niveles:
+
+      caliente   Progreso/Acceso individuales de los últimos `dias_crudos` días
+                 (viven en GimnasioService)
+      templado   resúmenes diarios por socio en memoria, una tabla NumPy por
+                 mes ordenada por (socio, día), hasta `dias_agregados` días
+      frío       los resúmenes más antiguos en el archivo mensual comprimido
+
+    La memoria queda acotada por los días de cada nivel y no por los años de
+    historial. Las consultas juntan los niveles templado y frío con una
+    búsqueda binaria por mes.
+    """
+
+    def __init__(self, directorio: str = HISTORIAL_DIR, dias_crudos: int = HISTORIAL_DIAS_CRUDOS,
+                 dias_agregados: int = HISTORIAL_DIAS_AGREGADOS) -> None:
+        self.dias_crudos = dias_crudos
+        self.dias_agregados = dias_agregados
+        self.archivo = ArchivoHistorial(directorio)
+        self._meses: Dict[str, Tabla] = {}  # "AAAA-MM" -> resúmenes del mes, ordenados por (socio, día)
+        # Ordinal del primer día sin compactar: los registros individuales anteriores ya
+        # están en los resúmenes aunque aún no se hayan borrado de memoria
+        self.compactado_hasta = 1
+        self._lock = threading.Lock()
+        registro.al_recolectar(self._actualizar_gauges)
+
+    def _actualizar_gauges(self) -> None:
+        historial_registros.set(sum(len(t["dia"]) for t in list(self._meses.values())))
+        historial_bytes.set(self.archivo.bytes_en_disco())
+
+    def compactar(self, progresos: List[Progreso], accesos: List[Acceso], hasta: Optional[date] = None) -> None:
+        """
+        Pasa registros individuales al nivel templado como resúmenes (socio,
+        día). Con `hasta`, declara además compactados los días anteriores: se
+        actualiza a la vez que los resúmenes, así que una consulta nunca ve un
+        registro dos veces ni deja de verlo.
+        """
+        # Una fila por registro (los accesos con sesiones=0) y _combinar las funde por (socio, día)
+        n_progresos, n_accesos = len(progresos), len(accesos)
+        peso = np.array([p.peso for p in progresos], "<f8")
+        repeticiones = np.array([p.repeticiones for p in progresos], "<i4")
+        tabla = {
+            "socio": np.array([p.socio_id.encode() for p in progresos] + [a.socio_id.encode() for a in accesos]),
+            "dia": np.array([p.fecha.toordinal() for p in progresos] + [a.fecha.toordinal() for a in accesos], "<i4"),
+            "sesiones": np.repeat(np.array([1, 0], "<i4"), (n_progresos, n_accesos)),
+            "peso_max": np.concatenate([peso, np.zeros(n_accesos)]).astype("<f4"),
+            "repeticiones": np.concatenate([repeticiones, np.zeros(n_accesos, "<i4")]),
+            "tiempo": np.array([p.tiempo for p in progresos] + [0] * n_accesos, "<i8"),
+            "volumen": np.concatenate([peso * repeticiones, np.zeros(n_accesos)]),
+            "accesos": np.repeat(np.array([0, 1], "<i4"), (n_progresos, n_accesos)),
+        }
+        nuevos: Dict[str, Tabla] = {}
+        if n_progresos + n_accesos:
+            tabla = _combinar(tabla)
+            dias = np.unique(tabla["dia"])
+            meses = np.array([_mes(d) for d in dias.tolist()])[np.searchsorted(dias, tabla["dia"])]
+            nuevos = {mes: _filtrar(tabla, meses == mes) for mes in np.unique(meses).tolist()}
+        with self._lock:
+            # Se combinan antes de tocar nada: si algo falla, no queda ningún mes a medias
+            combinados = {mes: _combinar(_concatenar([self._meses[mes], filas])) if mes in self._meses else filas
+                          for mes, filas in nuevos.items()}
+            self._meses.update(combinados)
+            if hasta is not None:
+                self.compactado_hasta = max(self.compactado_hasta, hasta.toordinal())
+        historial_compactados.inc("progreso", cantidad=n_progresos)
+        historial_compactados.inc("acceso", cantidad=n_accesos)
+
+    def archivar(self, hoy: date) -> int:
+        """Mueve al archivo los días con más de `dias_agregados` de antigüedad. Devuelve cuántos."""
+        limite = (hoy - timedelta(days=self.dias_agregados)).toordinal()
+        archivados = 0
+        with self._lock:
+            for mes in sorted(m for m in self._meses if m <= _mes(limite)):
+                tabla = self._meses[mes]
+                viejos = tabla["dia"] < limite
+                if not viejos.any():
+                    continue
+                self.archivo.anadir(mes, _filtrar(tabla, viejos))
+                archivados += len(np.unique(tabla["dia"][viejos]))
+                # Solo cuando ya están en disco
+                if viejos.all():
+                    del self._meses[mes]
+                else:
+                    self._meses[mes] = _filtrar(tabla, ~viejos)
+        historial_compactados.inc("dia", cantidad=archivados)
+        return archivados
+
+    def progresos_diarios(self, socio_id: str, desde: Optional[date] = None,
+                          hasta: Optional[date] = None) -> Tuple[List[ProgresoDiario], int]:
+        """
+        Resúmenes diarios con progresos del socio (niveles templado y frío),
+        por fecha, y el `compactado_hasta` con el que se leyeron.
+        """
+        d0 = desde.toordinal() if desde else 1
+        d1 = hasta.toordinal() if hasta else date.max.toordinal()
+        mes0, mes1 = _mes(d0), _mes(d1)
+        clave = socio_id.encode()
+        with self._lock:
+            templados = [_filas_socio(self._meses[m], clave) for m in sorted(self._meses) if mes0 <= m <= mes1]
+            corte = self.compactado_hasta
+        tablas = self.archivo.consultar(socio_id, [m for m in self.archivo.meses() if mes0 <= m <= mes1])
+        resultado = []
+        for tabla in tablas + templados:
+            for dia, sesiones, peso, reps, tiempo, volumen in zip(
+                    tabla["dia"].tolist(), tabla["sesiones"].tolist(), tabla["peso_max"].tolist(),
+                    tabla["repeticiones"].tolist(), tabla["tiempo"].tolist(), tabla["volumen"].tolist()):
+                if sesiones and d0 <= dia <= d1:
+                    resultado.append(ProgresoDiario(socio_id, dia, sesiones, peso, reps, tiempo, volumen))
+        # Un mes puede estar a medias en el archivo y en memoria: se ordena el conjunto
+        resultado.sort(key=lambda p: p.fecha)
+        return resultado, corte
+
+    def resumenes(self) -> Tuple[Tabla, int]:
+        """
+        Todos los resúmenes diarios (niveles templado y frío) en una tabla, para
+        la instantánea de analítica, y el `compactado_hasta` con el que se
+        leyeron. Un mes a medias entre el archivo y la memoria puede repetir
+        (socio, día): los informes solo suman.
+        """
+        with self._lock:
+            tablas = [self.archivo.leer_mes(mes) for mes in self.archivo.meses()]
+            tablas.extend(self._meses.values())
+            corte = self.compactado_hasta
+        return (_concatenar(tablas) if tablas else _tabla_vacia()), corte
+
+    def estado(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "dias_crudos": self.dias_crudos,
+                "compactado_hasta": date.fromordinal(self.compactado_hasta).isoformat(),
+                "dias_agregados": self.dias_agregados,
+                "meses_en_memoria": sorted(self._meses),
+                "resumenes_en_memoria": sum(len(t["dia"]) for t in self._meses.values()),
+                "meses_archivados": self.archivo.meses(),
+                "bytes_archivo": self.archivo.bytes_en_disco(),
+            }
@@ -0,0 +1,302 @@
+import heapq
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Deque, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from src.metrics import registro
+from src.models.Clase import Clase
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configuración
+NOTIFICACIONES_SUMIDERO = os.getenv("NOTIFICACIONES_SUMIDERO", "fichero")  # fichero, stdout o ninguno
+NOTIFICACIONES_FICHERO = os.getenv(
+    "NOTIFICACIONES_FICHERO", os.path.join(BACKEND_DIR, "notificaciones", "notificaciones.ndjson"))
+NOTIFICACIONES_LOTE = int(os.getenv("NOTIFICACIONES_LOTE", 500))                     # notificaciones por envío
+NOTIFICACIONES_MAX_PENDIENTES = int(os.getenv("NOTIFICACIONES_MAX_PENDIENTES", 10_000))  # avisos sin repartir
+NOTIFICACIONES_INTERVALO = float(os.getenv("NOTIFICACIONES_INTERVALO", 1))            # segundos entre repartos
+NOTIFICACIONES_ANTELACION = float(os.getenv("NOTIFICACIONES_ANTELACION", 3600))       # recordatorio antes de empezar
+
+notificaciones_eventos = registro.counter(
+    "gym_notificaciones_total",
+    "Avisos y notificaciones por resultado (publicado, descartado, enviada, fallida)", ("resultado",))
+notificaciones_retraso = registro.histogram(
+    "gym_notificaciones_retraso_segundos", "Tiempo desde que se publica un aviso hasta que sale su último lote")
+notificaciones_pendientes = registro.gauge(
+    "gym_notificaciones_pendientes", "Avisos publicados esperando a repartirse")
+recordatorios_programados = registro.gauge(
+    "gym_notificaciones_recordatorios", "Recordatorios de clases programados")
+
+
+class Aviso(NamedTuple):
+    """Lo que se publica en un tema; el reparto lo convierte en una notificación por suscriptor."""
+    instante: float  # time.time()
+    tema: str        # ID de la clase (o de la sesión de una serie)
+    tipo: str        # "cambio" o "recordatorio"
+    mensaje: str
+
+
+class Notificacion(NamedTuple):
+    socio_id: str
+    tema: str
+    tipo: str
+    mensaje: str
+    instante: float
+
+
+class Sumidero(ABC):
+    """Destino de las notificaciones (correo, push...). Recibe lotes, nunca notificaciones sueltas."""
+
+    nombre = "sumidero"
+
+    @abstractmethod
+    def enviar(self, lote: List[Notificacion]) -> None:
+        """Entrega un lote; si lanza una excepción, el reparto lo cuenta como fallido."""
+
+    def cerrar(self) -> None:
+        return None
+
+
+class SumideroFichero(Sumidero):
+    """Añade cada lote a un fichero NDJSON (una notificación por línea) con una sola escritura."""
+
+    nombre = "fichero"
+
+    def __init__(self, ruta: str = NOTIFICACIONES_FICHERO) -> None:
+        self.ruta = ruta
+        os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        self._fichero = open(ruta, "a", encoding="utf-8")
+
+    def enviar(self, lote: List[Notificacion]) -> None:
+        self._fichero.write("".join(json.dumps(n._asdict(), ensure_ascii=False) + "\n" for n in lote))
+        self._fichero.flush()
+
+    def cerrar(self) -> None:
+        self._fichero.close()
+
+
+class SumideroSalida(Sumidero):
+    """Imprime los lotes por la salida estándar (para desarrollo)."""
+
+    nombre = "stdout"
+
+    def enviar(self, lote: List[Notificacion]) -> None:
+        print("\n".join(f"🔔 {n.socio_id}: {n.mensaje}" for n in lote), flush=True)
+
+
+def crear_sumideros(nombre: str = NOTIFICACIONES_SUMIDERO) -> List[Sumidero]:
+    if nombre == "fichero":
+        return [SumideroFichero()]
+    if nombre == "stdout":
+        return [SumideroSalida()]
+    if nombre == "ninguno":
+        return []
+    raise ValueError(f"Error: NOTIFICACIONES_SUMIDERO inválido: {nombre} (fichero, stdout o ninguno)")
+
+
+class NotificacionesService:
+    """
+    Avisos a los socios con reserva en una clase: cambios publicados por la
+    administración y recordatorios antes de que empiece.
+
+    Cada clase (o sesión de una serie) es un tema, y reservar suscribe al
+    socio. Publicar solo añade el aviso a una cola acotada, así que no cuesta
+    nada a la petición; un reparto periódico (en un hilo, fuera del event
+    loop) lo convierte en una notificación por suscriptor y las entrega por
+    lotes de `lote` a los sumideros. En memoria solo hay un lote a la vez,
+    aunque la clase tenga miles de suscriptores; si la cola se llena, se
+    descartan los avisos más antiguos.
+
+    Los recordatorios están en un heap por instante: cada reparto saca los
+    vencidos sin recorrer los demás. Hay uno por clase con reservas, no uno
+    por socio, y el de una clase semanal se reprograma para la semana
+    siguiente mientras le queden suscriptores.
+    """
+
+    def __init__(self, sumideros: Optional[List[Sumidero]] = None, lote: int = NOTIFICACIONES_LOTE,
+                 max_pendientes: int = NOTIFICACIONES_MAX_PENDIENTES,
+                 antelacion: float = NOTIFICACIONES_ANTELACION) -> None:
+        self._sumideros = sumideros
+        self.lote = lote
+        self.max_pendientes = max_pendientes
+        self.antelacion = antelacion
+        self._temas: Dict[str, Set[str]] = {}
+        self._pendientes: Deque[Aviso] = deque()
+        self._recordatorios: List[Tuple[float, int, Clase]] = []  # heap (instante, desempate, clase)
+        self._programado: Dict[str, float] = {}                    # tema -> instante de su recordatorio vigente
+        self._secuencia = itertools.count()
+        self._lock = threading.Lock()
+        self._lock_reparto = threading.Lock()
+        registro.al_recolectar(self._publicar_metricas)
+
+    @property
+    def sumideros(self) -> List[Sumidero]:
+        # Se crean en el primer reparto: importar el servicio no abre ficheros
+        if self._sumideros is None:
+            self._sumideros = crear_sumideros()
+        return self._sumideros
+
+    def anadir_sumidero(self, sumidero: Sumidero) -> None:
+        self.sumideros.append(sumidero)
+
+    def _publicar_metricas(self) -> None:
+        notificaciones_pendientes.set(len(self._pendientes))
+        recordatorios_programados.set(len(self._programado))
+
+    # =========== SUSCRIPCIONES ===========
+
+    def suscribir(self, tema: str, socio_id: str) -> None:
+        with self._lock:
+            self._temas.setdefault(tema, set()).add(socio_id)
+
+    def desuscribir(self, tema: str, socio_id: str) -> None:
+        with self._lock:
+            suscriptores = self._temas.get(tema)
+            if suscriptores is not None:
+                suscriptores.discard(socio_id)
+                if not suscriptores:
+                    del self._temas[tema]
+
+    def suscriptores(self, tema: str) -> int:
+        return len(self._temas.get(tema, ()))
+
+    def reserva(self, clase: Clase, socio_id: str) -> None:
+        """El socio recibe los avisos de la clase y se programa su recordatorio si aún no lo tiene."""
+        self.suscribir(clase.id, socio_id)
+        self.programar_recordatorio(clase)
+
+    def cancelacion(self, clase: Clase, socio_id: str) -> None:
+        self.desuscribir(clase.id, socio_id)
+
+    # =========== PUBLICACIÓN ===========
+
+    def publicar(self, tema: str, tipo: str, mensaje: str) -> int:
+        """
+        Deja el aviso para el siguiente reparto (O(1), no espera a los sumideros).
+
+        Returns:
+            Suscriptores del tema en este momento
+        """
+        with self._lock:
+            if len(self._pendientes) >= self.max_pendientes:
+                self._pendientes.popleft()
+                notificaciones_eventos.inc("descartado")
+            self._pendientes.append(Aviso(time.time(), tema, tipo, mensaje))
+            suscriptores = len(self._temas.get(tema, ()))
+        notificaciones_eventos.inc("publicado")
+        return suscriptores
+
+    # =========== RECORDATORIOS ===========
+
+    def programar_recordatorio(self, clase: Clase, desde: Optional[datetime] = None) -> Optional[datetime]:
+        """
+        Programa el recordatorio de la próxima sesión de la clase que aún
+        permite avisar con `antelacion`. No hace nada si ya tiene uno.
+
+        Returns:
+            Cuándo saltará el recordatorio, o None si no se ha programado
+        """
+        if clase.id in self._programado:
+            return None
+        desde = desde or datetime.now()
+        inicio = clase.proximo_inicio(desde + timedelta(seconds=self.antelacion))
+        if inicio is None:
+            return None  # sesión de una serie que ya empieza o ha pasado
+        aviso = inicio - timedelta(seconds=self.antelacion)
+        instante = aviso.timestamp()
+        with self._lock:
+            if clase.id in self._programado:
+                return None
+            self._programado[clase.id] = instante
+            heapq.heappush(self._recordatorios, (instante, next(self._secuencia), clase))
+        return aviso
+
+    def _recordatorios_vencidos(self, ahora: float) -> List[Tuple[float, Clase]]:
+        vencidos = []
+        with self._lock:
+            while self._recordatorios and self._recordatorios[0][0] <= ahora:
+                instante, _, clase = heapq.heappop(self._recordatorios)
+                del self._programado[clase.id]
+                vencidos.append((instante, clase))
+        return vencidos
+
+    def _recordar(self, instante: float, clase: Clase, ahora: float) -> None:
+        if not self.suscriptores(clase.id):
+            return  # sin reservas: no se avisa ni se reprograma (la próxima reserva lo hará)
+        inicio = datetime.fromtimestamp(instante) + timedelta(seconds=self.antelacion)
+        if inicio.timestamp() > ahora:  # tras una parada larga puede que la clase ya haya empezado
+            self.publicar(clase.id, "recordatorio",
+                          f"Tu clase {clase.nombre} empieza el {inicio:%d/%m} a las {inicio:%H:%M}.")
+        # La siguiente sesión (una sesión de una serie no tiene siguiente)
+        self.programar_recordatorio(clase, max(inicio + timedelta(minutes=1), datetime.fromtimestamp(ahora)))
+
+    # =========== REPARTO ===========
+
+    def repartir(self, ahora: Optional[float] = None) -> Dict[str, int]:
+        """
+        Lanza los recordatorios vencidos y reparte todos los avisos pendientes
+        (tarea periódica; se ejecuta en un hilo). Devuelve avisos y notificaciones enviadas.
+        """
+        with self._lock_reparto:
+            ahora = time.time() if ahora is None else ahora
+            for instante, clase in self._recordatorios_vencidos(ahora):
+                self._recordar(instante, clase, ahora)
+            with self._lock:
+                avisos, self._pendientes = self._pendientes, deque()
+            enviadas = 0
+            for aviso in avisos:
+                enviadas += self._difundir(aviso)
+            return {"avisos": len(avisos), "notificaciones": enviadas}
+
+    def _difundir(self, aviso: Aviso) -> int:
+        with self._lock:
+            # Copia de los IDs (no de las notificaciones): reservar a la vez no afecta al reparto
+            suscriptores = tuple(self._temas.get(aviso.tema, ()))
+        for inicio in range(0, len(suscriptores), self.lote):
+            lote = [Notificacion(socio_id, aviso.tema, aviso.tipo, aviso.mensaje, aviso.instante)
+                    for socio_id in suscriptores[inicio:inicio + self.lote]]
+            self._entregar(lote)
+        if suscriptores:
+            notificaciones_retraso.observe(time.time() - aviso.instante)
+        return len(suscriptores)
+
+    def _entregar(self, lote: List[Notificacion]) -> None:
+        for sumidero in self.sumideros:
+            try:
+                sumidero.enviar(lote)
+                notificaciones_eventos.inc("enviada", cantidad=len(lote))
+            except Exception:
+                # Un sumidero caído no frena a los demás ni al resto del reparto
+                notificaciones_eventos.inc("fallida", cantidad=len(lote))
+                logger.exception("Sumidero %s: no se pudo entregar un lote de %d", sumidero.nombre, len(lote))
+
+    def cerrar(self) -> None:
+        """Reparte lo pendiente y cierra los sumideros (al parar la app)."""
+        self.repartir()
+        # Solo los que ya existen: si nunca hubo reparto no se abre el fichero para cerrarlo
+        for sumidero in self._sumideros or ():
+            sumidero.cerrar()
+
+    # =========== CONSULTAS ===========
+
+    def estado(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "temas": len(self._temas),
+                "suscripciones": sum(len(s) for s in self._temas.values()),
+                "pendientes": len(self._pendientes),
+                "recordatorios": len(self._programado),
+                "proximo_recordatorio": (datetime.fromtimestamp(self._recordatorios[0][0]).isoformat(timespec="seconds")
+                                         if self._recordatorios else None),
+                "sumideros": [s.nombre for s in self.sumideros],
+                "lote": self.lote,
+            }
@@ -0,0 +1,488 @@
+import asyncio
+import bisect
+import hashlib
+import heapq
+import itertools
+import multiprocessing
+import os
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from src.auth import hash_password
+from src.metrics import registro, temporizar
+from src.models.Acceso import Acceso
+from src.models.DispositivoIoT import DispositivoIoT
+from src.models.Progreso import Progreso
+from src.models.Rutina import Rutina
+from src.models.Sede import SEDE_PRINCIPAL
+from src.models.Socio import Socio
+from src.Services.Analitica_service import ANALITICA_INTERVALO
+from src.Services.Gimnasio_async_service import AlmacenamientoAsync, GimnasioServiceAsync
+from src.Services.Gimnasio_service import GimnasioService
+from src.Services.Historial_service import HISTORIAL_DIR, HISTORIAL_INTERVALO, HistorialService, unir_tablas
+
+# Configuración: con 1 (por defecto) la API usa el servicio único
+PARTICIONES_SOCIOS = int(os.getenv("PARTICIONES_SOCIOS", 1))
+PARTICIONES_VNODOS = int(os.getenv("PARTICIONES_VNODOS", 64))  # puntos de cada partición en el anillo
+
+llamadas_particion = registro.counter(
+    "gym_particiones_llamadas_total", "Operaciones enviadas a cada partición de socios", ("particion",))
+
+
+def _hash64(clave: str) -> int:
+    # Estable entre procesos y ejecuciones (hash() de str cambia con PYTHONHASHSEED)
+    return int.from_bytes(hashlib.blake2b(clave.encode(), digest_size=8).digest(), "big")
+
+
+class AnilloConsistente:
+    """
+    Hash consistente con nodos virtuales: cada partición ocupa `vnodos`
+    puntos del anillo y una clave va a la del primer punto a su derecha.
+    Al pasar de N a N+1 particiones solo se mueve ~1/(N+1) de las claves
+    (con hash módulo N se movería casi todo).
+    """
+
+    def __init__(self, particiones: int, vnodos: int = PARTICIONES_VNODOS) -> None:
+        if particiones < 1:
+            raise ValueError("Error: hace falta al menos una partición.")
+        self.particiones = particiones
+        puntos = sorted((_hash64(f"particion-{p}#{v}"), p) for p in range(particiones) for v in range(vnodos))
+        self._puntos = [h for h, _ in puntos]
+        self._dueno = [p for _, p in puntos]
+
+    def particion(self, clave: str) -> int:
+        i = bisect.bisect(self._puntos, _hash64(clave))
+        return self._dueno[i % len(self._puntos)]
+
+
+# =========== LADO DE LA PARTICIÓN (en su propio proceso) ===========
+
+def _crear_servicio(numero: int) -> GimnasioService:
+    servicio = GimnasioService()
+    # Cada partición archiva su propio historial
+    servicio.historial = HistorialService(os.path.join(HISTORIAL_DIR, f"particion-{numero}"))
+    return servicio
+
+
+def _alta_socio(servicio: GimnasioService, socio: Socio, password: str) -> Socio:
+    """Socio ya validado por el coordinador: el bcrypt se paga en la partición."""
+    if password:
+        with temporizar("bcrypt_hash"):
+            socio.password_hash = hash_password(password)
+    return servicio._insertar_socio(socio)
+
+
+def _autenticar(servicio: GimnasioService, email: str, password_plana: str) -> Tuple[Optional[Socio], bool]:
+    """El socio autenticado (o None) y si se ha rehasheado su contraseña con el coste actual."""
+    socio = servicio.buscar_socio_por_email(email)
+    hash_anterior = socio.password_hash if socio else None
+    autenticado = servicio.autenticar_socio(email, password_plana)
+    return autenticado, autenticado is not None and autenticado.password_hash != hash_anterior
+
+
+def _anotar_reserva(servicio: GimnasioService, socio_id: str, clase_id: str) -> bool:
+    """Lado del socio de una reserva; la plaza ya la ha ocupado el coordinador."""
+    socio = servicio.socios.get(socio_id)
+    if socio is None:
+        return False
+    servicio._anotar_reserva(socio, clase_id)
+    return True
+
+
+def _anotar_cancelacion(servicio: GimnasioService, socio_id: str, clase_id: str) -> bool:
+    socio = servicio.socios.get(socio_id)
+    if socio is None or clase_id not in socio.clases_reservadas:
+        return False
+    servicio._anotar_cancelacion(socio, clase_id)
+    return True
+
+
+def _asignar_rutina(servicio: GimnasioService, socio_id: str, rutina_id: str) -> bool:
+    """La rutina la ha comprobado el coordinador, que tiene el catálogo."""
+    socio = servicio.socios.get(socio_id)
+    if socio is None:
+        return False
+    socio.asignar_rutina(rutina_id)
+    return True
+
+
+# Operaciones propias de la partición; el resto son métodos de GimnasioService con el mismo nombre
+_OPERACIONES: Dict[str, Callable[..., Any]] = {
+    "alta_socio": _alta_socio,
+    "autenticar": _autenticar,
+    "anotar_reserva": _anotar_reserva,
+    "anotar_cancelacion": _anotar_cancelacion,
+    "asignar_rutina_socio": _asignar_rutina,
+    "anotar_acceso": lambda servicio, socio_id, sede_id: servicio._anotar_acceso(socio_id, sede_id),
+    "existe_socio": lambda servicio, socio_id: socio_id in servicio.socios,
+    "contar_socios": lambda servicio: len(servicio.socios),
+    "valor_clasificacion": lambda servicio, *args: servicio.estadisticas.valor(*args),
+    "por_delante": lambda servicio, *args: servicio.estadisticas.por_delante(*args),
+    "datos_analitica": lambda servicio: servicio._datos_analitica(),
+}
+
+# Con las particiones en este proceso, el bcrypt va a un hilo para no parar el event loop
+_OPERACIONES_CPU = frozenset({"alta_socio", "autenticar"})
+
+
+def _aplicar(servicio: GimnasioService, operacion: str, args: Tuple) -> Any:
+    funcion = _OPERACIONES.get(operacion)
+    if funcion is not None:
+        return funcion(servicio, *args)
+    return getattr(servicio, operacion)(*args)
+
+
+_servicio_particion: Optional[GimnasioService] = None
+
+
+def _iniciar_proceso(numero: int) -> None:
+    global _servicio_particion
+    _servicio_particion = _crear_servicio(numero)
+
+
+def _ejecutar(operacion: str, args: Tuple) -> Any:
+    return _aplicar(_servicio_particion, operacion, args)
+
+
+class _Particion:
+    """
+    Una partición de socios. En su propio proceso (un ProcessPoolExecutor de
+    un solo worker, que conserva el estado entre llamadas) o, sin
+    `en_proceso`, un GimnasioService en el mismo proceso.
+    """
+
+    def __init__(self, numero: int, en_proceso: bool) -> None:
+        self.numero = numero
+        self.etiqueta = str(numero)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._servicio: Optional[GimnasioService] = None
+        if en_proceso:
+            # spawn: un fork del proceso de la API (con hilos que pueden tener un lock cogido) puede colgarse
+            self._pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=_iniciar_proceso, initargs=(numero,))
+        else:
+            self._servicio = _crear_servicio(numero)
+
+    async def llamar(self, operacion: str, *args) -> Any:
+        llamadas_particion.inc(self.etiqueta)
+        if self._pool is None:
+            if operacion in _OPERACIONES_CPU:
+                return await asyncio.to_thread(_aplicar, self._servicio, operacion, args)
+            return _aplicar(self._servicio, operacion, args)
+        return await asyncio.get_running_loop().run_in_executor(self._pool, _ejecutar, operacion, args)
+
+    def cerrar(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+# =========== COORDINADOR ===========
+
+class GimnasioParticionado:
+    """
+    Socios repartidos en varias particiones por hash consistente de su ID,
+    cada una con sus progresos, accesos, reservas, estadísticas e historial.
+    Tiene la misma API asíncrona que GimnasioServiceAsync, así que la API lo
+    usa tal cual con PARTICIONES_SOCIOS > 1.
+
+    El coordinador (el proceso de la API) guarda solo lo global:
+      - el índice email -> socio_id, para llevar el login y el registro
+        directamente a la partición del socio (y que el email sea único);
+      - el catálogo (`catalogo`: clases, series, entrenadores, rutinas,
+        sedes, dispositivos, demanda, avisos) y el aforo de cada clase: una
+        reserva ocupa la plaza aquí, en el event loop, y luego la anota en la
+        partición del socio, de modo que el aforo es correcto aunque los
+        inscritos vivan en particiones distintas.
+    Los listados y las clasificaciones se piden a todas las particiones a la
+    vez y se juntan. Lo que no toca socios va directo al catálogo.
+
+    Con `en_procesos`, cada partición trabaja en su proceso (bcrypt, altas de
+    progresos y consultas de distintos socios corren en paralelo en varios
+    núcleos); sin él, todas viven en este proceso.
+    """
+
+    def __init__(self, particiones: int = PARTICIONES_SOCIOS, en_procesos: bool = True,
+                 catalogo: Optional[GimnasioService] = None, vnodos: int = PARTICIONES_VNODOS,
+                 almacenamiento: Optional[AlmacenamientoAsync] = None) -> None:
+        self.anillo = AnilloConsistente(particiones, vnodos)
+        self.catalogo = catalogo or GimnasioService()
+        self.asincrono = GimnasioServiceAsync(self.catalogo, almacenamiento)
+        self.particiones = [_Particion(p, en_procesos) for p in range(particiones)]
+        self.email_socio_index: Dict[str, str] = {}
+        self._emails_en_alta: Set[str] = set()
+        self._lotes_iot: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        # El historial y la instantánea del catálogo no tienen socios: las periódicas pasan a las particiones
+        tareas = self.catalogo.tareas
+        tareas.quitar("historial.compactar")
+        tareas.quitar("analitica.exportar")
+        tareas.cada("historial.compactar", HISTORIAL_INTERVALO, self.compactar_historial)
+        tareas.cada("analitica.exportar", ANALITICA_INTERVALO, self.exportar_analitica)
+
+    def __getattr__(self, nombre: str) -> Any:
+        # Catálogo, sedes, dispositivos, demanda, avisos...: la API asíncrona del servicio del coordinador
+        if nombre == "asincrono":
+            raise AttributeError(nombre)
+        return getattr(self.asincrono, nombre)
+
+    def particion_de(self, socio_id: str) -> int:
+        return self.anillo.particion(socio_id)
+
+    async def _llamar(self, socio_id: str, operacion: str, *args) -> Any:
+        return await self.particiones[self.particion_de(socio_id)].llamar(operacion, *args)
+
+    async def _todas(self, operacion: str, *args) -> List[Any]:
+        """Scatter-gather: la misma operación en todas las particiones a la vez."""
+        return await asyncio.gather(*(p.llamar(operacion, *args) for p in self.particiones))
+
+    async def _anotar(self, operacion: str, **datos) -> None:
+        await self.asincrono.almacenamiento.anotar(operacion, datos)
+
+    async def cerrar(self) -> None:
+        for particion in self.particiones:
+            particion.cerrar()
+        await self.asincrono.cerrar()
+
+    # =========== SOCIOS ===========
+
+    async def registrar_socio(self, nombre: str, email: str, fecha_nacimiento: str, nivel: str,
+                              password: str) -> Socio:
+        if email in self.email_socio_index or email in self._emails_en_alta:
+            raise ValueError(f"Error: el email {email} ya está registrado.")
+        # Se valida aquí; el ID ya decide la partición. El email queda apartado mientras se hashea
+        socio = Socio(nombre, email, fecha_nacimiento, nivel)
+        self._emails_en_alta.add(email)
+        try:
+            socio = await self._llamar(socio.id, "alta_socio", socio, password)
+        finally:
+            self._emails_en_alta.discard(email)
+        self.email_socio_index[email] = socio.id
+        await self._anotar("registrar_socio", id=socio.id, nombre=nombre, email=email,
+                           fecha_nacimiento=socio.fecha_nacimiento, nivel=socio.nivel,
+                           password_hash=socio.password_hash)
+        return socio
+
+    async def registrar_socios_en_bloque(self, socios: List[Socio]) -> List[Tuple[int, str]]:
+        """Socios ya construidos (con hash): un lote por partición, enviados a la vez. Devuelve los rechazados."""
+        errores: List[Tuple[int, str]] = []
+        por_particion: Dict[int, List[Tuple[int, Socio]]] = {}
+        for i, socio in enumerate(socios):
+            if socio.email in self.email_socio_index or socio.email in self._emails_en_alta:
+                errores.append((i, f"Error: el email {socio.email} ya está registrado."))
+                continue
+            self._emails_en_alta.add(socio.email)
+            por_particion.setdefault(self.particion_de(socio.id), []).append((i, socio))
+        lotes = list(por_particion.items())
+        try:
+            resultados = await asyncio.gather(*(self.particiones[p].llamar(
+                "registrar_socios_en_bloque", [socio for _, socio in lote]) for p, lote in lotes))
+        finally:
+            for email in [socio.email for _, lote in lotes for _, socio in lote]:
+                self._emails_en_alta.discard(email)
+        for (_, lote), rechazados in zip(lotes, resultados):
+            indices_rechazados = {j for j, _ in rechazados}
+            errores.extend((lote[j][0], motivo) for j, motivo in rechazados)
+            self.email_socio_index.update(
+                (socio.email, socio.id) for j, (_, socio) in enumerate(lote) if j not in indices_rechazados)
+        return sorted(errores)
+
+    async def autenticar_socio(self, email: str, password_plana: str) -> Optional[Socio]:
+        socio_id = self.email_socio_index.get(email)
+        if socio_id is None:
+            return None
+        socio, rehasheado = await self._llamar(socio_id, "autenticar", email, password_plana)
+        if rehasheado:
+            await self._anotar("actualizar_password_hash", id=socio.id, password_hash=socio.password_hash)
+        return socio
+
+    async def buscar_socio_por_id(self, socio_id: str) -> Optional[Socio]:
+        return await self._llamar(socio_id, "buscar_socio_por_id", socio_id)
+
+    async def buscar_socio_por_email(self, email: str) -> Optional[Socio]:
+        socio_id = self.email_socio_index.get(email)
+        return await self.buscar_socio_por_id(socio_id) if socio_id else None
+
+    async def listar_socios(self) -> List[Socio]:
+        return [socio for socios in await self._todas("listar_socios") for socio in socios]
+
+    async def socios_por_particion(self) -> List[int]:
+        return await self._todas("contar_socios")
+
+    # =========== RESERVAS (aforo global en el coordinador) ===========
+
+    async def reservar_clase(self, socio_id: str, clase_id: str) -> bool:
+        """Reserva una clase (o una sesión de una serie, "<serie_id>@AAAA-MM-DD") para un socio."""
+        # La plaza se ocupa antes del primer await: dos reservas a la vez no pueden pasarse del aforo
+        clase = self.catalogo._ocupar_plaza(socio_id, clase_id)
+        if clase is None:
+            return False
+        try:
+            anotada = await self._llamar(socio_id, "anotar_reserva", socio_id, clase.id)
+        except BaseException:
+            self.catalogo._liberar_plaza(socio_id, clase.id)
+            raise
+        if not anotada:  # socio inexistente
+            self.catalogo._liberar_plaza(socio_id, clase.id)
+            return False
+        self.catalogo._reserva_hecha(clase, socio_id)
+        await self._anotar("reservar_clase", socio_id=socio_id, clase_id=clase_id)
+        return True
+
+    async def cancelar_reserva_clase(self, socio_id: str, clase_id: str) -> bool:
+        clase = self.catalogo._liberar_plaza(socio_id, clase_id)
+        if clase is None:
+            return False
+        await self._llamar(socio_id, "anotar_cancelacion", socio_id, clase.id)
+        self.catalogo._cancelacion_hecha(clase, socio_id)
+        await self._anotar("cancelar_reserva_clase", socio_id=socio_id, clase_id=clase_id)
+        return True
+
+    # =========== RUTINAS (catálogo en el coordinador, las del socio en su partición) ===========
+
+    async def asignar_rutina(self, socio_id: str, rutina_id: str) -> bool:
+        if rutina_id not in self.catalogo.rutinas:
+            return False
+        if not await self._llamar(socio_id, "asignar_rutina_socio", socio_id, rutina_id):
+            return False
+        await self._anotar("asignar_rutina", socio_id=socio_id, rutina_id=rutina_id)
+        return True
+
+    async def recomendar_rutinas(self, socio_id: str, limite: int = 5) -> List[Tuple[Rutina, float]]:
+        # El índice de recomendación es del catálogo; el perfil de progreso se le manda con cada progreso
+        socio = await self.buscar_socio_por_id(socio_id)
+        if socio is None:
+            raise ValueError("Socio no encontrado")
+        catalogo = self.catalogo
+        sugeridas = await asyncio.to_thread(catalogo.recomendador.recomendar, socio_id, socio.nivel,
+                                            socio.rutinas, limite)
+        return [(catalogo.rutinas[r], p) for r, p in sugeridas if r in catalogo.rutinas]
+
+    def _perfil_recomendacion(self, socio_id: str, lecturas: List[Tuple[float, int]]) -> None:
+        self.catalogo.tareas.encolar("recomendador.progreso", self._actualizar_perfil, socio_id, lecturas,
+                                     reintentos=0)
+
+    def _actualizar_perfil(self, socio_id: str, lecturas: List[Tuple[float, int]]) -> None:
+        for peso, tiempo in lecturas:
+            self.catalogo.recomendador.registrar_progreso(socio_id, peso, tiempo)
+
+    # =========== PROGRESOS, ACCESOS E IOT (en la partición del socio) ===========
+
+    async def registrar_progreso(self, socio_id: str, peso: float, repeticiones: int, tiempo: int) -> Progreso:
+        progreso = await self._llamar(socio_id, "registrar_progreso", socio_id, peso, repeticiones, tiempo)
+        self._perfil_recomendacion(socio_id, [(peso, tiempo)])
+        await self._anotar("registrar_progreso", socio_id=socio_id, peso=peso, repeticiones=repeticiones,
+                           tiempo=tiempo)
+        return progreso
+
+    async def registrar_progresos_en_bloque(self, socio_id: str,
+                                            lecturas: Iterable[Tuple[float, int, int, datetime]]) -> int:
+        lecturas = list(lecturas)
+        registrados = await self._llamar(socio_id, "registrar_progresos_en_bloque", socio_id, lecturas)
+        self._perfil_recomendacion(socio_id, [(peso, tiempo) for peso, _, tiempo, _ in lecturas])
+        await self._anotar("registrar_progresos_en_bloque", socio_id=socio_id, lecturas=lecturas)
+        return registrados
+
+    async def listar_progresos_socio(self, socio_id: str, desde: Optional[date] = None,
+                                     hasta: Optional[date] = None) -> List[Any]:
+        return await self._llamar(socio_id, "listar_progresos_socio", socio_id, desde, hasta)
+
+    async def registrar_acceso(self, socio_id: str, sede_id: str = SEDE_PRINCIPAL) -> Acceso:
+        self.catalogo.sedes.obtener(sede_id)
+        acceso = await self._llamar(socio_id, "anotar_acceso", socio_id, sede_id)
+        self.catalogo.sedes.acceso(acceso)
+        await self._anotar("registrar_acceso", socio_id=socio_id, sede_id=sede_id)
+        return acceso
+
+    async def registrar_dispositivo(self, tipo: str, socio_id: str,
+                                    sede_id: str = SEDE_PRINCIPAL) -> DispositivoIoT:
+        # El registro de dispositivos (latidos, barrido) es del coordinador; el socio, de su partición
+        if not await self._llamar(socio_id, "existe_socio", socio_id):
+            raise ValueError("Socio no encontrado")
+        dispositivo = self.catalogo._alta_dispositivo(tipo, socio_id, sede_id)
+        await self._anotar("registrar_dispositivo", tipo=tipo, socio_id=socio_id, sede_id=sede_id)
+        return dispositivo
+
+    async def registrar_lecturas_dispositivo(self, dispositivo_id: str, socio_id: str,
+                                             lecturas: Iterable[Tuple[float, int, int, datetime]],
+                                             secuencia: Optional[int] = None) -> Optional[int]:
+        """Como GimnasioService.registrar_lecturas_dispositivo, con el lote en la partición del socio."""
+        registro_iot = self.catalogo.registro_iot
+        dispositivo = registro_iot.obtener(dispositivo_id, socio_id)
+        # Un lote por dispositivo a la vez: un reenvío que llegue mientras el original está en
+        # la partición tiene que ver ya su secuencia aceptada
+        candado = self._lotes_iot.get(dispositivo_id)
+        if candado is None:
+            candado = self._lotes_iot[dispositivo_id] = asyncio.Lock()
+        async with candado:
+            if registro_iot.es_reenvio(dispositivo, secuencia):
+                registro_iot.latido(dispositivo_id, secuencia)
+                return None
+            registrados = await self.registrar_progresos_en_bloque(socio_id, lecturas)
+            registro_iot.latido(dispositivo_id, secuencia)
+        return registrados
+
+    # =========== ESTADÍSTICAS Y CLASIFICACIONES (scatter-gather) ===========
+
+    async def _posicion_global(self, socio_id: str, tipo: str, clase_id: Optional[str],
+                               hoy: date) -> Tuple[Optional[int], int]:
+        """Puesto del socio entre los de todas las particiones (None si no está clasificado) y el total."""
+        valor = await self._llamar(socio_id, "valor_clasificacion", socio_id, tipo, clase_id, hoy)
+        cuentas = await self._todas("por_delante", socio_id, valor or 0.0, tipo, clase_id, hoy)
+        total = sum(t for _, t in cuentas)
+        return (None if valor is None else 1 + sum(d for d, _ in cuentas)), total
+
+    async def estadisticas_socio(self, socio_id: str) -> Dict[str, object]:
+        hoy = date.today()
+        resumen = await self._llamar(socio_id, "estadisticas_socio", socio_id)
+        # La partición solo conoce a sus socios: los puestos se rehacen con todas
+        (posicion, total), (posicion_volumen, _) = await asyncio.gather(
+            self._posicion_global(socio_id, "puntos", None, hoy),
+            self._posicion_global(socio_id, "volumen_semanal", None, hoy))
+        resumen.update(posicion=posicion, total_socios=total, posicion_volumen_semanal=posicion_volumen)
+        return resumen
+
+    async def clasificacion(self, tipo: str = "puntos", limite: int = 10, desde: int = 0,
+                            clase_id: Optional[str] = None) -> Tuple[int, List[Tuple[int, Socio, float]]]:
+        # Cada partición da sus `desde + limite` primeros; la mezcla ordenada tiene los globales
+        parciales = await self._todas("clasificacion", tipo, desde + limite, 0, clase_id)
+        total = sum(t for t, _ in parciales)
+        mezcla = heapq.merge(*(puestos for _, puestos in parciales), key=lambda p: (-p[2], p[1].id))
+        return total, [(desde + i + 1, socio, valor)
+                       for i, (_, socio, valor) in enumerate(itertools.islice(mezcla, desde, desde + limite))]
+
+    async def posicion_en_clase(self, socio_id: str, clase_id: str) -> Optional[int]:
+        posicion, _ = await self._posicion_global(socio_id, "puntos", clase_id, date.today())
+        return posicion
+
+    # =========== HISTORIAL Y ANALÍTICA ===========
+
+    async def compactar_historial(self, hoy: Optional[date] = None) -> Dict[str, int]:
+        """Cada partición compacta y archiva su propio historial."""
+        resultados = await self._todas("compactar_historial", hoy or date.today())
+        return {clave: sum(r[clave] for r in resultados) for clave in resultados[0]}
+
+    async def estado_historial(self) -> Dict[str, object]:
+        estados = await self._todas("estado_historial")
+        return {
+            **estados[0],
+            "compactado_hasta": min(e["compactado_hasta"] for e in estados),
+            "meses_en_memoria": sorted({m for e in estados for m in e["meses_en_memoria"]}),
+            "resumenes_en_memoria": sum(e["resumenes_en_memoria"] for e in estados),
+            "meses_archivados": sorted({m for e in estados for m in e["meses_archivados"]}),
+            "bytes_archivo": sum(e["bytes_archivo"] for e in estados),
+            "particiones": len(estados),
+        }
+
+    async def exportar_analitica(self) -> Dict[str, Any]:
+        """Junta los socios y registros de todas las particiones en una sola instantánea."""
+        socios, progresos, accesos, resumenes = [], [], [], []
+        for s, p, a, r in await self._todas("datos_analitica"):
+            socios.extend(s)
+            progresos.extend(p)
+            accesos.extend(a)
+            resumenes.append(r)
+        catalogo = self.catalogo
+        return await asyncio.to_thread(catalogo.analitica.exportar, socios, progresos, accesos,
+                                       list(catalogo.clases.values()), unir_tablas(resumenes))
@@ -0,0 +1,215 @@
+import threading
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from src.models.Rutina import Rutina
+
+# Orden de las dificultades / niveles (comparten escala)
+NIVELES = ["principiante", "intermedio", "avanzado"]
+# Duraciones de referencia (min) para codificar la duración como vector
+DURACIONES_REF = [15, 30, 45, 60, 90, 120]
+# Dimensiones del "bag of words" de ejercicios (hashing trick)
+DIM_EJERCICIOS = 64
+# Pesos de cada bloque de características en la puntuación
+PESO_DIFICULTAD = 1.0
+PESO_DURACION = 0.6
+PESO_EJERCICIOS = 0.8
+# Pendiente mínima de peso (kg por sesión) para considerar que el socio progresa
+UMBRAL_PROGRESION = 0.5
+
+DIM = len(NIVELES) + len(DURACIONES_REF) + DIM_EJERCICIOS
+_INI_DURACION = len(NIVELES)
+_INI_EJERCICIOS = _INI_DURACION + len(DURACIONES_REF)
+
+
+def _vector_duracion(minutos: float) -> List[float]:
+    """Codificación "suave": reparte el peso entre las dos duraciones de referencia más cercanas."""
+    v = [0.0] * len(DURACIONES_REF)
+    if minutos <= DURACIONES_REF[0]:
+        v[0] = 1.0
+        return v
+    if minutos >= DURACIONES_REF[-1]:
+        v[-1] = 1.0
+        return v
+    for i in range(len(DURACIONES_REF) - 1):
+        a, b = DURACIONES_REF[i], DURACIONES_REF[i + 1]
+        if a <= minutos <= b:
+            t = (minutos - a) / (b - a)
+            v[i], v[i + 1] = 1.0 - t, t
+            return v
+    return v
+
+
+def _indice_ejercicio(nombre: str) -> int:
+    # crc32 es estable entre procesos (a diferencia de hash())
+    return zlib.crc32(nombre.strip().lower().encode("utf-8")) % DIM_EJERCICIOS
+
+
+class _TendenciaProgreso:
+    """Regresión lineal incremental del peso frente al nº de sesión, y tiempo medio."""
+
+    __slots__ = ("n", "sx", "sy", "sxy", "sxx", "tiempo_total")
+
+    def __init__(self) -> None:
+        self.n = 0
+        self.sx = self.sy = self.sxy = self.sxx = 0.0
+        self.tiempo_total = 0
+
+    def anadir(self, peso: float, tiempo: int) -> None:
+        x = float(self.n)
+        self.n += 1
+        self.sx += x
+        self.sy += peso
+        self.sxy += x * peso
+        self.sxx += x * x
+        self.tiempo_total += tiempo
+
+    def pendiente(self) -> float:
+        den = self.n * self.sxx - self.sx * self.sx
+        if self.n < 2 or den == 0:
+            return 0.0
+        return (self.n * self.sxy - self.sx * self.sy) / den
+
+    def minutos_medios(self) -> Optional[float]:
+        if not self.n or not self.tiempo_total:
+            return None
+        return self.tiempo_total / self.n / 60
+
+
+class RecomendacionService:
+    """
+    Recomendador de rutinas basado en contenido.
+
+    Cada rutina es un vector (dificultad one-hot, duración codificada y bolsa
+    de ejercicios) guardado como fila de una matriz NumPy. El socio se
+    representa con un vector del mismo espacio (su nivel ajustado por la
+    tendencia de su progreso, su duración habitual y los ejercicios de las
+    rutinas que ya tiene) y la recomendación es un producto matriz-vector
+    seguido de un top-k con argpartition.
+
+    Los cambios solo marcan rutinas como pendientes; la matriz se actualiza
+    de forma incremental (solo esas filas) en la siguiente consulta.
+    """
+
+    def __init__(self) -> None:
+        self._np = None
+        self._matriz = None                       # filas 0.._n-1 en uso
+        self._n = 0
+        self._fila_por_id: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._pendientes: Dict[str, Rutina] = {}
+        self._tendencias: Dict[str, _TendenciaProgreso] = {}
+        self._lock = threading.Lock()
+
+    # =========== ACTUALIZACIONES (O(1), sin NumPy) ===========
+
+    def actualizar_rutina(self, rutina: Rutina) -> None:
+        """Marca la rutina para (re)vectorizarla en la próxima consulta."""
+        self._pendientes[rutina.id] = rutina
+
+    def registrar_progreso(self, socio_id: str, peso: float, tiempo: int) -> None:
+        tendencia = self._tendencias.get(socio_id)
+        if tendencia is None:
+            tendencia = self._tendencias[socio_id] = _TendenciaProgreso()
+        tendencia.anadir(peso, tiempo)
+
+    # =========== ÍNDICE ===========
+
+    def _numpy(self):
+        if self._np is None:
+            import numpy
+            self._np = numpy
+            self._matriz = numpy.zeros((64, DIM), dtype=numpy.float32)
+        return self._np
+
+    def _vector_rutina(self, rutina: Rutina):
+        np = self._numpy()
+        v = np.zeros(DIM, dtype=np.float32)
+        v[NIVELES.index(rutina.dificultad)] = PESO_DIFICULTAD
+        v[_INI_DURACION:_INI_EJERCICIOS] = np.asarray(_vector_duracion(rutina.duracion)) * PESO_DURACION
+        ejercicios = v[_INI_EJERCICIOS:]
+        for entrada in rutina.ejercicios:
+            ejercicios[_indice_ejercicio(entrada.ejercicio.nombre)] += 1.0
+        norma = np.linalg.norm(ejercicios)
+        if norma:
+            ejercicios *= PESO_EJERCICIOS / norma
+        return v
+
+    def _sincronizar(self) -> None:
+        """Vuelca en la matriz solo las rutinas nuevas o modificadas."""
+        np = self._numpy()
+        if not self._pendientes:
+            return
+        pendientes, self._pendientes = self._pendientes, {}
+        for rutina_id, rutina in pendientes.items():
+            fila = self._fila_por_id.get(rutina_id)
+            if fila is None:
+                if self._n == len(self._matriz):
+                    # Crecimiento geométrico: inserciones en O(1) amortizado
+                    nueva = np.zeros((len(self._matriz) * 2, DIM), dtype=np.float32)
+                    nueva[:self._n] = self._matriz[:self._n]
+                    self._matriz = nueva
+                fila = self._n
+                self._n += 1
+                self._fila_por_id[rutina_id] = fila
+                self._ids.append(rutina_id)
+            self._matriz[fila] = self._vector_rutina(rutina)
+
+    # =========== CONSULTA ===========
+
+    def _vector_socio(self, nivel: str, rutinas_asignadas: List[str], socio_id: str):
+        np = self._numpy()
+        q = np.zeros(DIM, dtype=np.float32)
+
+        tendencia = self._tendencias.get(socio_id)
+        idx_nivel = NIVELES.index(nivel) if nivel in NIVELES else 0
+        if tendencia is not None and tendencia.pendiente() > UMBRAL_PROGRESION and idx_nivel + 1 < len(NIVELES):
+            # Progresa: mezcla su nivel con el siguiente
+            q[idx_nivel] = 0.6 * PESO_DIFICULTAD
+            q[idx_nivel + 1] = 0.4 * PESO_DIFICULTAD
+        else:
+            q[idx_nivel] = PESO_DIFICULTAD
+
+        filas = [self._fila_por_id[r] for r in rutinas_asignadas if r in self._fila_por_id]
+        minutos = tendencia.minutos_medios() if tendencia is not None else None
+        if minutos is not None:
+            q[_INI_DURACION:_INI_EJERCICIOS] = np.asarray(_vector_duracion(minutos)) * PESO_DURACION
+        elif filas:
+            q[_INI_DURACION:_INI_EJERCICIOS] = self._matriz[filas, _INI_DURACION:_INI_EJERCICIOS].mean(axis=0)
+
+        if filas:
+            ejercicios = self._matriz[filas, _INI_EJERCICIOS:].sum(axis=0)
+            norma = np.linalg.norm(ejercicios)
+            if norma:
+                q[_INI_EJERCICIOS:] = ejercicios * (PESO_EJERCICIOS / norma)
+        return q, filas
+
+    def recomendar(self, socio_id: str, nivel: str, rutinas_asignadas: List[str],
+                   limite: int = 5) -> List[Tuple[str, float]]:
+        """
+        Devuelve hasta `limite` pares (rutina_id, puntuación), de mejor a peor,
+        excluyendo las rutinas que el socio ya tiene asignadas.
+        """
+        with self._lock:
+            return self._recomendar(socio_id, nivel, rutinas_asignadas, limite)
+
+    def _recomendar(self, socio_id: str, nivel: str, rutinas_asignadas: List[str],
+                    limite: int) -> List[Tuple[str, float]]:
+        self._sincronizar()
+        if self._n == 0 or limite <= 0:
+            return []
+        np = self._np
+        q, excluidas = self._vector_socio(nivel, rutinas_asignadas, socio_id)
+        puntuaciones = self._matriz[:self._n] @ q
+        if excluidas:
+            puntuaciones[excluidas] = -np.inf
+
+        k = min(limite, self._n - len(excluidas))
+        if k <= 0:
+            return []
+        candidatas = np.argpartition(-puntuaciones, k - 1)[:k]
+        orden = candidatas[np.argsort(-puntuaciones[candidatas])]
+        return [(self._ids[i], float(puntuaciones[i])) for i in orden]
+
+    def __len__(self) -> int:
+        return self._n + sum(1 for r in self._pendientes if r not in self._fila_por_id)
@@ -0,0 +1,177 @@
+import os
+import threading
+from collections import deque
+from datetime import date
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from src.metrics import registro
+from src.models.Acceso import Acceso
+from src.models.Clase import Clase
+from src.models.DispositivoIoT import DispositivoIoT
+from src.models.Entrenador import Entrenador
+from src.models.SerieClase import SerieClase
+from src.models.Sede import Sede, SEDE_PRINCIPAL
+
+# Configuración
+SEDES_ULTIMOS_ACCESOS = int(os.getenv("SEDES_ULTIMOS_ACCESOS", 1000))  # accesos recientes que guarda cada sede
+
+consultas_catalogo = registro.counter(
+    "gym_sedes_catalogo_total", "Consultas del catálogo de una sede por resultado de la caché (acierto, fallo)",
+    ("resultado",))
+
+
+class IndiceSede:
+    """Lo que pertenece a una sede, para que sus consultas no recorran las de las demás."""
+
+    __slots__ = ("sede", "clases", "series", "entrenadores", "dispositivos", "accesos_por_dia", "ultimos_accesos",
+                 "plazas", "inscritos", "reservas_series", "version", "catalogo", "lock_ocurrencias", "_lock")
+
+    def __init__(self, sede: Sede, max_accesos: int) -> None:
+        self.sede = sede
+        self.clases: Dict[str, Clase] = {}
+        self.series: Dict[str, SerieClase] = {}
+        self.entrenadores: Dict[str, Entrenador] = {}
+        self.dispositivos: Dict[str, DispositivoIoT] = {}
+        self.accesos_por_dia: Dict[date, int] = {}
+        self.ultimos_accesos: Deque[Acceso] = deque(maxlen=max_accesos)
+        self.plazas = 0            # suma de aforos de sus clases semanales
+        self.inscritos = 0         # reservas vigentes en esas clases
+        self.reservas_series = 0   # reservas vigentes en sesiones de sus series
+        self.version = 0           # cambia con cada alta, reserva o cancelación en la sede
+        self.catalogo: Optional[Tuple[int, List[Dict[str, Any]]]] = None  # (versión, filas)
+        # Reservas en sesiones de series: cada sede las serializa por su cuenta
+        self.lock_ocurrencias = threading.Lock()
+        self._lock = threading.Lock()
+
+
+class SedesService:
+    """
+    Sedes del gimnasio e índices por sede: clases, series, entrenadores,
+    dispositivos y accesos de cada una, con su ocupación al día.
+
+    El catálogo de una sede se consulta recorriendo solo su índice y queda
+    en caché hasta que cambia algo de esa sede: las reservas de una sede
+    con mucho movimiento no invalidan el catálogo de las demás, y cada sede
+    serializa aparte las reservas en sesiones de series. La sede principal
+    (SEDE_PRINCIPAL) existe siempre y recibe todo lo que no indica otra.
+    """
+
+    def __init__(self, max_accesos: int = SEDES_ULTIMOS_ACCESOS) -> None:
+        self.max_accesos = max_accesos
+        self._indices: Dict[str, IndiceSede] = {}
+        self._lock = threading.Lock()
+        self.anadir(Sede("Sede principal", sede_id=SEDE_PRINCIPAL))
+
+    # =========== SEDES ===========
+
+    def anadir(self, sede: Sede) -> Sede:
+        with self._lock:
+            if sede.id in self._indices:
+                raise ValueError(f"Error: la sede {sede.id} ya existe.")
+            if any(i.sede.nombre.lower() == sede.nombre.lower() for i in self._indices.values()):
+                raise ValueError(f"Error: ya existe una sede llamada {sede.nombre}.")
+            self._indices[sede.id] = IndiceSede(sede, self.max_accesos)
+        return sede
+
+    def indice(self, sede_id: str) -> IndiceSede:
+        indice = self._indices.get(sede_id)
+        if indice is None:
+            raise ValueError("Error: sede no encontrada.")
+        return indice
+
+    def obtener(self, sede_id: str) -> Sede:
+        return self.indice(sede_id).sede
+
+    def existe(self, sede_id: str) -> bool:
+        return sede_id in self._indices
+
+    def listar(self) -> List[Sede]:
+        return [indice.sede for indice in self._indices.values()]
+
+    # =========== ALTAS ===========
+
+    def alta_clase(self, clase: Clase) -> None:
+        indice = self.indice(clase.sede_id)
+        with indice._lock:
+            indice.clases[clase.id] = clase
+            indice.plazas += clase.aforo
+            indice.inscritos += len(clase.socios_inscritos)
+            indice.version += 1
+
+    def alta_serie(self, serie: SerieClase) -> None:
+        self.indice(serie.sede_id).series[serie.id] = serie
+
+    def alta_entrenador(self, entrenador: Entrenador) -> None:
+        self.indice(entrenador.sede_id).entrenadores[entrenador.id] = entrenador
+
+    def alta_dispositivo(self, dispositivo: DispositivoIoT) -> None:
+        self.indice(dispositivo.sede_id).dispositivos[dispositivo.id] = dispositivo
+
+    def baja_dispositivo(self, dispositivo: DispositivoIoT) -> None:
+        self.indice(dispositivo.sede_id).dispositivos.pop(dispositivo.id, None)
+
+    def acceso(self, acceso: Acceso) -> None:
+        indice = self.indice(acceso.sede_id)
+        with indice._lock:
+            indice.accesos_por_dia[acceso.fecha] = indice.accesos_por_dia.get(acceso.fecha, 0) + 1
+            indice.ultimos_accesos.append(acceso)
+
+    # =========== RESERVAS ===========
+
+    def reserva(self, clase: Clase) -> None:
+        self._anotar(clase, 1)
+
+    def cancelacion(self, clase: Clase) -> None:
+        self._anotar(clase, -1)
+
+    def _anotar(self, clase: Clase, cambio: int) -> None:
+        indice = self.indice(clase.sede_id)
+        with indice._lock:
+            if getattr(clase, "serie_id", None):
+                indice.reservas_series += cambio
+            else:
+                indice.inscritos += cambio
+            indice.version += 1
+
+    # =========== CONSULTAS ===========
+
+    def catalogo(self, sede_id: str, fila: Callable[[Clase], Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Filas del catálogo de la sede (una por clase, construidas con `fila`).
+        Se reconstruyen solo si la sede ha cambiado desde la última consulta;
+        la lista devuelta es compartida y no se debe modificar.
+        """
+        indice = self.indice(sede_id)
+        guardado = indice.catalogo
+        if guardado is not None and guardado[0] == indice.version:
+            consultas_catalogo.inc("acierto")
+            return guardado[1]
+        # Si entra una reserva mientras se construye, la versión guardada ya queda vieja y la siguiente reconstruye
+        version = indice.version
+        filas = [fila(clase) for clase in list(indice.clases.values())]
+        indice.catalogo = (version, filas)
+        consultas_catalogo.inc("fallo")
+        return filas
+
+    def ocupacion(self, sede_id: str, hoy: Optional[date] = None) -> Dict[str, Any]:
+        """Resumen de la sede a partir de sus contadores (no recorre clases ni reservas)."""
+        indice = self.indice(sede_id)
+        return {
+            "sede_id": sede_id,
+            "nombre": indice.sede.nombre,
+            "clases": len(indice.clases),
+            "series": len(indice.series),
+            "entrenadores": len(indice.entrenadores),
+            "plazas": indice.plazas,
+            "inscritos": indice.inscritos,
+            "ocupacion": round(indice.inscritos / indice.plazas, 4) if indice.plazas else 0.0,
+            "reservas_series": indice.reservas_series,
+            "dispositivos": len(indice.dispositivos),
+            "dispositivos_conectados": sum(d.conectado for d in list(indice.dispositivos.values())),
+            "accesos_hoy": indice.accesos_por_dia.get(hoy or date.today(), 0),
+        }
+
+    def ultimos_accesos(self, sede_id: str, limite: int = 100) -> List[Acceso]:
+        """Accesos más recientes de la sede primero (se guardan los `max_accesos` últimos)."""
+        accesos = list(self.indice(sede_id).ultimos_accesos)
+        return accesos[:-limite - 1:-1] if limite else []
@@ -0,0 +1,223 @@
+import asyncio
+import inspect
+import itertools
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.metrics import registro
+
+logger = logging.getLogger(__name__)
+
+# Prioridades (menor número = antes). Con la misma prioridad, orden de llegada.
+PRIORIDAD_ALTA = 0
+PRIORIDAD_NORMAL = 5
+PRIORIDAD_BAJA = 9
+
+# Configuración
+TAREAS_MAX_COLA = int(os.getenv("TAREAS_MAX_COLA", 10_000))        # tareas pendientes como máximo
+TAREAS_WORKERS = int(os.getenv("TAREAS_WORKERS", 4))
+TAREAS_REINTENTOS = int(os.getenv("TAREAS_REINTENTOS", 3))
+TAREAS_RETARDO_REINTENTO = float(os.getenv("TAREAS_RETARDO_REINTENTO", 0.5))  # segundos, se dobla en cada intento
+
+tareas_en_cola = registro.gauge(
+    "gym_tareas_en_cola", "Tareas en segundo plano pendientes de ejecutar")
+tareas_procesadas = registro.counter(
+    "gym_tareas_total", "Tareas en segundo plano por tipo y resultado (ok, reintento, fallida, en_linea)",
+    ("tipo", "resultado"))
+tareas_retraso = registro.histogram(
+    "gym_tareas_retraso_segundos", "Tiempo desde que se encola una tarea hasta que empieza", ("tipo",))
+tareas_duracion = registro.histogram(
+    "gym_tareas_duracion_segundos", "Duración de las tareas en segundo plano", ("tipo",))
+
+
+@dataclass(order=True)
+class _Tarea:
+    prioridad: int
+    secuencia: int
+    tipo: str = field(compare=False)
+    funcion: Callable = field(compare=False)
+    args: Tuple = field(compare=False)
+    kwargs: Dict[str, Any] = field(compare=False)
+    reintentos: int = field(compare=False)
+    en_hilo: bool = field(compare=False)
+    intento: int = field(default=0, compare=False)
+    encolada: float = field(default_factory=time.monotonic, compare=False)
+
+
+class ColaTareas:
+    """
+    Cola de trabajo en segundo plano dentro del proceso: cola de prioridad
+    acotada, un pool de workers en el event loop y reintentos con espera
+    exponencial.
+
+    Las tareas son funciones síncronas. Por defecto se ejecutan en el propio
+    event loop (sin carreras con los endpoints, que también corren ahí); las
+    pesadas se marcan con `en_hilo` y van a un hilo. Una corrutina (p. ej.
+    una que reparte trabajo entre procesos) se espera en el loop.
+
+    Mientras la cola no está iniciada (scripts, benchmarks que montan datos)
+    o si está llena, la tarea se ejecuta en línea: nunca se pierde trabajo,
+    solo se deja de diferir.
+    """
+
+    def __init__(self, max_cola: int = TAREAS_MAX_COLA, workers: int = TAREAS_WORKERS,
+                 reintentos: int = TAREAS_REINTENTOS, retardo_reintento: float = TAREAS_RETARDO_REINTENTO) -> None:
+        self.max_cola = max_cola
+        self.workers = workers
+        self.reintentos = reintentos
+        self.retardo_reintento = retardo_reintento
+        self._secuencia = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._hilo_loop: Optional[int] = None
+        self._cola: Optional[asyncio.PriorityQueue] = None
+        self._workers: List[asyncio.Task] = []
+        self._reintentos_pendientes = 0
+        self._periodicas: List[Tuple[str, float, Callable, Tuple, Dict[str, Any], int, bool]] = []
+        self._temporizadores: List[asyncio.Task] = []
+
+    @property
+    def activa(self) -> bool:
+        return self._loop is not None
+
+    async def iniciar(self) -> None:
+        """Arranca los workers en el event loop actual (se llama en el startup de la app)."""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        # Un proceso hijo (fork) hereda una cola ligada al loop del padre: se empieza de cero
+        self._loop, self._hilo_loop = loop, threading.get_ident()
+        self._cola = asyncio.PriorityQueue(self.max_cola)
+        self._workers = [loop.create_task(self._worker()) for _ in range(self.workers)]
+        self._temporizadores = [loop.create_task(self._periodica(*p)) for p in self._periodicas]
+        tareas_en_cola.set(0)
+
+    async def detener(self, espera: float = 5.0) -> None:
+        """Espera hasta `espera` segundos a que se vacíe la cola y para los workers."""
+        if self._cola is None:
+            return
+        for temporizador in self._temporizadores:
+            temporizador.cancel()
+        try:
+            await asyncio.wait_for(self.esperar_vacia(), espera)
+        except asyncio.TimeoutError:
+            logger.warning("Se descartan %d tareas en segundo plano pendientes al parar.", self._cola.qsize())
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, *self._temporizadores, return_exceptions=True)
+        self._loop = self._hilo_loop = self._cola = None
+        self._workers = []
+        self._temporizadores = []
+
+    async def esperar_vacia(self) -> None:
+        """Espera a que terminen todas las tareas encoladas (incluidos sus reintentos)."""
+        while True:
+            await self._cola.join()
+            if not self._reintentos_pendientes and not self._cola.qsize():
+                return
+            await asyncio.sleep(self.retardo_reintento / 4)
+
+    def pendientes(self) -> int:
+        return self._cola.qsize() if self._cola is not None else 0
+
+    # =========== ENCOLAR ===========
+
+    def encolar(self, tipo: str, funcion: Callable, *args, prioridad: int = PRIORIDAD_NORMAL,
+                reintentos: Optional[int] = None, en_hilo: bool = False, **kwargs) -> bool:
+        """
+        Difiere `funcion(*args, **kwargs)`. Se puede llamar desde el event loop
+        o desde cualquier hilo. Devuelve False si se ejecutó en línea.
+        """
+        tarea = _Tarea(prioridad, next(self._secuencia), tipo, funcion, args, kwargs,
+                       self.reintentos if reintentos is None else reintentos, en_hilo)
+        loop = self._loop
+        if loop is None:
+            self._en_linea(tarea)
+            return False
+        if threading.get_ident() != self._hilo_loop:
+            loop.call_soon_threadsafe(self._poner, tarea)
+            return True
+        return self._poner(tarea)
+
+    def cada(self, tipo: str, intervalo: float, funcion: Callable, *args,
+             prioridad: int = PRIORIDAD_BAJA, en_hilo: bool = False, **kwargs) -> None:
+        """
+        Encola `funcion(*args, **kwargs)` cada `intervalo` segundos mientras la
+        cola esté iniciada (mantenimiento periódico). La primera vez, pasado
+        un intervalo.
+        """
+        periodica = (tipo, intervalo, funcion, args, kwargs, prioridad, en_hilo)
+        self._periodicas.append(periodica)
+        if self._loop is not None:
+            self._temporizadores.append(self._loop.create_task(self._periodica(*periodica)))
+
+    def quitar(self, tipo: str) -> None:
+        """Quita la tarea periódica `tipo` antes de iniciar la cola (p. ej. para sustituirla por otra)."""
+        self._periodicas = [p for p in self._periodicas if p[0] != tipo]
+
+    async def _periodica(self, tipo: str, intervalo: float, funcion: Callable, args: Tuple,
+                         kwargs: Dict[str, Any], prioridad: int, en_hilo: bool) -> None:
+        while True:
+            await asyncio.sleep(intervalo)
+            self.encolar(tipo, funcion, *args, prioridad=prioridad, reintentos=0, en_hilo=en_hilo, **kwargs)
+
+    def _poner(self, tarea: _Tarea) -> bool:
+        if self._cola is not None:
+            try:
+                self._cola.put_nowait(tarea)
+                tareas_en_cola.inc()
+                return True
+            except asyncio.QueueFull:
+                pass
+        # Cola llena (o ya parada): la petición paga el trabajo en vez de perderlo
+        self._en_linea(tarea)
+        return False
+
+    @staticmethod
+    def _en_linea(tarea: _Tarea) -> None:
+        tareas_procesadas.inc(tarea.tipo, "en_linea")
+        resultado = tarea.funcion(*tarea.args, **tarea.kwargs)
+        if inspect.isawaitable(resultado):
+            asyncio.ensure_future(resultado)  # solo desde el loop: sin él no hay quien la espere
+
+    # =========== WORKERS ===========
+
+    async def _worker(self) -> None:
+        while True:
+            tarea = await self._cola.get()
+            tareas_en_cola.dec()
+            inicio = time.monotonic()
+            tareas_retraso.observe(inicio - tarea.encolada, tarea.tipo)
+            try:
+                if tarea.en_hilo:
+                    await asyncio.to_thread(tarea.funcion, *tarea.args, **tarea.kwargs)
+                else:
+                    resultado = tarea.funcion(*tarea.args, **tarea.kwargs)
+                    if inspect.isawaitable(resultado):
+                        await resultado
+                tareas_procesadas.inc(tarea.tipo, "ok")
+            except Exception:
+                self._fallo(tarea)
+            finally:
+                tareas_duracion.observe(time.monotonic() - inicio, tarea.tipo)
+                self._cola.task_done()
+
+    def _fallo(self, tarea: _Tarea) -> None:
+        """Se llama desde el `except` del worker: logger.exception recoge la excepción en curso."""
+        if tarea.intento >= tarea.reintentos:
+            tareas_procesadas.inc(tarea.tipo, "fallida")
+            logger.exception("Tarea %s fallida tras %d intentos", tarea.tipo, tarea.intento + 1)
+            return
+        tareas_procesadas.inc(tarea.tipo, "reintento")
+        tarea.intento += 1
+        self._reintentos_pendientes += 1
+
+        def reencolar():
+            self._reintentos_pendientes -= 1
+            tarea.encolada = time.monotonic()
+            self._poner(tarea)
+
+        self._loop.call_later(self.retardo_reintento * 2 ** (tarea.intento - 1), reencolar)
@@ -1,39 +1,175 @@
+import os
+import threading
+import time
+import uuid
 from datetime import datetime, timedelta, timezone
-from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from typing import Optional, Tuple
+
+from src.metrics import registro, temporizar
 
 # Configuración
 SECRET_KEY = "tu-clave-secreta-muy-segura-cambiar-en-produccion"
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 7))
+
+# Tipos de token (claim "tipo"): solo los de acceso abren los endpoints protegidos
+TOKEN_ACCESO = "access"
+TOKEN_REFRESCO = "refresh"
+
+# Emails con permisos de administración (lista separada por comas)
+ADMIN_EMAILS = {e.strip() for e in os.getenv("ADMIN_EMAILS", "").split(",") if e.strip()}
+
+# Coste de bcrypt (log2 de las iteraciones): cada punto más duplica lo que tarda un login.
+# "auto" elige al arrancar el mayor que verifica en BCRYPT_OBJETIVO_MS o menos en esta máquina
+# (ver benchmarks/bench_bcrypt.py). Las contraseñas con otro coste se rehashean al entrar.
+BCRYPT_ROUNDS = os.getenv("BCRYPT_ROUNDS", "12")
+BCRYPT_OBJETIVO_MS = float(os.getenv("BCRYPT_OBJETIVO_MS", 250))
+BCRYPT_MIN_ROUNDS, BCRYPT_MAX_ROUNDS = 10, 16  # márgenes de la calibración automática
+
+coste_bcrypt = registro.gauge("gym_bcrypt_rounds", "Coste (log2 de iteraciones) con el que se hashean las contraseñas")
+rehashes = registro.counter(
+    "gym_bcrypt_rehash_total", "Contraseñas rehasheadas al entrar porque su coste no era el configurado")
+
+# Contexto para hashing de contraseñas.
+# Se crea en el primer uso (no al importar) y es compartido por todo el backend,
+# así el arranque no paga la carga de passlib/bcrypt.
+_pwd_context = None
+_pwd_context_lock = threading.Lock()
+
+def tiempo_verificacion(rondas: int, repeticiones: int = 3) -> float:
+    """Segundos que tarda en esta máquina verificar una contraseña hasheada con `rondas` (el mínimo de varias)."""
+    from passlib.hash import bcrypt
+    hashed = bcrypt.using(rounds=rondas).hash("calibracion")
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        bcrypt.verify("calibracion", hashed)
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+def calibrar_coste(objetivo_ms: float = BCRYPT_OBJETIVO_MS, minimo: int = BCRYPT_MIN_ROUNDS,
+                   maximo: int = BCRYPT_MAX_ROUNDS) -> int:
+    """Mayor coste entre `minimo` y `maximo` cuya verificación no pasa de `objetivo_ms`."""
+    rondas = minimo
+    segundos = tiempo_verificacion(rondas, repeticiones=1)
+    # Cada ronda más duplica el tiempo: se sube mientras el doble siga dentro del objetivo
+    while rondas < maximo and segundos * 2 * 1000 <= objetivo_ms:
+        rondas += 1
+        segundos = tiempo_verificacion(rondas, repeticiones=1)
+    return rondas
 
-# Contexto para hashing de contraseñas
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+def _coste_configurado() -> int:
+    if BCRYPT_ROUNDS.strip().lower() == "auto":
+        rondas = calibrar_coste()
+        # Los procesos hijos (importación masiva, particiones) heredan el coste elegido y no recalibran
+        os.environ["BCRYPT_ROUNDS"] = str(rondas)
+        print(f"🔐 Coste de bcrypt calibrado: {rondas} (objetivo {BCRYPT_OBJETIVO_MS:.0f} ms por verificación)")
+        return rondas
+    rondas = int(BCRYPT_ROUNDS)
+    if not 4 <= rondas <= 31:
+        raise ValueError(f"Error: BCRYPT_ROUNDS debe estar entre 4 y 31 (o ser 'auto'): {BCRYPT_ROUNDS}")
+    return rondas
+
+def get_pwd_context():
+    """Devuelve el CryptContext compartido, creándolo la primera vez."""
+    global _pwd_context
+    if _pwd_context is None:
+        with _pwd_context_lock:
+            if _pwd_context is None:
+                from passlib.context import CryptContext
+                rondas = _coste_configurado()
+                # min = max = coste: needs_update marca cualquier hash con otro coste, suba o baje la política
+                _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__default_rounds=rondas,
+                                            bcrypt__min_rounds=rondas, bcrypt__max_rounds=rondas)
+                coste_bcrypt.set(rondas)
+    return _pwd_context
 
 def hash_password(password: str) -> str:
     """Hashea una contraseña."""
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica una contraseña contra su hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+def verify_and_rehash(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifica una contraseña y, si es correcta pero su hash no sigue la política
+    actual (otro coste), devuelve también el hash nuevo para guardarlo.
+
+    Returns:
+        (válida, hash nuevo o None si el actual sirve)
+    """
+    valida, nuevo_hash = get_pwd_context().verify_and_update(plain_password, hashed_password)
+    if nuevo_hash:
+        rehashes.inc()
+    return valida, nuevo_hash
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
-    """Crea un token JWT."""
+    """Crea un token JWT de acceso (ACCESS_TOKEN_EXPIRE_MINUTES si no se indica otra duración)."""
+    from jose import jwt
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
     else:
-        expire = datetime.now(timezone.utc) + timedelta(minutes=15)
+        expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    to_encode.setdefault("jti", uuid.uuid4().hex)
+    to_encode.setdefault("tipo", TOKEN_ACCESO)
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def create_refresh_token(email: str, sesion_id: str, jti: str,
+                         expires_delta: Optional[timedelta] = None) -> str:
+    """Crea el token de refresco de una sesión: sirve para pedir tokens de acceso nuevos sin contraseña."""
+    return create_access_token({"sub": email, "sid": sesion_id, "jti": jti, "tipo": TOKEN_REFRESCO},
+                               expires_delta or timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+
 def decode_token(token: str) -> Optional[dict]:
     """Decodifica un token JWT."""
+    from jose import JWTError, jwt
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         return payload
     except JWTError:
-        return None
\ No newline at end of file
+        return None
+
+def es_admin(email: Optional[str]) -> bool:
+    """Indica si el email pertenece a un administrador."""
+    return bool(email) and email in ADMIN_EMAILS
+
+def payload_de_scope(scope, token: Optional[str] = None) -> Optional[dict]:
+    """
+    Payload del token (por defecto el Bearer de la petición ASGI), o None si
+    no hay token o no es válido. Se decodifica una sola vez por petición: el
+    resultado queda en scope["state"] y lo reutilizan los middlewares (rate
+    limit, idempotencia, perfilado) y las dependencias de autenticación.
+    """
+    if token is None:
+        for nombre, valor in scope.get("headers", ()):
+            if nombre == b"authorization":
+                esquema, _, token = valor.decode("latin-1").partition(" ")
+                if esquema.lower() != "bearer":
+                    token = None
+                break
+        if not token:
+            return None
+    estado = scope.setdefault("state", {})
+    guardado = estado.get("jwt")
+    if guardado is not None and guardado[0] == token:
+        return guardado[1]
+    with temporizar("jwt_decode"):
+        payload = decode_token(token)
+    estado["jwt"] = (token, payload)
+    return payload
+
+def email_de_scope(scope) -> Optional[str]:
+    """
+    Devuelve el email (sub) del token Bearer de una petición ASGI, o None.
+    Pensado para middlewares que se ejecutan antes de las dependencias.
+    """
+    payload = payload_de_scope(scope)
+    if payload and payload.get("tipo", TOKEN_ACCESO) == TOKEN_ACCESO:
+        return payload.get("sub")
+    return None
@@ -0,0 +1,245 @@
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from src.auth import email_de_scope
+from src.metrics import registro
+
+# Configuración (sobrescribible por variables de entorno)
+IDEMPOTENCIA_TTL = float(os.getenv("IDEMPOTENCIA_TTL", 24 * 3600))          # segundos que se recuerda una clave
+IDEMPOTENCIA_MAX_CLAVES = int(os.getenv("IDEMPOTENCIA_MAX_CLAVES", 50_000))  # respuestas guardadas como máximo
+IDEMPOTENCIA_ESPERA = float(os.getenv("IDEMPOTENCIA_ESPERA", 10))           # espera de un reintento a la original
+IDEMPOTENCIA_MAX_CUERPO = int(os.getenv("IDEMPOTENCIA_MAX_CUERPO", 1 << 20))  # bytes; por encima no se deduplica
+METODOS_ESCRITURA = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+MAX_LONGITUD_CLAVE = 255
+
+peticiones_idempotentes = registro.counter(
+    "gym_idempotencia_total",
+    "Peticiones con Idempotency-Key por resultado (nueva, repetida, esperada, conflicto, olvidada, omitida)", ("resultado",))
+claves_idempotencia = registro.gauge(
+    "gym_idempotencia_claves", "Respuestas guardadas para reintentos con Idempotency-Key")
+
+
+class _Entrada:
+    """Petición original: su huella y, cuando termina, la respuesta que se repite."""
+
+    __slots__ = ("huella", "expira", "terminada", "estado", "cabeceras", "cuerpo")
+
+    def __init__(self, huella: bytes, expira: float) -> None:
+        self.huella = huella
+        self.expira = expira
+        self.terminada = asyncio.Event()
+        self.estado: Optional[int] = None
+        self.cabeceras: List[Tuple[bytes, bytes]] = []
+        self.cuerpo = b""
+
+
+class CacheIdempotencia:
+    """
+    Respuestas de las escrituras con Idempotency-Key, por usuario y clave.
+
+    Acotada en número de claves y con TTL. Como el TTL es el mismo para todas,
+    el orden de inserción es también el de caducidad: la purga solo toca las
+    entradas del principio que han caducado (o que sobran), nunca recorre la
+    caché. Se usa desde el event loop, así que no necesita lock.
+    """
+
+    def __init__(self, ttl: float = IDEMPOTENCIA_TTL, max_claves: int = IDEMPOTENCIA_MAX_CLAVES) -> None:
+        self.ttl = ttl
+        self.max_claves = max_claves
+        self._entradas: "OrderedDict[Tuple[str, str], _Entrada]" = OrderedDict()
+        registro.al_recolectar(lambda: claves_idempotencia.set(len(self._entradas)))
+
+    def _purgar(self, ahora: float) -> None:
+        entradas = self._entradas
+        while entradas:
+            primera = next(iter(entradas.values()))
+            if primera.expira > ahora and len(entradas) <= self.max_claves:
+                return
+            entradas.popitem(last=False)
+
+    def obtener(self, clave: Tuple[str, str]) -> Optional[_Entrada]:
+        self._purgar(time.monotonic())
+        return self._entradas.get(clave)
+
+    def reservar(self, clave: Tuple[str, str], huella: bytes) -> _Entrada:
+        """Registra la petición original (en curso) para que los reintentos la esperen."""
+        ahora = time.monotonic()
+        entrada = self._entradas[clave] = _Entrada(huella, ahora + self.ttl)
+        self._purgar(ahora)
+        return entrada
+
+    def olvidar(self, clave: Tuple[str, str], entrada: _Entrada) -> None:
+        """Descarta una original que no terminó bien: el siguiente reintento se ejecuta de nuevo."""
+        if self._entradas.get(clave) is entrada:
+            del self._entradas[clave]
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+
+def _propietario(scope) -> str:
+    """Las claves son por usuario (email del token) o, sin token, por IP."""
+    email = email_de_scope(scope)
+    if email:
+        return "user:" + email
+    cliente = scope.get("client")
+    return "ip:" + (cliente[0] if cliente else "desconocido")
+
+
+def _longitud_declarada(scope) -> Optional[int]:
+    valor = next((v for n, v in scope.get("headers", ()) if n == b"content-length"), None)
+    try:
+        return int(valor) if valor is not None else None
+    except ValueError:
+        return None
+
+
+async def _leer_cuerpo(receive, maximo: int) -> Tuple[List[dict], Optional[bytes]]:
+    """
+    Lee el cuerpo hasta `maximo` bytes.
+
+    Returns:
+        (mensajes leídos, cuerpo completo); el cuerpo es None si pasa de `maximo`
+        y entonces los mensajes son solo los leídos hasta ese momento
+    """
+    mensajes, total = [], 0
+    while True:
+        mensaje = await receive()
+        mensajes.append(mensaje)
+        if mensaje["type"] != "http.request":
+            break
+        total += len(mensaje.get("body", b""))
+        if total > maximo:
+            return mensajes, None
+        if not mensaje.get("more_body"):
+            break
+    return mensajes, b"".join(m.get("body", b"") for m in mensajes if m["type"] == "http.request")
+
+
+async def _sin_idempotencia(app, scope, receive, send, leidos: List[dict]) -> None:
+    """Ejecuta la petición normal, entregando primero los mensajes del cuerpo que ya se leyeron."""
+    peticiones_idempotentes.inc("omitida")
+
+    async def receive_reponiendo():
+        if leidos:
+            return leidos.pop(0)
+        return await receive()
+
+    await app(scope, receive_reponiendo, send)
+
+
+async def _responder(send, estado: int, cabeceras: List[Tuple[bytes, bytes]], cuerpo: bytes) -> None:
+    await send({"type": "http.response.start", "status": estado, "headers": cabeceras})
+    await send({"type": "http.response.body", "body": cuerpo})
+
+
+async def _responder_error(send, estado: int, detalle: str) -> None:
+    cuerpo = ('{"detail":"%s"}' % detalle).encode("utf-8")
+    await _responder(send, estado, [(b"content-type", b"application/json"),
+                                    (b"content-length", str(len(cuerpo)).encode())], cuerpo)
+
+
+class IdempotenciaMiddleware:
+    """
+    Middleware ASGI: una escritura con cabecera Idempotency-Key se ejecuta una
+    sola vez. Su respuesta se guarda y los reintentos con la misma clave la
+    reciben tal cual (con Idempotent-Replayed: true) sin volver a ejecutar
+    nada; si la original sigue en curso, el reintento la espera.
+
+    Solo se guardan las respuestas que no merece la pena repetir (< 500 y
+    distintas de 429); tras un error del servidor el reintento se ejecuta.
+    Reutilizar una clave con otro método, ruta o cuerpo responde 422.
+
+    La huella necesita el cuerpo entero en memoria, así que los cuerpos de
+    más de `max_cuerpo` bytes (una importación masiva) no se deduplican: la
+    petición se ejecuta sin más, sin que el middleware retenga su cuerpo.
+    """
+
+    def __init__(self, app, cache: CacheIdempotencia, espera: float = IDEMPOTENCIA_ESPERA,
+                 max_cuerpo: int = IDEMPOTENCIA_MAX_CUERPO):
+        self.app = app
+        self.cache = cache
+        self.espera = espera
+        self.max_cuerpo = max_cuerpo
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in METODOS_ESCRITURA:
+            await self.app(scope, receive, send)
+            return
+        clave_cliente = next((v for n, v in scope.get("headers", ()) if n == b"idempotency-key"), None)
+        if clave_cliente is None:
+            await self.app(scope, receive, send)
+            return
+        if not clave_cliente or len(clave_cliente) > MAX_LONGITUD_CLAVE:
+            await _responder_error(send, 400, f"Idempotency-Key debe tener entre 1 y {MAX_LONGITUD_CLAVE} caracteres")
+            return
+
+        longitud = _longitud_declarada(scope)
+        if longitud is not None and longitud > self.max_cuerpo:
+            await _sin_idempotencia(self.app, scope, receive, send, [])
+            return
+        leidos, cuerpo = await _leer_cuerpo(receive, self.max_cuerpo)
+        if cuerpo is None:
+            await _sin_idempotencia(self.app, scope, receive, send, leidos)
+            return
+        huella = hashlib.sha256(b"\0".join((scope["method"].encode(), scope["path"].encode(),
+                                            scope.get("query_string", b""), cuerpo))).digest()
+        clave = (_propietario(scope), clave_cliente.decode("latin-1"))
+
+        while True:
+            entrada = self.cache.obtener(clave)
+            if entrada is None:
+                break
+            if entrada.huella != huella:
+                peticiones_idempotentes.inc("conflicto")
+                await _responder_error(send, 422, "Idempotency-Key ya usada con otra petición")
+                return
+            if entrada.estado is not None:
+                peticiones_idempotentes.inc("repetida")
+                await _responder(send, entrada.estado, entrada.cabeceras + [(b"idempotent-replayed", b"true")],
+                                 entrada.cuerpo)
+                return
+            # La original sigue en curso: se espera a su respuesta (o a que falle y se olvide)
+            peticiones_idempotentes.inc("esperada")
+            try:
+                await asyncio.wait_for(entrada.terminada.wait(), self.espera)
+            except asyncio.TimeoutError:
+                await _responder_error(send, 409, "La petición original con esta Idempotency-Key sigue en curso")
+                return
+
+        entrada = self.cache.reservar(clave, huella)
+        peticiones_idempotentes.inc("nueva")
+        inicio = {}
+        partes: List[bytes] = []
+
+        async def receive_con_cuerpo():
+            # El cuerpo ya se leyó para la huella: se entrega de una vez y luego se delega (desconexión)
+            nonlocal cuerpo
+            if cuerpo is not None:
+                mensaje, cuerpo = {"type": "http.request", "body": cuerpo, "more_body": False}, None
+                return mensaje
+            return await receive()
+
+        async def send_guardando(mensaje):
+            if mensaje["type"] == "http.response.start":
+                inicio.update(mensaje)
+            elif mensaje["type"] == "http.response.body":
+                partes.append(mensaje.get("body", b""))
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive_con_cuerpo, send_guardando)
+        finally:
+            estado = inicio.get("status")
+            if estado is not None and estado < 500 and estado != 429:
+                entrada.cabeceras = list(inicio.get("headers", ()))
+                entrada.cuerpo = b"".join(partes)
+                entrada.estado = estado
+            else:
+                peticiones_idempotentes.inc("olvidada")
+                self.cache.olvidar(clave, entrada)
+            entrada.terminada.set()
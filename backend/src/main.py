@@ -1,77 +1,149 @@
 import sys
 import os
+import json
+from datetime import date, datetime, timedelta
 # Ajuste de path para que Docker encuentre los módulos correctamente
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from typing import List, Optional
 
 # Importaciones del proyecto
 from src.Services.Gimnasio_service import GimnasioService
+from src.Services.Gimnasio_async_service import GimnasioServiceAsync
+from src.Services.Particiones_service import GimnasioParticionado, PARTICIONES_SOCIOS
+from src.Services.Carga_masiva_service import CargaMasivaService
+from src.Services.Analitica_service import CAMPOS_PROGRESO
 from src.schemas.schemas import (
     SocioCreate, SocioResponse, 
+    EstadisticasResponse, ClasificacionResponse, PuestoClasificacion,
     ClaseCreate, ClaseResponse, 
-    Token, ReservaRequest, 
-    RutinaResponse, RutinaCreate,
-    EntrenadorCreate, EntrenadorResponse
+    SerieCreate, SerieResponse, OcurrenciaResponse,
+    Token, RefreshRequest, ReservaRequest, AvisoCreate, AvisoResponse, 
+    RutinaResponse, RutinaCreate, RutinaRecomendadaResponse,
+    RutinaDetalleResponse, EjercicioRutinaCreate, EjercicioRutinaResponse,
+    EjercicioCreate, EjercicioResponse,
+    EntrenadorCreate, EntrenadorResponse, FranjaHorario, DisponibilidadResponse,
+    SedeCreate, SedeResponse, OcupacionSedeResponse, AccesoResponse,
+    BusquedaResponse, ResultadoBusqueda,
+    ImportacionResponse, IngestaIoTResponse, DispositivoCreate, DispositivoResponse, ProgresoResponse
 )
 from src.models.Socio import Socio
-from src.models.DispositivoIoT import DispositivoIoT 
-from src.auth import create_access_token, decode_token  # Importamos auth
+from src.models.SerieClase import parsear_rrule
+from src.models.Sede import SEDE_PRINCIPAL
+from src import protocolo_iot
+from src.auth import (create_access_token, create_refresh_token, decode_token, email_de_scope, es_admin,
+                      payload_de_scope, TOKEN_ACCESO, TOKEN_REFRESCO)  # Importamos auth
+from src.sesiones import AlmacenSesiones
+from src.rate_limit import ControlCarga, ControlCargaMiddleware
+from src.idempotencia import CacheIdempotencia, IdempotenciaMiddleware
+from src.metrics import MetricasMiddleware, medir_serializacion, registro
+from src.profiling import PerfiladoMiddleware, PerfilesPeticiones, instalar_senal, perfilar
 
 app = FastAPI(title="Gimnasio Inteligente API")
 gym_service = GimnasioService()
+# Los endpoints son async def y usan la API asíncrona (bcrypt en un pool propio, I/O con await).
+# Con PARTICIONES_SOCIOS > 1 los datos de los socios viven en particiones en otros procesos
+# y gym_service queda como catálogo del coordinador (misma API asíncrona)
+if PARTICIONES_SOCIOS > 1:
+    gym_async = GimnasioParticionado(PARTICIONES_SOCIOS, catalogo=gym_service)
+    carga_masiva = CargaMasivaService(gym_service, socios=gym_async)
+else:
+    gym_async = GimnasioServiceAsync(gym_service)
+    carga_masiva = CargaMasivaService(gym_service)
+# Sesiones con token de refresco y revocación de tokens (logout)
+sesiones = AlmacenSesiones()
+
+# Escrituras con Idempotency-Key: los reintentos reciben la respuesta original sin repetir
+# el trabajo. Va por dentro del rate limiting para que un 429 nunca quede guardado.
+cache_idempotencia = CacheIdempotencia()
+app.add_middleware(IdempotenciaMiddleware, cache=cache_idempotencia)
+
+# Rate limiting y control de admisión (ver src/rate_limit.py para la configuración)
+control_carga = ControlCarga()
+app.add_middleware(ControlCargaMiddleware, control=control_carga)
+
+# Perfilado por petición con la cabecera X-Debug-Profile (solo administradores)
+perfiles_peticiones = PerfilesPeticiones()
+app.add_middleware(PerfiladoMiddleware, perfiles=perfiles_peticiones,
+                   autorizado=lambda scope: es_admin(email_de_scope(scope)))
+
+# Métricas: se añade el último para envolver también las respuestas 429/503
+app.add_middleware(MetricasMiddleware)
+medir_serializacion()
+clases_corruptas = registro.counter(
+    "gym_clases_corruptas_total", "Clases omitidas en el listado por datos corruptos")
+
+# Fixture con los datos semilla (se puede sustituir por entorno)
+SEED_FILE = os.getenv("SEED_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "semilla.json"))
 
 # --- EVENTO DE INICIO: CARGA DE DATOS AUTOMÁTICA ---
 @app.on_event("startup")
-def startup_event():
+async def startup_event():
     """Inicializa el gimnasio con datos de prueba al arrancar."""
     print("🚀 Arrancando sistema... Verificando datos iniciales...")
+
+    # Workers de las tareas en segundo plano (agregados, índices de importaciones)
+    await gym_service.tareas.iniciar()
+    # Barrido periódico de dispositivos IoT sin latido
+    await gym_service.registro_iot.iniciar()
+
+    # kill -USR2 <pid> lanza un perfilado del proceso (ver src/profiling.py)
+    instalar_senal()
     
     # 1. Chequear si ya hay datos (por si implementas persistencia futura)
-    if not gym_service.listar_entrenadores():
-        print("⚡ Base de datos vacía. Creando datos semilla...")
-        
-        # A) Crear Entrenadores
-        e1 = gym_service.registrar_entrenador("Yago Fontenla", "yago@gym.com", "CrossFit")
-        e2 = gym_service.registrar_entrenador("Ana López", "ana@gym.com", "Yoga")
-        
-        # B) Crear Clases (Usando los IDs de los entrenadores creados)
-        gym_service.crear_clase("Yoga Matutino", "08:00", 15, e2.id)
-        gym_service.crear_clase("CrossFit Duro", "18:00", 10, e1.id)
-        gym_service.crear_clase("Pilates Core", "19:30", 12, e2.id)
-        
-        # C) Crear Rutinas
-        gym_service.crear_rutina("Fuerza Básica", 45, "principiante")
-        gym_service.crear_rutina("Cardio HIIT", 30, "avanzado")
-        
-        # D) Crear un Usuario Admin/Demo (Opcional, para entrar rápido)
-        # gym_service.registrar_socio("Admin Demo", "admin@gym.com", "1990-01-01", "avanzado", "1234")
+    if not gym_service.entrenadores:
+        print("⚡ Base de datos vacía. Cargando datos semilla...")
 
-        # E) Crear Dispositivo IoT de Demo
-        demo_device = DispositivoIoT(tipo="pulsera", socio_id="demo_user")
-        demo_device.id = "pulsera-web"  # Forzamos el ID que busca el frontend
-        gym_service.dispositivos["pulsera-web"] = demo_device
+        # El fixture solo se lee si hace falta y se inserta en bloque:
+        # Entrenadores, Clases, Ejercicios y Rutinas
+        with open(SEED_FILE, encoding="utf-8") as f:
+            gym_service.cargar_semilla(json.load(f))
         
         print("✅ Datos iniciales cargados correctamente.")
     else:
         print("👍 El sistema ya tiene datos.")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Termina las tareas pendientes y libera los procesos de la importación masiva y los hilos de CPU."""
+    await gym_service.registro_iot.detener()
+    await gym_service.tareas.detener()
+    # Lo que quede por repartir sale antes de cerrar los sumideros
+    await run_in_threadpool(gym_service.notificaciones.cerrar)
+    carga_masiva.cerrar()
+    gym_service.analitica.cerrar()
+    await gym_async.cerrar()
+
 # Endpoint para Swagger UI (Pide usuario/contraseña)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 # --- AUTENTICACIÓN (Práctica 4) ---
 
+def _emitir_tokens(email: str, sesion_id: str, refresco: str) -> dict:
+    """Token de acceso y de refresco de una sesión (el de refresco caduca con ella)."""
+    access_token = create_access_token(data={"sub": email, "sid": sesion_id})
+    restante = timedelta(seconds=max(sesiones.expira(sesion_id) - datetime.now().timestamp(), 1))
+    return {"access_token": access_token, "token_type": "bearer",
+            "refresh_token": create_refresh_token(email, sesion_id, refresco, restante),
+            "expires_in": int(sesiones.duracion_acceso)}
+
 @app.post("/token", response_model=Token)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
     """
     Endpoint estándar OAuth2 para obtener el token JWT.
     Username = email del socio
     Password = contraseña del socio
+
+    Además del token de acceso devuelve uno de refresco: con él, /token/refresh
+    renueva la sesión sin volver a pasar por bcrypt.
     """
-    # Usamos el servicio para verificar credenciales de forma segura
-    socio = gym_service.autenticar_socio(form_data.username, form_data.password)
+    # Usamos el servicio para verificar credenciales de forma segura.
+    # bcrypt es CPU puro: el servicio asíncrono lo ejecuta en su pool de CPU sin bloquear el event loop
+    socio = await gym_async.autenticar_socio(form_data.username, form_data.password)
     
     if not socio:
         raise HTTPException(
@@ -80,19 +152,46 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Si es correcto, generamos el token
-    access_token = create_access_token(data={"sub": socio.email})
-    return {"access_token": access_token, "token_type": "bearer"}
+    # Si es correcto, abrimos la sesión y generamos los tokens
+    sesion_id, refresco = sesiones.abrir(socio.email)
+    return _emitir_tokens(socio.email, sesion_id, refresco)
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    """Dependencia para proteger endpoints"""
-    payload = decode_token(token)
-    if not payload:
+@app.post("/token/refresh", response_model=Token)
+async def refrescar_token(peticion: RefreshRequest):
+    """
+    Canjea el token de refresco por tokens nuevos (sin contraseña ni bcrypt).
+    Cada token de refresco vale una sola vez: reutilizar uno ya canjeado cierra la sesión.
+    """
+    payload = decode_token(peticion.refresh_token)
+    rotado = None
+    if payload and payload.get("tipo") == TOKEN_REFRESCO and payload.get("sid"):
+        rotado = sesiones.rotar(payload["sid"], payload.get("jti"))
+    if rotado is None or await gym_async.buscar_socio_por_email(rotado[0]) is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Sesión inválida o expirada",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return _emitir_tokens(rotado[0], payload["sid"], rotado[1])
+
+def _validar_token(request: Request, token: str) -> dict:
+    """
+    Payload de un token de acceso vigente y no revocado; 401 si no lo es.
+    Normalmente ya lo decodificó el rate limiter y se lee de request.state.
+    """
+    payload = payload_de_scope(request.scope, token)
+    if (not payload or payload.get("tipo", TOKEN_ACCESO) != TOKEN_ACCESO
+            or sesiones.revocado((payload.get("jti"), payload.get("sid")))):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido o expirado",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    return payload
+
+async def get_current_user(request: Request, token: str = Depends(oauth2_scheme)):
+    """Dependencia para proteger endpoints"""
+    payload = _validar_token(request, token)
     
     email = payload.get("sub")
     if email is None:
@@ -101,19 +200,35 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
             detail="Token inválido: no contiene email (sub)",
             headers={"WWW-Authenticate": "Bearer"},)
     
-    socio_id = gym_service.email_socio_index.get(email)
+    socio = await gym_async.buscar_socio_por_email(email)
     
-    if not socio_id:
+    if not socio:
         raise HTTPException(status_code=401, detail="Usuario no encontrado")
         
-    return gym_service.socios[socio_id]
+    return socio
+
+@app.post("/logout", status_code=204)
+async def logout(request: Request, token: str = Depends(oauth2_scheme)):
+    """Cierra la sesión: el token de acceso y el de refresco dejan de valer desde ya."""
+    payload = _validar_token(request, token)
+    if payload.get("sid"):
+        sesiones.cerrar(payload["sid"])
+    if payload.get("jti"):
+        sesiones.revocar(payload["jti"])
+    return Response(status_code=204)
+
+async def get_current_admin(current_user: Socio = Depends(get_current_user)):
+    """Dependencia para endpoints de administración (emails en ADMIN_EMAILS)."""
+    if not es_admin(current_user.email):
+        raise HTTPException(status_code=403, detail="Requiere permisos de administrador")
+    return current_user
 
 # --- ENDPOINTS SOCIOS (Práctica 3) ---
 
 @app.post("/socios", response_model=SocioResponse, status_code=201)
-def registrar_socio(socio: SocioCreate):
+async def registrar_socio(socio: SocioCreate):
     try:
-        nuevo_socio = gym_service.registrar_socio(
+        nuevo_socio = await gym_async.registrar_socio(
             socio.nombre, 
             socio.email, 
             socio.fecha_nacimiento, 
@@ -125,62 +240,196 @@ def registrar_socio(socio: SocioCreate):
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/socios", response_model=List[SocioResponse])
-def listar_socios(current_user: Socio = Depends(get_current_user)):
+async def listar_socios(current_user: Socio = Depends(get_current_user)):
     """
     Devuelve todos los socios.
     Requiere token (candado en Swagger).
     """
-    return gym_service.listar_socios()
+    return await gym_async.listar_socios()
 
 @app.get("/socios/me", response_model=SocioResponse)
-def leer_mi_perfil(current_user: Socio = Depends(get_current_user)):
+async def leer_mi_perfil(current_user: Socio = Depends(get_current_user)):
     """Devuelve los datos del usuario logueado actualmente"""
     return current_user
 
+@app.get("/socios/me/estadisticas", response_model=EstadisticasResponse)
+async def mis_estadisticas(current_user: Socio = Depends(get_current_user)):
+    """Puntos, posición, volumen semanal y racha de asistencia del usuario logueado."""
+    return await gym_async.estadisticas_socio(current_user.id)
+
+# --- ENDPOINTS CLASIFICACIONES ---
+
+async def _clasificacion(tipo: str, limite: int, desde: int, mi_posicion: Optional[int],
+                   clase_id: Optional[str] = None) -> ClasificacionResponse:
+    total, puestos = await gym_async.clasificacion(tipo, limite, desde, clase_id)
+    return ClasificacionResponse(
+        tipo=tipo, total=total, mi_posicion=mi_posicion,
+        puestos=[PuestoClasificacion(posicion=p, socio_id=s.id, nombre=s.nombre, valor=round(v, 1))
+                 for p, s, v in puestos],
+    )
+
+@app.get("/clasificacion", response_model=ClasificacionResponse)
+async def clasificacion(tipo: str = Query("puntos", pattern="^(puntos|volumen_semanal)$"),
+                  limite: int = Query(10, ge=1, le=100), desde: int = Query(0, ge=0),
+                  current_user: Socio = Depends(get_current_user)):
+    """Clasificación del gimnasio por puntos o por volumen de la semana en curso."""
+    resumen = await gym_async.estadisticas_socio(current_user.id)
+    mi_posicion = resumen["posicion"] if tipo == "puntos" else resumen["posicion_volumen_semanal"]
+    return await _clasificacion(tipo, limite, desde, mi_posicion)
+
+@app.get("/clases/{clase_id}/clasificacion", response_model=ClasificacionResponse)
+async def clasificacion_clase(clase_id: str, limite: int = Query(10, ge=1, le=100), desde: int = Query(0, ge=0),
+                        current_user: Socio = Depends(get_current_user)):
+    """Clasificación por puntos de los socios inscritos en una clase (o sesión de una serie)."""
+    mi_posicion = await gym_async.posicion_en_clase(current_user.id, clase_id)
+    return await _clasificacion("puntos", limite, desde, mi_posicion, clase_id)
+
+# --- ENDPOINTS SEDES ---
+
+@app.post("/sedes", response_model=SedeResponse, status_code=201)
+async def crear_sede(sede: SedeCreate, admin: Socio = Depends(get_current_admin)):
+    """Da de alta una sede (sucursal). Solo administradores."""
+    try:
+        return await gym_async.crear_sede(sede.nombre, sede.direccion)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/sedes", response_model=List[SedeResponse])
+async def listar_sedes():
+    return await gym_async.listar_sedes()
+
+@app.get("/sedes/{sede_id}/clases", response_model=List[ClaseResponse])
+async def catalogo_sede(sede_id: str):
+    """
+    Clases de la sede con sus plazas libres. Sale de la caché de la sede, que
+    solo se reconstruye cuando cambia algo de esa sede.
+    """
+    try:
+        return await gym_async.catalogo_sede(sede_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/sedes/{sede_id}/entrenadores", response_model=List[EntrenadorResponse])
+async def entrenadores_sede(sede_id: str):
+    try:
+        return await gym_async.listar_entrenadores(sede_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/sedes/{sede_id}/ocupacion", response_model=OcupacionSedeResponse)
+async def ocupacion_sede(sede_id: str):
+    """Plazas, reservas, dispositivos y accesos de hoy de la sede (contadores, sin recorrer reservas)."""
+    try:
+        return await gym_async.ocupacion_sede(sede_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/sedes/{sede_id}/accesos", response_model=List[AccesoResponse])
+async def accesos_sede(sede_id: str, limite: int = Query(100, ge=1, le=1000),
+                       admin: Socio = Depends(get_current_admin)):
+    """Últimos accesos por los tornos de la sede, el más reciente primero."""
+    try:
+        return await gym_async.accesos_sede(sede_id, limite)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/sedes/{sede_id}/dispositivos", response_model=List[DispositivoResponse])
+async def dispositivos_sede(sede_id: str, admin: Socio = Depends(get_current_admin)):
+    try:
+        return await gym_async.dispositivos_sede(sede_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
 # --- ENDPOINTS ENTRENADORES ---
 
 @app.post("/entrenadores", response_model=EntrenadorResponse, status_code=201)
-def registrar_entrenador(entrenador: EntrenadorCreate):
+async def registrar_entrenador(entrenador: EntrenadorCreate):
     try:
-        return gym_service.registrar_entrenador(
+        return await gym_async.registrar_entrenador(
             entrenador.nombre, 
             entrenador.email, 
-            entrenador.especialidad
+            entrenador.especialidad,
+            entrenador.sede_id
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/entrenadores", response_model=List[EntrenadorResponse])
-def listar_entrenadores():
-    return gym_service.listar_entrenadores()
+async def listar_entrenadores(sede: Optional[str] = None):
+    """Todos los entrenadores, o solo los de una sede."""
+    try:
+        return await gym_async.listar_entrenadores(sede)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+PATRON_DIA = "^(lunes|martes|miercoles|jueves|viernes|sabado|domingo)$"
+
+def _franjas(horario) -> List[FranjaHorario]:
+    return [FranjaHorario(clase_id=c.id, nombre=c.nombre, dia=dia, inicio=inicio, fin=fin, sala=c.sala)
+            for c, dia, inicio, fin in horario]
+
+@app.get("/entrenadores/{entrenador_id}/horario", response_model=List[FranjaHorario])
+async def horario_entrenador(entrenador_id: str, dia: Optional[str] = Query(None, pattern=PATRON_DIA)):
+    """Agenda semanal del entrenador (o de un solo día), en orden."""
+    try:
+        return _franjas(await gym_async.horario_entrenador(entrenador_id, dia))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/entrenadores/{entrenador_id}/disponibilidad", response_model=DisponibilidadResponse)
+async def disponibilidad_entrenador(entrenador_id: str, horario: str, duracion: int = Query(60, ge=1, le=1440),
+                              dia: Optional[str] = Query(None, pattern=PATRON_DIA), sala: Optional[str] = None):
+    """Comprueba si el entrenador (y la sala, si se indica) tiene libre esa franja."""
+    try:
+        motivo = await gym_async.comprobar_disponibilidad(entrenador_id, horario, duracion, dia, sala)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return DisponibilidadResponse(disponible=motivo is None, motivo=motivo)
+
+@app.get("/salas/{sala}/horario", response_model=List[FranjaHorario])
+async def horario_sala(sala: str, dia: Optional[str] = Query(None, pattern=PATRON_DIA), sede: str = SEDE_PRINCIPAL):
+    """Ocupación semanal de una sala de la sede."""
+    try:
+        return _franjas(await gym_async.horario_sala(sala, dia, sede))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
 # --- ENDPOINTS CLASES ---
 
 @app.post("/clases", response_model=ClaseResponse)
-def crear_clase(clase: ClaseCreate, current_user: Socio = Depends(get_current_user)):
+async def crear_clase(clase: ClaseCreate, current_user: Socio = Depends(get_current_user)):
     """Crea una nueva clase. Requiere autenticación."""
     try:
-        nueva = gym_service.crear_clase(
-            clase.nombre, clase.horario, clase.aforo, clase.entrenador_id
+        nueva = await gym_async.crear_clase(
+            clase.nombre, clase.horario, clase.aforo, clase.entrenador_id,
+            clase.duracion, clase.dia, clase.sala, clase.sede_id
         )
         return ClaseResponse(
             id=nueva.id,
             nombre=nueva.nombre,
             horario=nueva.horario,
             aforo=nueva.aforo,
-            plazas_disponibles=nueva.plazas_disponibles()
+            plazas_disponibles=nueva.plazas_disponibles(),
+            entrenador_id=nueva.entrenador_id,
+            duracion=nueva.duracion,
+            dia=nueva.dia,
+            sala=nueva.sala,
+            sede_id=nueva.sede_id
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/clases", response_model=List[ClaseResponse])
-def listar_clases():
+async def listar_clases(sede: Optional[str] = None):
     """
     Listar clases es público. 
     Añadimos robustez para saltar clases corruptas si el listado falla.
+    Con `sede`, solo las de esa sede (desde su caché, como /sedes/{sede_id}/clases).
     """
+    if sede is not None:
+        return await catalogo_sede(sede)
     res = []
-    for c in gym_service.listar_clases():
+    for c in await gym_async.listar_clases():
         try:
             # Usamos .copy() para no modificar el objeto original en memoria
             d = vars(c).copy() 
@@ -191,14 +440,66 @@ def listar_clases():
             # Si una clase está corrupta (ej: falta un ID, o un valor es nulo),
             # la omitimos para que el resto de clases sí aparezcan.
             print(f"ERROR: Clase {getattr(c, 'id', 'desconocida')} corrupta. Omitiendo: {e}")
+            clases_corruptas.inc()
             continue # Pasa a la siguiente clase
     return res
 
+# --- ENDPOINTS SERIES (CLASES RECURRENTES) ---
+
+MAX_DIAS_VENTANA = 366
+
+def _ventana(desde: Optional[date], hasta: Optional[date]):
+    desde = desde or date.today()
+    hasta = hasta or desde + timedelta(days=27)
+    if hasta < desde or (hasta - desde).days > MAX_DIAS_VENTANA:
+        raise HTTPException(status_code=400, detail=f"Error: ventana de fechas inválida (máximo {MAX_DIAS_VENTANA} días).")
+    return desde, hasta
+
+def _ocurrencias(sesiones) -> List[OcurrenciaResponse]:
+    return [OcurrenciaResponse(id=serie.id_ocurrencia(fecha), serie_id=serie.id, nombre=serie.nombre, fecha=fecha,
+                               horario=serie.horario, duracion=serie.duracion, sala=serie.sala,
+                               plazas_disponibles=serie.plazas_disponibles(fecha))
+            for serie, fecha in sesiones]
+
+@app.post("/series", response_model=SerieResponse, status_code=201)
+async def crear_serie(serie: SerieCreate, current_user: Socio = Depends(get_current_user)):
+    """Crea una clase recurrente (diaria o semanal). Requiere autenticación."""
+    try:
+        datos = serie.model_dump(exclude={"regla"})
+        if serie.regla:
+            datos.update(parsear_rrule(serie.regla))
+        return await gym_async.crear_serie(**datos)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/series", response_model=List[SerieResponse])
+async def listar_series(sede: Optional[str] = None):
+    try:
+        return await gym_async.listar_series(sede)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/series/{serie_id}/ocurrencias", response_model=List[OcurrenciaResponse])
+async def ocurrencias_serie(serie_id: str, desde: Optional[date] = None, hasta: Optional[date] = None):
+    """Sesiones de la serie entre dos fechas (por defecto, las próximas 4 semanas)."""
+    desde, hasta = _ventana(desde, hasta)
+    try:
+        return _ocurrencias(await gym_async.ocurrencias_serie(serie_id, desde, hasta))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/calendario", response_model=List[OcurrenciaResponse])
+async def calendario(desde: Optional[date] = None, hasta: Optional[date] = None,
+               limite: int = Query(200, ge=1, le=1000)):
+    """Sesiones de todas las series en orden cronológico."""
+    desde, hasta = _ventana(desde, hasta)
+    return _ocurrencias(await gym_async.calendario(desde, hasta, limite))
+
 @app.post("/reservas", status_code=201)
-def reservar_clase(reserva: ReservaRequest, current_user: Socio = Depends(get_current_user)):
-    """Permite a un socio reservar una clase."""
+async def reservar_clase(reserva: ReservaRequest, current_user: Socio = Depends(get_current_user)):
+    """Permite a un socio reservar una clase o una sesión de una serie (ID de /calendario)."""
     try:
-        exito = gym_service.reservar_clase(current_user.id, reserva.clase_id)
+        exito = await gym_async.reservar_clase(current_user.id, reserva.clase_id)
         if not exito:
             raise HTTPException(status_code=400, detail="No se pudo reservar (clase llena, usuario no encontrado o ya inscrito).")
         return {"mensaje": "Reserva realizada con éxito"}
@@ -206,19 +507,40 @@ def reservar_clase(reserva: ReservaRequest, current_user: Socio = Depends(get_cu
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.delete("/reservas/{clase_id}")
-def cancelar_reserva(clase_id: str, current_user: Socio = Depends(get_current_user)):
+async def cancelar_reserva(clase_id: str, current_user: Socio = Depends(get_current_user)):
     """Permite cancelar una reserva."""
-    exito = gym_service.cancelar_reserva_clase(current_user.id, clase_id)
+    exito = await gym_async.cancelar_reserva_clase(current_user.id, clase_id)
     if not exito:
         raise HTTPException(status_code=404, detail="Reserva no encontrada o no se pudo cancelar")
     return {"mensaje": "Reserva cancelada correctamente"}
 
+# --- NOTIFICACIONES (ADMINISTRACIÓN) ---
+
+@app.post("/clases/{clase_id}/avisos", response_model=AvisoResponse, status_code=202)
+async def avisar_clase(clase_id: str, aviso: AvisoCreate, admin: Socio = Depends(get_current_admin)):
+    """
+    Avisa de un cambio a los socios con reserva en la clase (o en una sesión de
+    una serie). Se reparte en segundo plano: la respuesta no espera al envío.
+    """
+    if not aviso.mensaje.strip():
+        raise HTTPException(status_code=400, detail="Error: el mensaje no puede estar vacío.")
+    try:
+        suscriptores = await gym_async.avisar_clase(clase_id, aviso.mensaje)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"clase_id": clase_id, "suscriptores": suscriptores}
+
+@app.get("/admin/notificaciones")
+async def estado_notificaciones(admin: Socio = Depends(get_current_admin)):
+    """Temas con suscriptores, avisos pendientes de repartir y recordatorios programados."""
+    return gym_service.notificaciones.estado()
+
 # --- ENDPOINTS RUTINAS (NUEVO) ---
 
 @app.post("/rutinas", response_model=RutinaResponse, status_code=201)
-def crear_rutina(rutina: RutinaCreate):
+async def crear_rutina(rutina: RutinaCreate):
     """Crea una nueva rutina en el sistema."""
-    nueva_rutina = gym_service.crear_rutina(
+    nueva_rutina = await gym_async.crear_rutina(
         rutina.nombre, 
         rutina.duracion, 
         rutina.dificultad
@@ -226,12 +548,12 @@ def crear_rutina(rutina: RutinaCreate):
     return nueva_rutina
 
 @app.get("/rutinas", response_model=List[RutinaResponse])
-def listar_rutinas():
+async def listar_rutinas():
     """Devuelve todas las rutinas disponibles."""
-    return gym_service.listar_rutinas()
+    return await gym_async.listar_rutinas()
 
 @app.get("/rutinas/me", response_model=List[RutinaResponse])
-def listar_mis_rutinas(current_user: Socio = Depends(get_current_user)):
+async def listar_mis_rutinas(current_user: Socio = Depends(get_current_user)):
     """Devuelve las rutinas asignadas al usuario logueado."""
     mis_rutinas = []
     # Recorremos los IDs de rutinas que tiene el socio guardados
@@ -242,23 +564,145 @@ def listar_mis_rutinas(current_user: Socio = Depends(get_current_user)):
             mis_rutinas.append(rutina)
     return mis_rutinas
 
+@app.get("/rutinas/recomendadas", response_model=List[RutinaRecomendadaResponse])
+async def recomendar_rutinas(limite: int = Query(5, ge=1, le=50), current_user: Socio = Depends(get_current_user)):
+    """Sugiere rutinas del catálogo según el nivel, las rutinas asignadas y el progreso del usuario."""
+    return [
+        RutinaRecomendadaResponse(id=r.id, nombre=r.nombre, duracion=r.duracion,
+                                  dificultad=r.dificultad, puntuacion=round(p, 4))
+        for r, p in await gym_async.recomendar_rutinas(current_user.id, limite)
+    ]
+
+def _detalle_rutina(rutina) -> RutinaDetalleResponse:
+    return RutinaDetalleResponse(
+        id=rutina.id, nombre=rutina.nombre, duracion=rutina.duracion, dificultad=rutina.dificultad,
+        ejercicios=[EjercicioRutinaResponse(ejercicio_id=e.ejercicio.id, nombre=e.ejercicio.nombre,
+                                            grupo_muscular=e.ejercicio.grupo_muscular,
+                                            repeticiones=e.repeticiones, series=e.series)
+                    for e in rutina.get_ejercicios()],
+    )
+
+@app.get("/rutinas/{rutina_id}", response_model=RutinaDetalleResponse)
+async def detalle_rutina(rutina_id: str):
+    """Devuelve la rutina con sus ejercicios, series y repeticiones."""
+    rutina = await gym_async.buscar_rutina_por_id(rutina_id)
+    if not rutina:
+        raise HTTPException(status_code=404, detail="Rutina no encontrada")
+    return _detalle_rutina(rutina)
+
+@app.post("/rutinas/{rutina_id}/ejercicios", response_model=RutinaDetalleResponse, status_code=201)
+async def anadir_ejercicio_rutina(rutina_id: str, datos: EjercicioRutinaCreate,
+                            current_user: Socio = Depends(get_current_user)):
+    """Añade a la rutina un ejercicio del catálogo (por ID o por nombre)."""
+    if not await gym_async.buscar_rutina_por_id(rutina_id):
+        raise HTTPException(status_code=404, detail="Rutina no encontrada")
+    try:
+        rutina = await gym_async.anadir_ejercicio_rutina(rutina_id, datos.nombre, datos.repeticiones,
+                                                     datos.series, ejercicio_id=datos.ejercicio_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _detalle_rutina(rutina)
+
+@app.delete("/rutinas/{rutina_id}/ejercicios/{posicion}", response_model=RutinaDetalleResponse)
+async def quitar_ejercicio_rutina(rutina_id: str, posicion: int, current_user: Socio = Depends(get_current_user)):
+    """Quita de la rutina el ejercicio en la posición indicada (empezando en 0)."""
+    if not await gym_async.buscar_rutina_por_id(rutina_id):
+        raise HTTPException(status_code=404, detail="Rutina no encontrada")
+    try:
+        rutina = await gym_async.quitar_ejercicio_rutina(rutina_id, posicion)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _detalle_rutina(rutina)
+
 @app.post("/rutinas/{rutina_id}/asignar")
-def asignar_rutina(rutina_id: str, current_user: Socio = Depends(get_current_user)):
+async def asignar_rutina(rutina_id: str, current_user: Socio = Depends(get_current_user)):
     """Asigna una rutina al usuario logueado."""
     try:
-        gym_service.asignar_rutina(current_user.id, rutina_id)
+        await gym_async.asignar_rutina(current_user.id, rutina_id)
         return {"mensaje": "Rutina asignada a tu plan de entrenamiento"}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     
+# --- ENDPOINTS EJERCICIOS ---
+
+@app.post("/ejercicios", response_model=EjercicioResponse, status_code=201)
+async def registrar_ejercicio(ejercicio: EjercicioCreate):
+    """Da de alta un ejercicio en el catálogo compartido."""
+    try:
+        return await gym_async.registrar_ejercicio(ejercicio.nombre, ejercicio.grupo_muscular)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/ejercicios", response_model=List[EjercicioResponse])
+async def listar_ejercicios():
+    """Devuelve el catálogo de ejercicios."""
+    return await gym_async.listar_ejercicios()
+
+# --- ENDPOINTS BÚSQUEDA ---
+
+@app.get("/buscar", response_model=BusquedaResponse)
+async def buscar(q: str = Query(..., min_length=1, max_length=100),
+           tipo: Optional[str] = Query(None, pattern="^(clase|serie|rutina|entrenador|ejercicio)$"),
+           pagina: int = Query(1, ge=1),
+           tamano: int = Query(20, ge=1, le=100)):
+    """Busca clases, series, rutinas (también por sus ejercicios), entrenadores y ejercicios; admite prefijos y erratas."""
+    total, encontrados = await gym_async.buscar(q, tipo, pagina, tamano)
+    return BusquedaResponse(
+        consulta=q, total=total, pagina=pagina, tamano=tamano,
+        resultados=[ResultadoBusqueda(tipo=t, id=i, nombre=n, puntuacion=round(p, 4))
+                    for t, i, n, p in encontrados],
+    )
+
+# --- ENDPOINTS DISPOSITIVOS IOT ---
+
+@app.post("/iot/dispositivos", response_model=DispositivoResponse, status_code=201)
+async def registrar_dispositivo(dispositivo: DispositivoCreate, current_user: Socio = Depends(get_current_user)):
+    """Da de alta un dispositivo del usuario (pulsera, bascula o sensor)."""
+    try:
+        return await gym_async.registrar_dispositivo(dispositivo.tipo, current_user.id, dispositivo.sede_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/iot/dispositivos", response_model=List[DispositivoResponse])
+async def listar_mis_dispositivos(current_user: Socio = Depends(get_current_user)):
+    """Dispositivos del usuario con su estado de conexión."""
+    return await gym_async.listar_dispositivos_socio(current_user.id)
+
+@app.get("/iot/dispositivos/{dispositivo_id}", response_model=DispositivoResponse)
+async def obtener_dispositivo(dispositivo_id: str, current_user: Socio = Depends(get_current_user)):
+    try:
+        return await gym_async.obtener_dispositivo(dispositivo_id, current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.delete("/iot/dispositivos/{dispositivo_id}")
+async def eliminar_dispositivo(dispositivo_id: str, current_user: Socio = Depends(get_current_user)):
+    try:
+        await gym_async.eliminar_dispositivo(dispositivo_id, current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"mensaje": "Dispositivo eliminado correctamente"}
+
+@app.post("/iot/latido/{dispositivo_id}", response_model=DispositivoResponse)
+async def latido_dispositivo(dispositivo_id: str, current_user: Socio = Depends(get_current_user)):
+    """
+    Latido de un dispositivo: lo marca como conectado. Si pasan
+    DISPOSITIVOS_TIMEOUT segundos sin latido ni lecturas, el barrido lo marca
+    como desconectado.
+    """
+    try:
+        return await gym_async.latido_dispositivo(dispositivo_id, current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
 @app.post("/iot/sincronizar/{dispositivo_id}")
-def sincronizar_dispositivo(dispositivo_id: str, current_user: Socio = Depends(get_current_user)):
+async def sincronizar_dispositivo(dispositivo_id: str, current_user: Socio = Depends(get_current_user)):
     """
     Simula la sincronización de un dispositivo IoT y registra el progreso automáticamente.
     (Alineado con el Diagrama de Secuencia: Sincronizar -> Validar -> Registrar Progreso)
     """
-    # 1. Llamada al servicio para obtener los datos crudos del dispositivo
-    datos = gym_service.sincronizar_dispositivo(dispositivo_id)
+    # 1. Llamada al servicio para obtener los datos crudos del dispositivo (solo si es del usuario)
+    datos = await gym_async.sincronizar_dispositivo(dispositivo_id, current_user.id)
     
     if not datos:
         raise HTTPException(status_code=404, detail="Dispositivo no encontrado o error de conexión")
@@ -294,7 +738,7 @@ def sincronizar_dispositivo(dispositivo_id: str, current_user: Socio = Depends(g
 
         # 3. Registrar en el sistema (Persistencia)
         if guardar_registro:
-            gym_service.registrar_progreso(
+            await gym_async.registrar_progreso(
                 socio_id=current_user.id,
                 peso=peso_reg,
                 repeticiones=reps_reg,
@@ -314,23 +758,238 @@ def sincronizar_dispositivo(dispositivo_id: str, current_user: Socio = Depends(g
         "datos_recibidos": datos
     }
 
+# Lecturas por lote como máximo (binario o JSON)
+IOT_MAX_LECTURAS = int(os.getenv("IOT_MAX_LECTURAS", 100_000))
+
+def _lecturas_json(cuerpo: bytes):
+    """Lecturas JSON (lista de objetos como DispositivoIoT.datos) -> (peso, reps, tiempo, fecha)."""
+    try:
+        lecturas = json.loads(cuerpo)
+        if not isinstance(lecturas, list):
+            raise ValueError
+    except ValueError:
+        raise ValueError("Error: se esperaba una lista JSON de lecturas.")
+    resultado = []
+    for i, datos in enumerate(lecturas):
+        try:
+            progreso = protocolo_iot.progreso_de_lectura(datos)
+            if progreso is not None:
+                resultado.append((*progreso, datetime.fromisoformat(datos["timestamp"])))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"Error: lectura {i} inválida.")
+    return len(lecturas), resultado
+
+@app.post("/iot/dispositivos/{dispositivo_id}/lecturas", response_model=IngestaIoTResponse, status_code=201)
+async def ingerir_lecturas(dispositivo_id: str, request: Request, response: Response,
+                           secuencia: Optional[int] = Query(None, ge=0),
+                           current_user: Socio = Depends(get_current_user)):
+    """
+    Ingesta por lotes de lecturas de un dispositivo en el historial de progreso.
+    Con Content-Type application/octet-stream el cuerpo es un lote del protocolo
+    binario (ver src/protocolo_iot.py); si no, una lista JSON de lecturas.
+
+    `secuencia` (creciente por dispositivo) permite reintentar sin duplicar:
+    un lote con una secuencia ya aceptada responde 200 con `duplicado` y no
+    se vuelve a insertar.
+    """
+    try:
+        dispositivo = await gym_async.obtener_dispositivo(dispositivo_id, current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    cuerpo = await request.body()
+    binario = request.headers.get("content-type", "").startswith("application/octet-stream")
+    try:
+        if binario:
+            tipo, n, _ = protocolo_iot.leer_cabecera(cuerpo)
+            if tipo != dispositivo.tipo:
+                raise ValueError(f"Error: el lote es de tipo {tipo} y el dispositivo es {dispositivo.tipo}.")
+        else:
+            n, lecturas = _lecturas_json(cuerpo)
+        if n > IOT_MAX_LECTURAS:
+            raise ValueError(f"Error: un lote admite como máximo {IOT_MAX_LECTURAS} lecturas.")
+        if binario:
+            # Se decodifica directamente sobre el cuerpo (memoryview), sin copias intermedias
+            lecturas = list(protocolo_iot.progresos(cuerpo)[1])
+        registrados = await gym_async.registrar_lecturas_dispositivo(
+            dispositivo_id, current_user.id, lecturas, secuencia)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if registrados is None:
+        response.status_code = 200
+    return IngestaIoTResponse(dispositivo_id=dispositivo_id, formato="binario" if binario else "json",
+                              lecturas=n, progresos=registrados or 0, duplicado=registrados is None)
+
 @app.post("/accesos")
-def registrar_acceso_gym(current_user: Socio = Depends(get_current_user)):
-    """Registra que el usuario acaba de entrar al gimnasio (Torno)."""
+async def registrar_acceso_gym(sede: str = SEDE_PRINCIPAL, current_user: Socio = Depends(get_current_user)):
+    """Registra que el usuario acaba de entrar al gimnasio por el torno de una sede."""
     try:
-        acceso = gym_service.registrar_acceso(current_user.id)
+        acceso = await gym_async.registrar_acceso(current_user.id, sede)
         return {"mensaje": "Acceso permitido", "detalle": str(acceso)}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@app.get("/progreso")
-def ver_mi_progreso(current_user: Socio = Depends(get_current_user)):
-    """Devuelve el historial real de progreso para las gráficas."""
-    # Nota: Necesitarías añadir un método 'listar_progresos_socio' en el servicio 
-    # o acceder directo si es sencillo, pero para el prototipo esto cumple.
-    return gym_service.listar_progresos_socio(current_user.id)
+@app.get("/progreso", response_model=List[ProgresoResponse])
+async def ver_mi_progreso(desde: Optional[date] = None, hasta: Optional[date] = None,
+                          current_user: Socio = Depends(get_current_user)):
+    """
+    Devuelve el historial real de progreso para las gráficas. Los días antiguos
+    llegan compactados (un registro por día con `agregado`), sea cual sea el
+    nivel de retención en el que estén.
+    """
+    return await gym_async.listar_progresos_socio(current_user.id, desde, hasta)
+
+# --- IMPORTACIÓN / EXPORTACIÓN MASIVA ---
+
+# Content-Type -> formato de la carga masiva
+FORMATOS_CONTENT_TYPE = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+@app.post("/importar/{entidad}", response_model=ImportacionResponse)
+async def importar_masivo(entidad: str, request: Request, formato: Optional[str] = None,
+                          admin: Socio = Depends(get_current_admin)):
+    """
+    Importa socios, entrenadores, clases o rutinas desde un cuerpo CSV (con cabecera)
+    o NDJSON (un objeto por línea). El cuerpo se lee en streaming y se procesa por lotes.
+    El formato se toma del parámetro `formato` o, si no viene, del Content-Type.
+    Solo administradores.
+    """
+    if formato is None:
+        content_type = request.headers.get("content-type", "").split(";")[0].strip()
+        formato = FORMATOS_CONTENT_TYPE.get(content_type, "ndjson")
+    try:
+        return await carga_masiva.importar(entidad, formato, request.stream())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/exportar/{entidad}")
+async def exportar_masivo(entidad: str, formato: str = "ndjson", admin: Socio = Depends(get_current_admin)):
+    """Exporta una colección completa en streaming (CSV o NDJSON). Solo administradores: incluye los emails."""
+    try:
+        contenido = carga_masiva.exportar(entidad, formato)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    media_type = "text/csv" if formato == "csv" else "application/x-ndjson"
+    return StreamingResponse(contenido, media_type=media_type)
+
+# --- PERFILADO (ADMINISTRACIÓN) ---
+
+@app.get("/admin/perfil", response_class=PlainTextResponse)
+async def perfilar_proceso(segundos: float = Query(10, gt=0, le=60),
+                           intervalo_ms: float = Query(5, ge=1, le=100),
+                           admin: Socio = Depends(get_current_admin)):
+    """
+    Muestrea el proceso en vivo durante `segundos` y devuelve las pilas en formato
+    collapsed (flamegraph.pl / speedscope). El resto de peticiones se sigue atendiendo.
+    """
+    resultado = await run_in_threadpool(perfilar, segundos, intervalo_ms / 1000)
+    if resultado is None:
+        raise HTTPException(status_code=409, detail="Ya hay un perfilado en curso")
+    return PlainTextResponse(resultado, headers={
+        "Content-Disposition": 'attachment; filename="perfil.collapsed"'})
+
+@app.get("/admin/perfil/peticiones")
+async def listar_perfiles_peticiones(admin: Socio = Depends(get_current_admin)):
+    """Perfiles guardados con la cabecera X-Debug-Profile (ID -> pilas distintas)."""
+    return perfiles_peticiones.listar()
+
+@app.get("/admin/perfil/peticiones/{perfil_id}", response_class=PlainTextResponse)
+async def ver_perfil_peticion(perfil_id: str, admin: Socio = Depends(get_current_admin)):
+    """Devuelve el perfil collapsed de una petición concreta."""
+    texto = perfiles_peticiones.obtener(perfil_id)
+    if texto is None:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+    return PlainTextResponse(texto)
+
+# --- RETENCIÓN DEL HISTORIAL (ADMINISTRACIÓN) ---
+
+@app.get("/admin/historial")
+async def estado_historial(admin: Socio = Depends(get_current_admin)):
+    """Niveles de retención del historial: resúmenes en memoria y meses archivados."""
+    return await gym_async.estado_historial()
+
+@app.post("/admin/historial/compactar")
+async def compactar_historial(admin: Socio = Depends(get_current_admin)):
+    """Aplica ya la retención (normalmente corre sola cada HISTORIAL_INTERVALO segundos)."""
+    try:
+        return await gym_async.compactar_historial()
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+# --- SESIONES (ADMINISTRACIÓN) ---
+
+@app.get("/admin/sesiones")
+async def estado_sesiones(admin: Socio = Depends(get_current_admin)):
+    """Sesiones abiertas y tokens revocados pendientes de caducar."""
+    return sesiones.estado()
+
+# --- INFORMES (ANALÍTICA SOBRE LA INSTANTÁNEA) ---
+
+async def _informe(nombre: str, **parametros):
+    try:
+        return await gym_service.analitica.informe(nombre, **parametros)
+    except ValueError as e:  # aún no hay instantánea
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/informes/asistencia")
+async def informe_asistencia(limite: int = Query(50, ge=1, le=1000), admin: Socio = Depends(get_current_admin)):
+    """Ocupación de las clases (reservas frente a aforo) según la última instantánea."""
+    return await _informe("asistencia", limite=limite)
+
+@app.get("/informes/accesos")
+async def informe_accesos(dias: int = Query(30, ge=1, le=3660), admin: Socio = Depends(get_current_admin)):
+    """Accesos por hora del día y día de la semana en los últimos `dias` días (incluidos los ya compactados)."""
+    return await _informe("accesos", dias=dias)
+
+@app.get("/informes/progresos")
+async def informe_progresos(campo: str = "peso", cubetas: int = Query(20, ge=1, le=200),
+                            admin: Socio = Depends(get_current_admin)):
+    """Distribución de peso, repeticiones, tiempo o volumen en los progresos registrados."""
+    if campo not in CAMPOS_PROGRESO:
+        raise HTTPException(status_code=400, detail=f"Campo inválido. Opciones: {', '.join(CAMPOS_PROGRESO)}")
+    return await _informe("progresos", campo=campo, cubetas=cubetas)
+
+@app.get("/informes/demanda")
+async def informe_demanda(agrupar: str = "clase", orden: str = "ocupacion",
+                          limite: int = Query(50, ge=1, le=1000), admin: Socio = Depends(get_current_admin)):
+    """
+    Demanda de las clases agrupada por clase, entrenador, franja o sede: ocupación,
+    tasa de cancelación y tiempo medio hasta completarse. Son agregados que
+    se mantienen con cada reserva, así que no depende de la instantánea.
+    """
+    try:
+        return await gym_async.informe_demanda(agrupar, orden, limite)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/informes/demanda/eventos")
+async def eventos_demanda(clase_id: Optional[str] = None, limite: int = Query(100, ge=1, le=1000),
+                          admin: Socio = Depends(get_current_admin)):
+    """Últimas reservas y cancelaciones, de todas las clases o de una (o de una serie)."""
+    return [{"instante": datetime.fromtimestamp(e.instante).isoformat(timespec="seconds"), "tipo": e.tipo,
+             "clase_id": e.clase_id, "socio_id": e.socio_id}
+            for e in await gym_async.eventos_demanda(limite, clase_id)]
+
+@app.get("/admin/analitica")
+async def estado_analitica(admin: Socio = Depends(get_current_admin)):
+    """Manifiesto de la instantánea actual (versión, filas por tabla, bytes)."""
+    if gym_service.analitica.manifiesto is None:
+        raise HTTPException(status_code=404, detail="Todavía no hay ninguna instantánea de analítica")
+    return gym_service.analitica.manifiesto
+
+@app.post("/admin/analitica/exportar")
+async def exportar_analitica(admin: Socio = Depends(get_current_admin)):
+    """Escribe ya una instantánea (normalmente se hace sola cada ANALITICA_INTERVALO segundos)."""
+    return await gym_async.exportar_analitica()
+
+# Métricas en formato de texto Prometheus
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metricas():
+    return PlainTextResponse(registro.exponer(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 # Endpoint de Health Check
 @app.get("/")
-def root():
+async def root():
     return {"mensaje": "API del Gimnasio Inteligente funcionando correctamente"}
\ No newline at end of file
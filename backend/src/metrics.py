@@ -0,0 +1,266 @@
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Tuple
+
+# Buckets de latencia (segundos), pensados para endpoints en memoria y bcrypt
+BUCKETS_LATENCIA: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+Etiquetas = Tuple[str, ...]
+
+
+def _formatear_etiquetas(nombres: Tuple[str, ...], valores: Etiquetas, extra: str = "") -> str:
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _numero(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self._lock = threading.Lock()
+
+    def cabecera(self) -> List[str]:
+        return [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+
+
+class Counter(_Metrica):
+    """Contador monótono con etiquetas."""
+
+    tipo = "counter"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...] = ()):
+        super().__init__(nombre, ayuda, etiquetas)
+        self._valores: Dict[Etiquetas, float] = {}
+
+    def inc(self, *valores_etiquetas: str, cantidad: float = 1) -> None:
+        with self._lock:
+            self._valores[valores_etiquetas] = self._valores.get(valores_etiquetas, 0) + cantidad
+
+    def exponer(self) -> List[str]:
+        lineas = self.cabecera()
+        with self._lock:
+            valores = list(self._valores.items())
+        for etiquetas, valor in sorted(valores):
+            lineas.append(f"{self.nombre}{_formatear_etiquetas(self.etiquetas, etiquetas)} {_numero(valor)}")
+        return lineas
+
+
+class Gauge(Counter):
+    """Valor que sube y baja (peticiones en curso, tamaño de colas...)."""
+
+    tipo = "gauge"
+
+    def dec(self, *valores_etiquetas: str, cantidad: float = 1) -> None:
+        self.inc(*valores_etiquetas, cantidad=-cantidad)
+
+    def set(self, valor: float, *valores_etiquetas: str) -> None:
+        with self._lock:
+            self._valores[valores_etiquetas] = valor
+
+
+class Histogram(_Metrica):
+    """
+    Histograma de buckets fijos. Cada observación es un bisect y tres sumas,
+    así que se puede dejar activo en producción.
+    """
+
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = BUCKETS_LATENCIA):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(sorted(buckets))
+        # etiquetas -> [cuentas por bucket (+Inf al final), suma, total]
+        self._series: Dict[Etiquetas, list] = {}
+
+    def observe(self, valor: float, *valores_etiquetas: str) -> None:
+        i = bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(valores_etiquetas)
+            if serie is None:
+                serie = self._series[valores_etiquetas] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            serie[0][i] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def exponer(self) -> List[str]:
+        lineas = self.cabecera()
+        with self._lock:
+            series = [(e, list(s[0]), s[1], s[2]) for e, s in self._series.items()]
+        for etiquetas, cuentas, suma, total in sorted(series):
+            acumulado = 0
+            for limite, cuenta in zip(self.buckets + (float("inf"),), cuentas):
+                acumulado += cuenta
+                le = f'le="{_numero(limite)}"'
+                lineas.append(f"{self.nombre}_bucket{_formatear_etiquetas(self.etiquetas, etiquetas, le)} {acumulado}")
+            base = _formatear_etiquetas(self.etiquetas, etiquetas)
+            lineas.append(f"{self.nombre}_sum{base} {_numero(suma)}")
+            lineas.append(f"{self.nombre}_count{base} {total}")
+        return lineas
+
+
+class Registro:
+    """Conjunto de métricas del proceso, exportable en formato de texto Prometheus."""
+
+    def __init__(self) -> None:
+        self._metricas: Dict[str, _Metrica] = {}
+        self._recolectores: List[Callable[[], None]] = []
+
+    def _registrar(self, metrica):
+        if metrica.nombre in self._metricas:
+            raise ValueError(f"Error: la métrica {metrica.nombre} ya existe.")
+        self._metricas[metrica.nombre] = metrica
+        return metrica
+
+    def counter(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...] = ()) -> Counter:
+        return self._registrar(Counter(nombre, ayuda, etiquetas))
+
+    def gauge(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...] = ()) -> Gauge:
+        return self._registrar(Gauge(nombre, ayuda, etiquetas))
+
+    def histogram(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = BUCKETS_LATENCIA) -> Histogram:
+        return self._registrar(Histogram(nombre, ayuda, etiquetas, buckets))
+
+    def al_recolectar(self, funcion: Callable[[], None]) -> None:
+        """Registra una función que actualiza gauges justo antes de cada exportación."""
+        self._recolectores.append(funcion)
+
+    def exponer(self) -> str:
+        for recolectar in self._recolectores:
+            recolectar()
+        lineas: List[str] = []
+        for metrica in self._metricas.values():
+            lineas.extend(metrica.exponer())
+        return "\n".join(lineas) + "\n"
+
+
+# Registro global del backend y métricas comunes
+registro = Registro()
+
+http_peticiones = registro.counter(
+    "gym_http_requests_total", "Peticiones HTTP atendidas", ("method", "route", "status"))
+http_latencia = registro.histogram(
+    "gym_http_request_duration_seconds", "Latencia de las peticiones HTTP", ("method", "route"))
+http_en_curso = registro.gauge(
+    "gym_http_requests_in_progress", "Peticiones HTTP en curso", ("method",))
+http_excepciones = registro.counter(
+    "gym_http_exceptions_total", "Peticiones que terminaron con una excepción no controlada", ("method", "route"))
+etapa_latencia = registro.histogram(
+    "gym_stage_duration_seconds", "Duración de etapas internas (JWT, bcrypt, servicio, serialización)", ("stage",))
+
+
+@contextmanager
+def temporizar(etapa: str):
+    """Mide el bloque y lo registra en gym_stage_duration_seconds{stage=etapa}."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        etapa_latencia.observe(time.perf_counter() - inicio, etapa)
+
+
+def medir_servicio(cls):
+    """
+    Decorador de clase: mide cada método público del servicio como la etapa
+    "servicio.<método>". Los generadores y los métodos privados no se tocan.
+    """
+    for nombre, atributo in list(vars(cls).items()):
+        if nombre.startswith("_") or not callable(atributo) or inspect.isgeneratorfunction(atributo):
+            continue
+        setattr(cls, nombre, _medir_metodo(f"servicio.{nombre}", atributo))
+    return cls
+
+
+def _medir_metodo(etapa: str, metodo: Callable) -> Callable:
+    @functools.wraps(metodo)
+    def envoltorio(*args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return metodo(*args, **kwargs)
+        finally:
+            etapa_latencia.observe(time.perf_counter() - inicio, etapa)
+    return envoltorio
+
+
+def medir_serializacion() -> None:
+    """
+    Mide la serialización de respuestas de FastAPI (validación contra el
+    response_model + jsonable_encoder) como la etapa "serializacion".
+
+    FastAPI no expone un hook para esto, así que se envuelve
+    `fastapi.routing.serialize_response`, que los handlers buscan por nombre.
+    """
+    import fastapi.routing as routing
+    if getattr(routing.serialize_response, "_medido", False):
+        return
+    original = routing.serialize_response
+
+    @functools.wraps(original)
+    async def serialize_response(*args, **kwargs):
+        with temporizar("serializacion"):
+            return await original(*args, **kwargs)
+
+    serialize_response._medido = True
+    routing.serialize_response = serialize_response
+
+
+class MetricasMiddleware:
+    """Middleware ASGI: latencia, peticiones en curso y errores por ruta."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metodo = scope["method"]
+        estado = [500]
+
+        async def send_con_estado(mensaje):
+            if mensaje["type"] == "http.response.start":
+                estado[0] = mensaje["status"]
+            await send(mensaje)
+
+        http_en_curso.inc(metodo)
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_con_estado)
+        except Exception:
+            http_excepciones.inc(metodo, _plantilla_ruta(scope))
+            raise
+        finally:
+            duracion = time.perf_counter() - inicio
+            http_en_curso.dec(metodo)
+            ruta = _plantilla_ruta(scope)
+            http_latencia.observe(duracion, metodo, ruta)
+            http_peticiones.inc(metodo, ruta, str(estado[0]))
+
+
+def _plantilla_ruta(scope) -> str:
+    """Plantilla de la ruta ("/reservas/{clase_id}") para no disparar la cardinalidad."""
+    ruta = scope.get("route")
+    return getattr(ruta, "path", None) or "sin_ruta"
@@ -2,20 +2,24 @@ import uuid
 from datetime import datetime
 from typing import Optional
 
+from src.models.Sede import SEDE_PRINCIPAL
+
 class Acceso:
     """Registro de acceso de un socio al gimnasio."""
 
-    def __init__(self, socio_id: str, socio_nombre: Optional[str] = None):
+    def __init__(self, socio_id: str, socio_nombre: Optional[str] = None, sede_id: str = SEDE_PRINCIPAL):
         """
         Inicializa un registro de acceso.
 
         Args:
             socio_id: ID del socio
             socio_nombre: Nombre del socio (opcional)
+            sede_id: Sede por la que entra
         """
         self.id = str(uuid.uuid4())
         self.socio_id = socio_id
         self.socio_nombre = socio_nombre or f"Socio({socio_id[:8]})"
+        self.sede_id = sede_id
         ahora = datetime.now()
         self.fecha = ahora.date()
         self.hora = ahora.time()
@@ -1,24 +1,91 @@
+import unicodedata
 import uuid
-from datetime import datetime
-from typing import List
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Tuple
+
+DIAS_SEMANA = ["lunes", "martes", "miercoles", "jueves", "viernes", "sabado", "domingo"]
+MINUTOS_DIA = 24 * 60
+MINUTOS_SEMANA = 7 * MINUTOS_DIA
+
+
+def normalizar_dia(dia: str) -> str:
+    """ "Miércoles" -> "miercoles"; lanza ValueError si no es un día de la semana."""
+    dia = unicodedata.normalize("NFKD", dia.strip().lower()).encode("ascii", "ignore").decode()
+    if dia not in DIAS_SEMANA:
+        raise ValueError(f"Error: día inválido. Debe ser: {', '.join(DIAS_SEMANA)}")
+    return dia
+
+
+def franjas_semanales(dias: Iterable[int], inicio_dia: int, duracion: int) -> List[Tuple[int, int]]:
+    """
+    Intervalos [inicio, fin) en minutos desde el lunes a las 00:00 para una
+    sesión que empieza `inicio_dia` minutos tras la medianoche de cada uno de
+    los `dias` (0 = lunes). La que cruza el final del domingo se parte en dos.
+    """
+    franjas = []
+    for d in dias:
+        inicio = d * MINUTOS_DIA + inicio_dia
+        fin = inicio + duracion
+        if fin > MINUTOS_SEMANA:
+            franjas.append((inicio, MINUTOS_SEMANA))
+            franjas.append((0, fin - MINUTOS_SEMANA))
+        else:
+            franjas.append((inicio, fin))
+    return franjas
+
 
 class Clase:
-    def __init__(self, nombre: str, horario: str, aforo: int, entrenador_id: str):
+    def __init__(self, nombre: str, horario: str, aforo: int, entrenador_id: str,
+                 duracion: int = 60, dia: Optional[str] = None, sala: Optional[str] = None,
+                 sede_id: Optional[str] = None):
+        """
+        Args:
+            duracion: Minutos que dura la clase
+            dia: Día de la semana (sin tilde); None = se imparte todos los días
+            sala: Sala donde se imparte (opcional)
+            sede_id: Sede de la clase; None = la de su entrenador (la fija el servicio al darla de alta)
+        """
         if not nombre.strip():
             raise ValueError("Error: el nombre no puede estar vacío.")
         try:
-            datetime.strptime(horario, "%H:%M")
+            hora = datetime.strptime(horario, "%H:%M")
         except ValueError:
             raise ValueError("Error: horario inválido. Use formato HH:MM")
         if aforo <= 0:
             raise ValueError("Error: el aforo debe ser positivo.")
+        if not 0 < duracion <= MINUTOS_DIA:
+            raise ValueError("Error: la duración debe estar entre 1 y 1440 minutos.")
+        if dia:
+            dia = normalizar_dia(dia)
 
         self.id = str(uuid.uuid4())
         self.nombre = nombre
         self.horario = horario
         self.aforo = aforo
         self.entrenador_id = entrenador_id
+        self.duracion = duracion
+        self.dia = dia or None
+        self.sala = sala.strip() if sala and sala.strip() else None
+        self.sede_id = sede_id
         self.socios_inscritos: List[str] = []
+        self._inicio_dia = hora.hour * 60 + hora.minute
+
+    def franjas(self) -> List[Tuple[int, int]]:
+        """Intervalos semanales que ocupa la clase (ver `franjas_semanales`)."""
+        dias = [DIAS_SEMANA.index(self.dia)] if self.dia else range(len(DIAS_SEMANA))
+        return franjas_semanales(dias, self._inicio_dia, self.duracion)
+
+    def proximo_inicio(self, desde: datetime) -> Optional[datetime]:
+        """Primer inicio de la clase en `desde` o después (hora local, sin zona)."""
+        dias = [DIAS_SEMANA.index(self.dia)] if self.dia else range(len(DIAS_SEMANA))
+        medianoche = desde.replace(hour=0, minute=0, second=0, microsecond=0)
+        for salto in range(len(DIAS_SEMANA) + 1):
+            dia = medianoche + timedelta(days=salto)
+            if dia.weekday() in dias:
+                inicio = dia + timedelta(minutes=self._inicio_dia)
+                if inicio >= desde:
+                    return inicio
+        return None
 
     def verificar_disponibilidad(self) -> bool:
         return len(self.socios_inscritos) < self.aforo
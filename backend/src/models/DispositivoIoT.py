@@ -1,18 +1,21 @@
 import uuid
 import random
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+from src.models.Sede import SEDE_PRINCIPAL
 
 class DispositivoIoT:
     """Dispositivo IoT que recopila datos biométricos de socios."""
 
-    def __init__(self, tipo: str, socio_id: str):
+    def __init__(self, tipo: str, socio_id: str, sede_id: str = SEDE_PRINCIPAL):
         """
         Inicializa un dispositivo IoT.
 
         Args:
             tipo: Tipo de dispositivo (pulsera, báscula, sensor)
             socio_id: ID del socio propietario
+            sede_id: Sede donde está instalado o se usa
         """
         tipos_validos = ["pulsera", "bascula", "sensor"]
         if tipo.lower() not in tipos_validos:
@@ -21,7 +24,12 @@ class DispositivoIoT:
         self.id = str(uuid.uuid4())
         self.tipo = tipo.lower()
         self.socio_id = socio_id
+        self.sede_id = sede_id
         self.datos: Dict[str, Any] = {}
+        # Estado de conexión (lo mantiene DispositivosService)
+        self.ultima_conexion: Optional[datetime] = None
+        self.ultima_secuencia = -1   # última secuencia aceptada: las repetidas son reenvíos
+        self.conectado = False
 
     def recopilar_datos(self) -> Dict[str, Any]:
         """
@@ -59,15 +67,15 @@ class DispositivoIoT:
 
     def sincronizar(self) -> bool:
         """
-        Simula la sincronización de datos con el sistema.
+        Simula la sincronización de datos con el sistema: cada llamada es una
+        lectura nueva.
 
         Returns:
             True si la sincronización fue exitosa
         """
-        if not self.datos:
-            self.recopilar_datos()
+        self.recopilar_datos()
         return True
 
     def __str__(self):
         return (f"DispositivoIoT(id={self.id[:8]}, tipo={self.tipo:<10}, "
-                f"socio_id={self.socio_id[:8]}, datos={'Sí' if self.datos else 'No'})")
\ No newline at end of file
+                f"socio_id={self.socio_id[:8]}, conectado={'Sí' if self.conectado else 'No'})")
\ No newline at end of file
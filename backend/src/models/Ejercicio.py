@@ -0,0 +1,29 @@
+import uuid
+from dataclasses import dataclass, field
+from typing import NamedTuple
+
+
+@dataclass(frozen=True, slots=True)
+class Ejercicio:
+    """
+    Definición de un ejercicio del catálogo.
+
+    Es inmutable: una misma instancia se comparte entre todas las rutinas
+    que la usan (ver EjercicioService).
+    """
+    nombre: str
+    grupo_muscular: str = "general"
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+
+    def __post_init__(self):
+        if not self.nombre.strip():
+            raise ValueError("Error: el nombre del ejercicio no puede estar vacío.")
+        if not self.grupo_muscular.strip():
+            raise ValueError("Error: el grupo muscular no puede estar vacío.")
+
+
+class EjercicioRutina(NamedTuple):
+    """Ejercicio dentro de una rutina: referencia al catálogo más series y repeticiones."""
+    ejercicio: Ejercicio
+    repeticiones: int
+    series: int
@@ -2,8 +2,10 @@ import uuid
 import re
 from typing import List
 
+from src.models.Sede import SEDE_PRINCIPAL
+
 class Entrenador:
-    def __init__(self, nombre: str, email: str, especialidad: str):
+    def __init__(self, nombre: str, email: str, especialidad: str, sede_id: str = SEDE_PRINCIPAL):
         if not nombre.strip():
             raise ValueError("Error: el nombre no puede estar vacío.")
         if not re.match(r"[^@]+@[^@]+\.[^@]+", email):
@@ -15,6 +17,7 @@ class Entrenador:
         self.nombre = nombre
         self.email = email
         self.especialidad = especialidad
+        self.sede_id = sede_id
         self.clases_impartidas: List[str] = []
 
     def crear_clase(self, clase_id: str) -> None:
@@ -5,7 +5,8 @@ from typing import Optional
 class Progreso:
     """Registro de progreso físico de un socio."""
 
-    def __init__(self, socio_id: str, peso: float, repeticiones: int, tiempo: int):
+    def __init__(self, socio_id: str, peso: float, repeticiones: int, tiempo: int,
+                 fecha: Optional[datetime] = None):
         """
         Inicializa un registro de progreso.
 
@@ -14,6 +15,7 @@ class Progreso:
             peso: Peso levantado en kg (0 si no aplica)
             repeticiones: Número de repeticiones realizadas
             tiempo: Tiempo de ejercicio en segundos
+            fecha: Momento de la medición (por defecto, ahora)
         """
         if peso < 0:
             raise ValueError("Error: el peso no puede ser negativo.")
@@ -26,7 +28,7 @@ class Progreso:
 
         self.id = str(uuid.uuid4())
         self.socio_id = socio_id
-        self.fecha = datetime.now()
+        self.fecha = fecha or datetime.now()
         self.peso = peso
         self.repeticiones = repeticiones
         self.tiempo = tiempo  # en segundos
@@ -1,5 +1,7 @@
 import uuid
-from typing import List, Dict, Any
+from typing import Tuple
+
+from src.models.Ejercicio import Ejercicio, EjercicioRutina
 
 class Rutina:
     """Rutina de ejercicios que puede ser asignada a socios."""
@@ -27,33 +29,33 @@ class Rutina:
         self.nombre = nombre
         self.duracion = duracion
         self.dificultad = dificultad.lower()
-        self.ejercicios: List[Dict[str, Any]] = []  # Lista de ejercicios
+        # Tupla inmutable: se reemplaza al modificarla, así las lecturas
+        # pueden compartirla sin copiarla
+        self.ejercicios: Tuple[EjercicioRutina, ...] = ()
 
-    def anadir_ejercicio(self, nombre_ejercicio: str, repeticiones: int = 10, series: int = 3) -> None:
+    def anadir_ejercicio(self, ejercicio: Ejercicio, repeticiones: int = 10, series: int = 3) -> None:
         """
-        Añade un ejercicio a la rutina.
+        Añade un ejercicio del catálogo a la rutina.
 
         Args:
-            nombre_ejercicio: Nombre del ejercicio
+            ejercicio: Definición (compartida) del ejercicio
             repeticiones: Número de repeticiones por serie
             series: Número de series
         """
-        if not nombre_ejercicio.strip():
-            raise ValueError("Error: el nombre del ejercicio no puede estar vacío.")
-
         if repeticiones <= 0 or series <= 0:
             raise ValueError("Error: repeticiones y series deben ser positivas.")
 
-        ejercicio = {
-            "nombre": nombre_ejercicio,
-            "repeticiones": repeticiones,
-            "series": series
-        }
-        self.ejercicios.append(ejercicio)
+        self.ejercicios = self.ejercicios + (EjercicioRutina(ejercicio, repeticiones, series),)
+
+    def quitar_ejercicio(self, posicion: int) -> None:
+        """Quita el ejercicio que ocupa `posicion` (empezando en 0)."""
+        if not 0 <= posicion < len(self.ejercicios):
+            raise ValueError("Error: posición de ejercicio inválida.")
+        self.ejercicios = self.ejercicios[:posicion] + self.ejercicios[posicion + 1:]
 
-    def get_ejercicios(self) -> List[Dict[str, Any]]:
-        """Retorna la lista de ejercicios."""
-        return self.ejercicios.copy()
+    def get_ejercicios(self) -> Tuple[EjercicioRutina, ...]:
+        """Retorna los ejercicios (la tupla es inmutable, no hace falta copiarla)."""
+        return self.ejercicios
 
     def __str__(self):
         return (f"Rutina(id={self.id[:8]}, nombre={self.nombre:<25}, "
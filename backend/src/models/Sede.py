@@ -0,0 +1,20 @@
+import uuid
+from typing import Optional
+
+# Sede a la que va todo lo que no indica otra (los datos de antes de haber varias sedes)
+SEDE_PRINCIPAL = "principal"
+
+
+class Sede:
+    """Sucursal del gimnasio: sus clases, entrenadores, dispositivos y accesos se indexan aparte."""
+
+    def __init__(self, nombre: str, direccion: Optional[str] = None, sede_id: Optional[str] = None):
+        if not nombre.strip():
+            raise ValueError("Error: el nombre no puede estar vacío.")
+
+        self.id = sede_id or str(uuid.uuid4())
+        self.nombre = nombre.strip()
+        self.direccion = direccion.strip() if direccion and direccion.strip() else None
+
+    def __str__(self):
+        return f"Sede(id={self.id[:8]}, nombre={self.nombre})"
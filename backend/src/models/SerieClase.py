@@ -0,0 +1,211 @@
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.models.Clase import Clase, DIAS_SEMANA, franjas_semanales, normalizar_dia
+
+FRECUENCIAS = ("diaria", "semanal")
+SEPARADOR_OCURRENCIA = "@"
+
+_FRECUENCIAS_RRULE = {"DAILY": "diaria", "WEEKLY": "semanal"}
+_DIAS_RRULE = {"MO": 0, "TU": 1, "WE": 2, "TH": 3, "FR": 4, "SA": 5, "SU": 6}
+
+
+def parsear_rrule(regla: str) -> Dict[str, object]:
+    """
+    Traduce el subconjunto de RRULE (RFC 5545) que soportan las series:
+    FREQ=DAILY|WEEKLY, INTERVAL, BYDAY, COUNT y UNTIL (AAAAMMDD).
+
+    Ej.: "FREQ=WEEKLY;BYDAY=MO,WE;COUNT=20" ->
+         {"frecuencia": "semanal", "dias": ["lunes", "miercoles"], "repeticiones": 20}
+    """
+    campos = {}
+    for parte in regla.strip().removeprefix("RRULE:").split(";"):
+        clave, _, valor = parte.partition("=")
+        campos[clave.strip().upper()] = valor.strip().upper()
+    if campos.get("FREQ") not in _FRECUENCIAS_RRULE:
+        raise ValueError("Error: regla inválida. FREQ debe ser DAILY o WEEKLY.")
+    try:
+        resultado: Dict[str, object] = {"frecuencia": _FRECUENCIAS_RRULE[campos["FREQ"]]}
+        if "INTERVAL" in campos:
+            resultado["intervalo"] = int(campos["INTERVAL"])
+        if "BYDAY" in campos:
+            resultado["dias"] = [DIAS_SEMANA[_DIAS_RRULE[d]] for d in campos["BYDAY"].split(",")]
+        if "COUNT" in campos:
+            resultado["repeticiones"] = int(campos["COUNT"])
+        if "UNTIL" in campos:
+            resultado["fecha_fin"] = datetime.strptime(campos["UNTIL"][:8], "%Y%m%d").date()
+    except (KeyError, ValueError):
+        raise ValueError("Error: regla inválida.")
+    return resultado
+
+
+class OcurrenciaClase(Clase):
+    """Sesión concreta de una serie. Solo se crea cuando alguien la reserva."""
+
+    def __init__(self, serie: "SerieClase", fecha: date):
+        super().__init__(serie.nombre, serie.horario, serie.aforo, serie.entrenador_id,
+                         serie.duracion, DIAS_SEMANA[fecha.weekday()], serie.sala, serie.sede_id)
+        self.id = f"{serie.id}{SEPARADOR_OCURRENCIA}{fecha.isoformat()}"
+        self.serie_id = serie.id
+        self.fecha = fecha
+
+    def proximo_inicio(self, desde: datetime) -> Optional[datetime]:
+        """La sesión solo se celebra una vez: su inicio, o None si ya ha pasado."""
+        inicio = datetime.combine(self.fecha, datetime.min.time()) + timedelta(minutes=self._inicio_dia)
+        return inicio if inicio >= desde else None
+
+
+class SerieClase:
+    """
+    Clase recurrente al estilo RRULE: diaria o semanal (en ciertos días), cada
+    `intervalo` días/semanas, desde `fecha_inicio` hasta `fecha_fin` o durante
+    `repeticiones` sesiones.
+
+    Las sesiones no se guardan: se calculan bajo demanda en la ventana de
+    fechas consultada, y solo se materializa (OcurrenciaClase) la que recibe
+    una reserva. La memoria crece con las reservas, no con el calendario.
+    """
+
+    def __init__(self, nombre: str, horario: str, aforo: int, entrenador_id: str, fecha_inicio: date,
+                 frecuencia: str = "semanal", intervalo: int = 1, dias: Optional[List[str]] = None,
+                 fecha_fin: Optional[date] = None, repeticiones: Optional[int] = None,
+                 duracion: int = 60, sala: Optional[str] = None, sede_id: Optional[str] = None):
+        # La plantilla valida nombre, horario, aforo, duración y sala igual que una clase normal
+        plantilla = Clase(nombre, horario, aforo, entrenador_id, duracion, None, sala)
+        if frecuencia not in FRECUENCIAS:
+            raise ValueError(f"Error: frecuencia inválida. Debe ser: {', '.join(FRECUENCIAS)}")
+        if intervalo <= 0:
+            raise ValueError("Error: el intervalo debe ser positivo.")
+        if fecha_fin is not None and fecha_fin < fecha_inicio:
+            raise ValueError("Error: la fecha de fin es anterior a la de inicio.")
+        if repeticiones is not None and repeticiones <= 0:
+            raise ValueError("Error: el número de repeticiones debe ser positivo.")
+
+        self.id = str(uuid.uuid4())
+        self.nombre = plantilla.nombre
+        self.horario = plantilla.horario
+        self.aforo = plantilla.aforo
+        self.entrenador_id = entrenador_id
+        self.duracion = plantilla.duracion
+        self.sala = plantilla.sala
+        self.sede_id = sede_id  # None = la de su entrenador
+        self.frecuencia = frecuencia
+        self.intervalo = intervalo
+        self.fecha_inicio = fecha_inicio
+        self.fecha_fin = fecha_fin
+        self.repeticiones = repeticiones
+        if frecuencia == "semanal":
+            nombres = [normalizar_dia(d) for d in dias] if dias else [DIAS_SEMANA[fecha_inicio.weekday()]]
+            self._dias_idx = sorted({DIAS_SEMANA.index(d) for d in nombres})
+        else:
+            self._dias_idx = list(range(len(DIAS_SEMANA)))
+        self.dias = [DIAS_SEMANA[i] for i in self._dias_idx]
+        self._inicio_dia = plantilla._inicio_dia
+        self._lunes_inicio = fecha_inicio - timedelta(days=fecha_inicio.weekday())
+        # Días de la primera semana anteriores a fecha_inicio (no cuentan como sesiones)
+        self._saltados = sum(1 for i in self._dias_idx if i < fecha_inicio.weekday())
+
+        # Solo las sesiones con reservas: fecha -> ocurrencia
+        self.ocurrencias: Dict[date, OcurrenciaClase] = {}
+
+    # =========== CÁLCULO DE SESIONES ===========
+
+    def _indice(self, fecha: date) -> int:
+        """Número de orden (desde 0) de la sesión de `fecha`, supuesta válida."""
+        if self.frecuencia == "diaria":
+            return (fecha - self.fecha_inicio).days // self.intervalo
+        semana = (fecha - self._lunes_inicio).days // 7
+        return (semana // self.intervalo) * len(self._dias_idx) + self._dias_idx.index(fecha.weekday()) - self._saltados
+
+    def es_ocurrencia(self, fecha: date) -> bool:
+        """Comprueba en O(1) si la serie tiene sesión en `fecha`."""
+        if fecha < self.fecha_inicio or (self.fecha_fin is not None and fecha > self.fecha_fin):
+            return False
+        if self.frecuencia == "diaria":
+            if (fecha - self.fecha_inicio).days % self.intervalo:
+                return False
+        else:
+            if fecha.weekday() not in self._dias_idx:
+                return False
+            if ((fecha - self._lunes_inicio).days // 7) % self.intervalo:
+                return False
+        return self.repeticiones is None or self._indice(fecha) < self.repeticiones
+
+    def fechas(self, desde: date, hasta: date) -> Iterator[date]:
+        """Fechas de las sesiones en [desde, hasta], en orden y sin recorrer días vacíos."""
+        desde = max(desde, self.fecha_inicio)
+        if self.fecha_fin is not None:
+            hasta = min(hasta, self.fecha_fin)
+        if desde > hasta:
+            return
+        if self.frecuencia == "diaria":
+            k = -(-(desde - self.fecha_inicio).days // self.intervalo)   # techo
+            while True:
+                if self.repeticiones is not None and k >= self.repeticiones:
+                    return
+                fecha = self.fecha_inicio + timedelta(days=k * self.intervalo)
+                if fecha > hasta:
+                    return
+                yield fecha
+                k += 1
+        semana = max(0, (desde - self._lunes_inicio).days // 7)
+        semana = -(-semana // self.intervalo) * self.intervalo          # alineada al intervalo
+        while True:
+            lunes = self._lunes_inicio + timedelta(weeks=semana)
+            if lunes > hasta:
+                return
+            for i in self._dias_idx:
+                fecha = lunes + timedelta(days=i)
+                if fecha < desde:
+                    continue
+                if fecha > hasta:
+                    return
+                if self.repeticiones is not None and self._indice(fecha) >= self.repeticiones:
+                    return
+                yield fecha
+            semana += self.intervalo
+
+    def franjas(self) -> List[Tuple[int, int]]:
+        """Franjas semanales que reserva la serie en la agenda (su patrón de días)."""
+        return franjas_semanales(self._dias_idx, self._inicio_dia, self.duracion)
+
+    def minuto_inicio(self) -> int:
+        return self._inicio_dia
+
+    # =========== OCURRENCIAS ===========
+
+    def id_ocurrencia(self, fecha: date) -> str:
+        return f"{self.id}{SEPARADOR_OCURRENCIA}{fecha.isoformat()}"
+
+    def ocurrencia(self, fecha: date, materializar: bool = False) -> Optional[OcurrenciaClase]:
+        """
+        Sesión de `fecha` si ya tiene reservas; con `materializar`, la crea
+        (si la serie tiene sesión ese día) para poder reservar en ella.
+        """
+        existente = self.ocurrencias.get(fecha)
+        if existente is not None or not materializar or not self.es_ocurrencia(fecha):
+            return existente
+        # setdefault: dos reservas simultáneas comparten la misma ocurrencia
+        return self.ocurrencias.setdefault(fecha, OcurrenciaClase(self, fecha))
+
+    def descartar_si_vacia(self, fecha: date) -> None:
+        """Libera la sesión materializada cuando ya no le quedan reservas."""
+        ocurrencia = self.ocurrencias.get(fecha)
+        if ocurrencia is not None and not ocurrencia.socios_inscritos:
+            del self.ocurrencias[fecha]
+
+    def plazas_disponibles(self, fecha: date) -> int:
+        ocurrencia = self.ocurrencias.get(fecha)
+        return ocurrencia.plazas_disponibles() if ocurrencia is not None else self.aforo
+
+
+def separar_id_ocurrencia(ocurrencia_id: str) -> Optional[Tuple[str, date]]:
+    """ "<serie_id>@2026-10-21" -> (serie_id, date(2026, 10, 21)), o None si no tiene ese formato."""
+    serie_id, sep, fecha = ocurrencia_id.partition(SEPARADOR_OCURRENCIA)
+    if not sep:
+        return None
+    try:
+        return serie_id, date.fromisoformat(fecha)
+    except ValueError:
+        return None
@@ -2,9 +2,7 @@ import uuid
 import re
 from datetime import date
 from typing import List
-from passlib.context import CryptContext  # NUEVO
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")  # NUEVO
+from src.auth import hash_password, verify_and_rehash
 fecha_nacimiento = "2005-03-15"
 
 
@@ -51,7 +49,7 @@ class Socio(Usuario):
         self.nivel = nivel.lower()
 
         # Guardar hash, no la contraseña en claro
-        self.password_hash = pwd_context.hash(password) if password else ""
+        self.password_hash = hash_password(password) if password else ""
 
         self.clases_reservadas: List[str] = []
         self.rutinas: List[str] = []
@@ -60,7 +58,11 @@ class Socio(Usuario):
     def verificar_contrasena(self, password: str) -> bool:
         if not self.password_hash:
             return False
-        return pwd_context.verify(password, self.password_hash)
+        valida, nuevo_hash = verify_and_rehash(password, self.password_hash)
+        if nuevo_hash:
+            # El coste de bcrypt ha cambiado: se guarda el hash con el coste actual
+            self.password_hash = nuevo_hash
+        return valida
 
     def reservar_clase(self, clase_id: str) -> None:
         if clase_id not in self.clases_reservadas:
@@ -0,0 +1,182 @@
+import asyncio
+import os
+import signal
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, Optional
+
+# Configuración
+PROFILE_MAX_SECONDS = 60                 # Duración máxima de un perfilado bajo demanda
+PROFILE_DEFAULT_INTERVAL = 0.005         # 5 ms entre muestras
+PROFILE_SIGNAL_SECONDS = float(os.getenv("PROFILE_SIGNAL_SECONDS", 10))
+PROFILE_OUTPUT_DIR = os.getenv("PROFILE_OUTPUT_DIR", "/tmp")
+PROFILE_REQUESTS_KEPT = 50               # Perfiles por petición que se guardan en memoria
+PROFILE_HEADER = b"x-debug-profile"
+
+
+def _nombre_frame(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Profiler de muestreo basado en la stdlib: un hilo lee `sys._current_frames()`
+    cada `intervalo` segundos y cuenta las pilas de todos los demás hilos.
+    El resultado se exporta en formato "collapsed stack" (flamegraph.pl, speedscope).
+    """
+
+    def __init__(self, intervalo: float = PROFILE_DEFAULT_INTERVAL):
+        self.intervalo = intervalo
+        self.muestras: Counter = Counter()
+        self._parar = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def _muestrear(self) -> None:
+        propio = threading.get_ident()
+        while not self._parar.is_set():
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == propio:
+                    continue
+                pila = []
+                while frame is not None:
+                    pila.append(_nombre_frame(frame))
+                    frame = frame.f_back
+                pila.reverse()
+                self.muestras[";".join(pila)] += 1
+            self._parar.wait(self.intervalo)
+
+    def iniciar(self) -> None:
+        self._hilo = threading.Thread(target=self._muestrear, name="sampling-profiler", daemon=True)
+        self._hilo.start()
+
+    def detener(self) -> str:
+        """Para el muestreo y devuelve las pilas en formato collapsed."""
+        self._parar.set()
+        if self._hilo is not None:
+            self._hilo.join()
+        return self.collapsed()
+
+    def collapsed(self) -> str:
+        return "".join(f"{pila} {n}\n" for pila, n in self.muestras.most_common())
+
+
+# Un solo perfilado global a la vez (el muestreo de todos los hilos no es gratis)
+_perfilado_global = threading.Lock()
+
+
+def perfilar(segundos: float, intervalo: float = PROFILE_DEFAULT_INTERVAL) -> Optional[str]:
+    """
+    Muestrea el proceso durante `segundos` (bloquea el hilo que llama).
+
+    Returns:
+        Las pilas en formato collapsed, o None si ya hay otro perfilado en marcha
+    """
+    if not _perfilado_global.acquire(blocking=False):
+        return None
+    try:
+        profiler = SamplingProfiler(intervalo)
+        profiler.iniciar()
+        time.sleep(min(segundos, PROFILE_MAX_SECONDS))
+        return profiler.detener()
+    finally:
+        _perfilado_global.release()
+
+
+def instalar_senal(senal: int = getattr(signal, "SIGUSR2", 0)) -> bool:
+    """
+    Instala un manejador: `kill -USR2 <pid>` perfila el proceso durante
+    PROFILE_SIGNAL_SECONDS y escribe el resultado en PROFILE_OUTPUT_DIR.
+
+    Returns:
+        True si se instaló (solo es posible desde el hilo principal y en POSIX)
+    """
+    if not senal:
+        return False
+
+    def _en_hilo() -> None:
+        resultado = perfilar(PROFILE_SIGNAL_SECONDS)
+        if resultado is None:
+            return
+        ruta = os.path.join(PROFILE_OUTPUT_DIR, f"perfil-{os.getpid()}-{int(time.time())}.collapsed")
+        with open(ruta, "w", encoding="utf-8") as f:
+            f.write(resultado)
+        print(f"🔥 Perfil guardado en {ruta}")
+
+    def _manejador(signum, frame) -> None:
+        # El manejador no debe bloquear: el muestreo corre en otro hilo
+        threading.Thread(target=_en_hilo, name="perfil-senal", daemon=True).start()
+
+    try:
+        signal.signal(senal, _manejador)
+    except ValueError:
+        return False
+    return True
+
+
+class PerfilesPeticiones:
+    """Últimos perfiles por petición, acotados a `maximo` entradas."""
+
+    def __init__(self, maximo: int = PROFILE_REQUESTS_KEPT):
+        self.maximo = maximo
+        self._perfiles: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def guardar(self, perfil_id: str, texto: str) -> None:
+        with self._lock:
+            self._perfiles[perfil_id] = texto
+            while len(self._perfiles) > self.maximo:
+                self._perfiles.popitem(last=False)
+
+    def obtener(self, perfil_id: str) -> Optional[str]:
+        with self._lock:
+            return self._perfiles.get(perfil_id)
+
+    def listar(self) -> Dict[str, int]:
+        """ID de perfil -> número de pilas distintas."""
+        with self._lock:
+            return {k: v.count("\n") for k, v in self._perfiles.items()}
+
+
+class PerfiladoMiddleware:
+    """
+    Middleware ASGI: si la petición trae la cabecera `X-Debug-Profile` y
+    `autorizado(scope)` lo permite, la muestrea mientras dura y devuelve el ID
+    del perfil en la cabecera `X-Profile-Id`.
+
+    El muestreo es de todo el proceso, así que con tráfico concurrente aparecen
+    también las pilas de otras peticiones.
+    """
+
+    def __init__(self, app, perfiles: PerfilesPeticiones, autorizado: Callable[[dict], bool],
+                 intervalo: float = 0.001):
+        self.app = app
+        self.perfiles = perfiles
+        self.autorizado = autorizado
+        self.intervalo = intervalo
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not any(n == PROFILE_HEADER for n, _ in scope.get("headers", ())):
+            await self.app(scope, receive, send)
+            return
+        if not self.autorizado(scope):
+            await self.app(scope, receive, send)
+            return
+
+        perfil_id = str(uuid.uuid4())
+
+        async def send_con_id(mensaje):
+            if mensaje["type"] == "http.response.start":
+                mensaje["headers"] = list(mensaje.get("headers", [])) + [(b"x-profile-id", perfil_id.encode())]
+            await send(mensaje)
+
+        profiler = SamplingProfiler(self.intervalo)
+        profiler.iniciar()
+        try:
+            await self.app(scope, receive, send_con_id)
+        finally:
+            # join() espera a que el muestreador termine su vuelta: fuera del event loop
+            self.perfiles.guardar(perfil_id, await asyncio.to_thread(profiler.detener))
@@ -0,0 +1,138 @@
+"""
+Protocolo binario de los dispositivos IoT.
+
+Un lote es una cabecera seguida de N registros de tamaño fijo, en little-endian
+y sin relleno. Los decimales viajan como enteros en punto fijo (décimas o
+centésimas) y la fecha como segundos Unix:
+
+  cabecera  <BBI      versión, tipo de dispositivo, número de registros   (6 bytes)
+  pulsera   <IBIHHHH  fecha, pulsaciones, pasos, calorías (cent.), peso levantado (déc.),
+                      repeticiones, tiempo de ejercicio (s)                (17 bytes)
+  bascula   <IHHH     fecha, peso (déc.), grasa corporal (déc. %), masa muscular (déc.)   (10 bytes)
+  sensor    <IHHH     fecha, repeticiones, peso levantado (déc.), tiempo de ejercicio (s)  (10 bytes)
+
+Una lectura de pulsera ocupa 17 bytes frente a unos 165 en JSON. El
+decodificador recorre el lote con memoryview + Struct.iter_unpack, sin copiar
+el cuerpo de la petición.
+"""
+import struct
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+VERSION = 1
+CABECERA = struct.Struct("<BBI")
+
+# tipo -> (código en la cabecera, formato del registro, campos en orden, divisor de cada campo)
+_FORMATOS: Dict[str, Tuple[int, struct.Struct, Tuple[str, ...], Tuple[int, ...]]] = {
+    "pulsera": (1, struct.Struct("<IBIHHHH"),
+                ("timestamp", "pulsaciones", "pasos", "calorias", "peso_levantado", "repeticiones", "tiempo_ejercicio"),
+                (1, 1, 1, 100, 10, 1, 1)),
+    "bascula": (2, struct.Struct("<IHHH"),
+                ("timestamp", "peso", "grasa_corporal", "masa_muscular"),
+                (1, 10, 10, 10)),
+    "sensor": (3, struct.Struct("<IHHH"),
+               ("timestamp", "repeticiones", "peso_levantado", "tiempo_ejercicio"),
+               (1, 1, 10, 1)),
+}
+_TIPO_POR_CODIGO = {codigo: tipo for tipo, (codigo, *_) in _FORMATOS.items()}
+
+# Lectura ya lista para el historial: (peso, repeticiones, tiempo, fecha)
+LecturaProgreso = Tuple[float, int, int, datetime]
+
+
+def tamano_registro(tipo: str) -> int:
+    return _FORMATOS[tipo][1].size
+
+
+def _formato(tipo: str):
+    try:
+        return _FORMATOS[tipo]
+    except KeyError:
+        raise ValueError(f"Error: tipo de dispositivo sin formato binario: {tipo}")
+
+
+# =========== CODIFICACIÓN (lado dispositivo) ===========
+
+def codificar(tipo: str, lecturas: Iterable[Dict[str, Any]]) -> bytes:
+    """Empaqueta lecturas con las claves de DispositivoIoT.datos en un lote binario."""
+    codigo, registro, campos, divisores = _formato(tipo)
+    cuerpo = bytearray()
+    n = 0
+    for datos in lecturas:
+        valores = []
+        for campo, divisor in zip(campos, divisores):
+            valor = datos[campo]
+            if campo == "timestamp":
+                valor = datetime.fromisoformat(valor).timestamp() if isinstance(valor, str) else valor
+            valores.append(round(valor * divisor))
+        try:
+            cuerpo += registro.pack(*valores)
+        except struct.error:
+            raise ValueError(f"Error: lectura {n} fuera de rango para el formato binario de {tipo}.")
+        n += 1
+    return CABECERA.pack(VERSION, codigo, n) + bytes(cuerpo)
+
+
+# =========== DECODIFICACIÓN (lado servidor) ===========
+
+def leer_cabecera(datos) -> Tuple[str, int, memoryview]:
+    """
+    Valida la cabecera y el tamaño del lote. Devuelve (tipo, número de
+    registros, vista de los registros) sin copiar `datos`.
+    """
+    vista = memoryview(datos)
+    if len(vista) < CABECERA.size:
+        raise ValueError("Error: lote binario incompleto.")
+    version, codigo, n = CABECERA.unpack_from(vista)
+    if version != VERSION:
+        raise ValueError(f"Error: versión de protocolo no soportada: {version}")
+    tipo = _TIPO_POR_CODIGO.get(codigo)
+    if tipo is None:
+        raise ValueError(f"Error: tipo de dispositivo desconocido: {codigo}")
+    registros = vista[CABECERA.size:]
+    if len(registros) != n * _FORMATOS[tipo][1].size:
+        raise ValueError(f"Error: el lote declara {n} lecturas y no cuadra con su tamaño.")
+    return tipo, n, registros
+
+
+def decodificar(datos) -> Tuple[str, List[Dict[str, Any]]]:
+    """Lote binario -> (tipo, lecturas como diccionarios de DispositivoIoT.datos)."""
+    tipo, _, registros = leer_cabecera(datos)
+    _, registro, campos, divisores = _FORMATOS[tipo]
+    lecturas = []
+    for valores in registro.iter_unpack(registros):
+        lectura = {c: (v / d if d != 1 else v) for c, v, d in zip(campos, valores, divisores)}
+        lectura["timestamp"] = datetime.fromtimestamp(lectura["timestamp"]).isoformat()
+        lecturas.append(lectura)
+    return tipo, lecturas
+
+
+def progresos(datos) -> Tuple[str, Iterator[LecturaProgreso]]:
+    """
+    Lote binario -> (tipo, lecturas de progreso). Camino rápido de la ingesta:
+    va de los campos empaquetados a (peso, repeticiones, tiempo, fecha) sin
+    pasar por diccionarios. Las pulseras y sensores registran fuerza; las
+    básculas, el peso corporal.
+    """
+    tipo, _, registros = leer_cabecera(datos)
+    iterador = _FORMATOS[tipo][1].iter_unpack(registros)
+    desde_ts = datetime.fromtimestamp
+    if tipo == "pulsera":
+        lecturas = ((peso / 10, reps, tiempo, desde_ts(ts)) for ts, _, _, _, peso, reps, tiempo in iterador)
+    elif tipo == "bascula":
+        lecturas = ((peso / 10, 0, 0, desde_ts(ts)) for ts, peso, _, _ in iterador)
+    else:
+        lecturas = ((peso / 10, reps, tiempo, desde_ts(ts)) for ts, reps, peso, tiempo in iterador)
+    return tipo, lecturas
+
+
+def progreso_de_lectura(datos: Dict[str, Any]) -> Optional[Tuple[float, int, int]]:
+    """
+    Mismo criterio para lecturas JSON: (peso, repeticiones, tiempo) si la
+    lectura es de fuerza o de báscula, None si solo es informativa.
+    """
+    if "peso_levantado" in datos and "repeticiones" in datos:
+        return float(datos["peso_levantado"]), int(datos["repeticiones"]), int(datos.get("tiempo_ejercicio", 0))
+    if "peso" in datos:
+        return float(datos["peso"]), 0, 0
+    return None
@@ -0,0 +1,311 @@
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from src.auth import email_de_scope
+from src.metrics import registro
+
+# Configuración (sobrescribible por variables de entorno)
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+RATE_LIMIT_CAPACITY = float(os.getenv("RATE_LIMIT_CAPACITY", 60))       # tokens por cubo
+RATE_LIMIT_REFILL = float(os.getenv("RATE_LIMIT_REFILL", 10))           # tokens por segundo
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", 100_000))    # cubos en memoria
+RATE_LIMIT_SEDE_CAPACITY = float(os.getenv("RATE_LIMIT_SEDE_CAPACITY", 600))  # cubo compartido de cada sede
+RATE_LIMIT_SEDE_REFILL = float(os.getenv("RATE_LIMIT_SEDE_REFILL", 200))
+RATE_LIMIT_IOT_CAPACITY = float(os.getenv("RATE_LIMIT_IOT_CAPACITY", 200))  # cubo IoT de cada usuario
+RATE_LIMIT_IOT_REFILL = float(os.getenv("RATE_LIMIT_IOT_REFILL", 20))
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", 4))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", 32))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", 2.0))  # segundos
+ADMISSION_CARGA_MAX_CONCURRENT = int(os.getenv("ADMISSION_CARGA_MAX_CONCURRENT", 1))
+ADMISSION_CARGA_MAX_QUEUE = int(os.getenv("ADMISSION_CARGA_MAX_QUEUE", 4))
+ADMISSION_IOT_MAX_CONCURRENT = int(os.getenv("ADMISSION_IOT_MAX_CONCURRENT", 4))
+
+# Grupos de admisión: (plazas concurrentes, tamaño de la cola). Cada grupo
+# tiene su propio semáforo: una importación larga no deja sin plaza a /token.
+GRUPOS_ADMISION: Dict[str, Tuple[int, int]] = {
+    "auth": (ADMISSION_MAX_CONCURRENT, ADMISSION_MAX_QUEUE),
+    "carga": (ADMISSION_CARGA_MAX_CONCURRENT, ADMISSION_CARGA_MAX_QUEUE),
+    "iot": (ADMISSION_IOT_MAX_CONCURRENT, ADMISSION_MAX_QUEUE),
+}
+
+# Reglas por endpoint: (método, prefijo de ruta, coste en tokens, cubo, grupo de admisión o None)
+# Se aplica la primera que coincide; el resto de peticiones cuesta 1 token del
+# cubo del usuario y no se encola. Las rutas IoT gastan de un cubo aparte, más
+# grande: un dispositivo que vuelca lotes seguidos no agota el del usuario.
+REGLAS: List[Tuple[str, str, float, str, Optional[str]]] = [
+    ("POST", "/token/refresh", 1, "usuario", None),     # sin bcrypt: solo firma tokens
+    ("POST", "/token", 10, "usuario", "auth"),          # bcrypt
+    ("POST", "/socios", 10, "usuario", "auth"),         # bcrypt
+    ("POST", "/importar/", 25, "usuario", "carga"),     # bcrypt por lote; la concurrencia la acota su grupo
+    ("POST", "/iot/sincronizar/", 5, "iot", "iot"),
+    ("POST", "/iot/dispositivos/", 10, "iot", "iot"),   # lotes de lecturas
+]
+COSTE_POR_DEFECTO = 1.0
+
+decisiones = registro.counter(
+    "gym_rate_limit_decisions_total", "Decisiones del control de carga por regla", ("regla", "resultado"))
+admision_en_vuelo = registro.gauge(
+    "gym_admission_in_flight", "Peticiones pesadas ejecutándose", ("grupo",))
+admision_en_cola = registro.gauge(
+    "gym_admission_queued", "Peticiones pesadas esperando plaza", ("grupo",))
+
+
+def regla_para(metodo: str, ruta: str) -> Tuple[str, float, str, Optional[str]]:
+    """Devuelve (nombre de la regla, coste, cubo, grupo de admisión) para una petición."""
+    for m, prefijo, coste, cubo, grupo in REGLAS:
+        if metodo == m and ruta.startswith(prefijo):
+            return prefijo, coste, cubo, grupo
+    return "default", COSTE_POR_DEFECTO, "usuario", None
+
+
+class TokenBucket:
+    """Cubo de tokens: `capacidad` de ráfaga y `recarga` tokens por segundo."""
+
+    __slots__ = ("capacidad", "recarga", "tokens", "ultimo")
+
+    def __init__(self, capacidad: float, recarga: float):
+        self.capacidad = capacidad
+        self.recarga = recarga
+        self.tokens = capacidad
+        self.ultimo = time.monotonic()
+
+    def consumir(self, coste: float) -> float:
+        """
+        Intenta gastar `coste` tokens.
+
+        Returns:
+            0 si se permite la petición; si no, los segundos hasta que habrá tokens
+        """
+        ahora = time.monotonic()
+        self.tokens = min(self.capacidad, self.tokens + (ahora - self.ultimo) * self.recarga)
+        self.ultimo = ahora
+        if self.tokens >= coste:
+            self.tokens -= coste
+            return 0.0
+        if self.recarga <= 0:
+            return math.inf
+        return (coste - self.tokens) / self.recarga
+
+
+class RateLimiter:
+    """Un TokenBucket por clave (usuario o IP), con expulsión LRU para acotar memoria."""
+
+    def __init__(self, capacidad: float = RATE_LIMIT_CAPACITY, recarga: float = RATE_LIMIT_REFILL,
+                 max_claves: int = RATE_LIMIT_MAX_KEYS):
+        self.capacidad = capacidad
+        self.recarga = recarga
+        self.max_claves = max_claves
+        self._cubos: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consumir(self, clave: str, coste: float) -> float:
+        """Igual que TokenBucket.consumir, sobre el cubo de `clave`."""
+        with self._lock:
+            cubo = self._cubos.get(clave)
+            if cubo is None:
+                cubo = self._cubos[clave] = TokenBucket(self.capacidad, self.recarga)
+                if len(self._cubos) > self.max_claves:
+                    self._cubos.popitem(last=False)
+            else:
+                self._cubos.move_to_end(clave)
+            # Una petición más cara que el cubo entero nunca podría pasar
+            return cubo.consumir(min(coste, self.capacidad))
+
+    def __len__(self) -> int:
+        return len(self._cubos)
+
+
+class ControlAdmision:
+    """
+    Limita cuántas peticiones pesadas se ejecutan a la vez.
+
+    Si todas las plazas están ocupadas la petición espera en cola hasta
+    `timeout` segundos; si la cola también está llena se rechaza en el acto.
+    """
+
+    def __init__(self, max_concurrentes: int = ADMISSION_MAX_CONCURRENT,
+                 max_cola: int = ADMISSION_MAX_QUEUE, timeout: float = ADMISSION_QUEUE_TIMEOUT):
+        self.max_concurrentes = max_concurrentes
+        self.max_cola = max_cola
+        self.timeout = timeout
+        self.en_vuelo = 0
+        self.en_cola = 0
+        self.tiempo_medio = 0.1  # EWMA del tiempo de servicio, en segundos
+        self._semaforo: Optional[asyncio.Semaphore] = None
+
+    def _get_semaforo(self) -> asyncio.Semaphore:
+        # Se crea dentro del event loop que sirve las peticiones
+        if self._semaforo is None:
+            self._semaforo = asyncio.Semaphore(self.max_concurrentes)
+        return self._semaforo
+
+    def retry_after(self) -> int:
+        """Estimación de cuándo habrá hueco, a partir de la cola y el tiempo medio."""
+        return max(1, math.ceil((self.en_cola + 1) * self.tiempo_medio / self.max_concurrentes))
+
+    async def entrar(self) -> bool:
+        """Ocupa una plaza. Devuelve False si hay que descartar la petición."""
+        semaforo = self._get_semaforo()
+        if not semaforo.locked():
+            await semaforo.acquire()
+        else:
+            if self.en_cola >= self.max_cola:
+                return False
+            self.en_cola += 1
+            try:
+                await asyncio.wait_for(semaforo.acquire(), self.timeout)
+            except asyncio.TimeoutError:
+                return False
+            finally:
+                self.en_cola -= 1
+        self.en_vuelo += 1
+        return True
+
+    def salir(self, duracion: float) -> None:
+        """Libera la plaza y actualiza el tiempo medio de servicio."""
+        self.en_vuelo -= 1
+        self.tiempo_medio = 0.8 * self.tiempo_medio + 0.2 * duracion
+        self._get_semaforo().release()
+
+
+def _sede_peticion(scope) -> Optional[str]:
+    """Sede a la que va la petición: /sedes/{sede_id}/... o el parámetro ?sede=."""
+    ruta = scope["path"]
+    if ruta.startswith("/sedes/"):
+        return ruta.split("/", 3)[2] or None
+    consulta = scope.get("query_string", b"")
+    if b"sede=" in consulta:
+        valores = parse_qs(consulta.decode("latin-1")).get("sede")
+        return valores[0] if valores else None
+    return None
+
+
+def _clave_peticion(scope) -> str:
+    """Clave del cubo: el email del token si es válido; si no, la IP del cliente."""
+    email = email_de_scope(scope)
+    if email:
+        return "user:" + email
+    cliente = scope.get("client")
+    return "ip:" + (cliente[0] if cliente else "desconocido")
+
+
+async def _responder_error(send, status: int, detalle: str, retry_after: int) -> None:
+    cuerpo = ('{"detail":"%s"}' % detalle).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(cuerpo)).encode()),
+            (b"retry-after", str(retry_after).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": cuerpo})
+
+
+class ControlCarga:
+    """
+    Agrupa los rate limiters, el control de admisión de cada grupo y sus
+    contadores. Además del cubo de cada usuario, las peticiones de una sede
+    gastan del cubo de esa sede: una sede con un pico de tráfico recibe 429
+    sin agotar a las demás.
+    """
+
+    def __init__(self, limiter: Optional[RateLimiter] = None,
+                 admision: Optional[Dict[str, ControlAdmision]] = None, activo: bool = RATE_LIMIT_ENABLED,
+                 limiter_sedes: Optional[RateLimiter] = None, limiter_iot: Optional[RateLimiter] = None):
+        self.limiter = limiter or RateLimiter()
+        self.limiter_sedes = limiter_sedes or RateLimiter(RATE_LIMIT_SEDE_CAPACITY, RATE_LIMIT_SEDE_REFILL, 10_000)
+        self.limiter_iot = limiter_iot or RateLimiter(RATE_LIMIT_IOT_CAPACITY, RATE_LIMIT_IOT_REFILL)
+        self.admision = admision or {
+            grupo: ControlAdmision(plazas, cola) for grupo, (plazas, cola) in GRUPOS_ADMISION.items()
+        }
+        self.activo = activo
+        # Contadores por regla: permitidas / limitadas (429) / descartadas (503)
+        self.contadores: Dict[str, Dict[str, int]] = {}
+        registro.al_recolectar(self._actualizar_gauges)
+
+    def limiter_para(self, cubo: str) -> RateLimiter:
+        return self.limiter_iot if cubo == "iot" else self.limiter
+
+    def contar(self, regla: str, resultado: str) -> None:
+        por_regla = self.contadores.setdefault(regla, {"permitidas": 0, "limitadas": 0, "descartadas": 0})
+        por_regla[resultado] += 1
+        decisiones.inc(regla, resultado)
+
+    def _actualizar_gauges(self) -> None:
+        for grupo, admision in self.admision.items():
+            admision_en_vuelo.set(admision.en_vuelo, grupo)
+            admision_en_cola.set(admision.en_cola, grupo)
+
+    def estadisticas(self) -> Dict:
+        """Estado actual de los limitadores y de las colas de admisión."""
+        return {
+            "claves_activas": len(self.limiter),
+            "claves_iot_activas": len(self.limiter_iot),
+            "sedes_activas": len(self.limiter_sedes),
+            "admision": {
+                grupo: {"en_vuelo": a.en_vuelo, "en_cola": a.en_cola, "tiempo_medio": a.tiempo_medio}
+                for grupo, a in self.admision.items()
+            },
+            "por_regla": {r: dict(c) for r, c in self.contadores.items()},
+        }
+
+
+class ControlCargaMiddleware:
+    """
+    Middleware ASGI: rate limiting por usuario/IP y por sede (429) y control
+    de admisión de los endpoints pesados (503), todos con cabecera Retry-After.
+    """
+
+    def __init__(self, app, control: ControlCarga):
+        self.app = app
+        self.control = control
+
+    async def __call__(self, scope, receive, send):
+        control = self.control
+        if scope["type"] != "http" or not control.activo:
+            await self.app(scope, receive, send)
+            return
+
+        regla, coste, cubo, grupo = regla_para(scope["method"], scope["path"])
+
+        espera = control.limiter_para(cubo).consumir(_clave_peticion(scope), coste)
+        if espera > 0:
+            control.contar(regla, "limitadas")
+            await _responder_error(send, 429, "Demasiadas peticiones, inténtalo más tarde",
+                                   max(1, math.ceil(espera)))
+            return
+
+        sede = _sede_peticion(scope)
+        if sede is not None:
+            espera = control.limiter_sedes.consumir("sede:" + sede, coste)
+            if espera > 0:
+                control.contar("sede", "limitadas")
+                await _responder_error(send, 429, "Demasiadas peticiones a esta sede, inténtalo más tarde",
+                                       max(1, math.ceil(espera)))
+                return
+
+        if grupo is None:
+            control.contar(regla, "permitidas")
+            await self.app(scope, receive, send)
+            return
+
+        admision = control.admision[grupo]
+        if not await admision.entrar():
+            control.contar(regla, "descartadas")
+            await _responder_error(send, 503, "Servidor saturado, inténtalo más tarde",
+                                   admision.retry_after())
+            return
+        control.contar(regla, "permitidas")
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admision.salir(time.perf_counter() - inicio)
@@ -1,10 +1,18 @@
 from pydantic import BaseModel, EmailStr
+from datetime import date, datetime, time
 from typing import Optional, List
 
+from src.models.Sede import SEDE_PRINCIPAL
+
 # Auth
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None  # para /token/refresh, sin volver a enviar la contraseña
+    expires_in: Optional[int] = None     # segundos de vida del access_token
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 # Socio
 class SocioCreate(BaseModel):
@@ -24,12 +32,40 @@ class SocioResponse(BaseModel):
     class Config:
         from_attributes = True
 
+# Estadísticas y clasificaciones
+class EstadisticasResponse(BaseModel):
+    puntos: float
+    posicion: Optional[int] = None
+    total_socios: int
+    sesiones: int
+    accesos: int
+    volumen_semanal: float              # kg (peso x repeticiones) de la semana en curso
+    posicion_volumen_semanal: Optional[int] = None
+    racha_actual: int                   # días consecutivos con acceso
+    mejor_racha: int
+
+class PuestoClasificacion(BaseModel):
+    posicion: int
+    socio_id: str
+    nombre: str
+    valor: float
+
+class ClasificacionResponse(BaseModel):
+    tipo: str
+    total: int
+    mi_posicion: Optional[int] = None
+    puestos: List[PuestoClasificacion]
+
 # Clase
 class ClaseCreate(BaseModel):
     nombre: str
     horario: str
     aforo: int
     entrenador_id: str
+    duracion: int = 60            # minutos
+    dia: Optional[str] = None     # None = todos los días
+    sala: Optional[str] = None
+    sede_id: Optional[str] = None  # None = la sede del entrenador
 
 class ClaseResponse(BaseModel):
     id: str
@@ -37,14 +73,72 @@ class ClaseResponse(BaseModel):
     horario: str
     aforo: int
     plazas_disponibles: int
+    entrenador_id: Optional[str] = None
+    duracion: int = 60
+    dia: Optional[str] = None
+    sala: Optional[str] = None
+    sede_id: Optional[str] = None
     
     class Config:
         from_attributes = True
         extra = "ignore"
     
+# Series de clases recurrentes
+class SerieCreate(BaseModel):
+    nombre: str
+    horario: str
+    aforo: int
+    entrenador_id: str
+    fecha_inicio: date
+    frecuencia: str = "semanal"           # diaria | semanal
+    intervalo: int = 1
+    dias: Optional[List[str]] = None      # solo semanal; por defecto, el día de fecha_inicio
+    fecha_fin: Optional[date] = None
+    repeticiones: Optional[int] = None
+    duracion: int = 60
+    sala: Optional[str] = None
+    sede_id: Optional[str] = None         # None = la sede del entrenador
+    regla: Optional[str] = None           # alternativa RRULE: "FREQ=WEEKLY;BYDAY=MO,WE;COUNT=20"
+
+class SerieResponse(BaseModel):
+    id: str
+    nombre: str
+    horario: str
+    aforo: int
+    entrenador_id: str
+    duracion: int
+    sala: Optional[str] = None
+    sede_id: Optional[str] = None
+    frecuencia: str
+    intervalo: int
+    dias: List[str]
+    fecha_inicio: date
+    fecha_fin: Optional[date] = None
+    repeticiones: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+class OcurrenciaResponse(BaseModel):
+    id: str               # usable como clase_id en /reservas
+    serie_id: str
+    nombre: str
+    fecha: date
+    horario: str
+    duracion: int
+    sala: Optional[str] = None
+    plazas_disponibles: int
+
 class ReservaRequest(BaseModel):
     clase_id: str
 
+class AvisoCreate(BaseModel):
+    mensaje: str
+
+class AvisoResponse(BaseModel):
+    clase_id: str
+    suscriptores: int  # socios con reserva a los que se repartirá
+
 class RutinaResponse(BaseModel):
     id: str
     nombre: str
@@ -54,21 +148,169 @@ class RutinaResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class EjercicioRutinaResponse(BaseModel):
+    ejercicio_id: str
+    nombre: str
+    grupo_muscular: str
+    repeticiones: int
+    series: int
+
+class RutinaDetalleResponse(RutinaResponse):
+    ejercicios: List[EjercicioRutinaResponse]
+
+class EjercicioRutinaCreate(BaseModel):
+    ejercicio_id: Optional[str] = None   # Del catálogo...
+    nombre: Optional[str] = None         # ...o por nombre (se da de alta si no existe)
+    repeticiones: int = 10
+    series: int = 3
+
+class RutinaRecomendadaResponse(RutinaResponse):
+    puntuacion: float
+
 class RutinaCreate(BaseModel):
     nombre: str
     duracion: int
     dificultad: str
 
+# Sedes
+class SedeCreate(BaseModel):
+    nombre: str
+    direccion: Optional[str] = None
+
+class SedeResponse(BaseModel):
+    id: str
+    nombre: str
+    direccion: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class OcupacionSedeResponse(BaseModel):
+    sede_id: str
+    nombre: str
+    clases: int
+    series: int
+    entrenadores: int
+    plazas: int
+    inscritos: int
+    ocupacion: float          # inscritos / plazas de sus clases semanales
+    reservas_series: int
+    dispositivos: int
+    dispositivos_conectados: int
+    accesos_hoy: int
+
+class AccesoResponse(BaseModel):
+    id: str
+    socio_id: str
+    socio_nombre: str
+    fecha: date
+    hora: time
+    sede_id: str
+
+    class Config:
+        from_attributes = True
+
 # Entrenadores
 class EntrenadorCreate(BaseModel):
     nombre: str
     email: EmailStr
     especialidad: str
+    sede_id: str = SEDE_PRINCIPAL
 
 class EntrenadorResponse(BaseModel):
     id: str
     nombre: str
     especialidad: str
+    sede_id: str
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class FranjaHorario(BaseModel):
+    clase_id: str
+    nombre: str
+    dia: str
+    inicio: str
+    fin: str
+    sala: Optional[str] = None
+
+class DisponibilidadResponse(BaseModel):
+    disponible: bool
+    motivo: Optional[str] = None
+
+# Ejercicios
+class EjercicioCreate(BaseModel):
+    nombre: str
+    grupo_muscular: str = "general"
+
+class EjercicioResponse(BaseModel):
+    id: str
+    nombre: str
+    grupo_muscular: str
+
+    class Config:
+        from_attributes = True
+
+# Búsqueda
+class ResultadoBusqueda(BaseModel):
+    tipo: str
+    id: str
+    nombre: str
+    puntuacion: float
+
+class BusquedaResponse(BaseModel):
+    consulta: str
+    total: int
+    pagina: int
+    tamano: int
+    resultados: List[ResultadoBusqueda]
+
+# Importación masiva
+class ErrorImportacion(BaseModel):
+    linea: int
+    error: str
+
+class ImportacionResponse(BaseModel):
+    entidad: str
+    importados: int
+    rechazados: int
+    errores: List[ErrorImportacion]
+
+# Progreso (registros recientes y días ya compactados)
+class ProgresoResponse(BaseModel):
+    id: str
+    socio_id: str
+    fecha: datetime
+    peso: float           # en un día compactado, el máximo del día
+    repeticiones: int
+    tiempo: int
+    sesiones: int = 1
+    agregado: bool = False  # True si es el resumen de un día antiguo
+
+    class Config:
+        from_attributes = True
+
+# Dispositivos IoT
+class DispositivoCreate(BaseModel):
+    tipo: str  # pulsera, bascula o sensor
+    sede_id: str = SEDE_PRINCIPAL
+
+class DispositivoResponse(BaseModel):
+    id: str
+    tipo: str
+    socio_id: str
+    sede_id: str
+    conectado: bool
+    ultima_conexion: Optional[datetime] = None
+    ultima_secuencia: int
+
+    class Config:
+        from_attributes = True
+
+# Ingesta de lecturas IoT
+class IngestaIoTResponse(BaseModel):
+    dispositivo_id: str
+    formato: str
+    lecturas: int
+    progresos: int
+    duplicado: bool = False  # la secuencia ya se había aceptado: no se ha vuelto a insertar
@@ -0,0 +1,161 @@
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from src.auth import ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_DAYS
+from src.metrics import registro
+
+# Configuración (sobrescribible por variables de entorno)
+SESIONES_MAX = int(os.getenv("SESIONES_MAX", 100_000))  # sesiones abiertas en memoria como máximo
+
+eventos_sesion = registro.counter(
+    "gym_sesiones_total",
+    "Eventos de las sesiones por tipo (abierta, refrescada, reutilizada, cerrada, desconocida, expulsada)",
+    ("evento",))
+sesiones_activas = registro.gauge("gym_sesiones_activas", "Sesiones abiertas (con token de refresco vigente)")
+claves_revocadas = registro.gauge(
+    "gym_sesiones_revocadas", "Tokens y sesiones revocados que aún no han caducado")
+
+
+class _Sesion:
+    """Una sesión abierta con /token: de quién es y cuál es su token de refresco vigente."""
+
+    __slots__ = ("email", "refresco", "expira")
+
+    def __init__(self, email: str, refresco: str, expira: float) -> None:
+        self.email = email
+        self.refresco = refresco
+        self.expira = expira
+
+
+class AlmacenSesiones:
+    """
+    Sesiones del servidor y lista de revocación de tokens.
+
+    Cada login abre una sesión (su id va en el claim "sid" de los tokens) con
+    un token de refresco; refrescar da tokens nuevos sin volver a pasar por
+    bcrypt y rota el de refresco: el anterior deja de valer y, si alguien lo
+    vuelve a presentar (token robado o reutilizado), se cierra la sesión.
+
+    Revocar es apuntar el jti del token, o el sid de una sesión cerrada, en
+    un diccionario: comprobarlo en cada petición es una búsqueda O(1). Una
+    revocación solo hace falta mientras pueda quedar vivo un token de acceso
+    afectado, así que dura lo mismo que estos; como el TTL es igual para
+    todas, el orden de inserción es el de caducidad y la purga solo mira las
+    del principio. Lo mismo con las sesiones, que duran lo que el token de
+    refresco del login (la rotación no las alarga).
+
+    Está en memoria: tras un reinicio los tokens de acceso siguen valiendo
+    hasta que caducan, pero los de refresco no y hay que volver a entrar.
+    Se usa desde el event loop, así que no necesita lock.
+    """
+
+    def __init__(self, max_sesiones: int = SESIONES_MAX,
+                 duracion_acceso: float = ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+                 duracion_sesion: float = REFRESH_TOKEN_EXPIRE_DAYS * 24 * 3600) -> None:
+        self.max_sesiones = max_sesiones
+        self.duracion_acceso = duracion_acceso
+        self.duracion_sesion = duracion_sesion
+        self._sesiones: "OrderedDict[str, _Sesion]" = OrderedDict()
+        self._revocados: "OrderedDict[str, float]" = OrderedDict()  # jti o sid -> hasta cuándo
+        registro.al_recolectar(self._publicar)
+
+    def _publicar(self) -> None:
+        sesiones_activas.set(len(self._sesiones))
+        claves_revocadas.set(len(self._revocados))
+
+    def _purgar(self, ahora: float) -> None:
+        sesiones = self._sesiones
+        while sesiones:
+            primera = next(iter(sesiones.values()))
+            if primera.expira > ahora and len(sesiones) <= self.max_sesiones:
+                break
+            if primera.expira > ahora:
+                eventos_sesion.inc("expulsada")  # sobran sesiones: sale la más antigua
+            sesiones.popitem(last=False)
+        # Las revocaciones no se descartan antes de caducar: el token volvería a valer
+        revocados = self._revocados
+        while revocados and next(iter(revocados.values())) <= ahora:
+            revocados.popitem(last=False)
+
+    # =========== SESIONES ===========
+
+    def abrir(self, email: str) -> Tuple[str, str]:
+        """Abre una sesión tras un login correcto. Devuelve (id de la sesión, jti del token de refresco)."""
+        ahora = time.time()
+        sesion_id, refresco = uuid.uuid4().hex, uuid.uuid4().hex
+        self._sesiones[sesion_id] = _Sesion(email, refresco, ahora + self.duracion_sesion)
+        self._purgar(ahora)
+        eventos_sesion.inc("abierta")
+        return sesion_id, refresco
+
+    def rotar(self, sesion_id: str, refresco: str) -> Optional[Tuple[str, str]]:
+        """
+        Canjea el token de refresco vigente de una sesión por uno nuevo.
+
+        Returns:
+            (email, jti del nuevo token de refresco), o None si la sesión no
+            existe o ha caducado, o si el token ya se había usado (en ese caso
+            se cierra la sesión)
+        """
+        ahora = time.time()
+        self._purgar(ahora)
+        sesion = self._sesiones.get(sesion_id)
+        if sesion is None or sesion.expira <= ahora:
+            eventos_sesion.inc("desconocida")
+            return None
+        if sesion.refresco != refresco:
+            eventos_sesion.inc("reutilizada")
+            self.cerrar(sesion_id)
+            return None
+        sesion.refresco = uuid.uuid4().hex
+        eventos_sesion.inc("refrescada")
+        return sesion.email, sesion.refresco
+
+    def expira(self, sesion_id: str) -> Optional[float]:
+        """Instante (epoch) en que caduca la sesión, o None si no está abierta."""
+        sesion = self._sesiones.get(sesion_id)
+        return sesion.expira if sesion else None
+
+    def cerrar(self, sesion_id: str) -> None:
+        """Cierra la sesión: ni su token de refresco ni sus tokens de acceso vuelven a valer."""
+        if self._sesiones.pop(sesion_id, None) is not None:
+            eventos_sesion.inc("cerrada")
+        self.revocar(sesion_id)
+
+    # =========== REVOCACIÓN ===========
+
+    def revocar(self, clave: str) -> None:
+        """Revoca un jti (o un sid) hasta que caduquen los tokens de acceso emitidos antes de ahora."""
+        ahora = time.time()
+        self._revocados.pop(clave, None)  # al final, con el TTL nuevo
+        self._revocados[clave] = ahora + self.duracion_acceso
+        self._purgar(ahora)
+
+    def revocado(self, claves: Iterable[Optional[str]]) -> bool:
+        """Indica si alguna de las claves (jti, sid) de un token está revocada."""
+        revocados = self._revocados
+        if not revocados:
+            return False
+        ahora = time.time()
+        for clave in claves:
+            if clave is not None:
+                hasta = revocados.get(clave)
+                if hasta is not None and hasta > ahora:
+                    return True
+        return False
+
+    def estado(self) -> Dict[str, float]:
+        self._purgar(time.time())
+        return {
+            "sesiones": len(self._sesiones),
+            "revocados": len(self._revocados),
+            "max_sesiones": self.max_sesiones,
+            "duracion_acceso_s": self.duracion_acceso,
+            "duracion_sesion_s": self.duracion_sesion,
+        }
+
+    def __len__(self) -> int:
+        return len(self._sesiones)
@@ -0,0 +1,19 @@
+"""
+Configuración común de las pruebas (desde la carpeta backend/: python -m pytest).
+
+Los servicios leen su configuración del entorno al importarse: antes de
+importar nada de `src` se llevan sus directorios a uno temporal y se baja
+el coste de bcrypt para que las pruebas no tarden.
+"""
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_TEMPORAL = tempfile.mkdtemp(prefix="gym-tests-")
+os.environ.setdefault("HISTORIAL_DIR", os.path.join(_TEMPORAL, "historial"))
+os.environ.setdefault("ANALITICA_DIR", os.path.join(_TEMPORAL, "analitica"))
+os.environ.setdefault("NOTIFICACIONES_SUMIDERO", "ninguno")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
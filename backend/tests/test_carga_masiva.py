@@ -0,0 +1,64 @@
+import asyncio
+
+from src.Services import Carga_masiva_service
+from src.Services.Carga_masiva_service import _registros
+
+
+async def _trozos(cuerpo: bytes, tamano: int):
+    for i in range(0, len(cuerpo), tamano):
+        yield cuerpo[i:i + tamano]
+
+
+def _leer(cuerpo: bytes, formato: str = "csv", tamano: int = 1 << 16):
+    async def leer():
+        return [fila async for fila in _registros(_trozos(cuerpo, tamano), formato)]
+    return asyncio.run(leer())
+
+
+CSV = (b'nombre,email,nivel\r\n'
+       b'Ana,ana@test.gym,avanzado\r\n'
+       b'"Ruiz, Luis",luis@test.gym,\r\n'
+       b'\r\n'
+       b'"Linea\ncon salto",salto@test.gym,principiante\r\n'
+       b'O"Brien,obrien@test.gym,intermedio\r\n')
+
+
+def test_csv_con_comillas_y_columnas_vacias():
+    assert _leer(CSV) == [
+        (2, {"nombre": "Ana", "email": "ana@test.gym", "nivel": "avanzado"}),
+        (3, {"nombre": "Ruiz, Luis", "email": "luis@test.gym"}),
+        (5, {"nombre": "Linea\ncon salto", "email": "salto@test.gym", "nivel": "principiante"}),
+        (7, {"nombre": 'O"Brien', "email": "obrien@test.gym", "nivel": "intermedio"}),
+    ]
+
+
+def test_csv_igual_en_trozos_pequenos():
+    # Los trozos cortan líneas, campos entre comillas y caracteres UTF-8 multibyte
+    cuerpo = CSV + "Íñigo,inigo@test.gym,avanzado\n".encode()
+    esperado = _leer(cuerpo)
+    assert esperado[-1] == (8, {"nombre": "Íñigo", "email": "inigo@test.gym", "nivel": "avanzado"})
+    for tamano in (1, 3, 7):
+        assert _leer(cuerpo, tamano=tamano) == esperado
+
+
+def test_csv_con_columnas_de_mas_o_de_menos():
+    filas = _leer(b"nombre,email\nAna,ana@test.gym\nLuis\nEva,eva@test.gym,sobra\nSol,sol@test.gym\n")
+    assert [numero for numero, _ in filas] == [2, 3, 4, 5]
+    assert filas[1][1] == filas[2][1] == "CSV inválido: se esperaban 2 columnas"
+    assert filas[3] == (5, {"nombre": "Sol", "email": "sol@test.gym"})
+
+
+def test_csv_de_muchas_filas(monkeypatch):
+    # Más filas que CSV_FILAS_POR_PASO: el lector vuelve al hilo varias veces
+    monkeypatch.setattr(Carga_masiva_service, "CSV_FILAS_POR_PASO", 4)
+    cuerpo = b"n\n" + b"".join(b"%d\n" % i for i in range(10))
+    assert _leer(cuerpo, tamano=5) == [(i + 2, {"n": str(i)}) for i in range(10)]
+
+
+def test_ndjson():
+    cuerpo = b'{"nombre": "Ana"}\n\n{"nombre": \n[1, 2]\r\n{"nombre": "Luis"}'
+    filas = _leer(cuerpo, "ndjson", tamano=4)
+    assert filas[0] == (1, {"nombre": "Ana"})
+    assert filas[1][0] == 3 and filas[1][1].startswith("JSON inválido")
+    assert filas[2] == (4, "JSON inválido: se esperaba un objeto")
+    assert filas[3] == (5, {"nombre": "Luis"})
@@ -0,0 +1,111 @@
+import asyncio
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from src.Services.Gimnasio_service import GimnasioService
+from src.Services.Particiones_service import AnilloConsistente, GimnasioParticionado
+
+PASSWORD = "clave1234"
+
+
+def _ejecutar(prueba):
+    """Cada prueba monta un coordinador con 3 particiones en este proceso y lo cierra al acabar."""
+    async def envoltorio():
+        gym = GimnasioParticionado(3, en_procesos=False, catalogo=GimnasioService())
+        try:
+            await prueba(gym)
+        finally:
+            await gym.cerrar()
+    asyncio.run(envoltorio())
+
+
+async def _socios(gym: GimnasioParticionado, n: int):
+    return [await gym.registrar_socio(f"Socio {i}", f"socio{i}@test.gym", "1990-01-01", "intermedio", PASSWORD)
+            for i in range(n)]
+
+
+def test_anillo_reparte_y_mueve_pocas_claves():
+    claves = [f"socio-{i}" for i in range(2000)]
+    antes, despues = AnilloConsistente(3), AnilloConsistente(4)
+    assert {antes.particion(c) for c in claves} == {0, 1, 2}
+    movidas = sum(antes.particion(c) != despues.particion(c) for c in claves) / len(claves)
+    assert movidas < 0.4  # ~1/4; con hash módulo N se movería ~3/4
+
+
+def test_alta_login_y_email_unico():
+    async def prueba(gym):
+        socios = await _socios(gym, 12)
+        assert sum(await gym.socios_por_particion()) == 12
+        assert max(await gym.socios_por_particion()) < 12  # repartidos en más de una
+        assert (await gym.autenticar_socio("socio3@test.gym", PASSWORD)).id == socios[3].id
+        assert await gym.autenticar_socio("socio3@test.gym", "otra") is None
+        assert (await gym.buscar_socio_por_email("socio5@test.gym")).id == socios[5].id
+        assert await gym.buscar_socio_por_email("nadie@test.gym") is None
+        with pytest.raises(ValueError):
+            await gym.registrar_socio("Otro", "socio3@test.gym", "1990-01-01", "intermedio", PASSWORD)
+        # El catálogo del coordinador no guarda socios
+        assert not gym.catalogo.socios
+    _ejecutar(prueba)
+
+
+def test_aforo_global_en_clases_y_sesiones():
+    async def prueba(gym):
+        socios = await _socios(gym, 8)
+        entrenador = gym.catalogo.registrar_entrenador("Entrenadora", "e@test.gym", "Yoga")
+        clase = gym.catalogo.crear_clase("Yoga", "10:00", 5, entrenador.id)
+
+        async def reservar(socio_id, clase_id):
+            try:
+                return await gym.reservar_clase(socio_id, clase_id)
+            except ValueError:  # completa
+                return False
+
+        resultados = await asyncio.gather(*(reservar(s.id, clase.id) for s in socios))
+        assert sum(resultados) == 5 and len(clase.socios_inscritos) == 5
+        inscrito = next(s for s, ok in zip(socios, resultados) if ok)
+        assert clase.id in (await gym.buscar_socio_por_id(inscrito.id)).clases_reservadas
+        assert await gym.cancelar_reserva_clase(inscrito.id, clase.id)
+        assert len(clase.socios_inscritos) == 4
+        assert clase.id not in (await gym.buscar_socio_por_id(inscrito.id)).clases_reservadas
+
+        serie = gym.catalogo.crear_serie("Pilates", "12:00", 2, entrenador.id, date.today(), "semanal", 1)
+        fecha = next(iter(serie.fechas(date.today(), date.today() + timedelta(days=7))))
+        sesion = serie.id_ocurrencia(fecha)
+        resultados = [await reservar(s.id, sesion) for s in socios[:4]]
+        assert resultados == [True, True, False, False]
+    _ejecutar(prueba)
+
+
+def test_clasificacion_y_posiciones_globales():
+    async def prueba(gym):
+        socios = await _socios(gym, 9)
+        for i, socio in enumerate(socios):
+            for _ in range(i):
+                await gym.registrar_progreso(socio.id, 50.0, 10, 120)
+        total, puestos = await gym.clasificacion("puntos", 3, 0)
+        assert total == 8  # el socio 0, sin progresos, no puntúa
+        assert [s.id for _, s, _ in puestos] == [socios[8].id, socios[7].id, socios[6].id]
+        total, puestos = await gym.clasificacion("puntos", 2, 2)
+        assert [(p, s.id) for p, s, _ in puestos] == [(3, socios[6].id), (4, socios[5].id)]
+        resumen = await gym.estadisticas_socio(socios[6].id)
+        assert (resumen["posicion"], resumen["total_socios"], resumen["posicion_volumen_semanal"]) == (3, 8, 3)
+    _ejecutar(prueba)
+
+
+def test_iot_y_analitica_en_las_particiones():
+    async def prueba(gym):
+        socios = await _socios(gym, 4)
+        dispositivo = await gym.registrar_dispositivo("sensor", socios[1].id)
+        ahora = datetime.now()
+        lote = [(40.0, 8, 60, ahora), (45.0, 6, 90, ahora)]
+        assert await gym.registrar_lecturas_dispositivo(dispositivo.id, socios[1].id, lote, 7) == 2
+        assert await gym.registrar_lecturas_dispositivo(dispositivo.id, socios[1].id, lote, 7) is None  # reenvío
+        assert len(await gym.listar_progresos_socio(socios[1].id)) == 2
+        await gym.registrar_acceso(socios[2].id)
+        assert gym.catalogo.ocupacion_sede("principal")["accesos_hoy"] == 1
+
+        manifiesto = await gym.exportar_analitica()
+        assert manifiesto["filas"]["socios"] == 4
+        assert manifiesto["filas"]["progresos"] == 2 and manifiesto["filas"]["accesos"] == 1
+    _ejecutar(prueba)
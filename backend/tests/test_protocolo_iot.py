@@ -0,0 +1,85 @@
+from datetime import datetime
+
+import pytest
+
+from src import protocolo_iot
+from src.protocolo_iot import CABECERA, VERSION, codificar, decodificar, leer_cabecera, progresos
+
+INSTANTE = datetime(2024, 3, 1, 10, 30)
+
+LECTURAS = {
+    "pulsera": {"timestamp": INSTANTE.isoformat(), "pulsaciones": 120, "pasos": 5400, "calorias": 310.25,
+                "peso_levantado": 42.5, "repeticiones": 10, "tiempo_ejercicio": 90},
+    "bascula": {"timestamp": INSTANTE.isoformat(), "peso": 72.3, "grasa_corporal": 18.5, "masa_muscular": 33.1},
+    "sensor": {"timestamp": INSTANTE.isoformat(), "repeticiones": 8, "peso_levantado": 60.0, "tiempo_ejercicio": 45},
+}
+
+
+def test_cabecera_de_seis_bytes():
+    assert CABECERA.format == "<BBI"
+    assert CABECERA.size == 6
+    assert VERSION == 1
+    assert protocolo_iot.tamano_registro("pulsera") == 17
+    assert protocolo_iot.tamano_registro("bascula") == 10
+
+
+@pytest.mark.parametrize("tipo", sorted(LECTURAS))
+def test_ida_y_vuelta(tipo):
+    lote = codificar(tipo, [LECTURAS[tipo]] * 3)
+    assert len(lote) == CABECERA.size + 3 * protocolo_iot.tamano_registro(tipo)
+    tipo_leido, lecturas = decodificar(lote)
+    assert tipo_leido == tipo
+    assert len(lecturas) == 3
+    for lectura in lecturas:
+        assert lectura.keys() == LECTURAS[tipo].keys()
+        assert lectura["timestamp"] == INSTANTE.isoformat()
+        for campo, valor in LECTURAS[tipo].items():
+            if campo != "timestamp":
+                assert lectura[campo] == pytest.approx(valor)
+
+
+def test_progresos_sin_diccionarios():
+    tipo, lecturas = progresos(codificar("pulsera", [LECTURAS["pulsera"]]))
+    assert tipo == "pulsera"
+    assert list(lecturas) == [(42.5, 10, 90, INSTANTE)]
+
+    _, lecturas = progresos(codificar("bascula", [LECTURAS["bascula"]]))
+    assert list(lecturas) == [(pytest.approx(72.3), 0, 0, INSTANTE)]
+
+    _, lecturas = progresos(codificar("sensor", [LECTURAS["sensor"]]))
+    assert list(lecturas) == [(60.0, 8, 45, INSTANTE)]
+
+
+def test_progreso_de_lectura_json():
+    assert protocolo_iot.progreso_de_lectura(LECTURAS["sensor"]) == (60.0, 8, 45)
+    assert protocolo_iot.progreso_de_lectura({"peso": 70}) == (70.0, 0, 0)
+    assert protocolo_iot.progreso_de_lectura({"pulsaciones": 90}) is None
+
+
+def test_lote_vacio():
+    lote = codificar("sensor", [])
+    assert leer_cabecera(lote)[:2] == ("sensor", 0)
+    assert decodificar(lote) == ("sensor", [])
+
+
+def test_errores_de_cabecera():
+    lote = codificar("sensor", [LECTURAS["sensor"]])
+    with pytest.raises(ValueError, match="incompleto"):
+        leer_cabecera(lote[:4])
+    with pytest.raises(ValueError, match="versión"):
+        leer_cabecera(CABECERA.pack(VERSION + 1, 3, 1) + lote[CABECERA.size:])
+    with pytest.raises(ValueError, match="desconocido"):
+        leer_cabecera(CABECERA.pack(VERSION, 99, 1) + lote[CABECERA.size:])
+    with pytest.raises(ValueError, match="no cuadra"):
+        leer_cabecera(lote[:-1])
+    with pytest.raises(ValueError, match="no cuadra"):
+        leer_cabecera(CABECERA.pack(VERSION, 3, 2) + lote[CABECERA.size:])
+
+
+def test_errores_al_codificar():
+    with pytest.raises(ValueError, match="sin formato binario"):
+        codificar("cinta", [])
+    with pytest.raises(ValueError, match="fuera de rango"):
+        codificar("sensor", [dict(LECTURAS["sensor"], repeticiones=70_000)])
+    with pytest.raises(ValueError, match="fuera de rango"):
+        codificar("bascula", [dict(LECTURAS["bascula"], peso=-1)])
@@ -0,0 +1,45 @@
+from datetime import date
+
+import pytest
+
+from src.models.SerieClase import SerieClase, parsear_rrule
+
+
+def test_parsear_rrule_semanal():
+    assert parsear_rrule("FREQ=WEEKLY;BYDAY=MO,WE;COUNT=20") == {
+        "frecuencia": "semanal", "dias": ["lunes", "miercoles"], "repeticiones": 20}
+
+
+def test_parsear_rrule_diaria_con_prefijo_e_until():
+    assert parsear_rrule("RRULE:freq=daily;interval=2;until=20240331T235959Z") == {
+        "frecuencia": "diaria", "intervalo": 2, "fecha_fin": date(2024, 3, 31)}
+
+
+@pytest.mark.parametrize("regla", [
+    "", "FREQ=MONTHLY", "BYDAY=MO", "FREQ=WEEKLY;BYDAY=XX", "FREQ=DAILY;COUNT=muchas",
+    "FREQ=DAILY;INTERVAL=", "FREQ=DAILY;UNTIL=2024-03-31",
+])
+def test_parsear_rrule_invalida(regla):
+    with pytest.raises(ValueError, match="regla inválida"):
+        parsear_rrule(regla)
+
+
+def _serie(regla: str, inicio: date) -> SerieClase:
+    return SerieClase("Yoga", "18:00", 10, "entrenador", inicio, **parsear_rrule(regla))
+
+
+def test_serie_semanal_desde_rrule():
+    # 2024-01-03 es miércoles: el lunes de esa semana no cuenta como sesión
+    serie = _serie("FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,WE;COUNT=4", date(2024, 1, 3))
+    fechas = list(serie.fechas(date(2024, 1, 1), date(2024, 12, 31)))
+    assert fechas == [date(2024, 1, 3), date(2024, 1, 15), date(2024, 1, 17), date(2024, 1, 29)]
+    assert all(serie.es_ocurrencia(f) for f in fechas)
+    assert not serie.es_ocurrencia(date(2024, 1, 8))    # semana sin sesiones
+    assert not serie.es_ocurrencia(date(2024, 1, 31))   # después de COUNT
+
+
+def test_serie_diaria_desde_rrule():
+    serie = _serie("FREQ=DAILY;INTERVAL=3;UNTIL=20240110", date(2024, 1, 1))
+    assert list(serie.fechas(date(2024, 1, 2), date(2024, 2, 1))) == [
+        date(2024, 1, 4), date(2024, 1, 7), date(2024, 1, 10)]
+    assert not serie.es_ocurrencia(date(2024, 1, 13))
@@ -0,0 +1,71 @@
+import time
+
+from src.sesiones import AlmacenSesiones
+
+
+def test_rotar_cambia_el_token_de_refresco():
+    almacen = AlmacenSesiones()
+    sid, refresco = almacen.abrir("ana@test.gym")
+    assert len(almacen) == 1
+    email, nuevo = almacen.rotar(sid, refresco)
+    assert email == "ana@test.gym"
+    assert nuevo != refresco
+    assert almacen.rotar(sid, nuevo)[0] == "ana@test.gym"
+
+
+def test_reutilizar_un_token_cierra_la_sesion():
+    almacen = AlmacenSesiones()
+    sid, refresco = almacen.abrir("ana@test.gym")
+    _, nuevo = almacen.rotar(sid, refresco)
+    assert almacen.rotar(sid, refresco) is None   # token ya usado: posible robo
+    assert almacen.rotar(sid, nuevo) is None      # la sesión ya no existe
+    assert len(almacen) == 0
+    assert almacen.expira(sid) is None
+    assert almacen.revocado([None, sid])          # sus tokens de acceso dejan de valer
+
+
+def test_sesion_desconocida():
+    almacen = AlmacenSesiones()
+    assert almacen.rotar("no-existe", "x") is None
+    assert not almacen.revocado(["no-existe"])
+
+
+def test_cerrar_y_revocar():
+    almacen = AlmacenSesiones(duracion_acceso=60)
+    sid, refresco = almacen.abrir("ana@test.gym")
+    otro, _ = almacen.abrir("luis@test.gym")
+    almacen.revocar("jti-1")
+    assert almacen.revocado(["jti-1", otro])
+    assert not almacen.revocado(["jti-2", otro])
+    almacen.cerrar(sid)
+    assert almacen.rotar(sid, refresco) is None
+    assert almacen.revocado(["jti-2", sid])
+    assert almacen.estado()["sesiones"] == 1
+    assert almacen.estado()["revocados"] == 2
+
+
+def test_caducidad(monkeypatch):
+    ahora = [1_000_000.0]
+    monkeypatch.setattr(time, "time", lambda: ahora[0])
+    almacen = AlmacenSesiones(duracion_acceso=60, duracion_sesion=3600)
+    sid, refresco = almacen.abrir("ana@test.gym")
+    almacen.revocar("jti-1")
+    assert almacen.expira(sid) == ahora[0] + 3600
+
+    ahora[0] += 61
+    assert not almacen.revocado(["jti-1"])   # el token de acceso ya habría caducado
+    assert almacen.estado()["revocados"] == 0
+    _, refresco = almacen.rotar(sid, refresco)
+    assert almacen.expira(sid) == 1_000_000.0 + 3600   # rotar no alarga la sesión
+
+    ahora[0] += 3600
+    assert almacen.rotar(sid, refresco) is None
+    assert len(almacen) == 0
+
+
+def test_expulsa_las_sesiones_mas_antiguas():
+    almacen = AlmacenSesiones(max_sesiones=2)
+    sesiones = [almacen.abrir(f"socio{i}@test.gym") for i in range(3)]
+    assert len(almacen) == 2
+    assert almacen.rotar(*sesiones[0]) is None
+    assert almacen.rotar(*sesiones[2])[0] == "socio2@test.gym"
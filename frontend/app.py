@@ -3,6 +3,7 @@ import requests
 import pandas as pd
 import altair as alt
 import time
+import uuid
 from datetime import date
 import requests.exceptions
 
@@ -113,6 +114,52 @@ local_css()
 # Configuración de la API
 API_URL = "http://backend:8000"
 
+def escritura_idempotente(metodo, url, headers, intentos=3, **kwargs):
+    """
+    Petición de escritura con Idempotency-Key: si la Wi-Fi corta la conexión
+    se reintenta con la misma clave y el backend no la ejecuta dos veces.
+    """
+    headers = {**headers, "Idempotency-Key": str(uuid.uuid4())}
+    for intento in range(intentos):
+        try:
+            return requests.request(metodo, url, headers=headers, timeout=10, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if intento == intentos - 1:
+                raise
+            time.sleep(0.5 * 2 ** intento)
+
+def guardar_tokens(datos):
+    """Guarda los tokens de /token o /token/refresh y cuándo caduca el de acceso."""
+    st.session_state['token'] = datos['access_token']
+    st.session_state['refresh_token'] = datos.get('refresh_token')
+    st.session_state['token_expira'] = time.time() + (datos.get('expires_in') or 15 * 60)
+
+def refrescar_sesion():
+    """
+    Renueva los tokens con el de refresco (sin contraseña ni bcrypt en el backend).
+    Devuelve False si no hay sesión que renovar y toca volver a entrar.
+    """
+    refresh_token = st.session_state.get('refresh_token')
+    if not refresh_token:
+        return False
+    try:
+        res = requests.post(f"{API_URL}/token/refresh", json={"refresh_token": refresh_token}, timeout=10)
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+        return False
+    if res.status_code != 200:
+        return False
+    guardar_tokens(res.json())
+    return True
+
+def cerrar_sesion(headers):
+    """Cierra la sesión también en el backend (sus tokens dejan de valer) y vuelve al login."""
+    try:
+        requests.post(f"{API_URL}/logout", headers=headers, timeout=5)
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+        pass  # el token caducará solo
+    st.session_state.clear()
+    st.rerun()
+
 def header_section(title, icon, subtitle):
     st.markdown(f"""
     <div style='margin-bottom: 2rem;'>
@@ -129,7 +176,7 @@ def header_section(title, icon, subtitle):
 
 def callback_reservar(clase_id, headers):
     try:
-        resp = requests.post(f"{API_URL}/reservas", json={"clase_id": clase_id}, headers=headers)
+        resp = escritura_idempotente("POST", f"{API_URL}/reservas", headers, json={"clase_id": clase_id})
         if resp.status_code == 201:
             st.toast("✅ Reserva confirmada correctamente", icon="🎉")
         else:
@@ -140,7 +187,7 @@ def callback_reservar(clase_id, headers):
 
 def callback_cancelar(clase_id, headers):
     try:
-        resp = requests.delete(f"{API_URL}/reservas/{clase_id}", headers=headers)
+        resp = escritura_idempotente("DELETE", f"{API_URL}/reservas/{clase_id}", headers)
         if resp.status_code == 200:
             st.toast("🗑️ Reserva cancelada", icon="✅")
         else:
@@ -150,7 +197,7 @@ def callback_cancelar(clase_id, headers):
 
 def callback_asignar_rutina(rutina_id, headers):
     try:
-        resp = requests.post(f"{API_URL}/rutinas/{rutina_id}/asignar", headers=headers)
+        resp = escritura_idempotente("POST", f"{API_URL}/rutinas/{rutina_id}/asignar", headers)
         if resp.status_code == 200:
             st.toast("💪 Rutina asignada a tu plan", icon="🔥")
         else:
@@ -158,10 +205,24 @@ def callback_asignar_rutina(rutina_id, headers):
     except:
         st.toast("❌ Error de conexión", icon="🔥")
 
+def obtener_pulsera(headers):
+    """ID de la pulsera del usuario: la primera que tenga registrada o, si no tiene, una nueva."""
+    if 'pulsera_id' not in st.session_state:
+        resp = requests.get(f"{API_URL}/iot/dispositivos", headers=headers)
+        resp.raise_for_status()
+        pulseras = [d for d in resp.json() if d["tipo"] == "pulsera"]
+        if pulseras:
+            st.session_state['pulsera_id'] = pulseras[0]["id"]
+        else:
+            resp = escritura_idempotente("POST", f"{API_URL}/iot/dispositivos", headers, json={"tipo": "pulsera"})
+            resp.raise_for_status()
+            st.session_state['pulsera_id'] = resp.json()["id"]
+    return st.session_state['pulsera_id']
+
 def callback_simular_iot(headers):
     try:
-        # Simulamos un dispositivo llamado "pulsera-web"
-        resp = requests.post(f"{API_URL}/iot/sincronizar/pulsera-web", headers=headers)
+        # Simulamos la pulsera del usuario (se registra la primera vez)
+        resp = escritura_idempotente("POST", f"{API_URL}/iot/sincronizar/{obtener_pulsera(headers)}", headers)
         
         if resp.status_code == 200:
             datos = resp.json().get("datos_recibidos", {})
@@ -199,7 +260,7 @@ def auth_system():
                         try:
                             response = requests.post(f"{API_URL}/token", data={"username": email, "password": password})
                             if response.status_code == 200:
-                                st.session_state['token'] = response.json()['access_token']
+                                guardar_tokens(response.json())
                                 st.toast("¡Conexión exitosa!", icon="✅")
                                 time.sleep(0.5)
                                 st.rerun()
@@ -269,10 +330,14 @@ def render_perfil(headers):
                     st.markdown(f"### Hola, {user['nombre']} 👋")
                     st.caption(f"ID Socio: `{user['id']}`")
                     st.markdown("---")
+                    # Puntos, posición y racha reales (calculados por el backend)
+                    res_stats = requests.get(f"{API_URL}/socios/me/estadisticas", headers=headers)
+                    stats = res_stats.json() if res_stats.status_code == 200 else {}
+                    posicion = f"#{stats['posicion']}" if stats.get('posicion') else "Sin clasificar"
                     m1, m2, m3 = st.columns(3)
                     m1.metric("Nivel", user['nivel'].upper(), "⭐")
-                    m2.metric("Puntos", "1,250", "🏆")
-                    m3.metric("Estado", "Activo", "🟢")
+                    m2.metric("Puntos", f"{stats.get('puntos', 0):,.0f}", posicion)
+                    m3.metric("Racha", f"{stats.get('racha_actual', 0)} días", f"Mejor: {stats.get('mejor_racha', 0)}")
             
             st.markdown("### 📋 Información de Cuenta")
             col_left, col_right = st.columns(2)
@@ -294,7 +359,7 @@ def render_perfil(headers):
                 # Simula pasar el torno
                 if st.button("📲 Simular Entrada (QR)", type="primary"):
                     try:
-                        resp = requests.post(f"{API_URL}/accesos", headers=headers)
+                        resp = escritura_idempotente("POST", f"{API_URL}/accesos", headers)
                         if resp.status_code == 200:
                             detalle = resp.json().get('detalle', 'Acceso OK')
                             st.toast(f"✅ {detalle}", icon="🚪")
@@ -307,9 +372,11 @@ def render_perfil(headers):
             with c_logout:
                 # Botón de Logout con KEY ÚNICA para evitar conflictos
                 if st.button("🚪 Cerrar Sesión", type="secondary", key="btn_logout_perfil"):
-                    st.session_state.clear()
-                    st.rerun()
+                    cerrar_sesion(headers)
                     
+        elif res.status_code == 401 and refrescar_sesion():
+            # Token de acceso caducado: se renueva con el de refresco sin pedir la contraseña
+            st.rerun()
         else:
             st.error("❌ Tu sesión ha expirado. Por favor, entra de nuevo.")
             st.session_state.clear()
@@ -418,7 +485,16 @@ def render_rutinas(headers):
                             col_a, col_b = st.columns([3, 1])
                             col_a.markdown(f"### ✅ {rut['nombre']}")
                             col_a.caption(f"Nivel: {rut['dificultad'].upper()} | Duración: {rut['duracion']} min")
-                            
+
+                            # Contenido de la rutina (ejercicios del catálogo con series y repeticiones)
+                            with col_a.expander("Ver ejercicios"):
+                                det = requests.get(f"{API_URL}/rutinas/{rut['id']}")
+                                ejercicios = det.json().get("ejercicios", []) if det.status_code == 200 else []
+                                if not ejercicios:
+                                    st.caption("Esta rutina aún no tiene ejercicios.")
+                                for ej in ejercicios:
+                                    st.write(f"• **{ej['nombre']}** ({ej['grupo_muscular']}): {ej['series']} x {ej['repeticiones']}")
+
                             # Botón decorativo "Iniciar" (Simulado)
                             if col_b.button("Empezar", key=f"start_{rut['id']}"):
                                 st.toast(f"¡A darle duro a {rut['nombre']}!", icon="🔥")
@@ -501,6 +577,10 @@ def main():
         auth_system()
         return
 
+    # Renovamos el token de acceso un poco antes de que caduque
+    if time.time() > st.session_state.get('token_expira', 0) - 60:
+        refrescar_sesion()
+
     headers = {"Authorization": f"Bearer {st.session_state['token']}"}
 
     with st.sidebar:
@@ -510,8 +590,7 @@ def main():
         st.markdown("---")
         
         if st.button("Cerrar Sesión", key="logout_sidebar"):
-            st.session_state.clear()
-            st.rerun()
+            cerrar_sesion(headers)
 
     if menu == "Mi Perfil":
         render_perfil(headers)